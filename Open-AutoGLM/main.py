@@ -406,7 +406,7 @@ Examples:
         "--base-url",
         type=str,
         default=os.getenv("PHONE_AGENT_BASE_URL", "http://localhost:8000/v1"),
-        help="Model API base URL",
+        help="Model API base URL (comma-separated for several replicas)",
     )
 
     parser.add_argument(
@@ -430,6 +430,12 @@ Examples:
         help="Maximum steps per task",
     )
 
+    parser.add_argument(
+        "--continuous-usage-stats",
+        action="store_true",
+        help="Ask for token usage on every stream chunk (vLLM/SGLang only)",
+    )
+
     # Device options
     parser.add_argument(
         "--device-id",
@@ -741,7 +747,9 @@ def main():
         sys.exit(1)
 
     # Check model API connectivity and model availability
-    if not check_model_api(args.base_url, args.model, args.apikey):
+    # With several replicas, one reachable endpoint is enough to start
+    base_urls = [url.strip() for url in args.base_url.split(",") if url.strip()]
+    if not any(check_model_api(url, args.model, args.apikey) for url in base_urls):
         sys.exit(1)
 
     # Create configurations and agent based on device type
@@ -750,6 +758,7 @@ def main():
         model_name=args.model,
         api_key=args.apikey,
         lang=args.lang,
+        continuous_usage_stats=args.continuous_usage_stats,
     )
 
     if device_type == DeviceType.IOS:
@@ -7,6 +7,16 @@ using AI models for visual understanding and decision making.
 
 from phone_agent.agent import PhoneAgent
 from phone_agent.agent_ios import IOSPhoneAgent
+from phone_agent.async_device_factory import AsyncDeviceFactory, BlockingDeviceBridge
+from phone_agent.orchestrator import AgentOrchestrator, DeviceSpec, OrchestratorConfig
 
 __version__ = "0.1.0"
-__all__ = ["PhoneAgent", "IOSPhoneAgent"]
+__all__ = [
+    "PhoneAgent",
+    "IOSPhoneAgent",
+    "AgentOrchestrator",
+    "DeviceSpec",
+    "OrchestratorConfig",
+    "AsyncDeviceFactory",
+    "BlockingDeviceBridge",
+]
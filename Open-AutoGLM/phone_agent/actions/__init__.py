@@ -1,5 +1,26 @@
 """Action handling module for Phone Agent."""
 
 from phone_agent.actions.handler import ActionHandler, ActionResult
+from phone_agent.actions.parser import ActionParseError, ActionParser, parse_action_call
+from phone_agent.actions.registry import (
+    ACTION_REGISTRY,
+    ACTION_STATS,
+    ActionSpec,
+    ActionStats,
+    CostClass,
+    SettleStrategy,
+)
 
-__all__ = ["ActionHandler", "ActionResult"]
+__all__ = [
+    "ActionHandler",
+    "ActionResult",
+    "ActionParseError",
+    "ActionParser",
+    "parse_action_call",
+    "ACTION_REGISTRY",
+    "ACTION_STATS",
+    "ActionSpec",
+    "ActionStats",
+    "CostClass",
+    "SettleStrategy",
+]
@@ -1,14 +1,20 @@
 """Action handler for processing AI model outputs."""
 
-import ast
 import re
 import subprocess
 import time
 from dataclasses import dataclass
 from typing import Any, Callable
 
+from phone_agent.actions.parser import parse_action_call
+from phone_agent.actions.registry import (
+    ACTION_REGISTRY,
+    ACTION_STATS,
+    ActionSpec,
+    SettleStrategy,
+)
 from phone_agent.config.timing import TIMING_CONFIG
-from phone_agent.device_factory import get_device_factory
+from phone_agent.device_factory import DeviceFactory, get_device_factory
 
 
 @dataclass
@@ -19,6 +25,10 @@ class ActionResult:
     should_finish: bool
     message: str | None = None
     requires_confirmation: bool = False
+    # Time spent in device commands and in settle waits/sleeps (including
+    # settle time handed over to the settle callback)
+    device_ms: float = 0.0
+    wait_ms: float = 0.0
 
 
 class ActionHandler:
@@ -30,6 +40,13 @@ class ActionHandler:
         confirmation_callback: Optional callback for sensitive action confirmation.
             Should return True to proceed, False to cancel.
         takeover_callback: Optional callback for takeover requests (login, captcha).
+        device_factory: Optional device backend; defaults to the process-wide
+            factory from get_device_factory().
+        settle_callback: Optional callback invoked with the settle delay
+            (seconds) once an action's device command has returned. If it
+            returns True the caller waits the delay out itself (e.g. while
+            capturing the next screen) and execute() returns without
+            sleeping.
     """
 
     def __init__(
@@ -37,10 +54,21 @@ class ActionHandler:
         device_id: str | None = None,
         confirmation_callback: Callable[[str], bool] | None = None,
         takeover_callback: Callable[[str], None] | None = None,
+        device_factory: DeviceFactory | None = None,
+        settle_callback: Callable[[float], bool] | None = None,
     ):
         self.device_id = device_id
+        self._device_factory = device_factory
         self.confirmation_callback = confirmation_callback or self._default_confirmation
         self.takeover_callback = takeover_callback or self._default_takeover
+        # Keyboard that was active before the first Type action of this session.
+        # ADB Keyboard stays active until end_session() restores it.
+        self._original_ime: str | None = None
+        self.settle_callback = settle_callback
+        # Seconds slept by the action currently executing, and settle time
+        # handed over to settle_callback
+        self._waited = 0.0
+        self._deferred = 0.0
 
     def execute(
         self, action: dict[str, Any], screen_width: int, screen_height: int
@@ -71,41 +99,53 @@ class ActionHandler:
             )
 
         action_name = action.get("action")
-        handler_method = self._get_handler(action_name)
+        spec = ACTION_REGISTRY.get(action_name)
 
-        if handler_method is None:
+        if spec is None:
             return ActionResult(
                 success=False,
                 should_finish=False,
                 message=f"Unknown action: {action_name}",
             )
 
+        self._waited = 0.0
+        self._deferred = 0.0
+        start = time.perf_counter()
         try:
-            return handler_method(action, screen_width, screen_height)
+            result = getattr(self, spec.handler)(action, screen_width, screen_height)
+            if result.success:
+                self._settle(spec)
         except Exception as e:
-            return ActionResult(
+            result = ActionResult(
                 success=False, should_finish=False, message=f"Action failed: {e}"
             )
-
-    def _get_handler(self, action_name: str) -> Callable | None:
-        """Get the handler method for an action."""
-        handlers = {
-            "Launch": self._handle_launch,
-            "Tap": self._handle_tap,
-            "Type": self._handle_type,
-            "Type_Name": self._handle_type,
-            "Swipe": self._handle_swipe,
-            "Back": self._handle_back,
-            "Home": self._handle_home,
-            "Double Tap": self._handle_double_tap,
-            "Long Press": self._handle_long_press,
-            "Wait": self._handle_wait,
-            "Take_over": self._handle_takeover,
-            "Note": self._handle_note,
-            "Call_API": self._handle_call_api,
-            "Interact": self._handle_interact,
-        }
-        return handlers.get(action_name)
+        elapsed = time.perf_counter() - start
+        result.wait_ms = round((self._waited + self._deferred) * 1000, 1)
+        result.device_ms = round(max(0.0, elapsed - self._waited) * 1000, 1)
+        ACTION_STATS.record(spec, result.device_ms, result.wait_ms, result.success)
+        return result
+
+    def _settle(self, spec: ActionSpec) -> None:
+        """Wait for the screen to settle as declared by the action's spec."""
+        if spec.settle == SettleStrategy.FIXED and spec.settle_delay:
+            delay = getattr(TIMING_CONFIG.device, spec.settle_delay)
+            if self.settle_callback is not None and self.settle_callback(delay):
+                self._deferred = delay
+                return
+            self._wait(delay)
+
+    def _wait(self, seconds: float) -> None:
+        """Sleep, counting the time as wait time of the current action."""
+        if seconds <= 0:
+            return
+        start = time.perf_counter()
+        time.sleep(seconds)
+        self._waited += time.perf_counter() - start
+
+    @property
+    def device_factory(self) -> DeviceFactory:
+        """Device backend the actions are sent to."""
+        return self._device_factory or get_device_factory()
 
     def _convert_relative_to_absolute(
         self, element: list[int], screen_width: int, screen_height: int
@@ -121,8 +161,8 @@ class ActionHandler:
         if not app_name:
             return ActionResult(False, False, "No app name specified")
 
-        device_factory = get_device_factory()
-        success = device_factory.launch_app(app_name, self.device_id)
+        device_factory = self.device_factory
+        success = device_factory.launch_app(app_name, self.device_id, delay=0)
         if success:
             return ActionResult(True, False)
         return ActionResult(False, False, f"App not found: {app_name}")
@@ -144,34 +184,59 @@ class ActionHandler:
                     message="User cancelled sensitive operation",
                 )
 
-        device_factory = get_device_factory()
-        device_factory.tap(x, y, self.device_id)
+        device_factory = self.device_factory
+        device_factory.tap(x, y, self.device_id, delay=0)
         return ActionResult(True, False)
 
     def _handle_type(self, action: dict, width: int, height: int) -> ActionResult:
         """Handle text input action."""
         text = action.get("text", "")
+        timing = TIMING_CONFIG.action
 
-        device_factory = get_device_factory()
-
-        # Switch to ADB keyboard
-        original_ime = device_factory.detect_and_set_adb_keyboard(self.device_id)
-        time.sleep(TIMING_CONFIG.action.keyboard_switch_delay)
+        device_factory = self.device_factory
 
-        # Clear existing text and type new text
-        device_factory.clear_text(self.device_id)
-        time.sleep(TIMING_CONFIG.action.text_clear_delay)
+        # Switch to ADB keyboard once per session
+        if self._original_ime is None:
+            self._original_ime = device_factory.detect_and_set_adb_keyboard(
+                self.device_id
+            )
+            device_factory.wait_for_keyboard(
+                self.device_id, timeout=timing.keyboard_switch_delay
+            )
 
-        # Handle multiline text by splitting on newlines
-        device_factory.type_text(text, self.device_id)
-        time.sleep(TIMING_CONFIG.action.text_input_delay)
+        if timing.text_verify_timeout <= 0:
+            device_factory.clear_text(self.device_id)
+            self._wait(timing.text_clear_delay)
+            device_factory.type_text(text, self.device_id)
+            self._wait(timing.text_input_delay)
+            return ActionResult(True, False)
 
-        # Restore original keyboard
-        device_factory.restore_keyboard(original_ime, self.device_id)
+        # Clear and type in one round trip, then confirm by reading the field back
+        device_factory.clear_and_type(text, self.device_id)
+        deadline = time.monotonic() + timing.text_verify_timeout
+        message = None
+        while True:
+            focused_text = device_factory.get_focused_text(self.device_id)
+            if focused_text is None or text.strip() in focused_text:
+                # Confirmed, or the field cannot be read back (WebView, password)
+                break
+            if time.monotonic() >= deadline:
+                # Reported in the action_executed event and the trace
+                message = f"Typed text not confirmed in focused field: {focused_text!r}"
+                break
+            self._wait(0.1)
+
+        return ActionResult(True, False, message)
+
+    def end_session(self) -> None:
+        """Restore the keyboard that was active before the session's first Type action."""
+        if self._original_ime is None:
+            return
+        device_factory = self.device_factory
+        device_factory.restore_keyboard(self._original_ime, self.device_id)
+        self._original_ime = None
         time.sleep(TIMING_CONFIG.action.keyboard_restore_delay)
 
-        return ActionResult(True, False)
-
     def _handle_swipe(self, action: dict, width: int, height: int) -> ActionResult:
         """Handle swipe action."""
         start = action.get("start")
@@ -183,20 +248,22 @@ class ActionHandler:
         start_x, start_y = self._convert_relative_to_absolute(start, width, height)
         end_x, end_y = self._convert_relative_to_absolute(end, width, height)
 
-        device_factory = get_device_factory()
-        device_factory.swipe(start_x, start_y, end_x, end_y, device_id=self.device_id)
+        device_factory = self.device_factory
+        device_factory.swipe(
+            start_x, start_y, end_x, end_y, device_id=self.device_id, delay=0
+        )
         return ActionResult(True, False)
 
     def _handle_back(self, action: dict, width: int, height: int) -> ActionResult:
         """Handle back button action."""
-        device_factory = get_device_factory()
-        device_factory.back(self.device_id)
+        device_factory = self.device_factory
+        device_factory.back(self.device_id, delay=0)
         return ActionResult(True, False)
 
     def _handle_home(self, action: dict, width: int, height: int) -> ActionResult:
         """Handle home button action."""
-        device_factory = get_device_factory()
-        device_factory.home(self.device_id)
+        device_factory = self.device_factory
+        device_factory.home(self.device_id, delay=0)
         return ActionResult(True, False)
 
     def _handle_double_tap(self, action: dict, width: int, height: int) -> ActionResult:
@@ -206,8 +273,8 @@ class ActionHandler:
             return ActionResult(False, False, "No element coordinates")
 
         x, y = self._convert_relative_to_absolute(element, width, height)
-        device_factory = get_device_factory()
-        device_factory.double_tap(x, y, self.device_id)
+        device_factory = self.device_factory
+        device_factory.double_tap(x, y, self.device_id, delay=0)
         return ActionResult(True, False)
 
     def _handle_long_press(self, action: dict, width: int, height: int) -> ActionResult:
@@ -217,8 +284,8 @@ class ActionHandler:
             return ActionResult(False, False, "No element coordinates")
 
         x, y = self._convert_relative_to_absolute(element, width, height)
-        device_factory = get_device_factory()
-        device_factory.long_press(x, y, device_id=self.device_id)
+        device_factory = self.device_factory
+        device_factory.long_press(x, y, device_id=self.device_id, delay=0)
         return ActionResult(True, False)
 
     def _handle_wait(self, action: dict, width: int, height: int) -> ActionResult:
@@ -229,7 +296,7 @@ class ActionHandler:
         except ValueError:
             duration = 1.0
 
-        time.sleep(duration)
+        self._wait(duration)
         return ActionResult(True, False)
 
     def _handle_takeover(self, action: dict, width: int, height: int) -> ActionResult:
@@ -257,15 +324,15 @@ class ActionHandler:
 
     def _send_keyevent(self, keycode: str) -> None:
         """Send a keyevent to the device."""
-        from phone_agent.device_factory import DeviceType, get_device_factory
+        from phone_agent.device_factory import DeviceType
         from phone_agent.hdc.connection import _run_hdc_command
 
-        device_factory = get_device_factory()
+        device_factory = self.device_factory
 
         # Handle HDC devices with HarmonyOS-specific keyEvent command
         if device_factory.device_type == DeviceType.HDC:
             hdc_prefix = ["hdc", "-t", self.device_id] if self.device_id else ["hdc"]
-            
+
             # Map common keycodes to HarmonyOS keyEvent codes
             # KEYCODE_ENTER (66) -> 2054 (HarmonyOS Enter key code)
             if keycode == "KEYCODE_ENTER" or keycode == "66":
@@ -283,7 +350,8 @@ class ActionHandler:
                         # For now, only handle ENTER, other keys may need mapping
                         if "ENTER" in keycode:
                             _run_hdc_command(
-                                hdc_prefix + ["shell", "uitest", "uiInput", "keyEvent", "2054"],
+                                hdc_prefix
+                                + ["shell", "uitest", "uiInput", "keyEvent", "2054"],
                                 capture_output=True,
                                 text=True,
                             )
@@ -297,7 +365,8 @@ class ActionHandler:
                     else:
                         # Assume it's a numeric code
                         _run_hdc_command(
-                            hdc_prefix + ["shell", "uitest", "uiInput", "keyEvent", str(keycode)],
+                            hdc_prefix
+                            + ["shell", "uitest", "uiInput", "keyEvent", str(keycode)],
                             capture_output=True,
                             text=True,
                         )
@@ -342,49 +411,7 @@ def parse_action(response: str) -> dict[str, Any]:
     Raises:
         ValueError: If the response cannot be parsed.
     """
-    print(f"Parsing action: {response}")
-    try:
-        response = response.strip()
-        if response.startswith('do(action="Type"') or response.startswith(
-            'do(action="Type_Name"'
-        ):
-            text = response.split("text=", 1)[1][1:-2]
-            action = {"_metadata": "do", "action": "Type", "text": text}
-            return action
-        elif response.startswith("do"):
-            # Use AST parsing instead of eval for safety
-            try:
-                # Escape special characters (newlines, tabs, etc.) for valid Python syntax
-                response = response.replace('\n', '\\n')
-                response = response.replace('\r', '\\r')
-                response = response.replace('\t', '\\t')
-
-                tree = ast.parse(response, mode="eval")
-                if not isinstance(tree.body, ast.Call):
-                    raise ValueError("Expected a function call")
-
-                call = tree.body
-                # Extract keyword arguments safely
-                action = {"_metadata": "do"}
-                for keyword in call.keywords:
-                    key = keyword.arg
-                    value = ast.literal_eval(keyword.value)
-                    action[key] = value
-
-                return action
-            except (SyntaxError, ValueError) as e:
-                raise ValueError(f"Failed to parse do() action: {e}")
-
-        elif response.startswith("finish"):
-            action = {
-                "_metadata": "finish",
-                "message": response.replace("finish(message=", "")[1:-2],
-            }
-        else:
-            raise ValueError(f"Failed to parse action: {response}")
-        return action
-    except Exception as e:
-        raise ValueError(f"Failed to parse action: {e}")
+    return parse_action_call(response)[0]
 
 
 def do(**kwargs) -> dict[str, Any]:
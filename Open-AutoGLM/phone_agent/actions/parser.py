@@ -0,0 +1,449 @@
+"""Single-pass parser for the do(...)/finish(...) action language."""
+
+import re
+from typing import Any
+
+# Arguments whose value is free text written by the model. Models do not
+# escape quotes inside them, so their closing quote is found by looking
+# ahead for the end of the argument, and backslashes are kept verbatim.
+FREE_TEXT_ARGS = {"do": frozenset({"text"}), "finish": frozenset({"message"})}
+
+_CALL = re.compile(r"\b(do|finish)\s*\(")
+_IDENT = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_NUMBER = re.compile(r"[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?")
+# Exponent marker whose digits have not arrived yet ("2.5e", "1E-")
+_EXPONENT_START = re.compile(r"[eE][-+]?")
+_SPACE = re.compile(r"\s*")
+_STRING_STOP = {'"': re.compile(r'["\\]'), "'": re.compile(r"['\\]")}
+_ESCAPES = {"n": "\n", "r": "\r", "t": "\t", "0": "\0", "\\": "\\", '"': '"', "'": "'"}
+_LITERALS = {"True": True, "False": False, "None": None}
+# Whole-call grammar for the common, well-formed case; anything it rejects
+# goes through the incremental parser, which also handles error recovery
+_STR = r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\''
+_SCALAR = rf"(?:{_STR}|[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?|True|False|None)"
+_FLAT_VALUE = rf"(?:{_SCALAR}|\[\s*(?:{_SCALAR}\s*(?:,\s*{_SCALAR}\s*)*,?)?\s*\])"
+_KWARG = rf"[A-Za-z_][A-Za-z0-9_]*\s*=\s*{_FLAT_VALUE}"
+_FAST_CALL = re.compile(
+    rf"\s*(do|finish)\s*\(\s*((?:{_KWARG}\s*(?:,\s*{_KWARG}\s*)*,?)?)\s*\)\s*", re.S
+)
+_FAST_KWARG = re.compile(rf"([A-Za-z_][A-Za-z0-9_]*)\s*=\s*({_FLAT_VALUE})", re.S)
+_FAST_ITEM = re.compile(_SCALAR, re.S)
+_FAST_ESCAPE = re.compile(r"\\(.)", re.S)
+# Longest text kept while looking for the call (covers a split "finish (")
+_SEEK_TAIL = 16
+
+# Parser states
+_SEEK = 0  # Before do( / finish(
+_ARG = 1  # Expecting an argument name, a positional value or ")"
+_EQUALS = 2  # After an argument name, expecting "="
+_VALUE = 3  # Expecting a value
+_AFTER_VALUE = 4  # Expecting "," or a closing bracket
+_STRING = 5  # Inside a string literal
+_STRING_END = 6  # After a quote that may close a free-text string
+_DONE = 7  # Call closed
+
+
+class ActionParseError(ValueError):
+    """Raised when a model response is not a valid action call."""
+
+    def __init__(self, message: str, position: int):
+        super().__init__(f"{message} (at offset {position})")
+        self.position = position
+
+
+class ActionParser:
+    """
+    Incremental parser for model action calls.
+
+    The response is tokenized in a single pass; chunks may be fed as they
+    stream in and the result is available from close(). Values are Python
+    literals: strings, numbers, True/False/None and (nested) lists.
+
+    Malformed but unambiguous input is recovered from and described in
+    ``warnings``: text around the call, a missing closing parenthesis or
+    quote in truncated output, unescaped quotes inside free-text arguments,
+    and a positional message in finish(). Anything else raises
+    ActionParseError.
+
+    Example:
+        >>> parser = ActionParser()
+        >>> parser.feed('do(action="Tap", ele')
+        >>> parser.feed("ment=[500, 200])")
+        >>> parser.close()
+        {'_metadata': 'do', 'action': 'Tap', 'element': [500, 200]}
+    """
+
+    def __init__(self):
+        self.warnings: list[str] = []
+        self.call: str | None = None
+        self._buf = ""
+        self._pos = 0
+        # Characters consumed before the current buffer
+        self._offset = 0
+        self._state = _SEEK
+        self._args: dict[str, Any] = {}
+        self._positional: list[Any] = []
+        self._key: str | None = None
+        self._lists: list[list[Any]] = []
+        self._chunks: list[str] = []
+        self._quote = ""
+        self._free_text = False
+        self._quote_warned = False
+        self._handlers = (
+            self._seek,
+            self._arg,
+            self._equals,
+            self._value,
+            self._after_value,
+            self._string,
+            self._string_end,
+            self._done,
+        )
+
+    @property
+    def done(self) -> bool:
+        """Whether the call's closing parenthesis has been read."""
+        return self._state == _DONE
+
+    def feed(self, text: str) -> None:
+        """Consume the next chunk of the response."""
+        self._buf = self._buf[self._pos :] + text
+        self._offset += self._pos
+        self._pos = 0
+        self._run(final=False)
+
+    def close(self) -> dict[str, Any]:
+        """
+        Finish parsing and return the action.
+
+        Returns:
+            Action dict with "_metadata" set to "do" or "finish".
+
+        Raises:
+            ActionParseError: If no valid call could be recovered.
+        """
+        self._run(final=True)
+        if self._state == _SEEK:
+            self._fail("no do(...) or finish(...) call found")
+        if self._state == _STRING:
+            self._warn("unterminated string")
+            self._end_string()
+        if self._state in (_EQUALS, _VALUE):
+            self._fail("response ends inside an argument")
+        if self._state != _DONE:
+            if self._lists:
+                self._warn("unclosed list")
+                while self._lists:
+                    self._end_value(self._lists.pop())
+            self._warn("missing closing parenthesis")
+            self._state = _DONE
+        return self._result()
+
+    def _run(self, final: bool) -> None:
+        handlers = self._handlers
+        end = len(self._buf)
+        while self._pos < end:
+            if not handlers[self._state](final):
+                return
+
+    # Each handler consumes input from self._pos and returns False when it
+    # needs more input than the buffer holds.
+
+    def _seek(self, final: bool) -> bool:
+        match = _CALL.search(self._buf, self._pos)
+        if match is None:
+            if final:
+                self._pos = len(self._buf)
+            else:
+                self._pos = max(self._pos, len(self._buf) - _SEEK_TAIL)
+            return False
+        if match.start() > self._pos and self._buf[self._pos : match.start()].strip():
+            self._warn("ignored text before the call")
+        self.call = match.group(1)
+        self._pos = match.end()
+        self._state = _ARG
+        return True
+
+    def _arg(self, final: bool) -> bool:
+        if not self._skip_space():
+            return False
+        char = self._buf[self._pos]
+        if char == ")":
+            self._pos += 1
+            self._state = _DONE
+            return True
+        if char == ",":
+            self._fail("unexpected ','")
+        match = _IDENT.match(self._buf, self._pos)
+        if match is not None and match.group() not in _LITERALS:
+            if match.end() == len(self._buf) and not final:
+                return False
+            self._key = match.group()
+            self._pos = match.end()
+            self._state = _EQUALS
+            return True
+        self._key = None
+        self._state = _VALUE
+        return True
+
+    def _equals(self, final: bool) -> bool:
+        if not self._skip_space():
+            return False
+        if self._buf[self._pos] != "=":
+            self._fail(f"expected '=' after {self._key!r}")
+        self._pos += 1
+        self._state = _VALUE
+        return True
+
+    def _value(self, final: bool) -> bool:
+        if not self._skip_space():
+            return False
+        char = self._buf[self._pos]
+        if char in _STRING_STOP:
+            self._quote = char
+            self._free_text = not self._lists and self._key in FREE_TEXT_ARGS.get(
+                self.call, ()
+            )
+            self._chunks = []
+            self._pos += 1
+            self._state = _STRING
+            return True
+        if char == "[":
+            self._lists.append([])
+            self._pos += 1
+            return True
+        if char == "]" and self._lists:
+            # Empty list or trailing comma
+            self._pos += 1
+            self._end_value(self._lists.pop())
+            return True
+        match = _NUMBER.match(self._buf, self._pos) or _IDENT.match(
+            self._buf, self._pos
+        )
+        if match is None:
+            if char in "+-." and self._pos + 1 == len(self._buf) and not final:
+                return False
+            self._fail(f"unexpected {char!r}")
+        if not final:
+            if match.end() == len(self._buf):
+                return False
+            partial = _EXPONENT_START.match(self._buf, match.end())
+            if partial and partial.end() == len(self._buf) and match.re is _NUMBER:
+                return False
+        token = match.group()
+        if token.isdigit():
+            value = int(token)
+        elif token in _LITERALS:
+            value = _LITERALS[token]
+        elif token[0].isalpha() or token[0] == "_":
+            self._fail(f"unknown name {token!r}")
+        elif "." in token or "e" in token or "E" in token:
+            value = float(token)
+        else:
+            value = int(token)
+        self._pos = match.end()
+        self._end_value(value)
+        return True
+
+    def _after_value(self, final: bool) -> bool:
+        if not self._skip_space():
+            return False
+        char = self._buf[self._pos]
+        self._pos += 1
+        if char == ",":
+            self._state = _VALUE if self._lists else _ARG
+        elif char == "]" and self._lists:
+            self._end_value(self._lists.pop())
+        elif char == ")" and not self._lists:
+            self._state = _DONE
+        else:
+            self._pos -= 1
+            self._fail(f"unexpected {char!r}")
+        return True
+
+    def _string(self, final: bool) -> bool:
+        match = _STRING_STOP[self._quote].search(self._buf, self._pos)
+        if match is None:
+            self._chunks.append(self._buf[self._pos :])
+            self._pos = len(self._buf)
+            return False
+        stop = match.start()
+        self._chunks.append(self._buf[self._pos : stop])
+        if self._buf[stop] == "\\":
+            if stop + 1 == len(self._buf):
+                if not final:
+                    self._pos = stop
+                    return False
+                self._chunks.append("\\")
+                self._pos = stop + 1
+                return False
+            escaped = self._buf[stop + 1]
+            if self._free_text:
+                self._chunks.append(self._buf[stop : stop + 2])
+            else:
+                self._chunks.append(_ESCAPES.get(escaped, "\\" + escaped))
+            self._pos = stop + 2
+            return True
+        self._pos = stop
+        if self._free_text:
+            self._state = _STRING_END
+        else:
+            self._pos += 1
+            self._end_string()
+        return True
+
+    def _string_end(self, final: bool) -> bool:
+        # self._pos is at a quote inside free text. It closes the string if
+        # what follows ends the call or starts the next keyword argument;
+        # otherwise the quote is part of the text.
+        end = self._lookahead_end(self._pos + 1, final)
+        if end is None:
+            return False
+        if end:
+            self._pos += 1
+            self._end_string()
+        else:
+            if not self._quote_warned:
+                self._quote_warned = True
+                self._warn("unescaped quote in free text")
+            self._chunks.append(self._quote)
+            self._pos += 1
+            self._state = _STRING
+        return True
+
+    def _done(self, final: bool) -> bool:
+        if self._buf[self._pos :].strip():
+            self._warn("ignored text after the call")
+        self._pos = len(self._buf)
+        return False
+
+    def _lookahead_end(self, pos: int, final: bool) -> bool | None:
+        """Whether a closing quote at pos - 1 ends the argument (None: need more)."""
+        buf = self._buf
+        pos = _SPACE.match(buf, pos).end()
+        if pos == len(buf):
+            return True if final else None
+        if buf[pos] == ")":
+            rest = _SPACE.match(buf, pos + 1).end()
+            if rest == len(buf):
+                return True if final else None
+            return False
+        if buf[pos] != ",":
+            return False
+        pos = _SPACE.match(buf, pos + 1).end()
+        if pos == len(buf):
+            return True if final else None
+        if buf[pos] == ")":
+            return True
+        match = _IDENT.match(buf, pos)
+        if match is None:
+            return False
+        pos = _SPACE.match(buf, match.end()).end()
+        if pos == len(buf):
+            return True if final else None
+        return buf[pos] == "="
+
+    def _skip_space(self) -> bool:
+        buf = self._buf
+        if self._pos < len(buf) and not buf[self._pos].isspace():
+            return True
+        self._pos = _SPACE.match(buf, self._pos).end()
+        return self._pos < len(buf)
+
+    def _end_string(self) -> None:
+        value = "".join(self._chunks)
+        self._chunks = []
+        self._end_value(value)
+
+    def _end_value(self, value: Any) -> None:
+        self._state = _AFTER_VALUE
+        if self._lists:
+            self._lists[-1].append(value)
+        elif self._key is None:
+            self._positional.append(value)
+        else:
+            if self._key in self._args:
+                self._warn(f"duplicate argument {self._key!r}")
+            self._args[self._key] = value
+            self._key = None
+
+    def _result(self) -> dict[str, Any]:
+        if self.call == "finish":
+            if self._positional and "message" not in self._args:
+                self._warn("positional finish() message")
+                self._args["message"] = self._positional[0]
+            return {"_metadata": "finish", "message": self._args.get("message", "")}
+        if self._positional:
+            self._fail("do() takes keyword arguments only")
+        if self._args.get("action") == "Type_Name":
+            self._args["action"] = "Type"
+        return {"_metadata": "do", **self._args}
+
+    def _warn(self, message: str) -> None:
+        self.warnings.append(message)
+
+    def _fail(self, message: str) -> None:
+        raise ActionParseError(message, self._offset + self._pos)
+
+
+def _fast_scalar(token: str, free_text: bool) -> Any:
+    if token[0] in "\"'":
+        value = token[1:-1]
+        if "\\" in value and not free_text:
+            value = _FAST_ESCAPE.sub(
+                lambda m: _ESCAPES.get(m.group(1), m.group(0)), value
+            )
+        return value
+    if token.isdigit():
+        return int(token)
+    if token in _LITERALS:
+        return _LITERALS[token]
+    if "." in token or "e" in token or "E" in token:
+        return float(token)
+    return int(token)
+
+
+def _parse_fast(text: str) -> dict[str, Any] | None:
+    """Parse a well-formed call with the compiled grammar, or return None."""
+    match = _FAST_CALL.fullmatch(text)
+    if match is None:
+        return None
+    call = match.group(1)
+    free_args = FREE_TEXT_ARGS[call]
+    args: dict[str, Any] = {}
+    for kwarg in _FAST_KWARG.finditer(match.group(2)):
+        key, token = kwarg.groups()
+        if key in args:
+            return None
+        if token[0] == "[":
+            args[key] = [
+                _fast_scalar(item, False) for item in _FAST_ITEM.findall(token[1:-1])
+            ]
+        else:
+            args[key] = _fast_scalar(token, key in free_args)
+    if call == "finish":
+        return {"_metadata": "finish", "message": args.get("message", "")}
+    if args.get("action") == "Type_Name":
+        args["action"] = "Type"
+    return {"_metadata": "do", **args}
+
+
+def parse_action_call(text: str) -> tuple[dict[str, Any], list[str]]:
+    """
+    Parse a complete action call.
+
+    Well-formed calls are matched in one go by the compiled grammar; the
+    rest go through ActionParser.
+
+    Returns:
+        Tuple of (action dict, recovery warnings).
+
+    Raises:
+        ActionParseError: If the text is not a valid action call.
+    """
+    action = _parse_fast(text)
+    if action is not None:
+        return action, []
+    parser = ActionParser()
+    parser.feed(text)
+    return parser.close(), parser.warnings
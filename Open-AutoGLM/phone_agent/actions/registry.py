@@ -0,0 +1,195 @@
+"""Declarative registry of device actions and per-action timing statistics."""
+
+import threading
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any
+
+
+class SettleStrategy(str, Enum):
+    """How the handler waits for the screen to settle after an action."""
+
+    NONE = "none"  # Nothing changes on screen
+    FIXED = "fixed"  # Sleep a configured delay after the device command
+    VERIFY = "verify"  # Poll the device until the result is confirmed
+    DURATION = "duration"  # The action itself is a wait
+
+
+class CostClass(str, Enum):
+    """Rough cost of an action, used to group timing statistics."""
+
+    LOCAL = "local"  # No device I/O
+    INPUT = "input"  # A single input command
+    TEXT = "text"  # Keyboard switch, text entry and read-back
+    APP = "app"  # App launch
+    WAIT = "wait"  # Requested idle time
+    HUMAN = "human"  # Blocks on a person (takeover)
+
+
+@dataclass(frozen=True)
+class ActionSpec:
+    """
+    Declaration of a device action.
+
+    Attributes:
+        name: Action name as emitted by the model (do(action="...")).
+        handler: Name of the ActionHandler method that executes it.
+        settle: How the screen is left to settle afterwards.
+        cost: Cost class the action's timings are grouped under.
+        settle_delay: For FIXED settling, the DeviceTimingConfig field
+            holding the delay.
+    """
+
+    name: str
+    handler: str
+    settle: SettleStrategy = SettleStrategy.NONE
+    cost: CostClass = CostClass.LOCAL
+    settle_delay: str | None = None
+
+
+ACTION_SPECS: tuple[ActionSpec, ...] = (
+    ActionSpec(
+        "Launch",
+        "_handle_launch",
+        SettleStrategy.FIXED,
+        CostClass.APP,
+        "default_launch_delay",
+    ),
+    ActionSpec(
+        "Tap", "_handle_tap", SettleStrategy.FIXED, CostClass.INPUT, "default_tap_delay"
+    ),
+    ActionSpec("Type", "_handle_type", SettleStrategy.VERIFY, CostClass.TEXT),
+    ActionSpec("Type_Name", "_handle_type", SettleStrategy.VERIFY, CostClass.TEXT),
+    ActionSpec(
+        "Swipe",
+        "_handle_swipe",
+        SettleStrategy.FIXED,
+        CostClass.INPUT,
+        "default_swipe_delay",
+    ),
+    ActionSpec(
+        "Back",
+        "_handle_back",
+        SettleStrategy.FIXED,
+        CostClass.INPUT,
+        "default_back_delay",
+    ),
+    ActionSpec(
+        "Home",
+        "_handle_home",
+        SettleStrategy.FIXED,
+        CostClass.INPUT,
+        "default_home_delay",
+    ),
+    ActionSpec(
+        "Double Tap",
+        "_handle_double_tap",
+        SettleStrategy.FIXED,
+        CostClass.INPUT,
+        "default_double_tap_delay",
+    ),
+    ActionSpec(
+        "Long Press",
+        "_handle_long_press",
+        SettleStrategy.FIXED,
+        CostClass.INPUT,
+        "default_long_press_delay",
+    ),
+    ActionSpec("Wait", "_handle_wait", SettleStrategy.DURATION, CostClass.WAIT),
+    ActionSpec("Take_over", "_handle_takeover", SettleStrategy.NONE, CostClass.HUMAN),
+    ActionSpec("Note", "_handle_note"),
+    ActionSpec("Call_API", "_handle_call_api"),
+    ActionSpec("Interact", "_handle_interact"),
+)
+
+ACTION_REGISTRY: dict[str, ActionSpec] = {spec.name: spec for spec in ACTION_SPECS}
+
+
+class ActionStats:
+    """
+    Thread-safe per-action timing aggregate.
+
+    Every executed action contributes its device-command time (the handler's
+    own work: adb/hdc commands, read-backs) and its wait time (settle delays
+    and other sleeps). Percentiles are computed over the most recent
+    ``window`` executions of each action.
+    """
+
+    def __init__(self, window: int = 256):
+        self._window = window
+        self._lock = threading.Lock()
+        self._actions: dict[str, dict[str, Any]] = {}
+
+    def record(
+        self, spec: ActionSpec, device_ms: float, wait_ms: float, success: bool
+    ) -> None:
+        """Add one execution of an action."""
+        with self._lock:
+            entry = self._actions.get(spec.name)
+            if entry is None:
+                entry = self._actions[spec.name] = {
+                    "count": 0,
+                    "failures": 0,
+                    "device_ms_total": 0.0,
+                    "wait_ms_total": 0.0,
+                    "recent_device_ms": deque(maxlen=self._window),
+                    "recent_wait_ms": deque(maxlen=self._window),
+                }
+            entry["count"] += 1
+            entry["failures"] += 0 if success else 1
+            entry["device_ms_total"] += device_ms
+            entry["wait_ms_total"] += wait_ms
+            entry["recent_device_ms"].append(device_ms)
+            entry["recent_wait_ms"].append(wait_ms)
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        """Return per-action statistics, largest total time first."""
+        with self._lock:
+            items = [
+                (
+                    name,
+                    dict(entry),
+                    list(entry["recent_device_ms"]),
+                    list(entry["recent_wait_ms"]),
+                )
+                for name, entry in self._actions.items()
+            ]
+        actions = []
+        for name, entry, device, wait in items:
+            spec = ACTION_REGISTRY.get(name)
+            count = entry["count"]
+            actions.append(
+                {
+                    "action": name,
+                    "cost": spec.cost.value if spec else None,
+                    "settle": spec.settle.value if spec else None,
+                    "count": count,
+                    "failures": entry["failures"],
+                    "total_ms": round(
+                        entry["device_ms_total"] + entry["wait_ms_total"], 1
+                    ),
+                    "device_ms_avg": round(entry["device_ms_total"] / count, 1),
+                    "device_ms_p50": _percentile(device, 0.5),
+                    "device_ms_p95": _percentile(device, 0.95),
+                    "device_ms_max": round(max(device), 1),
+                    "wait_ms_avg": round(entry["wait_ms_total"] / count, 1),
+                    "wait_ms_p95": _percentile(wait, 0.95),
+                }
+            )
+        actions.sort(key=lambda item: item["total_ms"], reverse=True)
+        return actions
+
+    def reset(self) -> None:
+        """Forget all recorded executions."""
+        with self._lock:
+            self._actions.clear()
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+
+# Process-wide statistics, fed by every ActionHandler
+ACTION_STATS = ActionStats()
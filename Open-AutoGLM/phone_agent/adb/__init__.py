@@ -1,5 +1,6 @@
 """ADB utilities for Android device interaction."""
 
+from phone_agent.adb.async_device import AsyncADBBackend
 from phone_agent.adb.connection import (
     ADBConnection,
     ConnectionType,
@@ -17,21 +18,36 @@ from phone_agent.adb.device import (
     swipe,
     tap,
 )
+from phone_agent.adb.geometry import (
+    ScreenGeometry,
+    get_screen_geometry,
+    invalidate_screen_geometry,
+)
 from phone_agent.adb.input import (
+    clear_and_type,
     clear_text,
     detect_and_set_adb_keyboard,
+    get_focused_text,
     restore_keyboard,
     type_text,
+    wait_for_keyboard,
 )
 from phone_agent.adb.screenshot import get_screenshot
 
 __all__ = [
     # Screenshot
     "get_screenshot",
+    # Screen geometry
+    "ScreenGeometry",
+    "get_screen_geometry",
+    "invalidate_screen_geometry",
     # Input
     "type_text",
     "clear_text",
+    "clear_and_type",
+    "get_focused_text",
     "detect_and_set_adb_keyboard",
+    "wait_for_keyboard",
     "restore_keyboard",
     # Device control
     "get_current_app",
@@ -48,4 +64,6 @@ __all__ = [
     "ConnectionType",
     "quick_connect",
     "list_devices",
+    # Async backend
+    "AsyncADBBackend",
 ]
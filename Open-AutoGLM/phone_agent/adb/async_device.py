@@ -0,0 +1,300 @@
+"""Async device backend for Android, over persistent adb shell channels."""
+
+import asyncio
+import html
+import time
+
+from phone_agent.adb.connection import DeviceInfo, _parse_devices
+from phone_agent.adb.device import _parse_current_app, _swipe_duration
+from phone_agent.adb.geometry import (
+    GEOMETRY_SCRIPT,
+    ScreenGeometry,
+    get_cached_screen_geometry,
+    parse_geometry,
+    set_screen_geometry,
+)
+from phone_agent.adb.input import (
+    _FOCUSED_NODE_PATTERN,
+    _PASSWORD_ATTR_PATTERN,
+    _TEXT_ATTR_PATTERN,
+    ADB_KEYBOARD_IME,
+    _input_broadcasts,
+)
+from phone_agent.adb.screenshot import (
+    PNG_SIGNATURE,
+    Screenshot,
+    _create_fallback_screenshot,
+    _get_screenshot_via_pull,
+    _screenshot_from_png,
+)
+from phone_agent.async_shell import ShellChannelPool, run_command
+from phone_agent.config.apps import APP_PACKAGES
+from phone_agent.config.timing import TIMING_CONFIG
+
+
+class AsyncADBBackend:
+    """
+    Non-blocking counterpart of the ``phone_agent.adb`` module.
+
+    Methods take the same arguments as the module functions. Input and
+    query commands go through one persistent ``adb shell`` per device
+    (see AsyncShellChannel); screenshots stream over ``adb exec-out`` in
+    an asyncio subprocess. Settle delays are awaited, not slept, so one
+    event loop can drive many devices.
+
+    The backend belongs to the event loop it is first used on.
+
+    Example:
+        >>> backend = AsyncADBBackend()
+        >>> await backend.tap(500, 800, "emulator-5554")
+        >>> screenshot = await backend.get_screenshot("emulator-5554")
+        >>> await backend.close()
+    """
+
+    def __init__(self, adb_path: str = "adb", channels: ShellChannelPool | None = None):
+        """
+        Args:
+            adb_path: adb executable.
+            channels: Shell channels to use, e.g. shared with other code
+                driving the same devices so each device has one shell.
+        """
+        self.adb_path = adb_path
+        self.channels = channels or ShellChannelPool([adb_path], "-s")
+
+    async def get_screenshot(
+        self, device_id: str | None = None, timeout: int = 10
+    ) -> Screenshot:
+        """Capture a screenshot; a black fallback image is returned on failure."""
+        try:
+            result = await run_command(
+                self.channels.prefix(device_id) + ["exec-out", "screencap", "-p"],
+                timeout,
+            )
+            if result.returncode == 0 and result.stdout.startswith(PNG_SIGNATURE):
+                return _screenshot_from_png(result.stdout, device_id)
+
+            # Check for screenshot failure (sensitive screen)
+            output = (result.stdout[:256] + result.stderr).decode(
+                "utf-8", errors="ignore"
+            )
+            if "Status: -1" in output or "Failed" in output:
+                return _create_fallback_screenshot(
+                    is_sensitive=True, device_id=device_id
+                )
+
+            # Older adb/devices without exec-out support; rare enough for a thread
+            return await asyncio.to_thread(
+                _get_screenshot_via_pull,
+                self.channels.prefix(device_id),
+                device_id,
+                timeout,
+            )
+        except Exception as e:
+            print(f"Screenshot error: {e}")
+            return _create_fallback_screenshot(is_sensitive=False, device_id=device_id)
+
+    async def get_screen_geometry(
+        self, device_id: str | None = None, refresh: bool = False
+    ) -> ScreenGeometry | None:
+        """Get the cached screen geometry, querying the device on a miss."""
+        cached = get_cached_screen_geometry(device_id)
+        if cached is not None and not refresh:
+            return cached
+        try:
+            result = await self.channels.shell(device_id, GEOMETRY_SCRIPT, timeout=5)
+        except (asyncio.TimeoutError, ConnectionError, OSError):
+            return cached
+        geometry = parse_geometry(result.text)
+        if geometry is not None:
+            set_screen_geometry(device_id, geometry)
+        return geometry or cached
+
+    async def get_current_app(self, device_id: str | None = None) -> str:
+        """Get the currently focused app name."""
+        result = await self.channels.shell(device_id, ["dumpsys", "window"])
+        output = result.text
+        if not output:
+            raise ValueError("No output from dumpsys window")
+        return _parse_current_app(output)
+
+    async def tap(
+        self, x: int, y: int, device_id: str | None = None, delay: float | None = None
+    ) -> None:
+        """Tap at the specified coordinates."""
+        if delay is None:
+            delay = TIMING_CONFIG.device.default_tap_delay
+        await self.channels.shell(device_id, ["input", "tap", str(x), str(y)])
+        await asyncio.sleep(delay)
+
+    async def double_tap(
+        self, x: int, y: int, device_id: str | None = None, delay: float | None = None
+    ) -> None:
+        """Double tap at the specified coordinates."""
+        if delay is None:
+            delay = TIMING_CONFIG.device.default_double_tap_delay
+        await self.channels.shell(device_id, ["input", "tap", str(x), str(y)])
+        await asyncio.sleep(TIMING_CONFIG.device.double_tap_interval)
+        await self.channels.shell(device_id, ["input", "tap", str(x), str(y)])
+        await asyncio.sleep(delay)
+
+    async def long_press(
+        self,
+        x: int,
+        y: int,
+        duration_ms: int = 3000,
+        device_id: str | None = None,
+        delay: float | None = None,
+    ) -> None:
+        """Long press at the specified coordinates."""
+        if delay is None:
+            delay = TIMING_CONFIG.device.default_long_press_delay
+        await self.channels.shell(
+            device_id,
+            ["input", "swipe", str(x), str(y), str(x), str(y), str(duration_ms)],
+            timeout=duration_ms / 1000 + 30,
+        )
+        await asyncio.sleep(delay)
+
+    async def swipe(
+        self,
+        start_x: int,
+        start_y: int,
+        end_x: int,
+        end_y: int,
+        duration_ms: int | None = None,
+        device_id: str | None = None,
+        delay: float | None = None,
+    ) -> None:
+        """Swipe from start to end coordinates."""
+        if delay is None:
+            delay = TIMING_CONFIG.device.default_swipe_delay
+        if duration_ms is None:
+            duration_ms = _swipe_duration(start_x, start_y, end_x, end_y)
+        await self.channels.shell(
+            device_id,
+            [
+                "input",
+                "swipe",
+                str(start_x),
+                str(start_y),
+                str(end_x),
+                str(end_y),
+                str(duration_ms),
+            ],
+        )
+        await asyncio.sleep(delay)
+
+    async def back(
+        self, device_id: str | None = None, delay: float | None = None
+    ) -> None:
+        """Press the back button."""
+        if delay is None:
+            delay = TIMING_CONFIG.device.default_back_delay
+        await self.channels.shell(device_id, ["input", "keyevent", "4"])
+        await asyncio.sleep(delay)
+
+    async def home(
+        self, device_id: str | None = None, delay: float | None = None
+    ) -> None:
+        """Press the home button."""
+        if delay is None:
+            delay = TIMING_CONFIG.device.default_home_delay
+        await self.channels.shell(device_id, ["input", "keyevent", "KEYCODE_HOME"])
+        await asyncio.sleep(delay)
+
+    async def launch_app(
+        self, app_name: str, device_id: str | None = None, delay: float | None = None
+    ) -> bool:
+        """Launch an app by name; False if the app is unknown."""
+        if delay is None:
+            delay = TIMING_CONFIG.device.default_launch_delay
+        if app_name not in APP_PACKAGES:
+            return False
+        await self.channels.shell(
+            device_id,
+            [
+                "monkey",
+                "-p",
+                APP_PACKAGES[app_name],
+                "-c",
+                "android.intent.category.LAUNCHER",
+                "1",
+            ],
+        )
+        await asyncio.sleep(delay)
+        return True
+
+    async def type_text(self, text: str, device_id: str | None = None) -> None:
+        """Type text into the focused input field using ADB Keyboard."""
+        await self.channels.shell(device_id, " ; ".join(_input_broadcasts(text)))
+
+    async def clear_text(self, device_id: str | None = None) -> None:
+        """Clear text in the focused input field."""
+        await self.channels.shell(
+            device_id, ["am", "broadcast", "-a", "ADB_CLEAR_TEXT"]
+        )
+
+    async def clear_and_type(self, text: str, device_id: str | None = None) -> None:
+        """Clear the focused input field and type text in one round trip."""
+        commands = ["am broadcast -a ADB_CLEAR_TEXT"] + _input_broadcasts(text)
+        await self.channels.shell(device_id, " ; ".join(commands))
+
+    async def get_focused_text(self, device_id: str | None = None) -> str | None:
+        """Read back the focused view's text, or None if it cannot be checked."""
+        try:
+            result = await self.channels.shell(
+                device_id,
+                ["uiautomator", "dump", "--compressed", "/dev/tty"],
+                timeout=5,
+            )
+        except (asyncio.TimeoutError, ConnectionError):
+            return None
+        match = _FOCUSED_NODE_PATTERN.search(result.text)
+        if not match or _PASSWORD_ATTR_PATTERN.search(match.group(0)):
+            return None
+        text_match = _TEXT_ATTR_PATTERN.search(match.group(0))
+        return html.unescape(text_match.group(1)) if text_match else ""
+
+    async def wait_for_keyboard(
+        self, device_id: str | None = None, timeout: float = 1.0
+    ) -> bool:
+        """Wait until ADB Keyboard is the bound input method."""
+        deadline = time.monotonic() + timeout
+        while True:
+            result = await self.channels.shell(
+                device_id, "dumpsys input_method | grep mCurMethodId"
+            )
+            if f"mCurMethodId={ADB_KEYBOARD_IME}" in result.text:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.1)
+
+    async def detect_and_set_adb_keyboard(self, device_id: str | None = None) -> str:
+        """Switch to ADB Keyboard if needed and return the original IME."""
+        result = await self.channels.shell(
+            device_id, ["settings", "get", "secure", "default_input_method"]
+        )
+        current_ime = result.text.strip()
+        if ADB_KEYBOARD_IME not in current_ime:
+            await self.channels.shell(device_id, ["ime", "set", ADB_KEYBOARD_IME])
+        # Warm up the keyboard
+        await self.type_text("", device_id)
+        return current_ime
+
+    async def restore_keyboard(self, ime: str, device_id: str | None = None) -> None:
+        """Restore the original keyboard IME."""
+        await self.channels.shell(device_id, ["ime", "set", ime])
+
+    async def list_devices(self) -> list[DeviceInfo]:
+        """List connected devices."""
+        try:
+            result = await run_command([self.adb_path, "devices", "-l"], timeout=5)
+        except Exception as e:
+            print(f"Error listing devices: {e}")
+            return []
+        return _parse_devices(result.text)
+
+    async def close(self) -> None:
+        """Stop the device shells."""
+        await self.channels.close()
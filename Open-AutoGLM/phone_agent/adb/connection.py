@@ -132,41 +132,7 @@ class ADBConnection:
                 timeout=5,
             )
 
-            devices = []
-            for line in result.stdout.strip().split("\n")[1:]:  # Skip header
-                if not line.strip():
-                    continue
-
-                parts = line.split()
-                if len(parts) >= 2:
-                    device_id = parts[0]
-                    status = parts[1]
-
-                    # Determine connection type
-                    if ":" in device_id:
-                        conn_type = ConnectionType.REMOTE
-                    elif "emulator" in device_id:
-                        conn_type = ConnectionType.USB  # Emulator via USB
-                    else:
-                        conn_type = ConnectionType.USB
-
-                    # Parse additional info
-                    model = None
-                    for part in parts[2:]:
-                        if part.startswith("model:"):
-                            model = part.split(":", 1)[1]
-                            break
-
-                    devices.append(
-                        DeviceInfo(
-                            device_id=device_id,
-                            status=status,
-                            connection_type=conn_type,
-                            model=model,
-                        )
-                    )
-
-            return devices
+            return _parse_devices(result.stdout)
 
         except Exception as e:
             print(f"Error listing devices: {e}")
@@ -342,6 +308,45 @@ def quick_connect(address: str) -> tuple[bool, str]:
     return conn.connect(address)
 
 
+def _parse_devices(output: str) -> list[DeviceInfo]:
+    """Parse `adb devices -l` output."""
+    devices = []
+    for line in output.strip().split("\n")[1:]:  # Skip header
+        if not line.strip():
+            continue
+
+        parts = line.split()
+        if len(parts) >= 2:
+            device_id = parts[0]
+            status = parts[1]
+
+            # Determine connection type
+            if ":" in device_id:
+                conn_type = ConnectionType.REMOTE
+            elif "emulator" in device_id:
+                conn_type = ConnectionType.USB  # Emulator via USB
+            else:
+                conn_type = ConnectionType.USB
+
+            # Parse additional info
+            model = None
+            for part in parts[2:]:
+                if part.startswith("model:"):
+                    model = part.split(":", 1)[1]
+                    break
+
+            devices.append(
+                DeviceInfo(
+                    device_id=device_id,
+                    status=status,
+                    connection_type=conn_type,
+                    model=model,
+                )
+            )
+
+    return devices
+
+
 def list_devices() -> list[DeviceInfo]:
     """
     Quick helper to list connected devices.
@@ -28,14 +28,7 @@ def get_current_app(device_id: str | None = None) -> str:
     if not output:
         raise ValueError("No output from dumpsys window")
 
-    # Parse window focus info
-    for line in output.split("\n"):
-        if "mCurrentFocus" in line or "mFocusedApp" in line:
-            for app_name, package in APP_PACKAGES.items():
-                if package in line:
-                    return app_name
-
-    return "System Home"
+    return _parse_current_app(output)
 
 
 def tap(
@@ -145,10 +138,7 @@ def swipe(
     adb_prefix = _get_adb_prefix(device_id)
 
     if duration_ms is None:
-        # Calculate duration based on distance
-        dist_sq = (start_x - end_x) ** 2 + (start_y - end_y) ** 2
-        duration_ms = int(dist_sq / 1000)
-        duration_ms = max(1000, min(duration_ms, 2000))  # Clamp between 1000-2000ms
+        duration_ms = _swipe_duration(start_x, start_y, end_x, end_y)
 
     subprocess.run(
         adb_prefix
@@ -245,6 +235,23 @@ def launch_app(
     return True
 
 
+def _parse_current_app(output: str) -> str:
+    """Find the focused app in `dumpsys window` output."""
+    for line in output.split("\n"):
+        if "mCurrentFocus" in line or "mFocusedApp" in line:
+            for app_name, package in APP_PACKAGES.items():
+                if package in line:
+                    return app_name
+
+    return "System Home"
+
+
+def _swipe_duration(start_x: int, start_y: int, end_x: int, end_y: int) -> int:
+    """Swipe duration in ms derived from the distance."""
+    dist_sq = (start_x - end_x) ** 2 + (start_y - end_y) ** 2
+    return max(1000, min(int(dist_sq / 1000), 2000))  # Clamp between 1000-2000ms
+
+
 def _get_adb_prefix(device_id: str | None) -> list:
     """Get ADB command prefix with optional device specifier."""
     if device_id:
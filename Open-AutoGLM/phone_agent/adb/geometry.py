@@ -0,0 +1,183 @@
+"""Per-device screen geometry cache for Android devices."""
+
+import re
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+
+# Cached geometry is re-queried after this many seconds even without a
+# display change, as a safety net for changes we cannot observe.
+GEOMETRY_TTL = 300.0
+
+# Size, density, rotation and cutout in a single shell call
+GEOMETRY_SCRIPT = (
+    "wm size; wm density; "
+    "dumpsys input | grep -m1 SurfaceOrientation; "
+    "dumpsys window displays | grep -m1 -i cutout"
+)
+
+_SIZE_PATTERN = re.compile(r"(Physical|Override) size:\s*(\d+)x(\d+)")
+_DENSITY_PATTERN = re.compile(r"(Physical|Override) density:\s*(\d+)")
+_ROTATION_PATTERN = re.compile(
+    r"(?:SurfaceOrientation|mCurrentRotation)[:=]\s*(?:ROTATION_)?(\d+)"
+)
+_CUTOUT_PATTERN = re.compile(r"insets=Rect\((\d+), (\d+) - (\d+), (\d+)\)")
+
+
+@dataclass
+class ScreenGeometry:
+    """Display geometry of a device."""
+
+    physical_width: int
+    physical_height: int
+    override_width: int | None = None
+    override_height: int | None = None
+    density: int | None = None
+    override_density: int | None = None
+    rotation: int = 0  # 0-3, quarter turns from natural orientation
+    cutout_insets: dict[str, int] = field(default_factory=dict)
+    updated_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def width(self) -> int:
+        """Effective width in the current orientation."""
+        width = self.override_width or self.physical_width
+        height = self.override_height or self.physical_height
+        return height if self.rotation % 2 else width
+
+    @property
+    def height(self) -> int:
+        """Effective height in the current orientation."""
+        width = self.override_width or self.physical_width
+        height = self.override_height or self.physical_height
+        return width if self.rotation % 2 else height
+
+
+_cache: dict[str, ScreenGeometry] = {}
+_lock = threading.Lock()
+
+
+def get_screen_geometry(
+    device_id: str | None = None, refresh: bool = False
+) -> ScreenGeometry | None:
+    """
+    Get the cached screen geometry, querying the device on a miss.
+
+    Args:
+        device_id: Optional ADB device ID.
+        refresh: Force a new query even if a cached value exists.
+
+    Returns:
+        ScreenGeometry, or None if the device could not be queried.
+    """
+    key = device_id or ""
+    with _lock:
+        cached = _cache.get(key)
+    if (
+        cached is not None
+        and not refresh
+        and time.monotonic() - cached.updated_at < GEOMETRY_TTL
+    ):
+        return cached
+
+    geometry = _query_geometry(device_id)
+    if geometry is not None:
+        with _lock:
+            _cache[key] = geometry
+    return geometry or cached
+
+
+def record_screenshot_size(device_id: str | None, width: int, height: int) -> None:
+    """
+    Update the cache from a captured screenshot.
+
+    A screenshot whose size differs from the cached geometry means the
+    display changed (rotation, resolution override), so the entry is
+    re-queried on next use.
+
+    Args:
+        device_id: Optional ADB device ID.
+        width: Screenshot width in pixels.
+        height: Screenshot height in pixels.
+    """
+    key = device_id or ""
+    with _lock:
+        cached = _cache.get(key)
+        if cached is None:
+            _cache[key] = ScreenGeometry(physical_width=width, physical_height=height)
+        elif (cached.width, cached.height) != (width, height):
+            del _cache[key]
+
+
+def get_cached_screen_geometry(device_id: str | None = None) -> ScreenGeometry | None:
+    """Return the cached geometry if it is still fresh, without querying the device."""
+    with _lock:
+        cached = _cache.get(device_id or "")
+    if cached is not None and time.monotonic() - cached.updated_at < GEOMETRY_TTL:
+        return cached
+    return None
+
+
+def set_screen_geometry(device_id: str | None, geometry: ScreenGeometry) -> None:
+    """Store geometry queried elsewhere (e.g. by the async backend)."""
+    with _lock:
+        _cache[device_id or ""] = geometry
+
+
+def invalidate_screen_geometry(device_id: str | None = None) -> None:
+    """Drop the cached geometry for a device."""
+    with _lock:
+        _cache.pop(device_id or "", None)
+
+
+def _query_geometry(device_id: str | None) -> ScreenGeometry | None:
+    """Query size, density, rotation and cutout in a single adb shell call."""
+    adb_prefix = ["adb", "-s", device_id] if device_id else ["adb"]
+    try:
+        result = subprocess.run(
+            adb_prefix + ["shell", GEOMETRY_SCRIPT],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="ignore",
+            timeout=5,
+        )
+    except (subprocess.TimeoutExpired, OSError):
+        return None
+    return parse_geometry(result.stdout)
+
+
+def parse_geometry(output: str) -> ScreenGeometry | None:
+    """Parse the combined output of wm size/density and dumpsys."""
+    sizes = {kind: (int(w), int(h)) for kind, w, h in _SIZE_PATTERN.findall(output)}
+    if "Physical" not in sizes:
+        return None
+    densities = {kind: int(d) for kind, d in _DENSITY_PATTERN.findall(output)}
+    override = sizes.get("Override")
+
+    rotation_match = _ROTATION_PATTERN.search(output)
+    cutout_match = _CUTOUT_PATTERN.search(output)
+    cutout = {}
+    if cutout_match:
+        left, top, right, bottom = (int(v) for v in cutout_match.groups())
+        cutout = {"left": left, "top": top, "right": right, "bottom": bottom}
+
+    return ScreenGeometry(
+        physical_width=sizes["Physical"][0],
+        physical_height=sizes["Physical"][1],
+        override_width=override[0] if override else None,
+        override_height=override[1] if override else None,
+        density=densities.get("Physical"),
+        override_density=densities.get("Override"),
+        rotation=_quarter_turns(rotation_match.group(1)) if rotation_match else 0,
+        cutout_insets=cutout,
+    )
+
+
+def _quarter_turns(value: str) -> int:
+    """Rotation as 0-3; window manager dumps may print degrees (ROTATION_270)."""
+    rotation = int(value)
+    if rotation >= 4:
+        rotation //= 90
+    return rotation % 4
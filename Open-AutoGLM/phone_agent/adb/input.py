@@ -1,14 +1,30 @@
 """Input utilities for Android device text input."""
 
 import base64
+import html
+import re
 import subprocess
+import time
 from typing import Optional
 
+ADB_KEYBOARD_IME = "com.android.adbkeyboard/.AdbIME"
+
+# Maximum characters per ADB Keyboard broadcast. Long texts are split so that
+# each base64 payload stays well below the shell command line limit.
+MAX_BROADCAST_CHARS = 256
+
+_FOCUSED_NODE_PATTERN = re.compile(r"<node\b[^>]*\bfocused=\"true\"[^>]*>")
+_TEXT_ATTR_PATTERN = re.compile(r"\btext=\"([^\"]*)\"")
+_PASSWORD_ATTR_PATTERN = re.compile(r"\bpassword=\"true\"")
+
 
 def type_text(text: str, device_id: str | None = None) -> None:
     """
     Type text into the currently focused input field using ADB Keyboard.
 
+    Long texts are split into chunks that are all sent in a single
+    ``adb shell`` invocation.
+
     Args:
         text: The text to type.
         device_id: Optional ADB device ID for multi-device setups.
@@ -17,26 +33,83 @@ def type_text(text: str, device_id: str | None = None) -> None:
         Requires ADB Keyboard to be installed on the device.
         See: https://github.com/nicnocquee/AdbKeyboard
     """
-    adb_prefix = _get_adb_prefix(device_id)
-    encoded_text = base64.b64encode(text.encode("utf-8")).decode("utf-8")
+    _run_broadcasts(_input_broadcasts(text), device_id)
 
-    subprocess.run(
-        adb_prefix
-        + [
-            "shell",
-            "am",
-            "broadcast",
-            "-a",
-            "ADB_INPUT_B64",
-            "--es",
-            "msg",
-            encoded_text,
-        ],
-        capture_output=True,
-        text=True,
+
+def clear_and_type(text: str, device_id: str | None = None) -> None:
+    """
+    Clear the focused input field and type text in one device round trip.
+
+    Args:
+        text: The text to type.
+        device_id: Optional ADB device ID for multi-device setups.
+    """
+    _run_broadcasts(
+        ["am broadcast -a ADB_CLEAR_TEXT"] + _input_broadcasts(text), device_id
     )
 
 
+def get_focused_text(device_id: str | None = None) -> str | None:
+    """
+    Read back the text of the currently focused view.
+
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
+
+    Returns:
+        The focused view's text, or None if it cannot be checked: no focused
+        view was found (e.g. WebViews or secure screens that uiautomator
+        cannot dump) or it is a password field, whose text is masked.
+    """
+    adb_prefix = _get_adb_prefix(device_id)
+    try:
+        result = subprocess.run(
+            adb_prefix
+            + ["exec-out", "uiautomator", "dump", "--compressed", "/dev/tty"],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="ignore",
+            timeout=5,
+        )
+    except subprocess.TimeoutExpired:
+        return None
+
+    match = _FOCUSED_NODE_PATTERN.search(result.stdout)
+    if not match or _PASSWORD_ATTR_PATTERN.search(match.group(0)):
+        return None
+    text_match = _TEXT_ATTR_PATTERN.search(match.group(0))
+    return html.unescape(text_match.group(1)) if text_match else ""
+
+
+def wait_for_keyboard(device_id: str | None = None, timeout: float = 1.0) -> bool:
+    """
+    Wait until ADB Keyboard is the bound input method.
+
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
+        timeout: Maximum time to wait in seconds.
+
+    Returns:
+        True if ADB Keyboard became active within the timeout.
+    """
+    adb_prefix = _get_adb_prefix(device_id)
+    deadline = time.monotonic() + timeout
+    while True:
+        result = subprocess.run(
+            adb_prefix + ["shell", "dumpsys", "input_method"],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="ignore",
+        )
+        if f"mCurMethodId={ADB_KEYBOARD_IME}" in result.stdout:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.1)
+
+
 def clear_text(device_id: str | None = None) -> None:
     """
     Clear text in the currently focused input field.
@@ -74,9 +147,9 @@ def detect_and_set_adb_keyboard(device_id: str | None = None) -> str:
     current_ime = (result.stdout + result.stderr).strip()
 
     # Switch to ADB Keyboard if not already set
-    if "com.android.adbkeyboard/.AdbIME" not in current_ime:
+    if ADB_KEYBOARD_IME not in current_ime:
         subprocess.run(
-            adb_prefix + ["shell", "ime", "set", "com.android.adbkeyboard/.AdbIME"],
+            adb_prefix + ["shell", "ime", "set", ADB_KEYBOARD_IME],
             capture_output=True,
             text=True,
         )
@@ -102,6 +175,29 @@ def restore_keyboard(ime: str, device_id: str | None = None) -> None:
     )
 
 
+def _input_broadcasts(text: str) -> list[str]:
+    """Build ADB Keyboard broadcast commands for text, one per chunk."""
+    chunks = [
+        text[i : i + MAX_BROADCAST_CHARS]
+        for i in range(0, len(text), MAX_BROADCAST_CHARS)
+    ] or [""]
+    return [
+        "am broadcast -a ADB_INPUT_B64 --es msg "
+        + base64.b64encode(chunk.encode("utf-8")).decode("utf-8")
+        for chunk in chunks
+    ]
+
+
+def _run_broadcasts(commands: list[str], device_id: str | None) -> None:
+    """Run several shell commands sequentially in a single adb shell call."""
+    adb_prefix = _get_adb_prefix(device_id)
+    subprocess.run(
+        adb_prefix + ["shell", " ; ".join(commands)],
+        capture_output=True,
+        text=True,
+    )
+
+
 def _get_adb_prefix(device_id: str | None) -> list:
     """Get ADB command prefix with optional device specifier."""
     if device_id:
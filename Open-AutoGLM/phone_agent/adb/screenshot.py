@@ -11,6 +11,10 @@ from typing import Tuple
 
 from PIL import Image
 
+from phone_agent.adb.geometry import get_screen_geometry, record_screenshot_size
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
 
 @dataclass
 class Screenshot:
@@ -37,52 +41,79 @@ def get_screenshot(device_id: str | None = None, timeout: int = 10) -> Screensho
         If the screenshot fails (e.g., on sensitive screens like payment pages),
         a black fallback image is returned with is_sensitive=True.
     """
-    temp_path = os.path.join(tempfile.gettempdir(), f"screenshot_{uuid.uuid4()}.png")
     adb_prefix = _get_adb_prefix(device_id)
 
     try:
-        # Execute screenshot command
+        # Stream the PNG straight to memory; one adb round trip, no temp files
         result = subprocess.run(
-            adb_prefix + ["shell", "screencap", "-p", "/sdcard/tmp.png"],
+            adb_prefix + ["exec-out", "screencap", "-p"],
             capture_output=True,
-            text=True,
             timeout=timeout,
         )
+        if result.returncode == 0 and result.stdout.startswith(PNG_SIGNATURE):
+            return _screenshot_from_png(result.stdout, device_id)
 
         # Check for screenshot failure (sensitive screen)
-        output = result.stdout + result.stderr
+        output = (result.stdout[:256] + result.stderr).decode("utf-8", errors="ignore")
         if "Status: -1" in output or "Failed" in output:
-            return _create_fallback_screenshot(is_sensitive=True)
+            return _create_fallback_screenshot(is_sensitive=True, device_id=device_id)
 
-        # Pull screenshot to local temp path
-        subprocess.run(
-            adb_prefix + ["pull", "/sdcard/tmp.png", temp_path],
-            capture_output=True,
-            text=True,
-            timeout=5,
-        )
+        # Older adb/devices without exec-out support
+        return _get_screenshot_via_pull(adb_prefix, device_id, timeout)
 
-        if not os.path.exists(temp_path):
-            return _create_fallback_screenshot(is_sensitive=False)
+    except Exception as e:
+        print(f"Screenshot error: {e}")
+        return _create_fallback_screenshot(is_sensitive=False, device_id=device_id)
 
-        # Read and encode image
-        img = Image.open(temp_path)
-        width, height = img.size
 
-        buffered = BytesIO()
-        img.save(buffered, format="PNG")
-        base64_data = base64.b64encode(buffered.getvalue()).decode("utf-8")
+def _get_screenshot_via_pull(
+    adb_prefix: list, device_id: str | None, timeout: int
+) -> Screenshot:
+    """Capture via a file on the device and adb pull."""
+    temp_path = os.path.join(tempfile.gettempdir(), f"screenshot_{uuid.uuid4()}.png")
 
-        # Cleanup
-        os.remove(temp_path)
+    # Execute screenshot command
+    result = subprocess.run(
+        adb_prefix + ["shell", "screencap", "-p", "/sdcard/tmp.png"],
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+    )
 
-        return Screenshot(
-            base64_data=base64_data, width=width, height=height, is_sensitive=False
-        )
+    # Check for screenshot failure (sensitive screen)
+    output = result.stdout + result.stderr
+    if "Status: -1" in output or "Failed" in output:
+        return _create_fallback_screenshot(is_sensitive=True, device_id=device_id)
+
+    # Pull screenshot to local temp path
+    subprocess.run(
+        adb_prefix + ["pull", "/sdcard/tmp.png", temp_path],
+        capture_output=True,
+        text=True,
+        timeout=5,
+    )
 
-    except Exception as e:
-        print(f"Screenshot error: {e}")
-        return _create_fallback_screenshot(is_sensitive=False)
+    if not os.path.exists(temp_path):
+        return _create_fallback_screenshot(is_sensitive=False, device_id=device_id)
+
+    with open(temp_path, "rb") as f:
+        data = f.read()
+    os.remove(temp_path)
+    return _screenshot_from_png(data, device_id)
+
+
+def _screenshot_from_png(data: bytes, device_id: str | None) -> Screenshot:
+    """Build a Screenshot from PNG bytes without re-encoding the image."""
+    # Only the header is parsed to get the size
+    width, height = Image.open(BytesIO(data)).size
+    record_screenshot_size(device_id, width, height)
+
+    return Screenshot(
+        base64_data=base64.b64encode(data).decode("utf-8"),
+        width=width,
+        height=height,
+        is_sensitive=False,
+    )
 
 
 def _get_adb_prefix(device_id: str | None) -> list:
@@ -92,9 +123,19 @@ def _get_adb_prefix(device_id: str | None) -> list:
     return ["adb"]
 
 
-def _create_fallback_screenshot(is_sensitive: bool) -> Screenshot:
-    """Create a black fallback image when screenshot fails."""
-    default_width, default_height = 1080, 2400
+def _create_fallback_screenshot(
+    is_sensitive: bool, device_id: str | None = None
+) -> Screenshot:
+    """Create a black fallback image when screenshot fails.
+
+    The image uses the device's cached screen geometry so that coordinates
+    derived from it still map onto the real display.
+    """
+    geometry = get_screen_geometry(device_id)
+    if geometry is not None:
+        default_width, default_height = geometry.width, geometry.height
+    else:
+        default_width, default_height = 1080, 2400
 
     black_img = Image.new("RGB", (default_width, default_height), color="black")
     buffered = BytesIO()
@@ -1,16 +1,23 @@
 """Main PhoneAgent class for orchestrating phone automation."""
 
 import json
+import threading
+import time
 import traceback
-from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from typing import Any, Callable
 
 from phone_agent.actions import ActionHandler
 from phone_agent.actions.handler import do, finish, parse_action
 from phone_agent.config import get_messages, get_system_prompt
-from phone_agent.device_factory import get_device_factory
+from phone_agent.context import CompactionPolicy, compact_context, estimate_tokens
+from phone_agent.device_factory import DeviceFactory, get_device_factory
+from phone_agent.events import RUN_EVENTS, AgentEvent, EventCallback, EventType
 from phone_agent.model import ModelClient, ModelConfig
-from phone_agent.model.client import MessageBuilder
+from phone_agent.model.client import MessageBuilder, ModelResponse
+from phone_agent.replay import ReplayCache, ReplayRecorder
+from phone_agent.trace import TraceStore
 
 
 @dataclass
@@ -22,12 +29,27 @@ class AgentConfig:
     lang: str = "cn"
     system_prompt: str | None = None
     verbose: bool = True
+    # None keeps the full history for the whole run
+    context_policy: CompactionPolicy | None = field(default_factory=CompactionPolicy)
+    # Capture the next screen in the background, waiting out the action's
+    # settle delay there while the step is wrapped up
+    prefetch_capture: bool = True
+    # Reuse model decisions from earlier successful runs of the same task
+    replay_cache: ReplayCache | None = None
+    # Record every run step by step (screenshots included) for later inspection
+    trace_store: TraceStore | None = None
+    # Device backend of this agent; None uses the process-wide factory
+    device_factory: DeviceFactory | None = None
 
     def __post_init__(self):
         if self.system_prompt is None:
             self.system_prompt = get_system_prompt(self.lang)
 
 
+class AgentCancelled(Exception):
+    """Raised inside a run when PhoneAgent.cancel() has been called."""
+
+
 @dataclass
 class StepResult:
     """Result of a single agent step."""
@@ -37,6 +59,8 @@ class StepResult:
     action: dict[str, Any] | None
     thinking: str
     message: str | None = None
+    timings: dict[str, float] = field(default_factory=dict)
+    tokens: dict[str, int] = field(default_factory=dict)
 
 
 class PhoneAgent:
@@ -51,6 +75,12 @@ class PhoneAgent:
         agent_config: Configuration for the agent behavior.
         confirmation_callback: Optional callback for sensitive action confirmation.
         takeover_callback: Optional callback for takeover requests.
+        step_callback: Optional callback invoked with each StepResult during run().
+        event_callback: Optional callback receiving typed AgentEvents as they
+            happen. When set, the model's thinking stream is delivered through
+            events instead of being printed.
+        model_client: Optional pre-built ModelClient, e.g. one routed through
+            a shared BatchingGateway. Defaults to a client for model_config.
 
     Example:
         >>> from phone_agent import PhoneAgent
@@ -67,19 +97,44 @@ class PhoneAgent:
         agent_config: AgentConfig | None = None,
         confirmation_callback: Callable[[str], bool] | None = None,
         takeover_callback: Callable[[str], None] | None = None,
+        step_callback: Callable[["StepResult"], None] | None = None,
+        event_callback: EventCallback | None = None,
+        model_client: ModelClient | None = None,
     ):
         self.model_config = model_config or ModelConfig()
         self.agent_config = agent_config or AgentConfig()
 
-        self.model_client = ModelClient(self.model_config)
+        self.model_client = model_client or ModelClient(self.model_config)
         self.action_handler = ActionHandler(
             device_id=self.agent_config.device_id,
             confirmation_callback=confirmation_callback,
             takeover_callback=takeover_callback,
+            device_factory=self.agent_config.device_factory,
+            settle_callback=self._prefetch_after_settle,
         )
 
+        self.step_callback = step_callback
+        self.event_callback = event_callback
+
         self._context: list[dict[str, Any]] = []
         self._step_count = 0
+        self._step_started = 0.0
+        self._token_history: list[dict[str, int]] = []
+
+        # Screenshot and current app are captured concurrently; during run()
+        # the next step's capture starts inside the action's settle window.
+        # Separate pools, so a background capture never waits for a worker
+        # held by itself. Created on first use, shut down by reset()/close().
+        self._app_pool: ThreadPoolExecutor | None = None
+        self._prefetch_pool: ThreadPoolExecutor | None = None
+        self._prefetched: Future | None = None
+        self._pipelining = False
+        self._replay: ReplayRecorder | None = None
+        # Trace id of the run in progress; trace_id keeps the last one
+        self._trace_run: str | None = None
+        self._trace_id: str | None = None
+        self._cancel_event = threading.Event()
+        self._cancel_reason: str | None = None
 
     def run(self, task: str) -> str:
         """
@@ -93,21 +148,68 @@ class PhoneAgent:
         """
         self._context = []
         self._step_count = 0
+        self._token_history = []
+        self._discard_prefetch()
+        self._pipelining = self.agent_config.prefetch_capture
+        self._replay = None
+        self._trace_id = None
+        trace_store = self.agent_config.trace_store
+        if trace_store is not None:
+            self._trace_id = trace_store.begin_run(
+                task,
+                device_id=self.agent_config.device_id,
+                model=self.model_config.model_name,
+                max_steps=self.agent_config.max_steps,
+            )
+        tracing = self._trace_run = self._trace_id
 
-        # First step with user prompt
-        result = self._execute_step(task, is_first=True)
-
-        if result.finished:
-            return result.message or "Task completed"
-
-        # Continue until finished or max steps reached
-        while self._step_count < self.agent_config.max_steps:
-            result = self._execute_step(is_first=False)
+        try:
+            # First step with user prompt
+            result = self._execute_step(task, is_first=True)
+            self._notify_step(result)
 
             if result.finished:
-                return result.message or "Task completed"
+                return self._finish_run(
+                    result.message or "Task completed", result.success
+                )
 
-        return "Max steps reached"
+            # Continue until finished or max steps reached
+            while self._step_count < self.agent_config.max_steps:
+                result = self._execute_step(is_first=False)
+                self._notify_step(result)
+
+                if result.finished:
+                    return self._finish_run(
+                        result.message or "Task completed", result.success
+                    )
+
+            return self._finish_run("Max steps reached", False)
+        except AgentCancelled:
+            # An interrupted trajectory says nothing about the cached steps
+            self._replay = None
+            reason = self._cancel_reason or "cancelled"
+            self._emit(EventType.CANCELLED, reason=reason, steps=self._step_count)
+            if tracing is not None:
+                trace_store.end_run(
+                    tracing, "cancelled", message=reason, steps=self._step_count
+                )
+            return f"Task cancelled: {reason}"
+        except Exception as e:
+            if tracing is not None:
+                trace_store.end_run(
+                    tracing, "failed", message=str(e), steps=self._step_count
+                )
+            raise
+        finally:
+            self._trace_run = None
+            self._cancel_event.clear()
+            self._pipelining = False
+            self._discard_prefetch()
+            if self._replay is not None:
+                # Run aborted by an exception
+                self._replay.finish(False)
+                self._replay = None
+            self.action_handler.end_session()
 
     def step(self, task: str | None = None) -> StepResult:
         """
@@ -128,21 +230,189 @@ class PhoneAgent:
 
         return self._execute_step(task, is_first)
 
+    def cancel(self, reason: str = "cancelled") -> None:
+        """
+        Stop the current run at the next phase boundary.
+
+        Safe to call from any thread. An in-flight model request is aborted
+        right away; a device action that has already started is allowed to
+        finish, but no further action is executed. run() then returns
+        "Task cancelled: <reason>".
+
+        Args:
+            reason: Reason reported in the cancelled event and return value.
+        """
+        self._cancel_reason = reason
+        self._cancel_event.set()
+        abort = getattr(self.model_client, "abort", None)
+        if abort is not None:
+            abort()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancel() was called for the current run."""
+        return self._cancel_event.is_set()
+
     def reset(self) -> None:
         """Reset the agent state for a new task."""
+        self.action_handler.end_session()
+        self._discard_prefetch()
+        self._shutdown_pools()
         self._context = []
         self._step_count = 0
+        self._token_history = []
+        self._replay = None
+
+    def close(self) -> None:
+        """Stop the agent's capture threads. The agent can still be run again."""
+        self._discard_prefetch()
+        self._shutdown_pools()
+
+    def _emit(self, event_type: EventType, **data: Any) -> None:
+        """Send an event to the event callback, if any."""
+        if self.event_callback is None:
+            return
+        event = AgentEvent(
+            type=event_type,
+            step=0 if event_type in RUN_EVENTS else self._step_count,
+            data=data,
+            elapsed_ms=round((time.perf_counter() - self._step_started) * 1000, 1),
+        )
+        try:
+            self.event_callback(event)
+        except Exception:
+            if self.agent_config.verbose:
+                traceback.print_exc()
+
+    def _finish_run(self, message: str, success: bool) -> str:
+        """Emit the run-level finish event and return the final message."""
+        if self._replay is not None:
+            self._replay.finish(success)
+            self._replay = None
+        if self._trace_run is not None:
+            self.agent_config.trace_store.end_run(
+                self._trace_run,
+                "succeeded" if success else "failed",
+                message=message,
+                steps=self._step_count,
+            )
+        self._emit(
+            EventType.FINISH, message=message, success=success, steps=self._step_count
+        )
+        return message
+
+    def _capture(self, settle: float = 0.0) -> tuple[Any, str, float]:
+        """Capture screenshot and current app concurrently.
+
+        Args:
+            settle: Seconds to wait for the screen to settle first.
+
+        Returns:
+            Tuple of (screenshot, current app, capture time in ms).
+        """
+        if settle > 0:
+            # Returns early on cancel(); the capture is discarded then
+            self._cancel_event.wait(settle)
+        start = time.perf_counter()
+        device_factory = self.agent_config.device_factory or get_device_factory()
+        device_id = self.agent_config.device_id
+        if self._app_pool is None:
+            self._app_pool = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="agent-current-app"
+            )
+        app_future = self._app_pool.submit(device_factory.get_current_app, device_id)
+        screenshot = device_factory.get_screenshot(device_id)
+        current_app = app_future.result()
+        return screenshot, current_app, _elapsed_ms(start)
+
+    def _prefetch(self, settle: float = 0.0) -> None:
+        """Start capturing the next screen in the background."""
+        if self._prefetch_pool is None:
+            self._prefetch_pool = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="agent-capture"
+            )
+        self._prefetched = self._prefetch_pool.submit(self._capture, settle)
+
+    def _prefetch_after_settle(self, settle: float) -> bool:
+        """ActionHandler settle callback: wait out the settle delay in the
+        background capture instead of sleeping in the step."""
+        if not self._pipelining or self._step_count >= self.agent_config.max_steps:
+            return False
+        self._prefetch(settle)
+        return True
+
+    def _discard_prefetch(self) -> None:
+        """Drop a background capture that will not be used."""
+        if self._prefetched is not None:
+            self._prefetched.cancel()
+            self._prefetched = None
+
+    def _shutdown_pools(self) -> None:
+        for pool in (self._prefetch_pool, self._app_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._prefetch_pool = self._app_pool = None
+
+    def _trace_step(self, screenshot: Any, current_app: str, **data: Any) -> None:
+        """Queue the current step for the trace store, if tracing this run."""
+        if self._trace_run is None:
+            return
+        self.agent_config.trace_store.record_step(
+            self._trace_run,
+            self._step_count,
+            screenshot_base64=screenshot.base64_data,
+            current_app=current_app,
+            width=screenshot.width,
+            height=screenshot.height,
+            **data,
+        )
+
+    def _check_cancelled(self) -> None:
+        if self._cancel_event.is_set():
+            raise AgentCancelled(self._cancel_reason)
+
+    def _notify_step(self, result: StepResult) -> None:
+        """Forward a step result to the step callback, if any."""
+        if self.step_callback is None:
+            return
+        try:
+            self.step_callback(result)
+        except Exception:
+            if self.agent_config.verbose:
+                traceback.print_exc()
 
     def _execute_step(
         self, user_prompt: str | None = None, is_first: bool = False
     ) -> StepResult:
         """Execute a single step of the agent loop."""
+        self._check_cancelled()
         self._step_count += 1
-
-        # Capture current screen state
-        device_factory = get_device_factory()
-        screenshot = device_factory.get_screenshot(self.agent_config.device_id)
-        current_app = device_factory.get_current_app(self.agent_config.device_id)
+        self._step_started = time.perf_counter()
+        timings: dict[str, float] = {}
+        self._emit(EventType.STEP_START, max_steps=self.agent_config.max_steps)
+
+        # Capture current screen state (possibly already started in background)
+        phase_start = time.perf_counter()
+        prefetched, self._prefetched = self._prefetched, None
+        if prefetched is not None:
+            screenshot, current_app, capture_ms = prefetched.result()
+        else:
+            screenshot, current_app, capture_ms = self._capture()
+        # screenshot_ms is the time this step blocked; capture_ms is device time
+        timings["screenshot_ms"] = _elapsed_ms(phase_start)
+        timings["capture_ms"] = capture_ms
+        timings["capture_overlap_ms"] = round(
+            max(0.0, capture_ms - timings["screenshot_ms"]), 1
+        )
+        self._emit(
+            EventType.SCREENSHOT_CAPTURED,
+            width=screenshot.width,
+            height=screenshot.height,
+            current_app=current_app,
+            duration_ms=timings["screenshot_ms"],
+            prefetched=prefetched is not None,
+        )
+        self._check_cancelled()
 
         # Build messages
         if is_first:
@@ -168,23 +438,97 @@ class PhoneAgent:
                 )
             )
 
+        tokens = {"context": estimate_tokens(self._context)}
+
+        # Look up a cached decision for this screen
+        replay_hit = phash = None
+        if is_first and self.agent_config.replay_cache is not None:
+            self._replay = ReplayRecorder(self.agent_config.replay_cache, user_prompt)
+        if self._replay is not None:
+            phase_start = time.perf_counter()
+            replay_hit, phash = self._replay.lookup(
+                self._step_count, current_app, screenshot.base64_data
+            )
+            timings["replay_lookup_ms"] = _elapsed_ms(phase_start)
+
         # Get model response
+        echo = self.event_callback is None
+        phase_start = time.perf_counter()
         try:
             msgs = get_messages(self.agent_config.lang)
-            print("\n" + "=" * 50)
-            print(f"💭 {msgs['thinking']}:")
-            print("-" * 50)
-            response = self.model_client.request(self._context)
+            if replay_hit is not None:
+                response = ModelResponse(
+                    thinking=replay_hit.thinking,
+                    action=replay_hit.action,
+                    raw_content=replay_hit.action,
+                )
+                if echo:
+                    print(f"♻️  Replayed cached action (distance {replay_hit.distance})")
+            elif echo:
+                print("\n" + "=" * 50)
+                print(f"💭 {msgs['thinking']}:")
+                print("-" * 50)
+            if replay_hit is None:
+                response = self.model_client.request(
+                    self._context,
+                    on_first_token=lambda ttft: self._emit(
+                        EventType.MODEL_FIRST_TOKEN, ttft_ms=round(ttft * 1000, 1)
+                    ),
+                    on_thinking=lambda text: self._emit(
+                        EventType.THINKING_DELTA, text=text
+                    ),
+                    echo=echo,
+                )
         except Exception as e:
+            # An aborted stream surfaces as a connection error
+            self._check_cancelled()
             if self.agent_config.verbose:
                 traceback.print_exc()
+            timings["model_ms"] = _elapsed_ms(phase_start)
+            self._emit(EventType.ERROR, message=f"Model error: {e}")
+            self._trace_step(
+                screenshot,
+                current_app,
+                success=False,
+                finished=True,
+                message=f"Model error: {e}",
+                timings=timings,
+                tokens=tokens,
+            )
+            self._emit(
+                EventType.STEP_END,
+                finished=True,
+                success=False,
+                timings=timings,
+                tokens=tokens,
+            )
             return StepResult(
                 success=False,
                 finished=True,
                 action=None,
                 thinking="",
                 message=f"Model error: {e}",
+                timings=timings,
+                tokens=tokens,
             )
+        timings["model_ms"] = _elapsed_ms(phase_start)
+        if response.time_to_first_token is not None:
+            timings["ttft_ms"] = round(response.time_to_first_token * 1000, 1)
+        if response.prompt_tokens is not None:
+            tokens["prompt"] = response.prompt_tokens
+        if response.completion_tokens is not None:
+            tokens["completion"] = response.completion_tokens
+        if response.cached_prompt_tokens is not None:
+            tokens["cached"] = response.cached_prompt_tokens
+        self._emit(
+            EventType.MODEL_RESPONSE,
+            thinking=response.thinking,
+            action=response.action,
+            duration_ms=timings["model_ms"],
+            stopped_early=response.stopped_early,
+            replayed=replay_hit is not None,
+            cached=response.cached,
+        )
 
         # Parse action from response
         try:
@@ -193,6 +537,7 @@ class PhoneAgent:
             if self.agent_config.verbose:
                 traceback.print_exc()
             action = finish(message=response.action)
+        self._emit(EventType.ACTION_PARSED, action=action)
 
         if self.agent_config.verbose:
             # Print thinking process
@@ -204,7 +549,11 @@ class PhoneAgent:
         # Remove image from context to save space
         self._context[-1] = MessageBuilder.remove_images_from_message(self._context[-1])
 
+        # Never start an action once the run is cancelled
+        self._check_cancelled()
+
         # Execute action
+        phase_start = time.perf_counter()
         try:
             result = self.action_handler.execute(
                 action, screenshot.width, screenshot.height
@@ -215,6 +564,45 @@ class PhoneAgent:
             result = self.action_handler.execute(
                 finish(message=str(e)), screenshot.width, screenshot.height
             )
+        timings["action_ms"] = _elapsed_ms(phase_start)
+        timings["action_device_ms"] = result.device_ms
+        timings["action_wait_ms"] = result.wait_ms
+
+        # Check if finished
+        finished = action.get("_metadata") == "finish" or result.should_finish
+
+        if self._replay is not None and not finished:
+            self._replay.record(
+                self._step_count,
+                current_app,
+                phash if result.success else None,
+                response.thinking,
+                response.action,
+                action.get("action"),
+                replay_hit,
+            )
+
+        if finished:
+            # Started by an action that turned out to end the run
+            self._discard_prefetch()
+        elif (
+            self._prefetched is None
+            and self._pipelining
+            and self._step_count < self.agent_config.max_steps
+        ):
+            # No settle delay was handed over (the action has none, or failed):
+            # start the next capture now, while the step is wrapped up
+            self._prefetch()
+
+        self._emit(
+            EventType.ACTION_EXECUTED,
+            success=result.success,
+            message=result.message,
+            duration_ms=timings["action_ms"],
+            action=action.get("action"),
+            device_ms=result.device_ms,
+            wait_ms=result.wait_ms,
+        )
 
         # Add assistant response to context
         self._context.append(
@@ -223,8 +611,12 @@ class PhoneAgent:
             )
         )
 
-        # Check if finished
-        finished = action.get("_metadata") == "finish" or result.should_finish
+        # Compact older turns so prompt size stays flat on long runs
+        if self.agent_config.context_policy is not None:
+            self._context = compact_context(
+                self._context, self.agent_config.context_policy
+            )
+        self._token_history.append(tokens)
 
         if finished and self.agent_config.verbose:
             msgs = get_messages(self.agent_config.lang)
@@ -234,12 +626,37 @@ class PhoneAgent:
             )
             print("=" * 50 + "\n")
 
+        timings["total_ms"] = _elapsed_ms(self._step_started)
+        self._trace_step(
+            screenshot,
+            current_app,
+            thinking=response.thinking,
+            raw_action=response.action,
+            action=action,
+            replayed=replay_hit is not None,
+            cached=response.cached,
+            success=result.success,
+            finished=finished,
+            message=result.message,
+            timings=timings,
+            tokens=tokens,
+        )
+        self._emit(
+            EventType.STEP_END,
+            finished=finished,
+            success=result.success,
+            timings=timings,
+            tokens=tokens,
+        )
+
         return StepResult(
             success=result.success,
             finished=finished,
             action=action,
             thinking=response.thinking,
             message=result.message or action.get("message"),
+            timings=timings,
+            tokens=tokens,
         )
 
     @property
@@ -247,7 +664,23 @@ class PhoneAgent:
         """Get the current conversation context."""
         return self._context.copy()
 
+    @property
+    def token_history(self) -> list[dict[str, int]]:
+        """Get per-step token counts (estimated context size, and server-reported
+        prompt/completion tokens when available)."""
+        return list(self._token_history)
+
+    @property
+    def trace_id(self) -> str | None:
+        """Trace store id of the current or last run, if it was traced."""
+        return self._trace_id
+
     @property
     def step_count(self) -> int:
         """Get the current step count."""
         return self._step_count
+
+
+def _elapsed_ms(start: float) -> float:
+    """Milliseconds elapsed since a perf_counter() reading."""
+    return round((time.perf_counter() - start) * 1000, 1)
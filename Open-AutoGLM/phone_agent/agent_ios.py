@@ -53,6 +53,8 @@ class IOSPhoneAgent:
         agent_config: Configuration for the iOS agent behavior.
         confirmation_callback: Optional callback for sensitive action confirmation.
         takeover_callback: Optional callback for takeover requests.
+        model_client: Optional pre-built ModelClient, e.g. one routed through
+            a shared BatchingGateway. Defaults to a client for model_config.
 
     Example:
         >>> from phone_agent.agent_ios import IOSPhoneAgent, IOSAgentConfig
@@ -70,11 +72,12 @@ class IOSPhoneAgent:
         agent_config: IOSAgentConfig | None = None,
         confirmation_callback: Callable[[str], bool] | None = None,
         takeover_callback: Callable[[str], None] | None = None,
+        model_client: ModelClient | None = None,
     ):
         self.model_config = model_config or ModelConfig()
         self.agent_config = agent_config or IOSAgentConfig()
 
-        self.model_client = ModelClient(self.model_config)
+        self.model_client = model_client or ModelClient(self.model_config)
 
         # Initialize WDA connection and create session if needed
         self.wda_connection = XCTestConnection(wda_url=self.agent_config.wda_url)
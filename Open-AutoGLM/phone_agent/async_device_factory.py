@@ -0,0 +1,223 @@
+"""Async device factory and a blocking bridge onto it for synchronous agents."""
+
+import asyncio
+import concurrent.futures
+import functools
+from typing import Any
+
+from phone_agent.device_factory import DeviceType
+
+
+class AsyncDeviceFactory:
+    """
+    Async variant of DeviceFactory.
+
+    Wraps a non-blocking backend (AsyncADBBackend, AsyncHDCBackend or
+    AsyncWDABackend) with the DeviceFactory method set, every method a
+    coroutine. Optional capabilities (focused text, keyboard wait) fall
+    back the same way DeviceFactory does.
+
+    Example:
+        >>> factory = AsyncDeviceFactory(DeviceType.ADB)
+        >>> screenshot = await factory.get_screenshot("emulator-5554")
+        >>> await factory.tap(500, 800, "emulator-5554")
+        >>> await factory.aclose()
+    """
+
+    def __init__(
+        self,
+        device_type: DeviceType = DeviceType.ADB,
+        backend: Any = None,
+        wda_url: str = "http://localhost:8100",
+        session_id: str | None = None,
+    ):
+        """
+        Args:
+            device_type: The type of device to use.
+            backend: Optional backend object used instead of the built-in
+                one for the device type.
+            wda_url: WebDriverAgent URL (iOS only).
+            session_id: Optional WDA session ID (iOS only).
+        """
+        self.device_type = device_type
+        if backend is None:
+            if device_type == DeviceType.ADB:
+                from phone_agent.adb.async_device import AsyncADBBackend
+
+                backend = AsyncADBBackend()
+            elif device_type == DeviceType.HDC:
+                from phone_agent.hdc.async_device import AsyncHDCBackend
+
+                backend = AsyncHDCBackend()
+            elif device_type == DeviceType.IOS:
+                from phone_agent.xctest.async_device import AsyncWDABackend
+
+                backend = AsyncWDABackend(wda_url, session_id)
+            else:
+                raise ValueError(f"Unknown device type: {device_type}")
+        self.backend = backend
+
+    async def get_screenshot(self, device_id: str | None = None, timeout: int = 10):
+        """Get screenshot from device."""
+        return await self.backend.get_screenshot(device_id, timeout)
+
+    async def get_current_app(self, device_id: str | None = None) -> str:
+        """Get current app name."""
+        return await self.backend.get_current_app(device_id)
+
+    async def tap(
+        self, x: int, y: int, device_id: str | None = None, delay: float | None = None
+    ):
+        """Tap at coordinates."""
+        return await self.backend.tap(x, y, device_id, delay)
+
+    async def double_tap(
+        self, x: int, y: int, device_id: str | None = None, delay: float | None = None
+    ):
+        """Double tap at coordinates."""
+        return await self.backend.double_tap(x, y, device_id, delay)
+
+    async def long_press(
+        self,
+        x: int,
+        y: int,
+        duration_ms: int = 3000,
+        device_id: str | None = None,
+        delay: float | None = None,
+    ):
+        """Long press at coordinates."""
+        return await self.backend.long_press(x, y, duration_ms, device_id, delay)
+
+    async def swipe(
+        self,
+        start_x: int,
+        start_y: int,
+        end_x: int,
+        end_y: int,
+        duration_ms: int | None = None,
+        device_id: str | None = None,
+        delay: float | None = None,
+    ):
+        """Swipe from start to end."""
+        return await self.backend.swipe(
+            start_x, start_y, end_x, end_y, duration_ms, device_id, delay
+        )
+
+    async def back(self, device_id: str | None = None, delay: float | None = None):
+        """Press back button."""
+        return await self.backend.back(device_id, delay)
+
+    async def home(self, device_id: str | None = None, delay: float | None = None):
+        """Press home button."""
+        return await self.backend.home(device_id, delay)
+
+    async def launch_app(
+        self, app_name: str, device_id: str | None = None, delay: float | None = None
+    ) -> bool:
+        """Launch an app."""
+        return await self.backend.launch_app(app_name, device_id, delay)
+
+    async def type_text(self, text: str, device_id: str | None = None):
+        """Type text."""
+        return await self.backend.type_text(text, device_id)
+
+    async def clear_text(self, device_id: str | None = None):
+        """Clear text."""
+        return await self.backend.clear_text(device_id)
+
+    async def clear_and_type(self, text: str, device_id: str | None = None):
+        """Clear the focused field and type text, in one round trip if supported."""
+        if hasattr(self.backend, "clear_and_type"):
+            return await self.backend.clear_and_type(text, device_id)
+        await self.backend.clear_text(device_id)
+        return await self.backend.type_text(text, device_id)
+
+    async def get_focused_text(self, device_id: str | None = None) -> str | None:
+        """Read back the focused field's text, or None if not supported."""
+        if hasattr(self.backend, "get_focused_text"):
+            return await self.backend.get_focused_text(device_id)
+        return None
+
+    async def wait_for_keyboard(
+        self, device_id: str | None = None, timeout: float = 1.0
+    ) -> bool:
+        """Wait until the automation keyboard is active, if supported."""
+        if hasattr(self.backend, "wait_for_keyboard"):
+            return await self.backend.wait_for_keyboard(device_id, timeout)
+        return True
+
+    async def detect_and_set_adb_keyboard(self, device_id: str | None = None) -> str:
+        """Detect and set keyboard."""
+        return await self.backend.detect_and_set_adb_keyboard(device_id)
+
+    async def restore_keyboard(self, ime: str, device_id: str | None = None):
+        """Restore keyboard."""
+        return await self.backend.restore_keyboard(ime, device_id)
+
+    async def list_devices(self):
+        """List connected devices."""
+        return await self.backend.list_devices()
+
+    async def aclose(self) -> None:
+        """Release the backend's shells or HTTP client."""
+        await self.backend.close()
+
+
+class BlockingDeviceBridge:
+    """
+    Synchronous device module backed by an async backend on another loop.
+
+    Every call is submitted to ``loop`` and waited for, so synchronous
+    PhoneAgents running in worker threads share the backend's persistent
+    shells and HTTP pool with async code on that loop (e.g. a server's
+    event loop). Pass it as the module of a DeviceFactory:
+
+    Example:
+        >>> bridge = BlockingDeviceBridge(async_factory.backend, loop)
+        >>> factory = DeviceFactory(DeviceType.ADB, module=bridge)
+
+    Must not be called from the loop's own thread.
+    """
+
+    def __init__(
+        self, backend: Any, loop: asyncio.AbstractEventLoop, timeout: float | None = 300
+    ):
+        """
+        Args:
+            backend: Async backend (AsyncADBBackend, ...) to call.
+            loop: Running event loop the backend belongs to.
+            timeout: Seconds a call may take before TimeoutError is raised,
+                so callers are not stranded if the loop stops; None waits
+                forever.
+        """
+        self.backend = backend
+        self.loop = loop
+        self.timeout = timeout
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.backend, name)
+        if not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            if _running_loop() is self.loop:
+                raise RuntimeError(
+                    "BlockingDeviceBridge called from its own event loop"
+                )
+            future = asyncio.run_coroutine_threadsafe(attr(*args, **kwargs), self.loop)
+            try:
+                return future.result(self.timeout)
+            except concurrent.futures.TimeoutError:
+                # Don't leave the call running on the loop after giving up
+                future.cancel()
+                raise
+
+        return call
+
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
@@ -0,0 +1,245 @@
+"""Non-blocking command execution for the async device backends."""
+
+import asyncio
+import itertools
+import shlex
+from dataclasses import dataclass
+
+_LINE_LIMIT = 8 * 1024 * 1024
+
+# Reaper tasks of discarded shells, referenced until they finish
+_reapers: set[asyncio.Task] = set()
+
+
+@dataclass
+class CommandOutput:
+    """Exit status and output of a command."""
+
+    returncode: int
+    stdout: bytes
+    stderr: bytes = b""
+
+    @property
+    def text(self) -> str:
+        """stdout decoded as UTF-8, undecodable bytes dropped."""
+        return self.stdout.decode("utf-8", errors="ignore")
+
+
+async def run_command(args: list[str], timeout: float = 30) -> CommandOutput:
+    """
+    Run a command as an asyncio subprocess.
+
+    The process is killed if it does not finish within the timeout.
+
+    Raises:
+        asyncio.TimeoutError: If the command timed out.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+    return CommandOutput(process.returncode, stdout, stderr)
+
+
+class AsyncShellChannel:
+    """
+    Persistent device shell (``adb -s <id> shell``, ``hdc -t <id> shell``).
+
+    Commands are written to the shell's stdin one at a time and their end
+    is found by an echoed sentinel line carrying the exit status, so each
+    command costs one round trip instead of a new adb/hdc process. stderr
+    is merged into stdout. A channel whose state is unknown (timeout,
+    closed pipe, cancelled command) is discarded and reopened on the next
+    command, so a command's unread output never reaches the next one.
+
+    The shell process belongs to the event loop it was started on.
+
+    Example:
+        >>> channel = AsyncShellChannel(["adb", "-s", "emulator-5554", "shell"])
+        >>> output = await channel.run("input tap 500 500")
+    """
+
+    def __init__(self, shell_args: list[str]):
+        self.shell_args = shell_args
+        self._process: asyncio.subprocess.Process | None = None
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._lock = asyncio.Lock()
+        self._sequence = itertools.count(1)
+        self.commands = 0
+        self.restarts = 0
+
+    @property
+    def is_alive(self) -> bool:
+        """Whether the shell process is running."""
+        return self._process is not None and self._process.returncode is None
+
+    async def run(self, command: str, timeout: float = 30) -> CommandOutput:
+        """
+        Run a shell command on the device.
+
+        Args:
+            command: Device-side shell command line.
+            timeout: Seconds to wait for the command to finish.
+
+        Raises:
+            asyncio.TimeoutError: If the command timed out.
+            ConnectionError: If the shell exited.
+        """
+        async with self._lock:
+            if not self.is_alive:
+                await self._start()
+            sentinel = f"__PHONE_AGENT_END_{next(self._sequence)}__"
+            payload = f'{{ {command} ; }} 2>&1; echo "{sentinel} $?"\n'
+            lines = []
+            try:
+                self._process.stdin.write(payload.encode("utf-8"))
+                await self._process.stdin.drain()
+                while True:
+                    line = await asyncio.wait_for(
+                        self._process.stdout.readline(), timeout
+                    )
+                    if not line:
+                        raise ConnectionError(
+                            f"Shell exited: {shlex.join(self.shell_args)}"
+                        )
+                    # Output without a trailing newline ends on the sentinel's line
+                    index = line.find(sentinel.encode())
+                    if index >= 0:
+                        lines.append(line[:index])
+                        status = line[index + len(sentinel) :].strip()
+                        returncode = (
+                            int(status) if status.lstrip(b"-").isdigit() else -1
+                        )
+                        break
+                    lines.append(line)
+            except BaseException:
+                # Timeout, closed pipe or CancelledError: output of this
+                # command may still be in flight
+                self.discard()
+                raise
+            self.commands += 1
+            # Device shells may emit CRLF
+            return CommandOutput(returncode, b"".join(lines).replace(b"\r\n", b"\n"))
+
+    async def close(self) -> None:
+        """Stop the shell process."""
+        async with self._lock:
+            await self._close()
+
+    def discard(self) -> None:
+        """Kill the shell process without waiting; the next command restarts it."""
+        process, self._process = self._process, None
+        if process is not None and process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                return
+            # Reap it on its own loop so the transport is not left to the GC
+            if self.loop is not None and self.loop is _running_loop():
+                reaper = self.loop.create_task(process.wait())
+                _reapers.add(reaper)
+                reaper.add_done_callback(_reapers.discard)
+
+    async def _start(self) -> None:
+        if self.loop is not None:
+            self.restarts += 1
+        self.loop = asyncio.get_running_loop()
+        self._process = await asyncio.create_subprocess_exec(
+            *self.shell_args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            # uiautomator dumps arrive as a single long line
+            limit=_LINE_LIMIT,
+        )
+
+    async def _close(self) -> None:
+        process, self._process = self._process, None
+        if process is None or process.returncode is not None:
+            return
+        try:
+            process.stdin.close()
+            await asyncio.wait_for(process.wait(), 1.0)
+        except (asyncio.TimeoutError, OSError):
+            process.kill()
+            await process.wait()
+
+
+class ShellChannelPool:
+    """
+    One persistent shell channel per device, for the async backends.
+
+    Args:
+        tool: Command-line tool prefix, e.g. ``["adb"]``.
+        target_flag: Flag selecting a device, e.g. ``"-s"`` for adb.
+    """
+
+    def __init__(self, tool: list[str], target_flag: str):
+        self.tool = tool
+        self.target_flag = target_flag
+        self._channels: dict[str, AsyncShellChannel] = {}
+
+    def prefix(self, device_id: str | None) -> list[str]:
+        """Command prefix with optional device specifier."""
+        if device_id:
+            return [*self.tool, self.target_flag, device_id]
+        return list(self.tool)
+
+    def channel(self, device_id: str | None) -> AsyncShellChannel:
+        """The device's shell channel, created on first use.
+
+        Must be called from a running event loop. A channel started on
+        another loop cannot be used from this one; it is discarded and
+        replaced.
+        """
+        key = device_id or ""
+        channel = self._channels.get(key)
+        if channel is not None and channel.loop not in (
+            None,
+            asyncio.get_running_loop(),
+        ):
+            channel.discard()
+            channel = None
+        if channel is None:
+            channel = self._channels[key] = AsyncShellChannel(
+                self.prefix(device_id) + ["shell"]
+            )
+        return channel
+
+    async def shell(
+        self, device_id: str | None, args: list[str] | str, timeout: float = 30
+    ) -> CommandOutput:
+        """Run a command (argument list or raw command line) in the device's shell."""
+        command = args if isinstance(args, str) else shlex.join(args)
+        return await self.channel(device_id).run(command, timeout)
+
+    def stats(self) -> dict[str, dict]:
+        """Per-device channel counters."""
+        return {
+            key: {
+                "alive": channel.is_alive,
+                "commands": channel.commands,
+                "restarts": channel.restarts,
+            }
+            for key, channel in list(self._channels.items())
+        }
+
+    async def close(self) -> None:
+        """Stop every shell process."""
+        channels = list(self._channels.values())
+        self._channels.clear()
+        for channel in channels:
+            await channel.close()
+
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
@@ -1,5 +1,9 @@
 """Configuration module for Phone Agent."""
 
+import functools
+from datetime import date
+
+from phone_agent.config import prompts_en, prompts_zh
 from phone_agent.config.apps import APP_PACKAGES
 from phone_agent.config.apps_ios import APP_PACKAGES_IOS
 from phone_agent.config.i18n import get_message, get_messages
@@ -16,19 +20,29 @@ from phone_agent.config.timing import (
 )
 
 
-def get_system_prompt(lang: str = "cn") -> str:
+def get_system_prompt(lang: str = "cn", day: date | None = None) -> str:
     """
     Get system prompt by language.
 
+    Prompts are rendered once per language and day and the same string is
+    returned to every caller, so all agents send a byte-identical system
+    message and the server's prefix cache is shared between them. The date
+    line follows the calendar in long-running processes.
+
     Args:
         lang: Language code, 'cn' for Chinese, 'en' for English.
+        day: Date stated in the prompt (default: today).
 
     Returns:
         System prompt string.
     """
-    if lang == "en":
-        return SYSTEM_PROMPT_EN
-    return SYSTEM_PROMPT_ZH
+    return _render_system_prompt("en" if lang == "en" else "cn", day or date.today())
+
+
+@functools.lru_cache(maxsize=16)
+def _render_system_prompt(lang: str, day: date) -> str:
+    module = prompts_en if lang == "en" else prompts_zh
+    return module.render_system_prompt(day)
 
 
 # Default to Chinese for backward compatibility
@@ -1,14 +1,27 @@
 """System prompts for the AI agent."""
 
-from datetime import datetime
+from datetime import date
 
-today = datetime.today()
-formatted_date = today.strftime("%Y-%m-%d, %A")
+# Fixed names: strftime("%A") depends on the process locale
+WEEKDAY_NAMES = [
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+]
 
-SYSTEM_PROMPT = (
-    "The current date: "
-    + formatted_date
-    + """
+DATE_PREFIX = "The current date: "
+
+
+def format_date(day: date) -> str:
+    """Format a date the way the prompt states it."""
+    return day.strftime("%Y-%m-%d, ") + WEEKDAY_NAMES[day.weekday()]
+
+
+PROMPT_BODY = """
 # Setup
 You are a professional Android operation agent assistant that can fulfill the user's high-level instructions. Given a screenshot of the Android interface at each step, you first analyze the situation, then plan the best course of action using Python-style pseudo-code.
 
@@ -76,4 +89,11 @@ REMEMBER:
 - Only ONE LINE of action in <answer> part per response: Each step must contain exactly one line of executable code.
 - Generate execution code strictly according to format requirements.
 """
-)
+
+
+def render_system_prompt(day: date) -> str:
+    """Render the system prompt for a given day."""
+    return DATE_PREFIX + format_date(day) + PROMPT_BODY
+
+
+SYSTEM_PROMPT = render_system_prompt(date.today())
@@ -13,10 +13,17 @@ class ActionTimingConfig:
     """Configuration for action handler timing delays."""
 
     # Text input related delays (in seconds)
-    keyboard_switch_delay: float = 1.0  # Delay after switching to ADB keyboard
-    text_clear_delay: float = 1.0  # Delay after clearing text
-    text_input_delay: float = 1.0  # Delay after typing text
+    keyboard_switch_delay: float = 1.0  # Max wait for ADB keyboard to become active
+    text_clear_delay: float = (
+        1.0  # Delay after clearing text (only when verification is off)
+    )
+    text_input_delay: float = (
+        1.0  # Delay after typing text (only when verification is off)
+    )
     keyboard_restore_delay: float = 1.0  # Delay after restoring original keyboard
+    # Max time to keep re-reading the field after the first readback, which
+    # alone takes a uiautomator dump (1-3 s); 0 disables verification
+    text_verify_timeout: float = 0.5
 
     def __post_init__(self):
         """Load values from environment variables if present."""
@@ -32,6 +39,9 @@ class ActionTimingConfig:
         self.keyboard_restore_delay = float(
             os.getenv("PHONE_AGENT_KEYBOARD_RESTORE_DELAY", self.keyboard_restore_delay)
         )
+        self.text_verify_timeout = float(
+            os.getenv("PHONE_AGENT_TEXT_VERIFY_TIMEOUT", self.text_verify_timeout)
+        )
 
 
 @dataclass
@@ -0,0 +1,163 @@
+"""Context window compaction for long agent runs."""
+
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Any
+
+# Rough cost of one screenshot in prompt tokens for typical VLM tokenizers
+IMAGE_TOKENS = 1000
+
+_THINK_PATTERN = re.compile(r"<think>(.*?)</think>", re.DOTALL)
+_CJK_PATTERN = re.compile(r"[぀-ヿ㐀-鿿가-힯＀-￯]")
+_SENTENCE_END = re.compile(r"[。！？.!?\n]")
+
+
+@dataclass
+class CompactionPolicy:
+    """
+    Rules for shrinking older turns of the conversation.
+
+    The most recent ``keep_last_turns`` user/assistant pairs are always kept
+    verbatim. Older turns are rewritten once and never change again, so the
+    compacted history stays byte-identical between steps and keeps hitting
+    the server's prefix cache.
+
+    Attributes:
+        keep_last_turns: Number of recent turns kept in full.
+        summarize_thinking: Shorten the <think> block of older assistant turns.
+        thinking_summary_chars: Max characters kept from older thinking.
+        drop_screen_info: Replace the screen-info JSON of older user turns
+            with just the app name.
+        max_turns: If set, turns beyond this many (oldest first, excluding the
+            first user turn that holds the task) are dropped entirely.
+    """
+
+    keep_last_turns: int = int(os.getenv("PHONE_AGENT_CONTEXT_KEEP_TURNS", "8"))
+    summarize_thinking: bool = True
+    thinking_summary_chars: int = 120
+    drop_screen_info: bool = True
+    max_turns: int | None = None
+
+
+def estimate_tokens(messages: list[dict[str, Any]]) -> int:
+    """
+    Estimate prompt tokens for a list of messages.
+
+    CJK characters count as one token each, other text as four characters
+    per token and images as IMAGE_TOKENS.
+    """
+    total = 0
+    for message in messages:
+        content = message.get("content")
+        parts = (
+            content
+            if isinstance(content, list)
+            else [{"type": "text", "text": content or ""}]
+        )
+        for part in parts:
+            if part.get("type") == "image_url":
+                total += IMAGE_TOKENS
+                continue
+            text = part.get("text", "")
+            cjk = len(_CJK_PATTERN.findall(text))
+            total += cjk + (len(text) - cjk + 3) // 4
+    return total
+
+
+def summarize_thinking(content: str, max_chars: int) -> str:
+    """Shorten the <think> block of an assistant message to its first sentence."""
+
+    def shorten(match: re.Match) -> str:
+        thinking = match.group(1).strip()
+        if len(thinking) <= max_chars:
+            return match.group(0)
+        end = _SENTENCE_END.search(thinking, 0, max_chars)
+        summary = (
+            thinking[: end.end()].strip()
+            if end
+            else thinking[:max_chars].rstrip() + "…"
+        )
+        return f"<think>{summary}</think>"
+
+    return _THINK_PATTERN.sub(shorten, content, count=1)
+
+
+def drop_screen_info(text: str) -> str:
+    """Replace a trailing screen-info JSON block with the current app name."""
+    head, sep, tail = text.rpartition("\n\n")
+    if not sep:
+        return text
+    try:
+        info = json.loads(tail)
+    except ValueError:
+        return text
+    if not isinstance(info, dict):
+        return text
+    app = info.get("current_app", "")
+    return f"{head}\n\n[{app}]" if head else f"[{app}]"
+
+
+def _compact_user(message: dict[str, Any]) -> dict[str, Any]:
+    content = message.get("content")
+    if isinstance(content, str):
+        return {**message, "content": drop_screen_info(content)}
+    return {
+        **message,
+        "content": [
+            {**part, "text": drop_screen_info(part["text"])}
+            if part.get("type") == "text"
+            else part
+            for part in content
+        ],
+    }
+
+
+def compact_context(
+    context: list[dict[str, Any]], policy: CompactionPolicy
+) -> list[dict[str, Any]]:
+    """
+    Apply a compaction policy to a conversation.
+
+    The system message is kept as is, and the first user message keeps its
+    task text. Messages are returned as new dicts; the input list is not
+    modified.
+
+    Args:
+        context: Messages in OpenAI format, starting with the system message.
+        policy: Compaction rules.
+
+    Returns:
+        The compacted message list.
+    """
+    system = context[:1] if context and context[0].get("role") == "system" else []
+    turns = context[len(system) :]
+
+    # turns alternate user/assistant; an odd length means the newest user
+    # message has no answer yet and belongs to the kept window
+    keep = max(0, policy.keep_last_turns) * 2 + len(turns) % 2
+    split = max(0, len(turns) - keep)
+    old, recent = turns[:split], turns[split:]
+
+    if policy.max_turns is not None:
+        excess = len(old) // 2 - max(0, policy.max_turns - policy.keep_last_turns)
+        if excess > 0:
+            # Keep the task message and drop whole user/assistant pairs after
+            # it, so roles still alternate
+            old = old[:1] + old[1 + 2 * excess :]
+
+    compacted = []
+    for message in old:
+        role = message.get("role")
+        if role == "user" and policy.drop_screen_info:
+            message = _compact_user(message)
+        elif role == "assistant" and policy.summarize_thinking:
+            message = {
+                **message,
+                "content": summarize_thinking(
+                    message.get("content", ""), policy.thinking_summary_chars
+                ),
+            }
+        compacted.append(message)
+    return system + compacted + recent
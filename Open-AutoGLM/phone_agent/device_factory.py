@@ -17,17 +17,22 @@ class DeviceFactory:
     Factory class for getting device-specific implementations.
 
     This allows the system to work with both Android (ADB) and HarmonyOS (HDC) devices.
+    Each PhoneAgent may be given its own instance (AgentConfig.device_factory),
+    so one process can drive devices of different types.
     """
 
-    def __init__(self, device_type: DeviceType = DeviceType.ADB):
+    def __init__(self, device_type: DeviceType = DeviceType.ADB, module: Any = None):
         """
         Initialize the device factory.
 
         Args:
             device_type: The type of device to use (ADB or HDC).
+            module: Optional object implementing the device module functions
+                (get_screenshot, tap, ...) used instead of the adb/hdc
+                package, e.g. a simulated device.
         """
         self.device_type = device_type
-        self._module = None
+        self._module = module
 
     @property
     def module(self):
@@ -113,6 +118,27 @@ class DeviceFactory:
         """Clear text."""
         return self.module.clear_text(device_id)
 
+    def clear_and_type(self, text: str, device_id: str | None = None):
+        """Clear the focused field and type text, in one round trip if supported."""
+        if hasattr(self.module, "clear_and_type"):
+            return self.module.clear_and_type(text, device_id)
+        self.module.clear_text(device_id)
+        return self.module.type_text(text, device_id)
+
+    def get_focused_text(self, device_id: str | None = None) -> str | None:
+        """Read back the focused field's text, or None if not supported."""
+        if hasattr(self.module, "get_focused_text"):
+            return self.module.get_focused_text(device_id)
+        return None
+
+    def wait_for_keyboard(
+        self, device_id: str | None = None, timeout: float = 1.0
+    ) -> bool:
+        """Wait until the automation keyboard is active, if supported."""
+        if hasattr(self.module, "wait_for_keyboard"):
+            return self.module.wait_for_keyboard(device_id, timeout)
+        return True
+
     def detect_and_set_adb_keyboard(self, device_id: str | None = None) -> str:
         """Detect and set keyboard."""
         return self.module.detect_and_set_adb_keyboard(device_id)
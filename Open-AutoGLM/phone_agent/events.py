@@ -0,0 +1,60 @@
+"""Typed events emitted by PhoneAgent while it runs a task."""
+
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable
+
+
+class EventType(str, Enum):
+    """Kinds of events emitted during an agent run."""
+
+    STEP_START = "step_start"
+    SCREENSHOT_CAPTURED = "screenshot_captured"
+    MODEL_FIRST_TOKEN = "model_first_token"
+    THINKING_DELTA = "thinking_delta"
+    MODEL_RESPONSE = "model_response"
+    ACTION_PARSED = "action_parsed"
+    ACTION_EXECUTED = "action_executed"
+    STEP_END = "step_end"
+    FINISH = "finish"
+    CANCELLED = "cancelled"
+    ERROR = "error"
+
+
+# Events about the whole run rather than one step; they carry step 0 and
+# report the number of steps taken in their data
+RUN_EVENTS = frozenset({EventType.FINISH, EventType.CANCELLED})
+
+
+@dataclass
+class AgentEvent:
+    """
+    A single event from an agent run.
+
+    Attributes:
+        type: Event kind.
+        step: 1-based step number the event belongs to (0 for RUN_EVENTS).
+        data: Event payload; keys depend on the event type.
+        timestamp: Wall-clock time in seconds since the epoch.
+        elapsed_ms: Milliseconds since the start of the current step.
+    """
+
+    type: EventType
+    step: int
+    data: dict[str, Any] = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+    elapsed_ms: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert the event to a JSON-serializable dict."""
+        return {
+            "type": self.type.value,
+            "step": self.step,
+            "timestamp": self.timestamp,
+            "elapsed_ms": self.elapsed_ms,
+            "data": self.data,
+        }
+
+
+EventCallback = Callable[[AgentEvent], None]
@@ -1,5 +1,6 @@
 """HDC utilities for HarmonyOS device interaction."""
 
+from phone_agent.hdc.async_device import AsyncHDCBackend
 from phone_agent.hdc.connection import (
     HDCConnection,
     ConnectionType,
@@ -50,4 +51,6 @@ __all__ = [
     "quick_connect",
     "list_devices",
     "set_hdc_verbose",
+    # Async backend
+    "AsyncHDCBackend",
 ]
@@ -0,0 +1,221 @@
+"""Async device backend for HarmonyOS, over persistent hdc shell channels."""
+
+import asyncio
+import os
+import shlex
+import tempfile
+import uuid
+
+from phone_agent.async_shell import ShellChannelPool, run_command
+from phone_agent.config.apps_harmonyos import APP_PACKAGES
+from phone_agent.config.timing import TIMING_CONFIG
+from phone_agent.hdc.connection import DeviceInfo, _parse_devices
+from phone_agent.hdc.device import _launch_args, _parse_current_app, _swipe_duration
+from phone_agent.hdc.screenshot import (
+    Screenshot,
+    _create_fallback_screenshot,
+    _screenshot_from_file,
+)
+
+# HarmonyOS HDC only supports JPEG format
+_REMOTE_SCREENSHOT = "/data/local/tmp/tmp_screenshot.jpeg"
+
+
+class AsyncHDCBackend:
+    """
+    Non-blocking counterpart of the ``phone_agent.hdc`` module.
+
+    Methods take the same arguments as the module functions. uitest and
+    query commands go through one persistent ``hdc shell`` per device
+    (see AsyncShellChannel); the screenshot file is received with an
+    asyncio subprocess and converted off the event loop.
+
+    The backend belongs to the event loop it is first used on.
+    """
+
+    def __init__(self, hdc_path: str = "hdc"):
+        self.hdc_path = hdc_path
+        self.channels = ShellChannelPool([hdc_path], "-t")
+
+    async def get_screenshot(
+        self, device_id: str | None = None, timeout: int = 10
+    ) -> Screenshot:
+        """Capture a screenshot; a black fallback image is returned on failure."""
+        temp_path = os.path.join(
+            tempfile.gettempdir(), f"screenshot_{uuid.uuid4()}.png"
+        )
+        try:
+            result = await self.channels.shell(
+                device_id, ["screenshot", _REMOTE_SCREENSHOT], timeout
+            )
+            output = result.text.lower()
+            if "fail" in output or "error" in output or "not found" in output:
+                # Older versions or different devices
+                result = await self.channels.shell(
+                    device_id, ["snapshot_display", "-f", _REMOTE_SCREENSHOT], timeout
+                )
+                output = result.text.lower()
+                if "fail" in output or "error" in output:
+                    return _create_fallback_screenshot(is_sensitive=True)
+
+            await run_command(
+                self.channels.prefix(device_id)
+                + ["file", "recv", _REMOTE_SCREENSHOT, temp_path],
+                timeout=5,
+            )
+            if not os.path.exists(temp_path):
+                return _create_fallback_screenshot(is_sensitive=False)
+
+            # JPEG -> PNG re-encoding is CPU work; keep it off the event loop
+            return await asyncio.to_thread(_screenshot_from_file, temp_path)
+
+        except Exception as e:
+            print(f"Screenshot error: {e}")
+            return _create_fallback_screenshot(is_sensitive=False)
+
+    async def get_current_app(self, device_id: str | None = None) -> str:
+        """Get the currently focused app name."""
+        result = await self.channels.shell(
+            device_id, ["hidumper", "-s", "WindowManagerService", "-a", "-a"]
+        )
+        output = result.text
+        if not output:
+            raise ValueError("No output from hidumper")
+        return _parse_current_app(output)
+
+    async def tap(
+        self, x: int, y: int, device_id: str | None = None, delay: float | None = None
+    ) -> None:
+        """Tap at the specified coordinates."""
+        if delay is None:
+            delay = TIMING_CONFIG.device.default_tap_delay
+        await self._ui_input(device_id, "click", x, y)
+        await asyncio.sleep(delay)
+
+    async def double_tap(
+        self, x: int, y: int, device_id: str | None = None, delay: float | None = None
+    ) -> None:
+        """Double tap at the specified coordinates."""
+        if delay is None:
+            delay = TIMING_CONFIG.device.default_double_tap_delay
+        await self._ui_input(device_id, "doubleClick", x, y)
+        await asyncio.sleep(delay)
+
+    async def long_press(
+        self,
+        x: int,
+        y: int,
+        duration_ms: int = 3000,
+        device_id: str | None = None,
+        delay: float | None = None,
+    ) -> None:
+        """Long press at the specified coordinates (uitest uses a fixed duration)."""
+        if delay is None:
+            delay = TIMING_CONFIG.device.default_long_press_delay
+        await self._ui_input(device_id, "longClick", x, y)
+        await asyncio.sleep(delay)
+
+    async def swipe(
+        self,
+        start_x: int,
+        start_y: int,
+        end_x: int,
+        end_y: int,
+        duration_ms: int | None = None,
+        device_id: str | None = None,
+        delay: float | None = None,
+    ) -> None:
+        """Swipe from start to end coordinates."""
+        if delay is None:
+            delay = TIMING_CONFIG.device.default_swipe_delay
+        if duration_ms is None:
+            duration_ms = _swipe_duration(start_x, start_y, end_x, end_y)
+        await self._ui_input(
+            device_id, "swipe", start_x, start_y, end_x, end_y, duration_ms
+        )
+        await asyncio.sleep(delay)
+
+    async def back(
+        self, device_id: str | None = None, delay: float | None = None
+    ) -> None:
+        """Press the back button."""
+        if delay is None:
+            delay = TIMING_CONFIG.device.default_back_delay
+        await self._ui_input(device_id, "keyEvent", "Back")
+        await asyncio.sleep(delay)
+
+    async def home(
+        self, device_id: str | None = None, delay: float | None = None
+    ) -> None:
+        """Press the home button."""
+        if delay is None:
+            delay = TIMING_CONFIG.device.default_home_delay
+        await self._ui_input(device_id, "keyEvent", "Home")
+        await asyncio.sleep(delay)
+
+    async def launch_app(
+        self, app_name: str, device_id: str | None = None, delay: float | None = None
+    ) -> bool:
+        """Launch an app by name; False if the app is unknown."""
+        if delay is None:
+            delay = TIMING_CONFIG.device.default_launch_delay
+        if app_name not in APP_PACKAGES:
+            print(f"[HDC] App '{app_name}' not found in HarmonyOS app list")
+            return False
+        await self.channels.shell(device_id, _launch_args(app_name))
+        await asyncio.sleep(delay)
+        return True
+
+    async def type_text(self, text: str, device_id: str | None = None) -> None:
+        """Type text into the focused input field; newlines become ENTER key events."""
+        commands = []
+        lines = text.split("\n")
+        for i, line in enumerate(lines):
+            if line:
+                commands.append(shlex.join(["uitest", "uiInput", "text", line]))
+            if i < len(lines) - 1:
+                commands.append("uitest uiInput keyEvent 2054")
+        if commands:
+            await self.channels.shell(device_id, " ; ".join(commands))
+
+    async def clear_text(self, device_id: str | None = None) -> None:
+        """Clear text in the focused input field (select all, then delete)."""
+        await self.channels.shell(
+            device_id,
+            "uitest uiInput keyEvent 2072 2017 ; uitest uiInput keyEvent 2055",
+        )
+
+    async def detect_and_set_adb_keyboard(self, device_id: str | None = None) -> str:
+        """Return the current IME; HarmonyOS has no ADB Keyboard to switch to."""
+        try:
+            result = await self.channels.shell(
+                device_id, ["settings", "get", "secure", "default_input_method"]
+            )
+            return result.text.strip()
+        except Exception:
+            return ""
+
+    async def restore_keyboard(self, ime: str, device_id: str | None = None) -> None:
+        """Restore the original keyboard IME."""
+        if not ime:
+            return
+        try:
+            await self.channels.shell(device_id, ["ime", "set", ime])
+        except Exception:
+            pass
+
+    async def list_devices(self) -> list[DeviceInfo]:
+        """List connected devices."""
+        try:
+            result = await run_command([self.hdc_path, "list", "targets"], timeout=5)
+        except Exception as e:
+            print(f"Error listing devices: {e}")
+            return []
+        return _parse_devices(result.text)
+
+    async def close(self) -> None:
+        """Stop the device shells."""
+        await self.channels.close()
+
+    async def _ui_input(self, device_id: str | None, *args) -> None:
+        await self.channels.shell(device_id, ["uitest", "uiInput", *map(str, args)])
@@ -177,33 +177,7 @@ class HDCConnection:
                 timeout=5,
             )
 
-            devices = []
-            for line in result.stdout.strip().split("\n"):
-                if not line.strip():
-                    continue
-
-                # HDC output format: device_id (status)
-                # Example: "192.168.1.100:5555" or "FMR0223C13000649"
-                device_id = line.strip()
-
-                # Determine connection type
-                if ":" in device_id:
-                    conn_type = ConnectionType.REMOTE
-                else:
-                    conn_type = ConnectionType.USB
-
-                # HDC doesn't provide detailed status in list command
-                # We assume "Connected" status for devices that appear
-                devices.append(
-                    DeviceInfo(
-                        device_id=device_id,
-                        status="device",
-                        connection_type=conn_type,
-                        model=None,
-                    )
-                )
-
-            return devices
+            return _parse_devices(result.stdout)
 
         except Exception as e:
             print(f"Error listing devices: {e}")
@@ -370,6 +344,37 @@ def quick_connect(address: str) -> tuple[bool, str]:
     return conn.connect(address)
 
 
+def _parse_devices(output: str) -> list[DeviceInfo]:
+    """Parse `hdc list targets` output."""
+    devices = []
+    for line in output.strip().split("\n"):
+        if not line.strip():
+            continue
+
+        # HDC output format: device_id (status)
+        # Example: "192.168.1.100:5555" or "FMR0223C13000649"
+        device_id = line.strip()
+
+        # Determine connection type
+        if ":" in device_id:
+            conn_type = ConnectionType.REMOTE
+        else:
+            conn_type = ConnectionType.USB
+
+        # HDC doesn't provide detailed status in list command
+        # We assume "Connected" status for devices that appear
+        devices.append(
+            DeviceInfo(
+                device_id=device_id,
+                status="device",
+                connection_type=conn_type,
+                model=None,
+            )
+        )
+
+    return devices
+
+
 def list_devices() -> list[DeviceInfo]:
     """
     Quick helper to list connected devices.
@@ -32,14 +32,7 @@ def get_current_app(device_id: str | None = None) -> str:
     if not output:
         raise ValueError("No output from hidumper")
 
-    # Parse window focus info
-    for line in output.split("\n"):
-        if "focused" in line.lower() or "current" in line.lower():
-            for app_name, package in APP_PACKAGES.items():
-                if package in line:
-                    return app_name
-
-    return "System Home"
+    return _parse_current_app(output)
 
 
 def tap(
@@ -150,10 +143,7 @@ def swipe(
     hdc_prefix = _get_hdc_prefix(device_id)
 
     if duration_ms is None:
-        # Calculate duration based on distance
-        dist_sq = (start_x - end_x) ** 2 + (start_y - end_y) ** 2
-        duration_ms = int(dist_sq / 1000)
-        duration_ms = max(500, min(duration_ms, 1000))  # Clamp between 500-1000ms
+        duration_ms = _swipe_duration(start_x, start_y, end_x, end_y)
 
     # HarmonyOS uses uitest uiInput swipe
     # Format: swipe startX startY endX endY duration
@@ -240,31 +230,42 @@ def launch_app(
         return False
 
     hdc_prefix = _get_hdc_prefix(device_id)
-    bundle = APP_PACKAGES[app_name]
-
-    # Get the ability name for this bundle
-    # Default to "EntryAbility" if not specified in APP_ABILITIES
-    ability = APP_ABILITIES.get(bundle, "EntryAbility")
 
     # HarmonyOS uses 'aa start' command to launch apps
     # Format: aa start -b {bundle} -a {ability}
     _run_hdc_command(
-        hdc_prefix
-        + [
-            "shell",
-            "aa",
-            "start",
-            "-b",
-            bundle,
-            "-a",
-            ability,
-        ],
+        hdc_prefix + ["shell", *_launch_args(app_name)],
         capture_output=True,
     )
     time.sleep(delay)
     return True
 
 
+def _parse_current_app(output: str) -> str:
+    """Find the focused app in `hidumper -s WindowManagerService` output."""
+    for line in output.split("\n"):
+        if "focused" in line.lower() or "current" in line.lower():
+            for app_name, package in APP_PACKAGES.items():
+                if package in line:
+                    return app_name
+
+    return "System Home"
+
+
+def _swipe_duration(start_x: int, start_y: int, end_x: int, end_y: int) -> int:
+    """Swipe duration in ms derived from the distance."""
+    dist_sq = (start_x - end_x) ** 2 + (start_y - end_y) ** 2
+    return max(500, min(int(dist_sq / 1000), 1000))  # Clamp between 500-1000ms
+
+
+def _launch_args(app_name: str) -> list[str]:
+    """Shell arguments that start a known app's ability."""
+    bundle = APP_PACKAGES[app_name]
+    # Default to "EntryAbility" if not specified in APP_ABILITIES
+    ability = APP_ABILITIES.get(bundle, "EntryAbility")
+    return ["aa", "start", "-b", bundle, "-a", ability]
+
+
 def _get_hdc_prefix(device_id: str | None) -> list:
     """Get HDC command prefix with optional device specifier."""
     if device_id:
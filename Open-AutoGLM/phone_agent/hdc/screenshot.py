@@ -80,27 +80,31 @@ def get_screenshot(device_id: str | None = None, timeout: int = 10) -> Screensho
         if not os.path.exists(temp_path):
             return _create_fallback_screenshot(is_sensitive=False)
 
-        # Read JPEG image and convert to PNG for model inference
-        # PIL automatically detects the image format from file content
-        img = Image.open(temp_path)
-        width, height = img.size
-
-        buffered = BytesIO()
-        img.save(buffered, format="PNG")
-        base64_data = base64.b64encode(buffered.getvalue()).decode("utf-8")
-
-        # Cleanup
-        os.remove(temp_path)
-
-        return Screenshot(
-            base64_data=base64_data, width=width, height=height, is_sensitive=False
-        )
+        return _screenshot_from_file(temp_path)
 
     except Exception as e:
         print(f"Screenshot error: {e}")
         return _create_fallback_screenshot(is_sensitive=False)
 
 
+def _screenshot_from_file(path: str) -> Screenshot:
+    """Convert a received JPEG screenshot to PNG and delete the file."""
+    # PIL automatically detects the image format from file content
+    img = Image.open(path)
+    width, height = img.size
+
+    buffered = BytesIO()
+    img.save(buffered, format="PNG")
+    base64_data = base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+    # Cleanup
+    os.remove(path)
+
+    return Screenshot(
+        base64_data=base64_data, width=width, height=height, is_sensitive=False
+    )
+
+
 def _get_hdc_prefix(device_id: str | None) -> list:
     """Get HDC command prefix with optional device specifier."""
     if device_id:
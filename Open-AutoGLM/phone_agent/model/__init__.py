@@ -1,5 +1,18 @@
 """Model client module for AI inference."""
 
-from phone_agent.model.client import ModelClient, ModelConfig
+from phone_agent.model.cache import ResponseCache, ResponseCacheConfig
+from phone_agent.model.client import ModelClient, ModelConfig, RequestAborted
+from phone_agent.model.gateway import BatchingGateway, GatewayConfig
+from phone_agent.model.router import EndpointRouter, RouterConfig
 
-__all__ = ["ModelClient", "ModelConfig"]
+__all__ = [
+    "BatchingGateway",
+    "EndpointRouter",
+    "GatewayConfig",
+    "ModelClient",
+    "ModelConfig",
+    "RequestAborted",
+    "ResponseCache",
+    "ResponseCacheConfig",
+    "RouterConfig",
+]
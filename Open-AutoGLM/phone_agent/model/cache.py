@@ -0,0 +1,236 @@
+"""Content-addressed cache for deterministic model responses."""
+
+import dataclasses
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from phone_agent.model.client import ModelConfig, ModelResponse
+
+
+@dataclass
+class ResponseCacheConfig:
+    """Configuration for the model response cache."""
+
+    max_entries: int = int(os.getenv("PHONE_AGENT_RESPONSE_CACHE_ENTRIES", "256"))
+    # Seconds a response stays valid
+    ttl: float = float(os.getenv("PHONE_AGENT_RESPONSE_CACHE_TTL", "600"))
+    # Optional SQLite file that keeps responses across restarts
+    path: str | None = os.getenv("PHONE_AGENT_RESPONSE_CACHE_PATH") or None
+    # Max seconds a request waits for an identical in-flight request before
+    # calling the model itself
+    inflight_timeout: float = 600.0
+
+
+def _hash_image_url(url: str) -> str:
+    # Data URLs carry the whole screenshot; hash it instead of keying on it
+    if url.startswith("data:"):
+        return "sha1:" + hashlib.sha1(url.encode("ascii", "ignore")).hexdigest()
+    return url
+
+
+def _canonical_content(content: Any) -> Any:
+    if not isinstance(content, list):
+        return content
+    parts = []
+    for part in content:
+        if part.get("type") == "image_url":
+            image_url = part.get("image_url") or {}
+            part = {
+                **part,
+                "image_url": {
+                    **image_url,
+                    "url": _hash_image_url(image_url.get("url", "")),
+                },
+            }
+        parts.append(part)
+    return parts
+
+
+def request_key(messages: list[dict[str, Any]], config: "ModelConfig") -> str:
+    """
+    Hash a request into a cache key.
+
+    Covers the messages (with image payloads replaced by their hashes) and
+    every sampling parameter that can change the answer.
+    """
+    payload = {
+        "model": config.model_name,
+        "base_url": config.base_url,
+        "max_tokens": config.max_tokens,
+        "temperature": config.temperature,
+        "top_p": config.top_p,
+        "frequency_penalty": config.frequency_penalty,
+        "extra_body": config.extra_body,
+        "messages": [
+            {**message, "content": _canonical_content(message.get("content"))}
+            for message in messages
+        ],
+    }
+    data = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of model responses, shared by any number of ModelClients.
+
+    Only requests with temperature 0 are cached. Concurrent identical
+    requests are deduplicated: the first one calls the model and the others
+    wait for its response. With ``path`` set, responses are also written to
+    SQLite and survive restarts.
+
+    Example:
+        >>> cache = ResponseCache()
+        >>> client = ModelClient(config, cache=cache)
+        >>> cache.stats()["hit_rate"]
+    """
+
+    def __init__(self, config: ResponseCacheConfig | None = None):
+        self.config = config or ResponseCacheConfig()
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._inflight: dict[str, threading.Event] = {}
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "deduplicated": 0,
+            "disk_hits": 0,
+            "stores": 0,
+            "evictions": 0,
+            "inflight_timeouts": 0,
+        }
+        self._db: sqlite3.Connection | None = None
+        if self.config.path:
+            directory = os.path.dirname(self.config.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.config.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, "
+                "created_at REAL NOT NULL, payload TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    def begin(self, key: str) -> "ModelResponse | None":
+        """
+        Look up a response, waiting for an identical request already in flight.
+
+        A caller that has waited ``inflight_timeout`` seconds for the same
+        in-flight request stops waiting and calls the model itself.
+
+        Returns:
+            The cached response, or None if the caller should call the model.
+            A None result must be followed by complete() with the same key.
+        """
+        from phone_agent.model.client import ModelResponse
+
+        waited = False
+        leader: threading.Event | None = None
+        deadline = 0.0
+        while True:
+            with self._lock:
+                payload = self._get(key)
+                if payload is not None:
+                    self._counters["deduplicated" if waited else "hits"] += 1
+                    return ModelResponse(**payload)
+                event = self._inflight.get(key)
+                if (
+                    leader is not None
+                    and event is leader
+                    and time.monotonic() >= deadline
+                ):
+                    # The leader is stuck; take over and wake the other
+                    # waiters so they wait for this caller instead
+                    self._counters["inflight_timeouts"] += 1
+                    event.set()
+                    event = None
+                if event is None:
+                    self._inflight[key] = threading.Event()
+                    self._counters["misses"] += 1
+                    return None
+                if event is not leader:
+                    # A new leader (the first, or one that took over)
+                    leader = event
+                    deadline = time.monotonic() + self.config.inflight_timeout
+            # If the leader fails, the next loop makes this caller the leader
+            event.wait(max(deadline - time.monotonic(), 0))
+            waited = True
+
+    def complete(self, key: str, response: "ModelResponse | None") -> None:
+        """Store a response (None if the request failed) and wake up waiters."""
+        with self._lock:
+            if response is not None:
+                payload = dataclasses.asdict(response)
+                payload["cached"] = True
+                now = time.time()
+                self._remember(key, now, payload)
+                self._counters["stores"] += 1
+                if self._db is not None:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO responses (key, created_at, payload) "
+                        "VALUES (?, ?, ?)",
+                        (key, now, json.dumps(payload, ensure_ascii=False)),
+                    )
+                    self._db.execute(
+                        "DELETE FROM responses WHERE created_at < ?",
+                        (now - self.config.ttl,),
+                    )
+                    self._db.commit()
+            event = self._inflight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters and the hit rate."""
+        with self._lock:
+            counters = dict(self._counters)
+            counters["entries"] = len(self._entries)
+            counters["inflight"] = len(self._inflight)
+        served = counters["hits"] + counters["deduplicated"]
+        total = served + counters["misses"]
+        counters["hit_rate"] = round(served / total, 3) if total else 0.0
+        return counters
+
+    def clear(self) -> None:
+        """Drop every cached response."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def _get(self, key: str) -> dict[str, Any] | None:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if now - entry[0] <= self.config.ttl:
+                self._entries.move_to_end(key)
+                return entry[1]
+            del self._entries[key]
+            self._counters["evictions"] += 1
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT created_at, payload FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or now - row[0] > self.config.ttl:
+            return None
+        payload = json.loads(row[1])
+        self._remember(key, row[0], payload)
+        self._counters["disk_hits"] += 1
+        return payload
+
+    def _remember(self, key: str, created_at: float, payload: dict[str, Any]) -> None:
+        self._entries[key] = (created_at, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.config.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
@@ -1,13 +1,22 @@
 """Model client for AI inference using OpenAI-compatible API."""
 
+import functools
+import importlib.util
 import json
+import os
+import threading
 import time
 from dataclasses import dataclass, field
-from typing import Any
+from typing import Any, Callable
 
+import httpx
 from openai import OpenAI
 
+from phone_agent.actions.parser import ActionParseError, parse_action_call
 from phone_agent.config.i18n import get_message
+from phone_agent.model.cache import ResponseCache, request_key
+from phone_agent.model.gateway import BatchingGateway, GatewayTicket
+from phone_agent.model.router import EndpointRouter
 
 
 @dataclass
@@ -23,6 +32,22 @@ class ModelConfig:
     frequency_penalty: float = 0.2
     extra_body: dict[str, Any] = field(default_factory=dict)
     lang: str = "cn"  # Language for UI messages: 'cn' or 'en'
+    # Stop reading (and close) the stream once the action call is complete
+    stop_at_action_close: bool = True
+    # Ask for usage on every stream chunk (vLLM/SGLang continuous_usage_stats)
+    # so token counts survive an early stop; other servers may reject it
+    continuous_usage_stats: bool = False
+    # Replicas serving the same model; a comma-separated base_url fills this
+    base_urls: list[str] = field(default_factory=list)
+
+    def __post_init__(self):
+        if "," in self.base_url:
+            self.base_urls = [u.strip() for u in self.base_url.split(",") if u.strip()]
+            self.base_url = self.base_urls[0]
+
+
+class RequestAborted(RuntimeError):
+    """Raised by ModelClient.request() when abort() interrupted it."""
 
 
 @dataclass
@@ -36,6 +61,144 @@ class ModelResponse:
     time_to_first_token: float | None = None  # Time to first token (seconds)
     time_to_thinking_end: float | None = None  # Time to thinking end (seconds)
     total_time: float | None = None  # Total inference time (seconds)
+    # Token usage, when the server reports it in the stream. After an early
+    # stop these come from the last chunk that carried usage, so they are
+    # None unless the server sends continuous usage stats
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    # Prompt tokens served from the server's prefix cache, when reported
+    cached_prompt_tokens: int | None = None
+    # True if the stream was cancelled right after the action call closed
+    stopped_early: bool = False
+    # True if served from a ResponseCache instead of the model
+    cached: bool = False
+
+
+ACTION_MARKERS = ("finish(message=", "do(action=")
+
+_shared_http_client: httpx.Client | None = None
+_shared_http_lock = threading.Lock()
+
+
+def get_shared_http_client() -> httpx.Client:
+    """
+    Return the process-wide HTTP client used by every ModelClient.
+
+    Sharing one size-limited pool lets agents running in different threads
+    reuse keep-alive connections to the model server. HTTP/2 is used when
+    the optional h2 package is installed.
+    """
+    global _shared_http_client
+    with _shared_http_lock:
+        if _shared_http_client is None:
+            _shared_http_client = httpx.Client(
+                http2=importlib.util.find_spec("h2") is not None,
+                limits=httpx.Limits(
+                    max_connections=int(
+                        os.getenv("PHONE_AGENT_POOL_MAX_CONNECTIONS", "64")
+                    ),
+                    max_keepalive_connections=int(
+                        os.getenv("PHONE_AGENT_POOL_MAX_KEEPALIVE", "32")
+                    ),
+                    keepalive_expiry=30.0,
+                ),
+                timeout=600.0,
+            )
+        return _shared_http_client
+
+
+class ThinkingStream:
+    """
+    Incrementally separates streamed thinking text from the action call.
+
+    Text is held back while the tail of the buffer could still be the start of
+    an action marker, so callers never emit a partial marker as thinking.
+    After the marker, the action call is tracked (string literals and bracket
+    depth) until its closing parenthesis arrives.
+    """
+
+    def __init__(self):
+        self.buffer = ""  # Content that might be part of a marker
+        self.in_action_phase = False
+        self.action = ""  # Action call text received so far
+        self.action_closed = False
+        self._depth = 0
+        self._quote = ""
+        self._escaped = False
+
+    def feed(self, content: str) -> tuple[str, bool]:
+        """
+        Add a streamed chunk.
+
+        Args:
+            content: Newly received text.
+
+        Returns:
+            Tuple of (thinking text that is safe to emit now, whether the
+            action marker was reached with this chunk).
+        """
+        if self.in_action_phase:
+            self._track_action(content)
+            return "", False
+
+        self.buffer += content
+
+        # Check if any marker is fully present in buffer
+        for marker in ACTION_MARKERS:
+            if marker in self.buffer:
+                self.in_action_phase = True
+                thinking, rest = self.buffer.split(marker, 1)
+                self._track_action(marker + rest)
+                return thinking, True
+
+        # Check if buffer ends with a prefix of any marker
+        # If so, don't emit yet (wait for more content)
+        for marker in ACTION_MARKERS:
+            for i in range(1, len(marker)):
+                if self.buffer.endswith(marker[:i]):
+                    return "", False
+
+        text, self.buffer = self.buffer, ""
+        return text, False
+
+    def _track_action(self, text: str) -> None:
+        if self.action_closed:
+            return
+        for i, char in enumerate(text):
+            if self._quote:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == self._quote:
+                    self._quote = ""
+            elif char in "\"'":
+                self._quote = char
+            elif char in "([{":
+                self._depth += 1
+            elif char in ")]}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.action += text[: i + 1]
+                    self.action_closed = True
+                    return
+        self.action += text
+
+
+def is_complete_call(text: str) -> bool:
+    """
+    Check that a closed action call parses cleanly.
+
+    Free-text arguments (Type, finish) may contain unescaped quotes that make
+    an early closing parenthesis look like the end of the call; such
+    candidates need error recovery to parse, and the caller keeps reading
+    the stream.
+    """
+    try:
+        _, warnings = parse_action_call(text)
+    except ActionParseError:
+        return False
+    return not warnings
 
 
 class ModelClient:
@@ -44,18 +207,51 @@ class ModelClient:
 
     Args:
         config: Model configuration.
+        gateway: Optional batching gateway that schedules this client's
+            requests together with those of other clients.
+        cache: Optional response cache. Used only when temperature is 0,
+            where identical requests yield identical answers.
+        router: Optional endpoint router. Created automatically when
+            config.base_urls lists more than one replica; pass one in to
+            share latency statistics between clients.
     """
 
-    def __init__(self, config: ModelConfig | None = None):
+    def __init__(
+        self,
+        config: ModelConfig | None = None,
+        gateway: BatchingGateway | None = None,
+        cache: ResponseCache | None = None,
+        router: EndpointRouter | None = None,
+    ):
         self.config = config or ModelConfig()
-        self.client = OpenAI(base_url=self.config.base_url, api_key=self.config.api_key)
-
-    def request(self, messages: list[dict[str, Any]]) -> ModelResponse:
+        self.gateway = gateway
+        self.cache = cache
+        if router is None and len(self.config.base_urls) > 1:
+            router = EndpointRouter(self.config.base_urls, api_key=self.config.api_key)
+        self.router = router
+        self.client = self._client_for(self.config.base_url)
+        self._clients: dict[str, OpenAI] = {}
+        # Open streams by requesting thread, so abort() can close them
+        self._streams: dict[int, Any] = {}
+        # Requesting threads, and whether abort() interrupted their request
+        self._aborted: dict[int, bool] = {}
+        self._streams_lock = threading.Lock()
+
+    def request(
+        self,
+        messages: list[dict[str, Any]],
+        on_first_token: Callable[[float], None] | None = None,
+        on_thinking: Callable[[str], None] | None = None,
+        echo: bool = True,
+    ) -> ModelResponse:
         """
         Send a request to the model.
 
         Args:
             messages: List of message dictionaries in OpenAI format.
+            on_first_token: Called with the time to first token (seconds).
+            on_thinking: Called with each chunk of thinking text as it streams.
+            echo: Whether to print the thinking stream and metrics to stdout.
 
         Returns:
             ModelResponse containing thinking and action.
@@ -63,12 +259,181 @@ class ModelClient:
         Raises:
             ValueError: If the response cannot be parsed.
         """
+        if self.cache is None or self.config.temperature != 0:
+            return self._dispatch(messages, on_first_token, on_thinking, echo)
+
+        key = request_key(messages, self.config)
+        cached = self.cache.begin(key)
+        if cached is not None:
+            if on_first_token is not None:
+                on_first_token(0.0)
+            if echo and cached.thinking:
+                print(cached.thinking, flush=True)
+            if on_thinking is not None and cached.thinking:
+                on_thinking(cached.thinking)
+            return cached
+
+        response = None
+        try:
+            response = self._dispatch(messages, on_first_token, on_thinking, echo)
+            return response
+        finally:
+            self.cache.complete(key, response)
+
+    def abort(self) -> None:
+        """
+        Close every stream this client is currently reading.
+
+        Safe to call from any thread. The interrupted request() raises
+        RequestAborted without retrying on another replica, and closing the
+        connection stops the generation on the server. A request still
+        waiting for a gateway slot or an endpoint is aborted before it is
+        sent.
+        """
+        with self._streams_lock:
+            for ident in self._aborted:
+                self._aborted[ident] = True
+            streams = list(self._streams.values())
+        for stream in streams:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def _dispatch(
+        self,
+        messages: list[dict[str, Any]],
+        on_first_token: Callable[[float], None] | None,
+        on_thinking: Callable[[str], None] | None,
+        echo: bool,
+    ) -> ModelResponse:
+        ident = threading.get_ident()
+        with self._streams_lock:
+            self._aborted[ident] = False
+        try:
+            if self.router is None:
+                return self._send(
+                    self.client, messages, on_first_token, on_thinking, echo
+                )
+            return self._dispatch_routed(messages, on_first_token, on_thinking, echo)
+        except RequestAborted:
+            raise
+        except Exception as e:
+            # A closed stream surfaces as a connection error
+            if self._is_aborted():
+                raise RequestAborted("Model request aborted") from e
+            raise
+        finally:
+            with self._streams_lock:
+                self._aborted.pop(ident, None)
+
+    def _dispatch_routed(
+        self,
+        messages: list[dict[str, Any]],
+        on_first_token: Callable[[float], None] | None,
+        on_thinking: Callable[[str], None] | None,
+        echo: bool,
+    ) -> ModelResponse:
+        tried: list[str] = []
+        while True:
+            self._check_aborted()
+            endpoint = self.router.acquire(exclude=tried)
+            if endpoint is None:
+                raise RuntimeError(f"No model endpoint left to try: {tried}")
+            tried.append(endpoint.url)
+            streamed = False
+
+            def first_token(ttft: float) -> None:
+                nonlocal streamed
+                streamed = True
+                if on_first_token is not None:
+                    on_first_token(ttft)
+
+            try:
+                response = self._send(
+                    self._routed_client(endpoint.url),
+                    messages,
+                    first_token,
+                    on_thinking,
+                    echo,
+                )
+            except Exception as e:
+                if self._is_aborted():
+                    # Cancelled by the caller; says nothing about the replica
+                    self.router.release(endpoint, cancelled=True)
+                    raise RequestAborted("Model request aborted") from e
+                self.router.release(endpoint, error=e)
+                # Output already reached the caller; a retry would repeat it
+                if streamed or len(tried) >= self.router.config.max_attempts:
+                    raise
+                continue
+            self.router.release(endpoint, ttft=response.time_to_first_token)
+            return response
+
+    def _send(
+        self,
+        client: OpenAI,
+        messages: list[dict[str, Any]],
+        on_first_token: Callable[[float], None] | None,
+        on_thinking: Callable[[str], None] | None,
+        echo: bool,
+    ) -> ModelResponse:
+        try:
+            self._check_aborted()
+            if self.gateway is None:
+                return self._request(
+                    client, messages, on_first_token, on_thinking, echo, None
+                )
+            with self.gateway.slot(
+                messages, self.config.model_name, cancelled=self._is_aborted
+            ) as ticket:
+                # abort() may have come while the request was queued
+                self._check_aborted()
+                return self._request(
+                    client, messages, on_first_token, on_thinking, echo, ticket
+                )
+        finally:
+            with self._streams_lock:
+                self._streams.pop(threading.get_ident(), None)
+
+    def _is_aborted(self) -> bool:
+        with self._streams_lock:
+            return self._aborted.get(threading.get_ident(), False)
+
+    def _check_aborted(self) -> None:
+        if self._is_aborted():
+            raise RequestAborted("Model request aborted")
+
+    def _client_for(self, base_url: str) -> OpenAI:
+        return OpenAI(
+            base_url=base_url,
+            api_key=self.config.api_key,
+            http_client=get_shared_http_client(),
+        )
+
+    def _routed_client(self, base_url: str) -> OpenAI:
+        client = self._clients.get(base_url)
+        if client is None:
+            # The router retries on another replica instead
+            client = self._client_for(base_url).with_options(max_retries=0)
+            self._clients[base_url] = client
+        return client
+
+    def _request(
+        self,
+        client: OpenAI,
+        messages: list[dict[str, Any]],
+        on_first_token: Callable[[float], None] | None,
+        on_thinking: Callable[[str], None] | None,
+        echo: bool,
+        ticket: GatewayTicket | None,
+    ) -> ModelResponse:
         # Start timing
         start_time = time.time()
         time_to_first_token = None
         time_to_thinking_end = None
 
-        stream = self.client.chat.completions.create(
+        stream = client.chat.completions.create(
             messages=messages,
             model=self.config.model_name,
             max_tokens=self.config.max_tokens,
@@ -77,15 +442,32 @@ class ModelClient:
             frequency_penalty=self.config.frequency_penalty,
             extra_body=self.config.extra_body,
             stream=True,
+            stream_options=_stream_options(self.config),
         )
+        with self._streams_lock:
+            self._streams[threading.get_ident()] = stream
+            aborted = self._aborted.get(threading.get_ident(), False)
+        if aborted:
+            # abort() came while the request was waiting for response headers
+            stream.close()
+            raise RequestAborted("Model request aborted")
 
         raw_content = ""
-        buffer = ""  # Buffer to hold content that might be part of a marker
-        action_markers = ["finish(message=", "do(action="]
-        in_action_phase = False  # Track if we've entered the action phase
+        splitter = ThinkingStream()
         first_token_received = False
+        early_stop = self.config.stop_at_action_close
+        stopped_early = False
 
+        def emit_thinking(text: str) -> None:
+            if echo:
+                print(text, end="", flush=True)
+            if on_thinking is not None and text:
+                on_thinking(text)
+
+        usage = None
         for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
             if len(chunk.choices) == 0:
                 continue
             if chunk.choices[0].delta.content is not None:
@@ -96,73 +478,61 @@ class ModelClient:
                 if not first_token_received:
                     time_to_first_token = time.time() - start_time
                     first_token_received = True
-
-                if in_action_phase:
-                    # Already in action phase, just accumulate content without printing
-                    continue
-
-                buffer += content
-
-                # Check if any marker is fully present in buffer
-                marker_found = False
-                for marker in action_markers:
-                    if marker in buffer:
-                        # Marker found, print everything before it
-                        thinking_part = buffer.split(marker, 1)[0]
-                        print(thinking_part, end="", flush=True)
-                        print()  # Print newline after thinking is complete
-                        in_action_phase = True
-                        marker_found = True
-
+                    if ticket is not None:
+                        ticket.mark_prefilled()
+                    if on_first_token is not None:
+                        on_first_token(time_to_first_token)
+
+                if splitter.in_action_phase:
+                    # Already in action phase, just track the action call
+                    splitter.feed(content)
+                else:
+                    thinking_part, marker_found = splitter.feed(content)
+                    emit_thinking(thinking_part)
+                    if marker_found:
+                        if echo:
+                            print()  # Print newline after thinking is complete
                         # Record time to thinking end
-                        if time_to_thinking_end is None:
-                            time_to_thinking_end = time.time() - start_time
-
-                        break
+                        time_to_thinking_end = time.time() - start_time
 
-                if marker_found:
-                    continue  # Continue to collect remaining content
-
-                # Check if buffer ends with a prefix of any marker
-                # If so, don't print yet (wait for more content)
-                is_potential_marker = False
-                for marker in action_markers:
-                    for i in range(1, len(marker)):
-                        if buffer.endswith(marker[:i]):
-                            is_potential_marker = True
-                            break
-                    if is_potential_marker:
+                if early_stop and splitter.action_closed:
+                    early_stop = False  # Only check the first close
+                    if is_complete_call(splitter.action):
+                        stopped_early = True
                         break
 
-                if not is_potential_marker:
-                    # Safe to print the buffer
-                    print(buffer, end="", flush=True)
-                    buffer = ""
+        if stopped_early:
+            # Abort the generation tail on the server
+            stream.close()
+            raw_content = raw_content[
+                : raw_content.find(splitter.action) + len(splitter.action)
+            ]
 
         # Calculate total time
         total_time = time.time() - start_time
 
         # Parse thinking and action from response
-        thinking, action = self._parse_response(raw_content)
+        thinking, action = parse_response(raw_content)
 
         # Print performance metrics
-        lang = self.config.lang
-        print()
-        print("=" * 50)
-        print(f"⏱️  {get_message('performance_metrics', lang)}:")
-        print("-" * 50)
-        if time_to_first_token is not None:
+        if echo:
+            lang = self.config.lang
+            print()
+            print("=" * 50)
+            print(f"⏱️  {get_message('performance_metrics', lang)}:")
+            print("-" * 50)
+            if time_to_first_token is not None:
+                print(
+                    f"{get_message('time_to_first_token', lang)}: {time_to_first_token:.3f}s"
+                )
+            if time_to_thinking_end is not None:
+                print(
+                    f"{get_message('time_to_thinking_end', lang)}:        {time_to_thinking_end:.3f}s"
+                )
             print(
-                f"{get_message('time_to_first_token', lang)}: {time_to_first_token:.3f}s"
+                f"{get_message('total_inference_time', lang)}:          {total_time:.3f}s"
             )
-        if time_to_thinking_end is not None:
-            print(
-                f"{get_message('time_to_thinking_end', lang)}:        {time_to_thinking_end:.3f}s"
-            )
-        print(
-            f"{get_message('total_inference_time', lang)}:          {total_time:.3f}s"
-        )
-        print("=" * 50)
+            print("=" * 50)
 
         return ModelResponse(
             thinking=thinking,
@@ -171,49 +541,58 @@ class ModelClient:
             time_to_first_token=time_to_first_token,
             time_to_thinking_end=time_to_thinking_end,
             total_time=total_time,
+            prompt_tokens=usage.prompt_tokens if usage else None,
+            completion_tokens=usage.completion_tokens if usage else None,
+            cached_prompt_tokens=_cached_tokens(usage),
+            stopped_early=stopped_early,
         )
 
     def _parse_response(self, content: str) -> tuple[str, str]:
-        """
-        Parse the model response into thinking and action parts.
+        """Parse the model response into thinking and action parts."""
+        return parse_response(content)
 
-        Parsing rules:
-        1. If content contains 'finish(message=', everything before is thinking,
-           everything from 'finish(message=' onwards is action.
-        2. If rule 1 doesn't apply but content contains 'do(action=',
-           everything before is thinking, everything from 'do(action=' onwards is action.
-        3. Fallback: If content contains '<answer>', use legacy parsing with XML tags.
-        4. Otherwise, return empty thinking and full content as action.
 
-        Args:
-            content: Raw response content.
+def parse_response(content: str) -> tuple[str, str]:
+    """
+    Parse the model response into thinking and action parts.
 
-        Returns:
-            Tuple of (thinking, action).
-        """
-        # Rule 1: Check for finish(message=
-        if "finish(message=" in content:
-            parts = content.split("finish(message=", 1)
-            thinking = parts[0].strip()
-            action = "finish(message=" + parts[1]
-            return thinking, action
-
-        # Rule 2: Check for do(action=
-        if "do(action=" in content:
-            parts = content.split("do(action=", 1)
-            thinking = parts[0].strip()
-            action = "do(action=" + parts[1]
-            return thinking, action
-
-        # Rule 3: Fallback to legacy XML tag parsing
-        if "<answer>" in content:
-            parts = content.split("<answer>", 1)
-            thinking = parts[0].replace("<think>", "").replace("</think>", "").strip()
-            action = parts[1].replace("</answer>", "").strip()
-            return thinking, action
-
-        # Rule 4: No markers found, return content as action
-        return "", content
+    Parsing rules:
+    1. If content contains 'finish(message=', everything before is thinking,
+       everything from 'finish(message=' onwards is action.
+    2. If rule 1 doesn't apply but content contains 'do(action=',
+       everything before is thinking, everything from 'do(action=' onwards is action.
+    3. Fallback: If content contains '<answer>', use legacy parsing with XML tags.
+    4. Otherwise, return empty thinking and full content as action.
+
+    Args:
+        content: Raw response content.
+
+    Returns:
+        Tuple of (thinking, action).
+    """
+    # Rule 1: Check for finish(message=
+    if "finish(message=" in content:
+        parts = content.split("finish(message=", 1)
+        thinking = parts[0].strip()
+        action = "finish(message=" + parts[1]
+        return thinking, action
+
+    # Rule 2: Check for do(action=
+    if "do(action=" in content:
+        parts = content.split("do(action=", 1)
+        thinking = parts[0].strip()
+        action = "do(action=" + parts[1]
+        return thinking, action
+
+    # Rule 3: Fallback to legacy XML tag parsing
+    if "<answer>" in content:
+        parts = content.split("<answer>", 1)
+        thinking = parts[0].replace("<think>", "").replace("</think>", "").strip()
+        action = parts[1].replace("</answer>", "").strip()
+        return thinking, action
+
+    # Rule 4: No markers found, return content as action
+    return "", content
 
 
 class MessageBuilder:
@@ -286,5 +665,27 @@ class MessageBuilder:
         Returns:
             JSON string with screen info.
         """
+        if not extra_info:
+            return _screen_info(current_app)
         info = {"current_app": current_app, **extra_info}
         return json.dumps(info, ensure_ascii=False)
+
+
+@functools.lru_cache(maxsize=512)
+def _screen_info(current_app: str) -> str:
+    return json.dumps({"current_app": current_app}, ensure_ascii=False)
+
+
+def _stream_options(config: ModelConfig) -> dict[str, Any]:
+    """Stream options requesting token usage (final chunk, or every chunk)."""
+    options: dict[str, Any] = {"include_usage": True}
+    if config.stop_at_action_close and config.continuous_usage_stats:
+        # The final usage chunk never arrives when the stream is cut short
+        options["continuous_usage_stats"] = True
+    return options
+
+
+def _cached_tokens(usage: Any) -> int | None:
+    """Cached prompt tokens from an OpenAI-style usage object (vLLM, SGLang)."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None)
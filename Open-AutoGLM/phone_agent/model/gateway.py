@@ -0,0 +1,316 @@
+"""Request batching gateway that sits between ModelClients and the model server."""
+
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+# How often a queued request checks whether its caller gave up (s)
+_CANCEL_POLL_INTERVAL = 0.1
+
+
+@dataclass
+class GatewayConfig:
+    """Configuration for the batching gateway."""
+
+    # How long to hold the first request of a batch waiting for others (ms)
+    window_ms: float = 15.0
+    # Dispatch a batch early once this many requests are queued
+    max_batch: int = 32
+    # Max requests in flight against the model server
+    max_inflight: int = 16
+    # Send one request per cold prefix first and hold its siblings until the
+    # leader's first token arrives, so they hit the server's prefix cache
+    warm_prefix: bool = True
+    # How long a prefix stays warm after its last request started decoding (s)
+    prefix_ttl: float = 300.0
+    # Upper bound on how long siblings wait for a leader's prefill (s)
+    leader_timeout: float = 30.0
+
+
+@dataclass
+class GatewayStats:
+    """Counters describing gateway behaviour."""
+
+    requests: int = 0
+    batches: int = 0
+    max_batch_size: int = 0
+    prefix_leaders: int = 0
+    prefix_followers: int = 0
+    queue_wait_total: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.requests / self.batches, 2)
+            if self.batches
+            else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "prefix_leaders": self.prefix_leaders,
+            "prefix_followers": self.prefix_followers,
+            "avg_queue_wait_ms": round(self.queue_wait_total / self.requests * 1000, 2)
+            if self.requests
+            else 0.0,
+        }
+
+
+@dataclass
+class GatewayTicket:
+    """
+    A request's slot in the gateway.
+
+    Obtained from BatchingGateway.slot(); the holder calls mark_prefilled()
+    when the first token arrives.
+    """
+
+    prefix_key: str
+    arrived: float = field(default_factory=time.monotonic)
+    dispatched_at: float | None = None
+    leader: bool = False
+    _event: threading.Event = field(default_factory=threading.Event, repr=False)
+    _gateway: "BatchingGateway | None" = field(default=None, repr=False)
+    _prefilled: bool = False
+
+    def mark_prefilled(self) -> None:
+        """Signal that the server has processed this request's prompt."""
+        if not self._prefilled and self._gateway is not None:
+            self._prefilled = True
+            self._gateway._on_prefilled(self)
+
+
+def prefix_key(messages: list[dict[str, Any]], model: str) -> str:
+    """
+    Identify the shared prompt prefix of a request.
+
+    Requests with the same model and the same leading system message share
+    a KV-cache prefix on servers with prefix caching (vLLM APC, SGLang radix).
+    """
+    head = messages[0] if messages and messages[0].get("role") == "system" else {}
+    if head.keys() == {"role", "content"} and isinstance(head["content"], str):
+        # The common case: the same prompt string every step
+        return _system_prefix_key(model, head["content"])
+    return _hash_head(model, head)
+
+
+@functools.lru_cache(maxsize=64)
+def _system_prefix_key(model: str, content: str) -> str:
+    return _hash_head(model, {"role": "system", "content": content})
+
+
+def _hash_head(model: str, head: dict[str, Any]) -> str:
+    payload = json.dumps([model, head], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class BatchingGateway:
+    """
+    Coalesces concurrent model requests into ordered batches.
+
+    Requests arriving within ``window_ms`` of each other are dispatched
+    together, grouped so requests sharing a prompt prefix are sent back to
+    back. The server's continuous batching scheduler then sees them in one
+    burst instead of a trickle. In-flight requests are capped at
+    ``max_inflight``.
+
+    The gateway only schedules requests; each ModelClient still performs
+    its own HTTP call once its ticket is dispatched.
+
+    Example:
+        >>> gateway = BatchingGateway()
+        >>> client = ModelClient(config, gateway=gateway)
+    """
+
+    def __init__(self, config: GatewayConfig | None = None):
+        self.config = config or GatewayConfig()
+        self.stats = GatewayStats()
+        self._cond = threading.Condition()
+        self._pending: list[GatewayTicket] = []
+        self._ready: deque[GatewayTicket] = deque()
+        self._inflight = 0
+        # prefix key -> monotonic time it became warm, or None while warming
+        self._prefixes: dict[str, float | None] = {}
+        self._warming_since: dict[str, float] = {}
+        self._stopped = False
+        self._thread = threading.Thread(
+            target=self._dispatch_loop, name="model-gateway", daemon=True
+        )
+        self._thread.start()
+
+    def slot(
+        self,
+        messages: list[dict[str, Any]],
+        model: str,
+        cancelled: Callable[[], bool] | None = None,
+    ) -> "_Slot":
+        """
+        Reserve a dispatch slot for one request.
+
+        Use as a context manager; entering blocks until the request may be
+        sent and leaving releases the in-flight slot. If ``cancelled`` is
+        given and returns True while the request is queued, the ticket is
+        withdrawn and entering returns it undispatched (dispatched_at None).
+        """
+        return _Slot(
+            self, GatewayTicket(prefix_key=prefix_key(messages, model)), cancelled
+        )
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return gateway counters and current queue depths."""
+        with self._cond:
+            data = self.stats.to_dict()
+            data.update(
+                pending=len(self._pending),
+                ready=len(self._ready),
+                inflight=self._inflight,
+                warm_prefixes=sum(1 for v in self._prefixes.values() if v is not None),
+            )
+            return data
+
+    def close(self) -> None:
+        """Stop the dispatcher and release every waiting request."""
+        with self._cond:
+            self._stopped = True
+            for ticket in [*self._pending, *self._ready]:
+                ticket._event.set()
+            self._pending.clear()
+            self._ready.clear()
+            self._cond.notify_all()
+        self._thread.join(timeout=1)
+
+    def _enqueue(self, ticket: GatewayTicket) -> None:
+        ticket._gateway = self
+        with self._cond:
+            if self._stopped:
+                ticket._event.set()
+                return
+            self._pending.append(ticket)
+            self._cond.notify_all()
+
+    def _withdraw(self, ticket: GatewayTicket) -> None:
+        """Drop a queued ticket; a ticket already dispatched is kept."""
+        with self._cond:
+            if ticket.dispatched_at is not None:
+                return
+            if ticket in self._pending:
+                self._pending.remove(ticket)
+            elif ticket in self._ready:
+                self._ready.remove(ticket)
+            ticket._event.set()
+
+    def _release(self, ticket: GatewayTicket) -> None:
+        with self._cond:
+            self._inflight -= 1
+            if ticket.leader and self._is_warming(ticket.prefix_key):
+                # Leader failed before prefill; let a sibling lead instead
+                del self._prefixes[ticket.prefix_key]
+                self._warming_since.pop(ticket.prefix_key, None)
+            self._cond.notify_all()
+
+    def _on_prefilled(self, ticket: GatewayTicket) -> None:
+        with self._cond:
+            self._prefixes[ticket.prefix_key] = time.monotonic()
+            self._warming_since.pop(ticket.prefix_key, None)
+            self._cond.notify_all()
+
+    def _is_warming(self, key: str) -> bool:
+        return key in self._prefixes and self._prefixes[key] is None
+
+    def _dispatch_loop(self) -> None:
+        window = self.config.window_ms / 1000
+        with self._cond:
+            while not self._stopped:
+                now = time.monotonic()
+                if self._pending and (
+                    len(self._pending) >= self.config.max_batch
+                    or now - self._pending[0].arrived >= window
+                ):
+                    self._form_batch()
+                self._release_ready(now)
+
+                timeout = None
+                if self._pending:
+                    timeout = max(0.0, self._pending[0].arrived + window - now)
+                if self._warming_since:
+                    deadline = (
+                        min(self._warming_since.values()) + self.config.leader_timeout
+                    )
+                    wait = max(0.0, deadline - now)
+                    timeout = wait if timeout is None else min(timeout, wait)
+                self._cond.wait(timeout)
+
+    def _form_batch(self) -> None:
+        batch = self._pending[: self.config.max_batch]
+        del self._pending[: self.config.max_batch]
+
+        # Group by prefix, ordering groups by their earliest arrival
+        groups: dict[str, list[GatewayTicket]] = {}
+        for ticket in batch:
+            groups.setdefault(ticket.prefix_key, []).append(ticket)
+        for group in groups.values():
+            self._ready.extend(group)
+
+        self.stats.batches += 1
+        self.stats.max_batch_size = max(self.stats.max_batch_size, len(batch))
+
+    def _release_ready(self, now: float) -> None:
+        for key, since in list(self._warming_since.items()):
+            if now - since >= self.config.leader_timeout:
+                # Leader is taking too long; stop holding its siblings back
+                self._prefixes[key] = now
+                del self._warming_since[key]
+
+        held: deque[GatewayTicket] = deque()
+        while self._ready and self._inflight < self.config.max_inflight:
+            ticket = self._ready.popleft()
+            if self.config.warm_prefix:
+                if self._is_warming(ticket.prefix_key):
+                    held.append(ticket)
+                    continue
+                warm_at = self._prefixes.get(ticket.prefix_key)
+                if warm_at is None or now - warm_at > self.config.prefix_ttl:
+                    ticket.leader = True
+                    self._prefixes[ticket.prefix_key] = None
+                    self._warming_since[ticket.prefix_key] = now
+                    self.stats.prefix_leaders += 1
+                else:
+                    self.stats.prefix_followers += 1
+            self._inflight += 1
+            ticket.dispatched_at = now
+            self.stats.requests += 1
+            self.stats.queue_wait_total += now - ticket.arrived
+            ticket._event.set()
+        self._ready.extendleft(reversed(held))
+
+
+class _Slot:
+    """Context manager pairing gateway enqueue and release."""
+
+    def __init__(
+        self,
+        gateway: BatchingGateway,
+        ticket: GatewayTicket,
+        cancelled: Callable[[], bool] | None = None,
+    ):
+        self.gateway = gateway
+        self.ticket = ticket
+        self.cancelled = cancelled
+
+    def __enter__(self) -> GatewayTicket:
+        self.gateway._enqueue(self.ticket)
+        if self.cancelled is None:
+            self.ticket._event.wait()
+            return self.ticket
+        while not self.ticket._event.wait(_CANCEL_POLL_INTERVAL):
+            if self.cancelled():
+                self.gateway._withdraw(self.ticket)
+                break
+        return self.ticket
+
+    def __exit__(self, *exc_info) -> None:
+        if self.ticket.dispatched_at is not None:
+            self.gateway._release(self.ticket)
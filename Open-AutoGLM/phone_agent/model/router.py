@@ -0,0 +1,218 @@
+"""Latency-aware routing across several replicas of the same model."""
+
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass
+class RouterConfig:
+    """Configuration for the endpoint router."""
+
+    # Weight of the newest sample in the time-to-first-token average
+    ewma_alpha: float = 0.3
+    # Consecutive failures before an endpoint is ejected
+    eject_after_failures: int = 2
+    # Seconds between health checks of ejected endpoints
+    health_interval: float = float(os.getenv("PHONE_AGENT_HEALTH_INTERVAL", "10"))
+    health_timeout: float = 5.0
+    # Max endpoints tried for one request
+    max_attempts: int = 3
+
+
+@dataclass
+class EndpointState:
+    """Routing state of one endpoint."""
+
+    url: str
+    ewma_ttft: float | None = None
+    inflight: int = 0
+    consecutive_failures: int = 0
+    ejected: bool = False
+    requests: int = 0
+    failures: int = 0
+    ejections: int = 0
+    last_error: str | None = None
+
+    def score(self) -> float:
+        """Expected wait for a new request; lower is better."""
+        # Unmeasured endpoints score 0 so every replica gets sampled
+        return (self.ewma_ttft or 0.0) * (self.inflight + 1)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "url": self.url,
+            "ewma_ttft_ms": round(self.ewma_ttft * 1000, 1)
+            if self.ewma_ttft is not None
+            else None,
+            "inflight": self.inflight,
+            "healthy": not self.ejected,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "last_error": self.last_error,
+        }
+
+
+class EndpointRouter:
+    """
+    Picks a model endpoint for each request.
+
+    Every request goes to the healthy endpoint with the lowest EWMA time to
+    first token, scaled by its in-flight requests. Endpoints that fail
+    ``eject_after_failures`` times in a row are ejected. A background thread
+    probes ejected endpoints (GET /models) and puts them back once they
+    answer. If every endpoint is ejected, requests still go to the one
+    ejected longest ago rather than failing outright.
+
+    A router may be shared by any number of ModelClients.
+
+    Example:
+        >>> router = EndpointRouter(["http://gpu1:8000/v1", "http://gpu2:8000/v1"])
+        >>> client = ModelClient(config, router=router)
+    """
+
+    def __init__(
+        self,
+        base_urls: list[str],
+        config: RouterConfig | None = None,
+        api_key: str = "EMPTY",
+    ):
+        if not base_urls:
+            raise ValueError("At least one base URL is required")
+        self.config = config or RouterConfig()
+        self.api_key = api_key
+        self.endpoints = [EndpointState(url.rstrip("/")) for url in base_urls]
+        self._lock = threading.Lock()
+        self._ejected_at: dict[str, float] = {}
+        self._wake = threading.Event()
+        self._health_thread: threading.Thread | None = None
+        self._closed = False
+
+    @property
+    def urls(self) -> list[str]:
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def acquire(self, exclude: list[str] | None = None) -> EndpointState | None:
+        """
+        Reserve the best endpoint for a request.
+
+        Args:
+            exclude: URLs already tried for this request.
+
+        Returns:
+            The chosen endpoint, or None if every endpoint is excluded.
+            Must be followed by release().
+        """
+        exclude = exclude or []
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.url not in exclude]
+            if not candidates:
+                return None
+            healthy = [e for e in candidates if not e.ejected]
+            if healthy:
+                best = min(
+                    healthy, key=lambda e: (e.score(), e.inflight, random.random())
+                )
+            else:
+                best = min(candidates, key=lambda e: self._ejected_at.get(e.url, 0.0))
+            best.inflight += 1
+            best.requests += 1
+            return best
+
+    def release(
+        self,
+        endpoint: EndpointState,
+        ttft: float | None = None,
+        error: Exception | None = None,
+        cancelled: bool = False,
+    ) -> None:
+        """
+        Record the outcome of a request sent to an endpoint.
+
+        A cancelled request only frees its in-flight slot; it counts as
+        neither a success nor a failure of the endpoint.
+        """
+        with self._lock:
+            endpoint.inflight -= 1
+            if cancelled:
+                return
+            if error is None:
+                endpoint.consecutive_failures = 0
+                if endpoint.ejected:
+                    self._reinstate(endpoint)
+                if ttft is not None:
+                    alpha = self.config.ewma_alpha
+                    endpoint.ewma_ttft = (
+                        ttft
+                        if endpoint.ewma_ttft is None
+                        else alpha * ttft + (1 - alpha) * endpoint.ewma_ttft
+                    )
+                return
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            endpoint.last_error = str(error)[:200]
+            if (
+                not endpoint.ejected
+                and endpoint.consecutive_failures >= self.config.eject_after_failures
+            ):
+                endpoint.ejected = True
+                endpoint.ejections += 1
+                self._ejected_at[endpoint.url] = time.monotonic()
+                self._start_health_checks()
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        """Return the state of every endpoint."""
+        with self._lock:
+            return [endpoint.to_dict() for endpoint in self.endpoints]
+
+    def close(self) -> None:
+        """Stop the health check thread."""
+        self._closed = True
+        self._wake.set()
+
+    def _reinstate(self, endpoint: EndpointState) -> None:
+        endpoint.ejected = False
+        endpoint.consecutive_failures = 0
+        # Forget latency measured while the endpoint was struggling
+        endpoint.ewma_ttft = None
+        self._ejected_at.pop(endpoint.url, None)
+
+    def _start_health_checks(self) -> None:
+        if self._health_thread is None or not self._health_thread.is_alive():
+            self._health_thread = threading.Thread(
+                target=self._health_loop, name="model-router-health", daemon=True
+            )
+            self._health_thread.start()
+
+    def _health_loop(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.config.health_interval)
+            if self._closed:
+                return
+            with self._lock:
+                ejected = [e for e in self.endpoints if e.ejected]
+                if not ejected:
+                    self._health_thread = None
+                    return
+            for endpoint in ejected:
+                if self._probe(endpoint.url):
+                    with self._lock:
+                        if endpoint.ejected:
+                            self._reinstate(endpoint)
+
+    def _probe(self, url: str) -> bool:
+        from phone_agent.model.client import get_shared_http_client
+
+        try:
+            response = get_shared_http_client().get(
+                f"{url}/models",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=self.config.health_timeout,
+            )
+        except Exception:
+            return False
+        return response.status_code < 500
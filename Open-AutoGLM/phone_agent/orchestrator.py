@@ -0,0 +1,369 @@
+"""Run many phone agents, across ADB, HDC and iOS devices, in one process."""
+
+import os
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable
+
+from phone_agent.agent import AgentConfig, PhoneAgent
+from phone_agent.agent_ios import IOSAgentConfig, IOSPhoneAgent
+from phone_agent.device_factory import DeviceFactory, DeviceType
+from phone_agent.events import AgentEvent
+from phone_agent.model import (
+    BatchingGateway,
+    EndpointRouter,
+    GatewayConfig,
+    ModelClient,
+    ModelConfig,
+)
+
+
+@dataclass
+class DeviceSpec:
+    """
+    A device driven by the orchestrator.
+
+    Attributes:
+        device_id: ADB serial, HDC target or iOS UDID.
+        device_type: Connection tool of the device.
+        wda_url: WebDriverAgent URL (iOS only).
+        module: Optional device module implementation passed to this
+            device's DeviceFactory, e.g. a simulated device (ADB/HDC only).
+    """
+
+    device_id: str
+    device_type: DeviceType = DeviceType.ADB
+    wda_url: str = "http://localhost:8100"
+    module: Any = None
+
+
+@dataclass
+class OrchestratorConfig:
+    """Configuration for the agent orchestrator."""
+
+    # Agents running at once; 0 gives every device its own worker
+    max_workers: int = int(os.getenv("PHONE_AGENT_ORCHESTRATOR_WORKERS", "0"))
+    # Model requests of all agents go through one batching gateway (None disables)
+    gateway: GatewayConfig | None = field(default_factory=GatewayConfig)
+
+
+@dataclass
+class TaskOutcome:
+    """Result of one task run by the orchestrator."""
+
+    device_id: str
+    task: str
+    result: str | None
+    error: str | None
+    steps: int
+    duration_ms: float
+    cancelled: bool = False
+
+
+@dataclass
+class _DeviceState:
+    spec: DeviceSpec
+    pending: deque = field(default_factory=deque)
+    agent: Any = None
+    running: bool = False
+    steps: int = 0
+    runs: int = 0
+    failures: int = 0
+    cancelled: int = 0
+    cancel_reason: str | None = None
+
+
+class AgentOrchestrator:
+    """
+    Drives one agent per device from a single process.
+
+    Every device gets its own agent and, for ADB/HDC devices, its own
+    DeviceFactory, so Android, HarmonyOS and iOS devices can be mixed.
+    All agents share one HTTP connection pool, one endpoint router and
+    (by default) one BatchingGateway, which admits and batches the model
+    requests of every agent.
+
+    Tasks are queued per device and run one at a time on each device.
+    Devices are scheduled round-robin onto a pool of ``max_workers``
+    threads: after a task finishes, its device goes to the back of the
+    queue if it has more work. Agents block only their own worker while
+    waiting on inference or device I/O (both release the GIL), so the
+    other agents keep capturing screens and executing actions in the
+    meantime.
+
+    Example:
+        >>> orchestrator = AgentOrchestrator(
+        ...     model_config,
+        ...     [DeviceSpec("emulator-5554"), DeviceSpec("FMR0223", DeviceType.HDC)],
+        ... )
+        >>> futures = [orchestrator.submit(d, "Open Settings") for d in orchestrator.device_ids]
+        >>> [f.result().result for f in futures]
+        >>> orchestrator.shutdown()
+    """
+
+    def __init__(
+        self,
+        model_config: ModelConfig,
+        devices: list[DeviceSpec],
+        agent_config: AgentConfig | None = None,
+        config: OrchestratorConfig | None = None,
+        event_callback: Callable[[str, AgentEvent], None] | None = None,
+        confirmation_callback: Callable[[str], bool] | None = None,
+        takeover_callback: Callable[[str], None] | None = None,
+    ):
+        """
+        Args:
+            model_config: Model configuration shared by every agent.
+            devices: Devices to drive; ids must be unique.
+            agent_config: Template for each agent's AgentConfig (device_id and
+                device_factory are filled in per device). iOS agents take
+                max_steps, lang, system_prompt and verbose from it.
+            config: Orchestrator configuration.
+            event_callback: Called with (device_id, event) for every
+                AgentEvent of an ADB/HDC agent.
+            confirmation_callback: Sensitive action confirmation for all agents.
+            takeover_callback: Takeover handler for all agents.
+        """
+        self.model_config = model_config
+        self.agent_config = agent_config or AgentConfig(verbose=False)
+        self.config = config or OrchestratorConfig()
+        self.event_callback = event_callback
+        self.confirmation_callback = confirmation_callback
+        self.takeover_callback = takeover_callback
+
+        self._devices: dict[str, _DeviceState] = {}
+        for spec in devices:
+            if spec.device_id in self._devices:
+                raise ValueError(f"Duplicate device id: {spec.device_id}")
+            self._devices[spec.device_id] = _DeviceState(spec)
+
+        self.gateway = (
+            BatchingGateway(self.config.gateway)
+            if self.config.gateway is not None
+            else None
+        )
+        self.router = (
+            EndpointRouter(model_config.base_urls, api_key=model_config.api_key)
+            if len(model_config.base_urls) > 1
+            else None
+        )
+        workers = self.config.max_workers or len(self._devices) or 1
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="orchestrator"
+        )
+        self._lock = threading.Lock()
+        self._started: float | None = None
+        self._steps = 0
+        self._closed = False
+
+    @property
+    def device_ids(self) -> list[str]:
+        """Ids of the orchestrated devices."""
+        return list(self._devices)
+
+    def submit(self, device_id: str, task: str) -> "Future[TaskOutcome]":
+        """
+        Queue a task on a device.
+
+        Returns:
+            Future resolving to the TaskOutcome once the task has run.
+        """
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Orchestrator is shut down")
+            state = self._devices.get(device_id)
+            if state is None:
+                raise KeyError(f"Unknown device: {device_id}")
+            if self._started is None:
+                self._started = time.perf_counter()
+            state.pending.append((task, future))
+            if not state.running:
+                state.running = True
+                self._executor.submit(self._drain, state)
+        return future
+
+    def run_all(self, tasks: dict[str, list[str]]) -> list[TaskOutcome]:
+        """Run lists of tasks per device and wait for all of them."""
+        futures = [
+            self.submit(device_id, task)
+            for device_id, device_tasks in tasks.items()
+            for task in device_tasks
+        ]
+        return [future.result() for future in futures]
+
+    def cancel(self, device_id: str, reason: str = "cancelled") -> int:
+        """
+        Drop a device's queued tasks and cancel its running one.
+
+        Returns:
+            Number of queued tasks dropped.
+        """
+        with self._lock:
+            state = self._devices[device_id]
+            dropped = list(state.pending)
+            state.pending.clear()
+            agent = state.agent if state.running else None
+            if isinstance(agent, PhoneAgent):
+                state.cancel_reason = reason
+        for _, future in dropped:
+            future.cancel()
+        if isinstance(agent, PhoneAgent):
+            agent.cancel(reason)
+        return len(dropped)
+
+    def stats(self) -> dict[str, Any]:
+        """Return throughput and per-device counters."""
+        with self._lock:
+            elapsed = time.perf_counter() - self._started if self._started else 0.0
+            devices = {
+                device_id: {
+                    "type": state.spec.device_type.value,
+                    "running": state.running,
+                    "queued": len(state.pending),
+                    "runs": state.runs,
+                    "failures": state.failures,
+                    "cancelled": state.cancelled,
+                    "steps": state.steps,
+                }
+                for device_id, state in self._devices.items()
+            }
+            steps = self._steps
+        return {
+            "devices": devices,
+            "steps": steps,
+            "elapsed_s": round(elapsed, 3),
+            "steps_per_second": round(steps / elapsed, 2) if elapsed else 0.0,
+            "gateway": self.gateway.snapshot() if self.gateway else None,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Cancel queued tasks, stop the workers and release shared resources."""
+        with self._lock:
+            self._closed = True
+        for device_id in self._devices:
+            self.cancel(device_id, "orchestrator shut down")
+        self._executor.shutdown(wait=wait)
+        for state in self._devices.values():
+            if isinstance(state.agent, PhoneAgent):
+                state.agent.close()
+        if self.gateway is not None:
+            self.gateway.close()
+        if self.router is not None:
+            self.router.close()
+
+    def __enter__(self) -> "AgentOrchestrator":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.shutdown()
+
+    def _drain(self, state: _DeviceState) -> None:
+        """Run the next queued task of a device, then requeue the device."""
+        with self._lock:
+            if not state.pending:
+                state.running = False
+                return
+            task, future = state.pending.popleft()
+        if future.set_running_or_notify_cancel():
+            future.set_result(self._run_task(state, task))
+        with self._lock:
+            if state.pending and not self._closed:
+                # Back of the line, behind the other devices' work
+                self._executor.submit(self._drain, state)
+            else:
+                state.running = False
+
+    def _run_task(self, state: _DeviceState, task: str) -> TaskOutcome:
+        device_id = state.spec.device_id
+        start = time.perf_counter()
+        result = error = None
+        steps = 0
+        with self._lock:
+            state.cancel_reason = None
+        try:
+            if state.agent is None:
+                state.agent = self._create_agent(state)
+            result = state.agent.run(task)
+        except Exception as e:
+            error = str(e)
+            if self.agent_config.verbose:
+                traceback.print_exc()
+        finally:
+            if isinstance(state.agent, IOSPhoneAgent):
+                # The iOS agent has no step callback; count its steps per run
+                self._count_steps(state, state.agent.step_count)
+            if state.agent is not None:
+                steps = state.agent.step_count
+        with self._lock:
+            cancel_reason, state.cancel_reason = state.cancel_reason, None
+            cancelled = cancel_reason is not None and error is None
+            if cancelled:
+                # run() returns normally when cancelled; don't count it a success
+                result, error = None, f"cancelled: {cancel_reason}"
+            state.runs += 1
+            state.failures += 1 if error is not None and not cancelled else 0
+            state.cancelled += 1 if cancelled else 0
+        return TaskOutcome(
+            device_id=device_id,
+            task=task,
+            result=result,
+            error=error,
+            steps=steps,
+            duration_ms=round((time.perf_counter() - start) * 1000, 1),
+            cancelled=cancelled,
+        )
+
+    def _create_agent(self, state: _DeviceState) -> PhoneAgent | IOSPhoneAgent:
+        spec = state.spec
+        model_client = ModelClient(
+            self.model_config, gateway=self.gateway, router=self.router
+        )
+        if spec.device_type == DeviceType.IOS:
+            template = self.agent_config
+            return IOSPhoneAgent(
+                model_config=self.model_config,
+                agent_config=IOSAgentConfig(
+                    max_steps=template.max_steps,
+                    wda_url=spec.wda_url,
+                    device_id=spec.device_id,
+                    lang=template.lang,
+                    system_prompt=template.system_prompt,
+                    verbose=template.verbose,
+                ),
+                confirmation_callback=self.confirmation_callback,
+                takeover_callback=self.takeover_callback,
+                model_client=model_client,
+            )
+
+        def on_step(_result: Any) -> None:
+            self._count_steps(state, 1)
+
+        def on_event(event: AgentEvent) -> None:
+            if self.event_callback is not None:
+                self.event_callback(spec.device_id, event)
+
+        return PhoneAgent(
+            model_config=self.model_config,
+            agent_config=replace(
+                self.agent_config,
+                device_id=spec.device_id,
+                device_factory=DeviceFactory(spec.device_type, module=spec.module),
+            ),
+            confirmation_callback=self.confirmation_callback,
+            takeover_callback=self.takeover_callback,
+            step_callback=on_step,
+            # Always set: without an event callback the agent prints the
+            # model's thinking stream, which interleaves across agents
+            event_callback=on_event,
+            model_client=model_client,
+        )
+
+    def _count_steps(self, state: _DeviceState, steps: int) -> None:
+        with self._lock:
+            state.steps += steps
+            self._steps += steps
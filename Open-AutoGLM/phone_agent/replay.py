@@ -0,0 +1,438 @@
+"""Replay cache for the well-known opening steps of recurring tasks."""
+
+import base64
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any
+
+from PIL import Image
+
+# Actions that depend on a human or on data outside the screen are never replayed
+UNCACHEABLE_ACTIONS = {"Take_over", "Note", "Call_API", "Interact"}
+
+# Actions whose arguments come from the task text itself; they are only
+# replayed for the exact task they were recorded for
+TASK_SPECIFIC_ACTIONS = {"Type", "Type_Name"}
+
+# Clause boundaries used to cut a task down to its opening
+_CLAUSE_SPLIT = re.compile(r"[，,。；;！!？?\n]|然后|\bthen\b")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_key TEXT NOT NULL,
+    prefix_key TEXT,
+    history_key TEXT NOT NULL,
+    current_app TEXT NOT NULL,
+    step INTEGER NOT NULL,
+    phash TEXT NOT NULL,
+    thinking TEXT NOT NULL,
+    action TEXT NOT NULL,
+    action_name TEXT,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Columns added after the first release, for caches created before them
+_MIGRATIONS = {
+    "prefix_key": "ALTER TABLE entries ADD COLUMN prefix_key TEXT",
+    "action_name": "ALTER TABLE entries ADD COLUMN action_name TEXT",
+}
+
+_LOOKUP_INDEX = """
+DROP INDEX IF EXISTS idx_entries_lookup;
+CREATE INDEX IF NOT EXISTS idx_entries_prefix_lookup
+    ON entries (prefix_key, history_key, current_app);
+"""
+
+
+@dataclass
+class ReplayConfig:
+    """Configuration for the replay cache."""
+
+    path: str = os.getenv(
+        "PHONE_AGENT_REPLAY_CACHE",
+        os.path.join(os.path.expanduser("~"), ".cache", "phone_agent", "replay.sqlite"),
+    )
+    # Max Hamming distance (out of hash_size * hash_size bits) for a screen match
+    max_distance: int = int(os.getenv("PHONE_AGENT_REPLAY_MAX_DISTANCE", "10"))
+    hash_size: int = 16
+    # Fraction of the screen height ignored at the top (status bar, clock)
+    crop_top: float = 0.05
+    # Only the first steps of a task are looked up; later steps depend too
+    # much on earlier variation to repeat reliably
+    max_replay_steps: int = 10
+    # Leading clauses of the task ("打开微信，...") that select the entries a
+    # run may replay; entries recorded for other tasks with the same opening
+    # are shared, except task-specific actions such as typed text
+    prefix_clauses: int = 1
+    # Least recently used entries are evicted beyond this count
+    max_entries: int = int(os.getenv("PHONE_AGENT_REPLAY_MAX_ENTRIES", "5000"))
+    # Entries unused for this long are evicted (seconds, None keeps them)
+    ttl: float | None = 30 * 24 * 3600
+
+
+@dataclass
+class ReplayHit:
+    """A cached model decision matching the current screen."""
+
+    entry_id: int
+    thinking: str
+    action: str
+    distance: int
+    # Recorded for a different task with the same opening
+    shared: bool = False
+
+
+@dataclass
+class _PendingStep:
+    task_key: str
+    prefix_key: str
+    history_key: str
+    current_app: str
+    step: int
+    phash: str
+    thinking: str
+    action: str
+    action_name: str | None = None
+    replayed_id: int | None = None
+
+
+def perceptual_hash(
+    image_base64: str, hash_size: int = 16, crop_top: float = 0.0
+) -> str:
+    """
+    Compute a difference hash (dHash) of a base64-encoded screenshot.
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale grid and
+    each bit records whether a cell is brighter than its right neighbour, so
+    small rendering differences flip only a few bits.
+
+    Returns:
+        The hash as a hex string of hash_size * hash_size bits.
+    """
+    image = Image.open(BytesIO(base64.b64decode(image_base64)))
+    if crop_top > 0:
+        image = image.crop((0, int(image.height * crop_top), image.width, image.height))
+    pixels = list(
+        image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR).getdata()
+    )
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+def hash_distance(a: str, b: str) -> int:
+    """Hamming distance between two hex hashes."""
+    return (int(a, 16) ^ int(b, 16)).bit_count()
+
+
+def normalize_task(task: str) -> str:
+    """Collapse whitespace and case in a task description."""
+    return " ".join(task.split()).lower()
+
+
+def task_prefix(task: str, clauses: int = 1) -> str:
+    """
+    The opening of a task: its first ``clauses`` clauses, normalized.
+
+    "打开微信，给张三发消息" and "打开微信，给李四发消息" share the prefix
+    "打开微信", so their first steps can be replayed for each other.
+    """
+    parts = [part.strip() for part in _CLAUSE_SPLIT.split(normalize_task(task))]
+    return "，".join([part for part in parts if part][:clauses])
+
+
+def task_key(task: str) -> str:
+    """Cache key of the full normalized task."""
+    return hashlib.sha1(normalize_task(task).encode("utf-8")).hexdigest()[:16]
+
+
+def prefix_key(task: str, clauses: int = 1) -> str:
+    """Cache key of the task's opening (see task_prefix)."""
+    prefix = task_prefix(task, clauses)
+    return hashlib.sha1(prefix.encode("utf-8")).hexdigest()[:16]
+
+
+def history_key(actions: list[str]) -> str:
+    """Key for the sequence of actions taken so far in a run."""
+    payload = json.dumps(actions, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class ReplayCache:
+    """
+    Persistent cache of model decisions for recurring task openings.
+
+    Entries are keyed by the task's opening clause (see task_prefix), the
+    actions already taken in the run, the foreground app and a perceptual
+    hash of the screen. A lookup succeeds when the stored hash is within
+    ``max_distance`` bits of the current one, and the cached
+    thinking/action is used instead of calling the model. The full task is
+    a secondary check: entries of the same task win ties, and
+    task-specific actions (typed text) are never replayed for another task.
+
+    Steps are only stored once their run finishes successfully, and entries
+    that were replayed in a failed run are removed, so a bad trajectory is
+    never repeated. Hit/miss counters live in the same SQLite file.
+
+    Example:
+        >>> cache = ReplayCache(ReplayConfig(path="/tmp/replay.sqlite"))
+        >>> agent = PhoneAgent(model_config, AgentConfig(replay_cache=cache))
+    """
+
+    def __init__(self, config: ReplayConfig | None = None):
+        self.config = config or ReplayConfig()
+        directory = os.path.dirname(self.config.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.config.path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(entries)")}
+        for column, statement in _MIGRATIONS.items():
+            if column not in columns:
+                self._db.execute(statement)
+        self._db.executescript(_LOOKUP_INDEX)
+        self._db.commit()
+
+    def screen_hash(self, image_base64: str) -> str:
+        """Perceptual hash of a screenshot using this cache's settings."""
+        return perceptual_hash(
+            image_base64, self.config.hash_size, self.config.crop_top
+        )
+
+    def lookup(
+        self, task: str, actions: list[str], current_app: str, phash: str
+    ) -> ReplayHit | None:
+        """
+        Find a cached decision for the current screen.
+
+        Args:
+            task: Task description of the run.
+            actions: Raw action strings already taken in this run.
+            current_app: Foreground app name.
+            phash: Perceptual hash of the current screenshot.
+
+        Returns:
+            The closest matching entry, or None on a miss.
+        """
+        full_key = task_key(task)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, task_key, action_name, phash, thinking, action "
+                "FROM entries "
+                "WHERE prefix_key = ? AND history_key = ? AND current_app = ?",
+                (
+                    prefix_key(task, self.config.prefix_clauses),
+                    history_key(actions),
+                    current_app,
+                ),
+            ).fetchall()
+            best: ReplayHit | None = None
+            for entry_id, entry_task, action_name, stored, thinking, action in rows:
+                shared = entry_task != full_key
+                if shared and action_name in TASK_SPECIFIC_ACTIONS:
+                    continue
+                distance = hash_distance(stored, phash)
+                if distance > self.config.max_distance:
+                    continue
+                if best is None or (distance, shared) < (best.distance, best.shared):
+                    best = ReplayHit(entry_id, thinking, action, distance, shared)
+            if best is None:
+                self._bump("misses")
+            else:
+                self._bump("hits")
+                if best.shared:
+                    self._bump("shared_hits")
+                self._db.execute(
+                    "UPDATE entries SET hits = hits + 1, last_used = ? WHERE id = ?",
+                    (time.time(), best.entry_id),
+                )
+            self._db.commit()
+            return best
+
+    def record_run(self, steps: list[_PendingStep], success: bool) -> None:
+        """
+        Store the steps of a finished run.
+
+        New steps are inserted only for successful runs. Entries replayed
+        in a failed run are deleted.
+        """
+        now = time.time()
+        with self._lock:
+            if success:
+                for step in steps:
+                    if step.replayed_id is not None:
+                        continue
+                    self._db.execute(
+                        "INSERT INTO entries (task_key, prefix_key, history_key, "
+                        "current_app, step, phash, thinking, action, action_name, "
+                        "created_at, last_used) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            step.task_key,
+                            step.prefix_key,
+                            step.history_key,
+                            step.current_app,
+                            step.step,
+                            step.phash,
+                            step.thinking,
+                            step.action,
+                            step.action_name,
+                            now,
+                            now,
+                        ),
+                    )
+                    self._bump("stores")
+            else:
+                replayed = [
+                    (s.replayed_id,) for s in steps if s.replayed_id is not None
+                ]
+                if replayed:
+                    self._db.executemany("DELETE FROM entries WHERE id = ?", replayed)
+                    self._bump("invalidations", len(replayed))
+            self._evict(now)
+            self._db.commit()
+
+    def stats(self) -> dict[str, Any]:
+        """Return persisted counters and the current entry count."""
+        with self._lock:
+            counters = dict(
+                self._db.execute("SELECT name, value FROM stats").fetchall()
+            )
+            entries = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        return {
+            "entries": entries,
+            "hits": hits,
+            "misses": misses,
+            "shared_hits": counters.get("shared_hits", 0),
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "stores": counters.get("stores", 0),
+            "invalidations": counters.get("invalidations", 0),
+            "evictions": counters.get("evictions", 0),
+        }
+
+    def clear(self) -> None:
+        """Remove all entries and counters."""
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._db.execute("DELETE FROM stats")
+            self._db.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
+
+    def _bump(self, name: str, amount: int = 1) -> None:
+        self._db.execute(
+            "INSERT INTO stats (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount),
+        )
+
+    def _evict(self, now: float) -> None:
+        evicted = 0
+        if self.config.ttl is not None:
+            evicted += self._db.execute(
+                "DELETE FROM entries WHERE last_used < ?", (now - self.config.ttl,)
+            ).rowcount
+        excess = (
+            self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            - self.config.max_entries
+        )
+        if excess > 0:
+            evicted += self._db.execute(
+                "DELETE FROM entries WHERE id IN "
+                "(SELECT id FROM entries ORDER BY last_used LIMIT ?)",
+                (excess,),
+            ).rowcount
+        if evicted:
+            self._bump("evictions", evicted)
+
+
+class ReplayRecorder:
+    """
+    Per-run view of a ReplayCache used by PhoneAgent.
+
+    Tracks the actions taken in the run, answers lookups for the current
+    step and hands the run's steps to the cache when it finishes.
+    """
+
+    def __init__(self, cache: ReplayCache, task: str):
+        self.cache = cache
+        self.task = task
+        self.actions: list[str] = []
+        self.steps: list[_PendingStep] = []
+        self._disabled = False
+
+    def lookup(
+        self, step: int, current_app: str, image_base64: str
+    ) -> tuple[ReplayHit | None, str | None]:
+        """
+        Look up the current screen.
+
+        Returns:
+            Tuple of (hit or None, perceptual hash or None when the step is
+            not eligible for caching).
+        """
+        if self._disabled or step > self.cache.config.max_replay_steps:
+            return None, None
+        phash = self.cache.screen_hash(image_base64)
+        return self.cache.lookup(self.task, self.actions, current_app, phash), phash
+
+    def record(
+        self,
+        step: int,
+        current_app: str,
+        phash: str | None,
+        thinking: str,
+        action: str,
+        action_name: str | None,
+        hit: ReplayHit | None = None,
+    ) -> None:
+        """Remember a step taken in this run."""
+        if phash is not None and action_name not in UNCACHEABLE_ACTIONS:
+            self.steps.append(
+                _PendingStep(
+                    task_key=task_key(self.task),
+                    prefix_key=prefix_key(self.task, self.cache.config.prefix_clauses),
+                    history_key=history_key(self.actions),
+                    current_app=current_app,
+                    step=step,
+                    phash=phash,
+                    thinking=thinking,
+                    action=action,
+                    action_name=action_name,
+                    replayed_id=hit.entry_id if hit else None,
+                )
+            )
+        elif phash is not None:
+            # The trajectory now depends on something the cache cannot see
+            self._disabled = True
+        self.actions.append(action)
+
+    def finish(self, success: bool) -> None:
+        """Persist the run's steps."""
+        self.cache.record_run(self.steps, success)
+        self.steps = []
@@ -0,0 +1,389 @@
+"""Append-only store of agent runs with per-step screenshots."""
+
+import base64
+import gzip
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any
+
+from PIL import Image
+
+_SEGMENT_PREFIX = "trace-"
+
+
+@dataclass
+class TraceConfig:
+    """Configuration for the trace store."""
+
+    root: str = os.getenv(
+        "PHONE_AGENT_TRACE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "phone_agent", "traces"),
+    )
+    # The active segment is gzipped and a new one started beyond this size
+    max_segment_bytes: int = 8 * 1024 * 1024
+    # Oldest segments (and screenshots only they reference) are deleted beyond this count
+    max_segments: int = int(os.getenv("PHONE_AGENT_TRACE_MAX_SEGMENTS", "50"))
+    # Screenshots are stored as JPEG no wider than this
+    screenshot_width: int = 360
+    screenshot_quality: int = 60
+    # Records waiting for the writer; further records are dropped when full
+    max_queue: int = 1000
+
+
+class TraceStore:
+    """
+    Persistent record of agent runs.
+
+    Every run gets a start record, one record per step (thinking, action,
+    result, timings, tokens and a screenshot reference) and an end record.
+    Records are appended as compact JSON lines to rotating segment files;
+    full segments are gzipped and the oldest are deleted once there are
+    more than ``max_segments``. Screenshots are downscaled to JPEG and
+    stored once per distinct image under their SHA-256.
+
+    All disk work happens on a background writer thread: the recording
+    methods only put a record on a queue, so tracing adds no I/O to the
+    step loop. Records are dropped (and counted) if the writer falls
+    behind by more than ``max_queue`` records.
+
+    Example:
+        >>> store = TraceStore(TraceConfig(root="/tmp/traces"))
+        >>> agent = PhoneAgent(model_config, AgentConfig(trace_store=store))
+        >>> agent.run("Open Settings")
+        >>> store.get_run(agent.trace_id)["steps"]
+    """
+
+    def __init__(self, config: TraceConfig | None = None):
+        self.config = config or TraceConfig()
+        self._segments_dir = os.path.join(self.config.root, "segments")
+        self._blobs_dir = os.path.join(self.config.root, "screenshots")
+        os.makedirs(self._segments_dir, exist_ok=True)
+        os.makedirs(self._blobs_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # run id -> summary, in start order
+        self._runs: dict[str, dict[str, Any]] = {}
+        self._counters = {
+            "records": 0,
+            "dropped": 0,
+            "screenshots": 0,
+            "screenshots_deduplicated": 0,
+            "rotations": 0,
+            "segments_deleted": 0,
+            "write_errors": 0,
+        }
+        self._segment_index = self._load_index()
+        self._segment_path = self._segment_file(self._segment_index)
+        self._segment = open(self._segment_path, "a", encoding="utf-8")
+        self._queue: queue.Queue = queue.Queue(maxsize=self.config.max_queue)
+        self._writer = threading.Thread(
+            target=self._write_loop, name="trace-writer", daemon=True
+        )
+        self._writer.start()
+
+    def begin_run(self, task: str, **meta: Any) -> str:
+        """Start a run and return its id."""
+        run_id = uuid.uuid4().hex[:16]
+        self._submit(
+            {"type": "run", "id": run_id, "ts": time.time(), "task": task, **meta}
+        )
+        return run_id
+
+    def record_step(
+        self, run_id: str, step: int, screenshot_base64: str | None = None, **data: Any
+    ) -> None:
+        """
+        Record a step of a run.
+
+        Args:
+            run_id: Id returned by begin_run().
+            step: Step number within the run.
+            screenshot_base64: Screenshot seen at the start of the step (PNG,
+                base64). Encoding and storage happen on the writer thread.
+            **data: JSON-serializable step fields (action, thinking, timings...).
+        """
+        self._submit(
+            {"type": "step", "id": run_id, "step": step, "ts": time.time(), **data},
+            screenshot_base64,
+        )
+
+    def end_run(self, run_id: str, status: str, **data: Any) -> None:
+        """Record the outcome of a run ("succeeded", "failed" or "cancelled")."""
+        self._submit(
+            {"type": "end", "id": run_id, "ts": time.time(), "status": status, **data}
+        )
+
+    def list_runs(
+        self,
+        device_id: str | None = None,
+        status: str | None = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> list[dict[str, Any]]:
+        """Return run summaries, newest first."""
+        with self._lock:
+            runs = [
+                self._public_summary(run)
+                for run in reversed(self._runs.values())
+                if (device_id is None or run.get("device_id") == device_id)
+                and (status is None or run["status"] == status)
+            ]
+        return runs[offset : offset + limit]
+
+    def get_run(self, run_id: str) -> dict[str, Any] | None:
+        """Return a run summary with all its recorded steps."""
+        with self._lock:
+            run = self._runs.get(run_id)
+            active = run is not None and self._segment_index in run["segments"]
+        if run is None:
+            return None
+        if active:
+            # Include records still waiting for the writer
+            self.flush(5.0)
+        with self._lock:
+            summary = self._public_summary(run)
+            segments = sorted(run["segments"])
+        steps = []
+        for index in segments:
+            for record in self._read_segment(index):
+                if record.get("id") == run_id and record.get("type") == "step":
+                    steps.append(record)
+        summary["steps"] = sorted(steps, key=lambda record: record["step"])
+        return summary
+
+    def screenshot_path(self, digest: str) -> str | None:
+        """Path of a stored screenshot, or None if it does not exist."""
+        if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+            return None
+        path = self._blob_path(digest)
+        return path if os.path.exists(path) else None
+
+    def stats(self) -> dict[str, Any]:
+        """Return writer counters and store size."""
+        with self._lock:
+            counters = dict(self._counters)
+            counters["runs"] = len(self._runs)
+        counters["pending"] = self._queue.qsize()
+        counters["segments"] = len(self._segment_indexes())
+        return counters
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every queued record is on disk."""
+        done = threading.Event()
+        try:
+            self._queue.put(("flush", done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """Write out queued records and stop the writer thread."""
+        self._queue.put(None)
+        self._writer.join()
+
+    def _submit(self, record: dict[str, Any], screenshot: str | None = None) -> None:
+        try:
+            self._queue.put_nowait((record, screenshot))
+        except queue.Full:
+            with self._lock:
+                self._counters["dropped"] += 1
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._segment.close()
+                return
+            record, extra = item
+            if record == "flush":
+                self._segment.flush()
+                extra.set()
+                continue
+            try:
+                if extra is not None:
+                    record["screenshot"] = self._store_screenshot(extra)
+                self._append(record)
+            except Exception:
+                with self._lock:
+                    self._counters["write_errors"] += 1
+            # Flush once the burst is written rather than after every record
+            if self._queue.empty():
+                self._segment.flush()
+
+    def _append(self, record: dict[str, Any]) -> None:
+        line = json.dumps(
+            record, ensure_ascii=False, separators=(",", ":"), default=str
+        )
+        self._segment.write(line + "\n")
+        with self._lock:
+            self._counters["records"] += 1
+            self._index_record(record, self._segment_index)
+        if self._segment.tell() >= self.config.max_segment_bytes:
+            self._rotate()
+
+    def _store_screenshot(self, image_base64: str) -> str:
+        image = Image.open(BytesIO(base64.b64decode(image_base64)))
+        if image.width > self.config.screenshot_width:
+            height = round(image.height * self.config.screenshot_width / image.width)
+            image = image.resize((self.config.screenshot_width, height), Image.BILINEAR)
+        buffer = BytesIO()
+        image.convert("RGB").save(
+            buffer, format="JPEG", quality=self.config.screenshot_quality
+        )
+        data = buffer.getvalue()
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if os.path.exists(path):
+            # Refresh mtime so retention keeps screenshots that are still referenced
+            os.utime(path)
+            with self._lock:
+                self._counters["screenshots_deduplicated"] += 1
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._counters["screenshots"] += 1
+        return digest
+
+    def _rotate(self) -> None:
+        self._segment.close()
+        with (
+            open(self._segment_path, "rb") as src,
+            gzip.open(f"{self._segment_path}.gz", "wb") as dst,
+        ):
+            dst.writelines(src)
+        os.remove(self._segment_path)
+        self._segment_index += 1
+        self._segment_path = self._segment_file(self._segment_index)
+        self._segment = open(self._segment_path, "a", encoding="utf-8")
+        with self._lock:
+            self._counters["rotations"] += 1
+        indexes = self._segment_indexes()
+        for index in indexes[: max(0, len(indexes) - self.config.max_segments)]:
+            self._delete_segment(index)
+
+    def _delete_segment(self, index: int) -> None:
+        path = self._existing_segment_file(index)
+        if path is None:
+            return
+        # Screenshots not touched since this segment was last written are
+        # referenced by no newer segment
+        cutoff = os.path.getmtime(path)
+        os.remove(path)
+        for directory, _, files in os.walk(self._blobs_dir):
+            for name in files:
+                blob = os.path.join(directory, name)
+                if os.path.getmtime(blob) <= cutoff:
+                    os.remove(blob)
+        with self._lock:
+            self._counters["segments_deleted"] += 1
+            for run_id in list(self._runs):
+                run = self._runs[run_id]
+                if index in run["segments"] and index == min(run["segments"]):
+                    # The run's start record is gone; drop the partial run
+                    del self._runs[run_id]
+
+    def _segment_file(self, index: int) -> str:
+        return os.path.join(self._segments_dir, f"{_SEGMENT_PREFIX}{index:06d}.jsonl")
+
+    def _existing_segment_file(self, index: int) -> str | None:
+        path = self._segment_file(index)
+        for candidate in (path, f"{path}.gz"):
+            if os.path.exists(candidate):
+                return candidate
+        return None
+
+    def _segment_indexes(self) -> list[int]:
+        indexes = set()
+        for name in os.listdir(self._segments_dir):
+            if name.startswith(_SEGMENT_PREFIX):
+                indexes.add(int(name[len(_SEGMENT_PREFIX) :].split(".")[0]))
+        return sorted(indexes)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self._blobs_dir, digest[:2], f"{digest}.jpg")
+
+    def _read_segment(self, index: int) -> list[dict[str, Any]]:
+        # The writer may compress (or delete) the segment between finding its
+        # file and opening it; the compressed copy is complete before the
+        # plain file is removed, so look the file up again
+        for _ in range(3):
+            path = self._existing_segment_file(index)
+            if path is None:
+                return []
+            try:
+                return self._read_segment_file(path)
+            except FileNotFoundError:
+                continue
+        return []
+
+    @staticmethod
+    def _read_segment_file(path: str) -> list[dict[str, Any]]:
+        opener = gzip.open if path.endswith(".gz") else open
+        records = []
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Partial last line after a crash
+                    continue
+        return records
+
+    def _load_index(self) -> int:
+        """Rebuild run summaries from existing segments; returns the active segment."""
+        indexes = self._segment_indexes()
+        for index in indexes:
+            for record in self._read_segment(index):
+                self._index_record(record, index)
+        if not indexes:
+            return 1
+        last = indexes[-1]
+        # Never append to a segment that was already compressed
+        return last + 1 if self._existing_segment_file(last).endswith(".gz") else last
+
+    def _index_record(self, record: dict[str, Any], segment: int) -> None:
+        run_id = record.get("id")
+        kind = record.get("type")
+        if kind == "run":
+            self._runs[run_id] = {
+                "id": run_id,
+                "task": record.get("task"),
+                "device_id": record.get("device_id"),
+                "model": record.get("model"),
+                "started_at": record.get("ts"),
+                "ended_at": None,
+                "status": "running",
+                "message": None,
+                "steps": 0,
+                "segments": {segment},
+            }
+            return
+        run = self._runs.get(run_id)
+        if run is None:
+            return
+        run["segments"].add(segment)
+        if kind == "step":
+            run["steps"] = max(run["steps"], record.get("step", 0))
+        elif kind == "end":
+            run["ended_at"] = record.get("ts")
+            run["status"] = record.get("status")
+            run["message"] = record.get("message")
+
+    @staticmethod
+    def _public_summary(run: dict[str, Any]) -> dict[str, Any]:
+        summary = {k: v for k, v in run.items() if k != "segments"}
+        if run["started_at"] is not None and run["ended_at"] is not None:
+            summary["duration_ms"] = round(
+                (run["ended_at"] - run["started_at"]) * 1000, 1
+            )
+        return summary
@@ -1,5 +1,6 @@
 """XCTest utilities for iOS device interaction via WebDriverAgent/XCUITest."""
 
+from phone_agent.xctest.async_device import AsyncWDABackend
 from phone_agent.xctest.connection import (
     ConnectionType,
     DeviceInfo,
@@ -44,4 +45,6 @@ __all__ = [
     "ConnectionType",
     "quick_connect",
     "list_devices",
+    # Async backend
+    "AsyncWDABackend",
 ]
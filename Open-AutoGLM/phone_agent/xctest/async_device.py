@@ -0,0 +1,265 @@
+"""Async device backend for iOS, over an httpx.AsyncClient to WebDriverAgent."""
+
+import asyncio
+import base64
+from io import BytesIO
+
+import httpx
+from PIL import Image
+
+from phone_agent.config.apps_ios import APP_PACKAGES_IOS as APP_PACKAGES
+from phone_agent.xctest.connection import DeviceInfo, list_devices
+from phone_agent.xctest.device import (
+    BACK_GESTURE,
+    _app_from_bundle,
+    _double_tap_actions,
+    _get_wda_session_url,
+    _long_press_actions,
+    _swipe_payload,
+    _tap_actions,
+)
+from phone_agent.xctest.screenshot import (
+    Screenshot,
+    _create_fallback_screenshot,
+    _get_screenshot_idevice,
+)
+
+# Settle delay after an action, as in the xctest module
+DEFAULT_DELAY = 1.0
+
+
+class AsyncWDABackend:
+    """
+    Non-blocking counterpart of the ``phone_agent.xctest`` module.
+
+    Talks to one WebDriverAgent over a pooled ``httpx.AsyncClient``.
+    Methods accept the ADB/HDC backend signatures so the backends are
+    interchangeable; ``device_id`` is only used for the idevicescreenshot
+    fallback, since the WDA URL already identifies the device. Durations
+    are in milliseconds, like the ADB/HDC backends, and settle delays
+    default to the xctest module's 1 second. Keyboard switching is a
+    no-op on iOS.
+
+    The backend belongs to the event loop it is first used on.
+
+    Example:
+        >>> backend = AsyncWDABackend("http://localhost:8100", session_id)
+        >>> await backend.tap(500, 800)
+        >>> await backend.close()
+    """
+
+    def __init__(
+        self, wda_url: str = "http://localhost:8100", session_id: str | None = None
+    ):
+        self.wda_url = wda_url.rstrip("/")
+        self.session_id = session_id
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared HTTP client, created on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(verify=False, timeout=15)
+        return self._client
+
+    async def get_screenshot(
+        self, device_id: str | None = None, timeout: int = 10
+    ) -> Screenshot:
+        """Capture a screenshot via WDA, then idevicescreenshot, then a black image."""
+        try:
+            response = await self.client.get(
+                f"{self.wda_url}/screenshot", timeout=timeout
+            )
+            if response.status_code == 200:
+                base64_data = response.json().get("value", "")
+                if base64_data:
+                    width, height = Image.open(
+                        BytesIO(base64.b64decode(base64_data))
+                    ).size
+                    return Screenshot(
+                        base64_data=base64_data, width=width, height=height
+                    )
+        except Exception as e:
+            print(f"WDA screenshot failed: {e}")
+
+        screenshot = await asyncio.to_thread(
+            _get_screenshot_idevice, device_id, timeout
+        )
+        return screenshot or _create_fallback_screenshot(is_sensitive=False)
+
+    async def get_current_app(self, device_id: str | None = None) -> str:
+        """Get the currently active app name."""
+        try:
+            response = await self.client.get(
+                f"{self.wda_url}/wda/activeAppInfo", timeout=5
+            )
+            if response.status_code == 200:
+                return _app_from_bundle(
+                    response.json().get("value", {}).get("bundleId", "")
+                )
+        except Exception as e:
+            print(f"Error getting current app: {e}")
+        return "System Home"
+
+    async def tap(
+        self, x: int, y: int, device_id: str | None = None, delay: float | None = None
+    ) -> None:
+        """Tap at the specified coordinates."""
+        await self._post(self._session_url("actions"), _tap_actions(x, y), delay=delay)
+
+    async def double_tap(
+        self, x: int, y: int, device_id: str | None = None, delay: float | None = None
+    ) -> None:
+        """Double tap at the specified coordinates."""
+        await self._post(
+            self._session_url("actions"), _double_tap_actions(x, y), delay=delay
+        )
+
+    async def long_press(
+        self,
+        x: int,
+        y: int,
+        duration_ms: int = 3000,
+        device_id: str | None = None,
+        delay: float | None = None,
+    ) -> None:
+        """Long press at the specified coordinates."""
+        await self._post(
+            self._session_url("actions"),
+            _long_press_actions(x, y, duration_ms),
+            timeout=duration_ms / 1000 + 10,
+            delay=delay,
+        )
+
+    async def swipe(
+        self,
+        start_x: int,
+        start_y: int,
+        end_x: int,
+        end_y: int,
+        duration_ms: int | None = None,
+        device_id: str | None = None,
+        delay: float | None = None,
+    ) -> None:
+        """Swipe from start to end coordinates."""
+        duration = duration_ms / 1000 if duration_ms is not None else None
+        payload = _swipe_payload(start_x, start_y, end_x, end_y, duration)
+        await self._post(
+            self._session_url("wda/dragfromtoforduration"),
+            payload,
+            timeout=payload["duration"] + 10,
+            delay=delay,
+        )
+
+    async def back(
+        self, device_id: str | None = None, delay: float | None = None
+    ) -> None:
+        """Swipe in from the left edge."""
+        await self._post(
+            self._session_url("wda/dragfromtoforduration"), BACK_GESTURE, delay=delay
+        )
+
+    async def home(
+        self, device_id: str | None = None, delay: float | None = None
+    ) -> None:
+        """Press the home button."""
+        await self._post(f"{self.wda_url}/wda/homescreen", delay=delay)
+
+    async def launch_app(
+        self, app_name: str, device_id: str | None = None, delay: float | None = None
+    ) -> bool:
+        """Launch an app by name; False if the app is unknown or the launch failed."""
+        if app_name not in APP_PACKAGES:
+            return False
+        response = await self._post(
+            self._session_url("wda/apps/launch"),
+            {"bundleId": APP_PACKAGES[app_name]},
+            delay=delay,
+        )
+        return response is not None and response.status_code in (200, 201)
+
+    async def type_text(
+        self, text: str, device_id: str | None = None, frequency: int = 60
+    ) -> None:
+        """Type text into the focused input field."""
+        response = await self._post(
+            self._session_url("wda/keys"),
+            {"value": list(text), "frequency": frequency},
+            timeout=30,
+        )
+        if response is not None and response.status_code not in (200, 201):
+            print(
+                f"Warning: Text input may have failed. Status: {response.status_code}"
+            )
+
+    async def clear_text(self, device_id: str | None = None) -> None:
+        """Clear the focused element, falling back to backspaces."""
+        try:
+            response = await self.client.get(
+                self._session_url("element/active"), timeout=10
+            )
+            if response.status_code == 200:
+                value = response.json().get("value", {})
+                element_id = value.get("ELEMENT") or value.get(
+                    "element-6066-11e4-a52e-4f735466cecf"
+                )
+                if element_id:
+                    await self._post(self._session_url(f"element/{element_id}/clear"))
+                    return
+        except Exception as e:
+            print(f"Error clearing text: {e}")
+        await self._post(self._session_url("wda/keys"), {"value": ["\u0008"] * 100})
+
+    async def clear_and_type(self, text: str, device_id: str | None = None) -> None:
+        """Clear the focused field and type text."""
+        await self.clear_text(device_id)
+        await self.type_text(text, device_id)
+
+    async def get_focused_text(self, device_id: str | None = None) -> str | None:
+        """Not supported over WDA."""
+        return None
+
+    async def wait_for_keyboard(
+        self, device_id: str | None = None, timeout: float = 1.0
+    ) -> bool:
+        """iOS types through WDA; there is no keyboard to wait for."""
+        return True
+
+    async def detect_and_set_adb_keyboard(self, device_id: str | None = None) -> str:
+        """No keyboard switch on iOS."""
+        return ""
+
+    async def restore_keyboard(self, ime: str, device_id: str | None = None) -> None:
+        """No keyboard switch on iOS."""
+
+    async def list_devices(self) -> list[DeviceInfo]:
+        """List connected iOS devices (libimobiledevice, run in a thread)."""
+        return await asyncio.to_thread(list_devices)
+
+    async def close(self) -> None:
+        """Close the HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _session_url(self, endpoint: str) -> str:
+        return _get_wda_session_url(self.wda_url, self.session_id, endpoint)
+
+    async def _post(
+        self,
+        url: str,
+        payload: dict | None = None,
+        timeout: float = 10,
+        delay: float | None = 0,
+    ) -> httpx.Response | None:
+        """POST to WDA, then await the settle delay; None if the request failed."""
+        if delay is None:
+            delay = DEFAULT_DELAY
+        response = None
+        try:
+            response = await self.client.post(url, json=payload, timeout=timeout)
+        except httpx.HTTPError as e:
+            print(f"WDA request failed ({url}): {e}")
+        if delay:
+            await asyncio.sleep(delay)
+        return response
@@ -8,6 +8,10 @@ from phone_agent.config.apps_ios import APP_PACKAGES_IOS as APP_PACKAGES
 
 SCALE_FACTOR = 3 # 3 for most modern iPhone 
 
+# Swipe from the left edge, the closest thing iOS has to a back button
+BACK_GESTURE = {"fromX": 0, "fromY": 640, "toX": 400, "toY": 640, "duration": 0.3}
+
+
 def _get_wda_session_url(wda_url: str, session_id: str | None, endpoint: str) -> str:
     """
     Get the correct WDA URL for a session endpoint.
@@ -53,16 +57,7 @@ def get_current_app(
             data = response.json()
             # Extract bundle ID from response
             # Response format: {"value": {"bundleId": "com.apple.AppStore", "name": "", "pid": 825, "processArguments": {...}}, "sessionId": "..."}
-            value = data.get("value", {})
-            bundle_id = value.get("bundleId", "")
-
-            if bundle_id:
-                # Try to find app name from bundle ID
-                for app_name, package in APP_PACKAGES.items():
-                    if package == bundle_id:
-                        return app_name
-
-            return "System Home"
+            return _app_from_bundle(data.get("value", {}).get("bundleId", ""))
 
     except ImportError:
         print("Error: requests library required. Install: pip install requests")
@@ -93,25 +88,7 @@ def tap(
         import requests
 
         url = _get_wda_session_url(wda_url, session_id, "actions")
-
-        # W3C WebDriver Actions API for tap/click
-        actions = {
-            "actions": [
-                {
-                    "type": "pointer",
-                    "id": "finger1",
-                    "parameters": {"pointerType": "touch"},
-                    "actions": [
-                        {"type": "pointerMove", "duration": 0, "x": x / SCALE_FACTOR, "y": y / SCALE_FACTOR},
-                        {"type": "pointerDown", "button": 0},
-                        {"type": "pause", "duration": 0.1},
-                        {"type": "pointerUp", "button": 0},
-                    ],
-                }
-            ]
-        }
-
-        requests.post(url, json=actions, timeout=15, verify=False)
+        requests.post(url, json=_tap_actions(x, y), timeout=15, verify=False)
 
         time.sleep(delay)
 
@@ -142,29 +119,7 @@ def double_tap(
         import requests
 
         url = _get_wda_session_url(wda_url, session_id, "actions")
-
-        # W3C WebDriver Actions API for double tap
-        actions = {
-            "actions": [
-                {
-                    "type": "pointer",
-                    "id": "finger1",
-                    "parameters": {"pointerType": "touch"},
-                    "actions": [
-                        {"type": "pointerMove", "duration": 0, "x": x / SCALE_FACTOR, "y": y / SCALE_FACTOR},
-                        {"type": "pointerDown", "button": 0},
-                        {"type": "pause", "duration": 100},
-                        {"type": "pointerUp", "button": 0},
-                        {"type": "pause", "duration": 100},
-                        {"type": "pointerDown", "button": 0},
-                        {"type": "pause", "duration": 100},
-                        {"type": "pointerUp", "button": 0},
-                    ],
-                }
-            ]
-        }
-
-        requests.post(url, json=actions, timeout=10, verify=False)
+        requests.post(url, json=_double_tap_actions(x, y), timeout=10, verify=False)
 
         time.sleep(delay)
 
@@ -197,28 +152,12 @@ def long_press(
         import requests
 
         url = _get_wda_session_url(wda_url, session_id, "actions")
-
-        # W3C WebDriver Actions API for long press
-        # Convert duration to milliseconds
-        duration_ms = int(duration * 1000)
-
-        actions = {
-            "actions": [
-                {
-                    "type": "pointer",
-                    "id": "finger1",
-                    "parameters": {"pointerType": "touch"},
-                    "actions": [
-                        {"type": "pointerMove", "duration": 0, "x": x / SCALE_FACTOR, "y": y / SCALE_FACTOR},
-                        {"type": "pointerDown", "button": 0},
-                        {"type": "pause", "duration": duration_ms},
-                        {"type": "pointerUp", "button": 0},
-                    ],
-                }
-            ]
-        }
-
-        requests.post(url, json=actions, timeout=int(duration + 10), verify=False)
+        requests.post(
+            url,
+            json=_long_press_actions(x, y, int(duration * 1000)),
+            timeout=int(duration + 10),
+            verify=False,
+        )
 
         time.sleep(delay)
 
@@ -254,24 +193,11 @@ def swipe(
     try:
         import requests
 
-        if duration is None:
-            # Calculate duration based on distance
-            dist_sq = (start_x - end_x) ** 2 + (start_y - end_y) ** 2
-            duration = dist_sq / 1000000  # Convert to seconds
-            duration = max(0.3, min(duration, 2.0))  # Clamp between 0.3-2 seconds
-
+        payload = _swipe_payload(start_x, start_y, end_x, end_y, duration)
         url = _get_wda_session_url(wda_url, session_id, "wda/dragfromtoforduration")
-
-        # WDA dragfromtoforduration API payload
-        payload = {
-            "fromX": start_x / SCALE_FACTOR,
-            "fromY": start_y / SCALE_FACTOR,
-            "toX": end_x / SCALE_FACTOR,
-            "toY": end_y / SCALE_FACTOR,
-            "duration": duration,
-        }
-
-        requests.post(url, json=payload, timeout=int(duration + 10), verify=False)
+        requests.post(
+            url, json=payload, timeout=int(payload["duration"] + 10), verify=False
+        )
 
         time.sleep(delay)
 
@@ -303,16 +229,7 @@ def back(
 
         url = _get_wda_session_url(wda_url, session_id, "wda/dragfromtoforduration")
 
-        # Swipe from left edge to simulate back gesture
-        payload = {
-            "fromX": 0,
-            "fromY": 640,
-            "toX": 400,
-            "toY": 640,
-            "duration": 0.3,
-        }
-
-        requests.post(url, json=payload, timeout=10, verify=False)
+        requests.post(url, json=BACK_GESTURE, timeout=10, verify=False)
 
         time.sleep(delay)
 
@@ -456,3 +373,85 @@ def press_button(
         print("Error: requests library required. Install: pip install requests")
     except Exception as e:
         print(f"Error pressing button: {e}")
+
+
+def _app_from_bundle(bundle_id: str) -> str:
+    """Map a bundle ID to a known app name."""
+    if bundle_id:
+        for app_name, package in APP_PACKAGES.items():
+            if package == bundle_id:
+                return app_name
+    return "System Home"
+
+
+def _pointer_actions(x: int, y: int, steps: list[dict]) -> dict:
+    """W3C WebDriver Actions payload for one touch pointer at (x, y) pixels."""
+    return {
+        "actions": [
+            {
+                "type": "pointer",
+                "id": "finger1",
+                "parameters": {"pointerType": "touch"},
+                "actions": [
+                    {"type": "pointerMove", "duration": 0, "x": x / SCALE_FACTOR, "y": y / SCALE_FACTOR},
+                    *steps,
+                ],
+            }
+        ]
+    }
+
+
+def _tap_actions(x: int, y: int) -> dict:
+    return _pointer_actions(
+        x,
+        y,
+        [
+            {"type": "pointerDown", "button": 0},
+            {"type": "pause", "duration": 0.1},
+            {"type": "pointerUp", "button": 0},
+        ],
+    )
+
+
+def _double_tap_actions(x: int, y: int) -> dict:
+    return _pointer_actions(
+        x,
+        y,
+        [
+            {"type": "pointerDown", "button": 0},
+            {"type": "pause", "duration": 100},
+            {"type": "pointerUp", "button": 0},
+            {"type": "pause", "duration": 100},
+            {"type": "pointerDown", "button": 0},
+            {"type": "pause", "duration": 100},
+            {"type": "pointerUp", "button": 0},
+        ],
+    )
+
+
+def _long_press_actions(x: int, y: int, duration_ms: int) -> dict:
+    return _pointer_actions(
+        x,
+        y,
+        [
+            {"type": "pointerDown", "button": 0},
+            {"type": "pause", "duration": duration_ms},
+            {"type": "pointerUp", "button": 0},
+        ],
+    )
+
+
+def _swipe_payload(
+    start_x: int, start_y: int, end_x: int, end_y: int, duration: float | None = None
+) -> dict:
+    """WDA dragfromtoforduration payload; duration (s) derived from distance if None."""
+    if duration is None:
+        dist_sq = (start_x - end_x) ** 2 + (start_y - end_y) ** 2
+        duration = max(0.3, min(dist_sq / 1000000, 2.0))  # Clamp between 0.3-2 seconds
+    return {
+        "fromX": start_x / SCALE_FACTOR,
+        "fromY": start_y / SCALE_FACTOR,
+        "toX": end_x / SCALE_FACTOR,
+        "toY": end_y / SCALE_FACTOR,
+        "duration": duration,
+    }
@@ -0,0 +1,265 @@
+"""
+Fuzz and benchmark the action parser (phone_agent/actions/parser.py).
+
+Builds a corpus of model action outputs, either generated from the action
+vocabulary of the system prompt or loaded from recorded runs (trace store
+directories or JSONL files with a "raw_action"/"action" string field), and:
+
+  * checks that the parser agrees with the previous ast-based parser on
+    every output the old parser accepted,
+  * checks that the compiled-grammar fast path, the incremental parser
+    fed all at once and the incremental parser fed in random chunks give
+    the same result,
+  * fuzzes the parser with truncated and mutated outputs: it must either
+    return an action or raise ActionParseError, never anything else,
+  * times both parsers.
+
+Usage:
+    python scripts/bench_action_parser.py --count 5000
+    python scripts/bench_action_parser.py --traces ~/.cache/phone_agent/traces
+"""
+
+import argparse
+import ast
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phone_agent.actions.parser import ActionParseError, ActionParser, parse_action_call
+
+WORDS = [
+    "微信",
+    "设置",
+    "搜索",
+    "hello",
+    "world",
+    "小红书",
+    "美团",
+    "外卖",
+    "订单",
+    "Settings",
+    "Chrome",
+    "张三",
+    "明天",
+    "下午3点",
+    "OK",
+    "确认",
+    "返回",
+    "🙂",
+]
+APPS = ["微信", "淘宝", "美团", "Settings", "Chrome", "小红书", "抖音", "高德地图"]
+
+
+def random_text(rng: random.Random, quotes: bool = True) -> str:
+    parts = [rng.choice(WORDS) for _ in range(rng.randint(1, 8))]
+    text = rng.choice([" ", "", "，"]).join(parts)
+    if quotes and rng.random() < 0.15:
+        text = text.replace(parts[0], f'"{parts[0]}"', 1)
+    if rng.random() < 0.1:
+        text += "\n" + rng.choice(WORDS)
+    if rng.random() < 0.05:
+        text += ")"
+    return text
+
+
+def point(rng: random.Random) -> str:
+    sep = rng.choice([",", ", "])
+    return f"[{rng.randint(0, 999)}{sep}{rng.randint(0, 999)}]"
+
+
+def generate(rng: random.Random) -> str:
+    kind = rng.randint(0, 11)
+    if kind == 0:
+        return f'do(action="Launch", app="{rng.choice(APPS)}")'
+    if kind in (1, 2, 3):
+        return f'do(action="Tap", element={point(rng)})'
+    if kind == 4:
+        name = rng.choice(["Type", "Type_Name"])
+        return f'do(action="{name}", text="{random_text(rng)}")'
+    if kind == 5:
+        return f'do(action="Swipe", start={point(rng)}, end={point(rng)})'
+    if kind == 6:
+        return f'do(action="{rng.choice(["Back", "Home"])}")'
+    if kind == 7:
+        return f'do(action="{rng.choice(["Long Press", "Double Tap"])}", element={point(rng)})'
+    if kind == 8:
+        return f'do(action="Wait", duration="{rng.randint(1, 5)} seconds")'
+    if kind == 9:
+        return f'do(action="Tap", element={point(rng)}, message="{random_text(rng, quotes=False)}")'
+    if kind == 10:
+        return f'do(action="Take_over", message="{random_text(rng, quotes=False)}")'
+    return f'finish(message="{random_text(rng)}")'
+
+
+def load_recorded(paths: list[str]) -> list[str]:
+    """Collect recorded action strings from trace directories or JSONL files."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, names in os.walk(path):
+                files += [os.path.join(directory, n) for n in names if ".jsonl" in n]
+        else:
+            files.append(path)
+    outputs = []
+    for file in sorted(files):
+        opener = gzip.open if file.endswith(".gz") else open
+        with opener(file, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                value = record.get("raw_action", record.get("action"))
+                if isinstance(value, str) and value:
+                    outputs.append(value)
+    return outputs
+
+
+def legacy_parse(response: str) -> dict:
+    """The ast-based parser this module replaced, kept as a reference."""
+    response = response.strip()
+    if response.startswith('do(action="Type"') or response.startswith(
+        'do(action="Type_Name"'
+    ):
+        return {
+            "_metadata": "do",
+            "action": "Type",
+            "text": response.split("text=", 1)[1][1:-2],
+        }
+    if response.startswith("do"):
+        response = (
+            response.replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t")
+        )
+        tree = ast.parse(response, mode="eval")
+        if not isinstance(tree.body, ast.Call):
+            raise ValueError("Expected a function call")
+        action = {"_metadata": "do"}
+        for keyword in tree.body.keywords:
+            action[keyword.arg] = ast.literal_eval(keyword.value)
+        return action
+    if response.startswith("finish"):
+        return {
+            "_metadata": "finish",
+            "message": response.replace("finish(message=", "")[1:-2],
+        }
+    raise ValueError(f"Failed to parse action: {response}")
+
+
+def parse(text: str) -> dict:
+    return parse_action_call(text)[0]
+
+
+def parse_incremental(text: str) -> tuple[dict, list[str]]:
+    parser = ActionParser()
+    parser.feed(text)
+    return parser.close(), parser.warnings
+
+
+def parse_chunked(text: str, rng: random.Random) -> dict:
+    parser = ActionParser()
+    i = 0
+    while i < len(text):
+        step = rng.randint(1, 6)
+        parser.feed(text[i : i + step])
+        i += step
+    return parser.close()
+
+
+def mutate(text: str, rng: random.Random) -> str:
+    kind = rng.randint(0, 5)
+    if kind == 0:
+        return text[: rng.randint(0, len(text))]
+    i = rng.randint(0, len(text))
+    if kind == 1:
+        return text[:i] + rng.choice("\"'()[],= \\\n") + text[i:]
+    if kind == 2:
+        return text[:i] + text[i + 1 :]
+    if kind == 3:
+        return (
+            rng.choice(["Action: ", "<answer>", "\n"])
+            + text
+            + rng.choice(["</answer>", " ", ""])
+        )
+    if kind == 4:
+        return text[:i] + chr(rng.randint(32, 0x9FFF)) + text[i:]
+    return text.replace(",", " ", 1)
+
+
+def timed(fn, outputs: list[str]) -> float:
+    start = time.perf_counter()
+    for text in outputs:
+        try:
+            fn(text)
+        except ValueError:
+            pass
+    return (time.perf_counter() - start) / len(outputs) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fuzz and benchmark the action parser")
+    parser.add_argument("--count", type=int, default=5000, help="Generated outputs")
+    parser.add_argument(
+        "--traces",
+        nargs="*",
+        default=[],
+        help="Trace dirs or JSONL files with recorded outputs",
+    )
+    parser.add_argument("--mutations", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    recorded = load_recorded(args.traces)
+    outputs = recorded + [generate(rng) for _ in range(args.count)]
+    print(f"corpus: {len(outputs)} outputs ({len(recorded)} recorded)")
+
+    legacy_ok = agree = 0
+    disagreements = []
+    for text in outputs:
+        try:
+            expected = legacy_parse(text)
+        except Exception:
+            continue
+        legacy_ok += 1
+        actual = parse(text)
+        assert parse_incremental(text)[0] == actual, text
+        if actual == expected:
+            agree += 1
+        elif len(disagreements) < 5:
+            disagreements.append((text, expected, actual))
+        assert parse_chunked(text, rng) == actual, text
+    print(f"agreement with legacy parser: {agree}/{legacy_ok}")
+    for text, expected, actual in disagreements:
+        print(f"  {text!r}\n    legacy: {expected}\n    new:    {actual}")
+
+    recovered = rejected = 0
+    for _ in range(args.mutations):
+        text = mutate(rng.choice(outputs), rng)
+        try:
+            action, warnings = parse_action_call(text)
+            recovered += 1
+        except ActionParseError:
+            rejected += 1
+            continue
+        if not warnings:
+            assert parse_incremental(text) == (action, []), text
+    print(
+        f"fuzz: {args.mutations} mutated outputs, {recovered} recovered, {rejected} rejected, 0 crashes"
+    )
+
+    new_us = timed(parse, outputs)
+    incremental_us = timed(lambda text: parse_incremental(text), outputs)
+    legacy_us = timed(legacy_parse, outputs)
+    print(
+        f"parse time per output: {new_us:.1f} us, incremental parser {incremental_us:.1f} us, "
+        f"legacy {legacy_us:.1f} us"
+    )
+
+
+if __name__ == "__main__":
+    main()
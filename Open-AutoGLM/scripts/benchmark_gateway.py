@@ -0,0 +1,198 @@
+"""
+Benchmark ModelClient with and without the BatchingGateway.
+
+Simulates many agents stepping at the same time against a local fake
+OpenAI-compatible server (scripts/fake_openai_server.py) and reports
+latency percentiles, wall time and the server's prefix cache counters.
+
+Usage:
+    python scripts/benchmark_gateway.py --agents 30 --rounds 3
+    python scripts/benchmark_gateway.py --base-url http://127.0.0.1:18080/v1
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from phone_agent.config import get_system_prompt
+from phone_agent.model import BatchingGateway, GatewayConfig, ModelClient, ModelConfig
+from phone_agent.model.client import MessageBuilder
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_server(port: int) -> subprocess.Popen:
+    script = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "fake_openai_server.py"
+    )
+    process = subprocess.Popen(
+        [sys.executable, script, "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("fake server did not start")
+
+
+def server_call(base_url: str, path: str, method: str = "GET") -> dict:
+    request = urllib.request.Request(
+        base_url.rstrip("/") + path,
+        method=method,
+        data=b"" if method == "POST" else None,
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def tiny_screenshot() -> str:
+    buffer = io.BytesIO()
+    Image.new("RGB", (108, 240), color=(30, 30, 30)).save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def build_messages(
+    agent: int, round_index: int, langs: list[str], image: str
+) -> list[dict]:
+    lang = langs[agent % len(langs)]
+    screen_info = MessageBuilder.build_screen_info(f"com.example.app{agent}")
+    return [
+        MessageBuilder.create_system_message(get_system_prompt(lang)),
+        MessageBuilder.create_user_message(
+            text=f"Task {agent}: open settings (round {round_index})\n\n{screen_info}",
+            image_base64=image,
+        ),
+    ]
+
+
+def run_mode(args, base_url: str, gateway: BatchingGateway | None) -> dict:
+    server_call(base_url, "/stats/reset", "POST")
+    config = ModelConfig(base_url=base_url, model_name="fake", api_key="EMPTY")
+    clients = [ModelClient(config, gateway=gateway) for _ in range(args.agents)]
+    langs = ["cn", "en"][: args.prefixes]
+    image = tiny_screenshot()
+    latencies: list[float] = []
+    ttfts: list[float] = []
+    lock = threading.Lock()
+
+    start = time.perf_counter()
+    for round_index in range(args.rounds):
+        barrier = threading.Barrier(args.agents)
+
+        def agent_step(agent: int) -> None:
+            messages = build_messages(agent, round_index, langs, image)
+            barrier.wait()
+            time.sleep(random.uniform(0, args.jitter_ms) / 1000)
+            t0 = time.perf_counter()
+            response = clients[agent].request(messages, echo=False)
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+                if response.time_to_first_token is not None:
+                    ttfts.append(response.time_to_first_token)
+
+        threads = [
+            threading.Thread(target=agent_step, args=(i,)) for i in range(args.agents)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "wall_s": round(wall, 3),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+        "mean_ttft_ms": round(statistics.mean(ttfts) * 1000, 1) if ttfts else None,
+        "server": server_call(base_url, "/stats"),
+        "gateway": gateway.snapshot() if gateway else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the model batching gateway")
+    parser.add_argument(
+        "--base-url", help="Existing fake server URL; a local one is started if omitted"
+    )
+    parser.add_argument("--agents", type=int, default=30)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument(
+        "--prefixes",
+        type=int,
+        choices=[1, 2],
+        default=2,
+        help="Distinct system prompts (cn/en)",
+    )
+    parser.add_argument(
+        "--jitter-ms",
+        type=float,
+        default=20.0,
+        help="Max random arrival delay per agent",
+    )
+    parser.add_argument("--window-ms", type=float, default=15.0)
+    parser.add_argument("--max-inflight", type=int, default=32)
+    args = parser.parse_args()
+
+    process = None
+    base_url = args.base_url
+    if base_url is None:
+        port = free_port()
+        process = start_fake_server(port)
+        base_url = f"http://127.0.0.1:{port}/v1"
+
+    try:
+        random.seed(0)
+        direct = run_mode(args, base_url, None)
+        gateway = BatchingGateway(
+            GatewayConfig(window_ms=args.window_ms, max_inflight=args.max_inflight)
+        )
+        random.seed(0)
+        batched = run_mode(args, base_url, gateway)
+        gateway.close()
+    finally:
+        if process is not None:
+            process.kill()
+
+    print(
+        f"{args.agents} agents x {args.rounds} rounds, {args.prefixes} system prompt(s)"
+    )
+    print(
+        f"{'mode':<10}{'wall s':>9}{'p50 ms':>9}{'p95 ms':>9}{'ttft ms':>9}{'hits':>7}{'misses':>8}{'prefill tok':>13}"
+    )
+    for name, result in (("direct", direct), ("gateway", batched)):
+        server = result["server"]
+        print(
+            f"{name:<10}{result['wall_s']:>9}{result['p50_ms']:>9}{result['p95_ms']:>9}"
+            f"{result['mean_ttft_ms']:>9}{server['prefix_hits']:>7}{server['prefix_misses']:>8}"
+            f"{server['prefill_tokens']:>13}"
+        )
+    print("gateway:", json.dumps(batched["gateway"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Measure per-process agent throughput with the AgentOrchestrator.
+
+Runs one PhoneAgent per simulated device (alternating ADB and HDC device
+types, each with its own DeviceFactory) in a single process against a
+local fake OpenAI-compatible server (scripts/fake_openai_server.py), and
+reports steps per second for each device count. The simulated devices
+sleep for a configurable screenshot and input latency instead of talking
+to real hardware. When the server is the fake one, its prefix cache hit
+rate and the share of prompt tokens served from the cache are reported too,
+next to the cached share the agents saw in the usage the server reported.
+
+Usage:
+    python scripts/benchmark_orchestrator.py --devices 1,4,16,32
+    python scripts/benchmark_orchestrator.py --devices 8 --workers 4 --no-gateway
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from phone_agent import AgentOrchestrator, DeviceSpec, OrchestratorConfig
+from phone_agent.adb.screenshot import Screenshot
+from phone_agent.agent import AgentConfig
+from phone_agent.config.timing import TIMING_CONFIG
+from phone_agent.device_factory import DeviceType
+from phone_agent.events import AgentEvent, EventType
+from phone_agent.model import GatewayConfig, ModelConfig
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_stats(base_url: str, reset: bool = False) -> dict | None:
+    """Prefix cache counters of the fake server; None for other servers."""
+    path = "/stats/reset" if reset else "/stats"
+    request = urllib.request.Request(
+        base_url.rstrip("/") + path,
+        method="POST" if reset else "GET",
+        data=b"" if reset else None,
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return json.loads(response.read())
+    except (OSError, ValueError):
+        return None
+
+
+def start_fake_server(port: int, decode_ms: float) -> subprocess.Popen:
+    script = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "fake_openai_server.py"
+    )
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            script,
+            "--port",
+            str(port),
+            "--decode-ms-per-step",
+            str(decode_ms),
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("fake server did not start")
+
+
+class FakeDevice:
+    """Device module stand-in with fixed screenshot and input latencies."""
+
+    def __init__(self, screenshot_ms: float, input_ms: float):
+        self.screenshot_ms = screenshot_ms
+        self.input_ms = input_ms
+        buffer = io.BytesIO()
+        Image.new("RGB", (108, 240), color=(30, 30, 30)).save(buffer, format="PNG")
+        self.image = base64.b64encode(buffer.getvalue()).decode()
+        self.commands = 0
+
+    def _input(self, *args, **kwargs) -> None:
+        self.commands += 1
+        time.sleep(self.input_ms / 1000)
+
+    tap = double_tap = long_press = swipe = back = home = _input
+    type_text = clear_text = _input
+
+    def get_screenshot(self, device_id=None, timeout=10) -> Screenshot:
+        time.sleep(self.screenshot_ms / 1000)
+        return Screenshot(base64_data=self.image, width=1080, height=2400)
+
+    def get_current_app(self, device_id=None) -> str:
+        time.sleep(self.input_ms / 1000)
+        return "System Home"
+
+    def launch_app(self, app_name, device_id=None, delay=None) -> bool:
+        self._input()
+        return True
+
+    def detect_and_set_adb_keyboard(self, device_id=None) -> str:
+        return "com.android.adbkeyboard/.AdbIME"
+
+    def restore_keyboard(self, ime, device_id=None) -> None:
+        pass
+
+    def list_devices(self) -> list:
+        return []
+
+
+class TokenTally:
+    """Sums the server-reported prompt tokens of every agent step."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.prompt = 0
+        self.cached = 0
+
+    def __call__(self, device_id: str, event: AgentEvent) -> None:
+        if event.type != EventType.STEP_END:
+            return
+        tokens = event.data.get("tokens", {})
+        with self.lock:
+            self.prompt += tokens.get("prompt", 0)
+            self.cached += tokens.get("cached", 0)
+
+    def cached_ratio(self) -> float | None:
+        return round(self.cached / self.prompt, 3) if self.prompt else None
+
+
+def run(args: argparse.Namespace, base_url: str, device_count: int) -> dict:
+    server_stats(base_url, reset=True)
+    tally = TokenTally()
+    devices = [
+        DeviceSpec(
+            device_id=f"fake-{i}",
+            device_type=DeviceType.ADB if i % 2 == 0 else DeviceType.HDC,
+            module=FakeDevice(args.screenshot_ms, args.input_ms),
+        )
+        for i in range(device_count)
+    ]
+    orchestrator = AgentOrchestrator(
+        ModelConfig(base_url=base_url, model_name="fake", continuous_usage_stats=True),
+        devices,
+        agent_config=AgentConfig(max_steps=args.steps, verbose=False),
+        config=OrchestratorConfig(
+            max_workers=args.workers,
+            gateway=None if args.no_gateway else GatewayConfig(),
+        ),
+        event_callback=tally,
+    )
+    try:
+        outcomes = orchestrator.run_all(
+            {
+                spec.device_id: [f"Open settings ({spec.device_id})"] * args.tasks
+                for spec in devices
+            }
+        )
+        stats = orchestrator.stats()
+        stats["server"] = server_stats(base_url)
+        stats["client_cached_ratio"] = tally.cached_ratio()
+    finally:
+        orchestrator.shutdown()
+    errors = [outcome.error for outcome in outcomes if outcome.error]
+    if errors:
+        print(f"  {len(errors)} task errors, first: {errors[0]}")
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the agent orchestrator")
+    parser.add_argument(
+        "--devices", default="1,4,16", help="Comma-separated device counts"
+    )
+    parser.add_argument("--tasks", type=int, default=1, help="Tasks per device")
+    parser.add_argument(
+        "--steps", type=int, default=5, help="Steps per task (max_steps)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Orchestrator workers (0: one per device)",
+    )
+    parser.add_argument("--screenshot-ms", type=float, default=150.0)
+    parser.add_argument("--input-ms", type=float, default=60.0)
+    parser.add_argument(
+        "--settle-ms", type=float, default=300.0, help="Settle delay after each tap"
+    )
+    parser.add_argument(
+        "--decode-ms", type=float, default=8.0, help="Fake server decode step time"
+    )
+    parser.add_argument(
+        "--no-gateway", action="store_true", help="Send model requests directly"
+    )
+    parser.add_argument(
+        "--base-url", help="Use a running server instead of starting the fake one"
+    )
+    args = parser.parse_args()
+
+    TIMING_CONFIG.device.default_tap_delay = args.settle_ms / 1000
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        port = free_port()
+        server = start_fake_server(port, args.decode_ms)
+        base_url = f"http://127.0.0.1:{port}/v1"
+
+    try:
+        baseline = None
+        for count in [int(n) for n in args.devices.split(",")]:
+            stats = run(args, base_url, count)
+            rate = stats["steps_per_second"]
+            baseline = baseline or rate / count
+            gateway = stats["gateway"] or {}
+            counters = stats["server"] or {}
+            print(
+                f"devices={count:3d} steps={stats['steps']:5d} "
+                f"wall={stats['elapsed_s']:7.2f}s steps/s={rate:7.2f} "
+                f"scaling={rate / baseline / count:5.2f} "
+                f"avg_batch={gateway.get('avg_batch_size', '-')} "
+                f"prefix_hit_rate={counters.get('prefix_hit_rate', '-')} "
+                f"cached_tokens={counters.get('cached_token_ratio', '-')} "
+                f"reported_cached={stats['client_cached_ratio'] or '-'}"
+            )
+    finally:
+        if server is not None:
+            server.terminate()
+
+
+if __name__ == "__main__":
+    main()
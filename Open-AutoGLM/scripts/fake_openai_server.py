@@ -0,0 +1,323 @@
+"""
+Fake OpenAI-compatible chat completion server for local benchmarks.
+
+Simulates the costs that matter when many agents share one self-hosted
+vision model:
+
+- prefill time proportional to prompt tokens that are not in the prefix cache
+- a prefix cache over leading messages, matched on their exact serialized
+  bytes (key order included) and populated only once a request's prefill
+  has finished (like vLLM APC / SGLang radix cache)
+- prefill serialised on one compute lane, decode steps shared by all running
+  sequences, with step time growing with the batch size
+
+Only the standard library is used. GET /stats returns counters, including
+the prefix hit rate and the share of prompt tokens served from the cache,
+and POST /stats/reset clears them along with the prefix cache. Responses
+carry usage.prompt_tokens_details.cached_tokens (streams only with
+stream_options.include_usage), as vLLM reports it; with
+stream_options.continuous_usage_stats every chunk carries the usage so far.
+
+Usage:
+    python scripts/fake_openai_server.py --port 18080
+    python scripts/fake_openai_server.py --port 18080 --prefill-us-per-token 40
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+IMAGE_TOKENS = 1000
+DEFAULT_RESPONSE = (
+    "The home screen is visible, tap the settings icon to continue. "
+    'do(action="Tap", element=[500,500])'
+)
+
+
+def estimate_tokens(content) -> int:
+    """Rough token count: 4 chars per token, fixed cost per image."""
+    if isinstance(content, str):
+        return max(1, len(content) // 4)
+    total = 0
+    for part in content or []:
+        if part.get("type") == "image_url":
+            total += IMAGE_TOKENS
+        else:
+            total += max(1, len(part.get("text", "")) // 4)
+    return total
+
+
+class FakeEngine:
+    """Timing model of an inference engine with prefix caching."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.prefill_lock = asyncio.Lock()
+        self.prefix_cache: OrderedDict[str, int] = OrderedDict()
+        self.running = 0
+        self.reset()
+
+    def reset(self) -> None:
+        self.prefix_cache.clear()
+        self.stats = {
+            "requests": 0,
+            "prefix_hits": 0,
+            "prefix_misses": 0,
+            "prefix_hit_rate": 0.0,
+            "prompt_tokens": 0,
+            "prefill_tokens": 0,
+            "cached_tokens": 0,
+            "cached_token_ratio": 0.0,
+            "max_running": 0,
+            "prefix_cache_size": 0,
+        }
+
+    @staticmethod
+    def _chain(messages: list[dict]) -> list[tuple[str, int]]:
+        """(key, tokens) of every leading run of messages, shortest first."""
+        chain = []
+        digest = hashlib.sha1()
+        for message in messages:
+            # Byte-exact: a reordered key or changed character is a miss
+            digest.update(json.dumps(message, ensure_ascii=False).encode("utf-8"))
+            chain.append(
+                (digest.copy().hexdigest(), estimate_tokens(message.get("content")))
+            )
+        return chain
+
+    async def prefill(self, messages: list[dict]) -> tuple[int, int]:
+        """Simulate prefill; returns (prompt tokens, cached prompt tokens)."""
+        chain = self._chain(messages)
+        total = sum(tokens for _, tokens in chain)
+        cached = 0
+        for key, tokens in chain:
+            if key not in self.prefix_cache:
+                break
+            cached += tokens
+        compute = total - cached
+
+        stats = self.stats
+        stats["requests"] += 1
+        stats["prefix_hits" if cached else "prefix_misses"] += 1
+        stats["prompt_tokens"] += total
+        stats["prefill_tokens"] += compute
+        stats["cached_tokens"] += cached
+        stats["prefix_hit_rate"] = round(stats["prefix_hits"] / stats["requests"], 3)
+        stats["cached_token_ratio"] = round(
+            stats["cached_tokens"] / max(1, stats["prompt_tokens"]), 3
+        )
+
+        async with self.prefill_lock:
+            await asyncio.sleep(compute * self.args.prefill_us_per_token / 1e6)
+
+        for key, tokens in chain:
+            self.prefix_cache[key] = tokens
+            self.prefix_cache.move_to_end(key)
+        while len(self.prefix_cache) > self.args.prefix_cache_entries:
+            self.prefix_cache.popitem(last=False)
+        stats["prefix_cache_size"] = len(self.prefix_cache)
+        return total, cached
+
+    def decode_step(self) -> float:
+        """Seconds per decode step at the current batch size."""
+        return (
+            self.args.decode_ms_per_step
+            + self.args.decode_ms_per_seq * max(0, self.running - 1)
+        ) / 1000
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument(
+        "--prefill-us-per-token",
+        type=float,
+        default=25.0,
+        help="Prefill cost per uncached prompt token in microseconds (default: 25)",
+    )
+    parser.add_argument(
+        "--decode-ms-per-step",
+        type=float,
+        default=8.0,
+        help="Decode step time for a single sequence in ms (default: 8)",
+    )
+    parser.add_argument(
+        "--decode-ms-per-seq",
+        type=float,
+        default=0.3,
+        help="Extra decode step time per additional running sequence in ms (default: 0.3)",
+    )
+    parser.add_argument(
+        "--chunk-tokens",
+        type=int,
+        default=4,
+        help="Tokens per streamed chunk (default: 4)",
+    )
+    parser.add_argument(
+        "--prefix-cache-entries",
+        type=int,
+        default=4096,
+        help="Number of cached message prefixes kept (default: 4096)",
+    )
+    parser.add_argument(
+        "--response",
+        default=DEFAULT_RESPONSE,
+        help="Assistant text returned for every request",
+    )
+    return parser.parse_args()
+
+
+async def handle_completion(
+    engine: FakeEngine, body: dict, writer: asyncio.StreamWriter
+) -> None:
+    messages = body.get("messages", [])
+    model = body.get("model", "fake")
+    text = engine.args.response
+
+    engine.running += 1
+    engine.stats["max_running"] = max(engine.stats["max_running"], engine.running)
+    try:
+        prompt_tokens, cached_tokens = await engine.prefill(messages)
+        chunk_chars = engine.args.chunk_tokens * 4
+        pieces = [text[i : i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+
+        def usage_after(count: int) -> dict:
+            completion_tokens = count * engine.args.chunk_tokens
+            return {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            }
+
+        usage = usage_after(len(pieces))
+        stream_options = body.get("stream_options") or {}
+
+        if not body.get("stream"):
+            for _ in pieces:
+                await asyncio.sleep(engine.decode_step())
+            payload = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage,
+            }
+            write_json(writer, 200, payload)
+            return
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\nConnection: keep-alive\r\n\r\n"
+        )
+        for count, piece in enumerate(pieces, 1):
+            await asyncio.sleep(engine.decode_step())
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {"index": 0, "delta": {"content": piece}, "finish_reason": None}
+                ],
+            }
+            if stream_options.get("continuous_usage_stats"):
+                chunk["usage"] = usage_after(count)
+            write_chunk(writer, f"data: {json.dumps(chunk)}\n\n".encode())
+            await writer.drain()
+        if stream_options.get("include_usage"):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [],
+                "usage": usage,
+            }
+            write_chunk(writer, f"data: {json.dumps(chunk)}\n\n".encode())
+        write_chunk(writer, b"data: [DONE]\n\n")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+    finally:
+        engine.running -= 1
+
+
+def write_chunk(writer: asyncio.StreamWriter, data: bytes) -> None:
+    writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+
+def write_json(writer: asyncio.StreamWriter, status: int, payload: dict) -> None:
+    data = json.dumps(payload).encode()
+    writer.write(
+        f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(data)}\r\nConnection: keep-alive\r\n\r\n".encode()
+        + data
+    )
+
+
+async def handle_connection(
+    engine: FakeEngine, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, path, _ = request_line.decode().split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, value = line.decode().split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            body = json.loads(await reader.readexactly(length)) if length else {}
+
+            if method == "POST" and path.endswith("/chat/completions"):
+                await handle_completion(engine, body, writer)
+            elif method == "GET" and path.endswith("/stats"):
+                write_json(writer, 200, engine.stats)
+            elif method == "POST" and path.endswith("/stats/reset"):
+                engine.reset()
+                write_json(writer, 200, {"ok": True})
+            elif method == "GET" and path.endswith("/models"):
+                write_json(writer, 200, {"object": "list", "data": [{"id": "fake"}]})
+            else:
+                write_json(writer, 404, {"error": f"unknown path {path}"})
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def main() -> None:
+    args = parse_args()
+    engine = FakeEngine(args)
+    server = await asyncio.start_server(
+        lambda r, w: handle_connection(engine, r, w), args.host, args.port
+    )
+    print(
+        f"Fake OpenAI server listening on http://{args.host}:{args.port}/v1", flush=True
+    )
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,135 @@
+"""Tests for phone_agent.model.cache."""
+
+import threading
+import time
+
+from phone_agent.model.cache import ResponseCache, ResponseCacheConfig, request_key
+from phone_agent.model.client import ModelConfig, ModelResponse
+
+
+def _response(action: str = 'do(action="Back")') -> ModelResponse:
+    return ModelResponse(thinking="t", action=action, raw_content=action)
+
+
+def _run_in_thread(target):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", target()))
+    thread.start()
+    return thread, result
+
+
+def test_miss_then_hit():
+    cache = ResponseCache(ResponseCacheConfig(max_entries=8, ttl=60))
+    assert cache.begin("a") is None
+    cache.complete("a", _response())
+
+    hit = cache.begin("a")
+    assert hit.action == 'do(action="Back")'
+    assert hit.cached
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["stores"]) == (1, 1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(ResponseCacheConfig(max_entries=2, ttl=60))
+    for key in ("a", "b"):
+        cache.begin(key)
+        cache.complete(key, _response(key))
+    cache.begin("a")  # a is now the most recently used
+    cache.begin("c")
+    cache.complete("c", _response("c"))
+
+    assert cache.begin("a") is not None
+    assert cache.begin("b") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entry_is_a_miss(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = ResponseCache(ResponseCacheConfig(max_entries=8, ttl=10))
+    cache.begin("a")
+    cache.complete("a", _response())
+
+    now[0] += 5
+    assert cache.begin("a") is not None
+    now[0] += 10
+    assert cache.begin("a") is None
+
+
+def test_failed_request_is_not_cached():
+    cache = ResponseCache(ResponseCacheConfig(max_entries=8, ttl=60))
+    cache.begin("a")
+    cache.complete("a", None)
+    assert cache.begin("a") is None
+    assert cache.stats()["stores"] == 0
+
+
+def test_identical_inflight_request_waits_for_the_leader():
+    cache = ResponseCache(ResponseCacheConfig(max_entries=8, ttl=60))
+    assert cache.begin("a") is None
+
+    thread, result = _run_in_thread(lambda: cache.begin("a"))
+    time.sleep(0.05)
+    assert thread.is_alive()
+    cache.complete("a", _response())
+    thread.join(1)
+
+    assert result["value"].action == 'do(action="Back")'
+    assert cache.stats()["deduplicated"] == 1
+
+
+def test_waiter_becomes_leader_when_the_leader_fails():
+    cache = ResponseCache(ResponseCacheConfig(max_entries=8, ttl=60))
+    cache.begin("a")
+
+    thread, result = _run_in_thread(lambda: cache.begin("a"))
+    time.sleep(0.05)
+    cache.complete("a", None)
+    thread.join(1)
+
+    assert result["value"] is None
+    assert cache.stats()["inflight"] == 1
+
+
+def test_waiter_stops_waiting_for_a_stuck_leader():
+    cache = ResponseCache(
+        ResponseCacheConfig(max_entries=8, ttl=60, inflight_timeout=0.1)
+    )
+    cache.begin("a")  # never completed
+
+    start = time.monotonic()
+    assert cache.begin("a") is None
+    assert time.monotonic() - start < 1
+    assert cache.stats()["inflight_timeouts"] == 1
+
+    # The stuck leader finishing late still serves later callers
+    cache.complete("a", _response())
+    assert cache.begin("a") is not None
+
+
+def test_request_key_hashes_images_and_sampling_parameters():
+    def messages(image: str):
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "image_url",
+                        "image_url": {"url": f"data:image/png;base64,{image}"},
+                    },
+                    {"type": "text", "text": "task"},
+                ],
+            }
+        ]
+
+    config = ModelConfig()
+    assert request_key(messages("AAAA"), config) == request_key(
+        messages("AAAA"), config
+    )
+    assert request_key(messages("AAAA"), config) != request_key(
+        messages("BBBB"), config
+    )
+    assert request_key(messages("AAAA"), config) != request_key(
+        messages("AAAA"), ModelConfig(top_p=0.5)
+    )
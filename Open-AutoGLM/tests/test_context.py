@@ -0,0 +1,115 @@
+"""Tests for phone_agent.context."""
+
+import json
+
+from phone_agent.context import (
+    IMAGE_TOKENS,
+    CompactionPolicy,
+    compact_context,
+    drop_screen_info,
+    estimate_tokens,
+    summarize_thinking,
+)
+
+
+def _user(text: str, app: str, image: bool = False) -> dict:
+    body = f"{text}\n\n{json.dumps({'current_app': app})}"
+    if not image:
+        return {"role": "user", "content": body}
+    return {
+        "role": "user",
+        "content": [
+            {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}},
+            {"type": "text", "text": body},
+        ],
+    }
+
+
+def _assistant(thinking: str, action: str = 'do(action="Back")') -> dict:
+    return {
+        "role": "assistant",
+        "content": f"<think>{thinking}</think><answer>{action}",
+    }
+
+
+def _conversation(turns: int) -> list[dict]:
+    messages = [{"role": "system", "content": "system prompt"}]
+    for i in range(turns):
+        messages.append(
+            _user("Task: open settings" if i == 0 else "** Screen Info **", f"App{i}")
+        )
+        messages.append(_assistant(f"Step {i} reasoning. " + "more detail " * 30))
+    return messages
+
+
+def test_estimate_tokens_counts_cjk_text_and_images():
+    messages = [
+        {"role": "user", "content": "打开微信"},
+        {"role": "user", "content": "abcdefgh"},
+        _user("x", "App", image=True),
+    ]
+    text = messages[2]["content"][1]["text"]
+    assert estimate_tokens(messages) == 4 + 2 + IMAGE_TOKENS + (len(text) + 3) // 4
+
+
+def test_summarize_thinking_keeps_the_first_sentence():
+    content = "<think>First sentence. " + "x" * 300 + "</think><answer>do()"
+    assert (
+        summarize_thinking(content, 120) == "<think>First sentence.</think><answer>do()"
+    )
+    short = "<think>Short.</think>do()"
+    assert summarize_thinking(short, 120) == short
+
+
+def test_drop_screen_info_keeps_only_the_app():
+    assert drop_screen_info('Task\n\n{"current_app": "WeChat"}') == "Task\n\n[WeChat]"
+    assert drop_screen_info("no json here") == "no json here"
+
+
+def test_recent_turns_are_kept_verbatim():
+    context = _conversation(6)
+    compacted = compact_context(context, CompactionPolicy(keep_last_turns=2))
+
+    assert len(compacted) == len(context)
+    assert compacted[0] == context[0]
+    assert compacted[-4:] == context[-4:]
+    # Older turns are shortened, the task text survives
+    assert compacted[1]["content"] == "Task: open settings\n\n[App0]"
+    assert (
+        compacted[2]["content"]
+        == '<think>Step 0 reasoning.</think><answer>do(action="Back")'
+    )
+
+
+def test_pending_user_message_stays_in_the_kept_window():
+    context = _conversation(4) + [_user("** Screen Info **", "Latest", image=True)]
+    compacted = compact_context(context, CompactionPolicy(keep_last_turns=1))
+    assert compacted[-3:] == context[-3:]
+
+
+def test_max_turns_drops_whole_pairs_after_the_task():
+    context = _conversation(6)
+    compacted = compact_context(
+        context, CompactionPolicy(keep_last_turns=2, max_turns=4)
+    )
+
+    roles = [message["role"] for message in compacted]
+    assert roles == ["system"] + ["user", "assistant"] * 4
+    assert compacted[1]["content"].startswith("Task: open settings")
+    assert compacted[-4:] == context[-4:]
+
+
+def test_compaction_is_stable_between_steps():
+    policy = CompactionPolicy(keep_last_turns=2)
+    context = _conversation(5)
+    before = compact_context(context, policy)
+    after = compact_context(context + _conversation(6)[-2:], policy)
+    # Everything compacted at the earlier step is byte-identical later on
+    assert after[: len(before) - 4] == before[:-4]
+
+
+def test_input_is_not_modified():
+    context = _conversation(4)
+    snapshot = json.dumps(context)
+    compact_context(context, CompactionPolicy(keep_last_turns=1))
+    assert json.dumps(context) == snapshot
@@ -0,0 +1,51 @@
+"""Tests for phone_agent.model.gateway."""
+
+import threading
+import time
+
+import pytest
+
+from phone_agent.model.gateway import BatchingGateway, GatewayConfig
+
+MESSAGES = [{"role": "system", "content": "prompt"}, {"role": "user", "content": "x"}]
+
+
+@pytest.fixture
+def gateway():
+    gateway = BatchingGateway(
+        GatewayConfig(window_ms=1, max_inflight=1, warm_prefix=False)
+    )
+    yield gateway
+    gateway.close()
+
+
+def test_slot_dispatches_and_releases(gateway):
+    with gateway.slot(MESSAGES, "m") as ticket:
+        assert ticket.dispatched_at is not None
+        assert gateway.snapshot()["inflight"] == 1
+    assert gateway.snapshot()["inflight"] == 0
+
+
+def test_queued_request_is_withdrawn_when_cancelled(gateway):
+    cancel = threading.Event()
+    entered = {}
+
+    def queued():
+        with gateway.slot(MESSAGES, "m", cancelled=cancel.is_set) as ticket:
+            entered["ticket"] = ticket
+
+    with gateway.slot(MESSAGES, "m"):
+        # max_inflight is 1, so the second request waits behind the first
+        thread = threading.Thread(target=queued)
+        thread.start()
+        time.sleep(0.05)
+        assert "ticket" not in entered
+        cancel.set()
+        thread.join(timeout=1)
+        assert not thread.is_alive()
+
+        assert entered["ticket"].dispatched_at is None
+        snapshot = gateway.snapshot()
+        assert snapshot["pending"] == snapshot["ready"] == 0
+        assert snapshot["inflight"] == 1
+    assert gateway.snapshot()["inflight"] == 0
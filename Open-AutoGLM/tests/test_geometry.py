@@ -0,0 +1,48 @@
+"""Tests for phone_agent.adb.geometry.parse_geometry."""
+
+from phone_agent.adb.geometry import parse_geometry
+
+OUTPUT = """Physical size: 1080x2400
+Override size: 720x1600
+Physical density: 420
+Override density: 320
+    SurfaceOrientation: 1
+  mDisplayCutout=DisplayCutout{insets=Rect(0, 136 - 0, 0) waterfall=Insets{}}
+"""
+
+
+def test_parses_size_density_rotation_and_cutout():
+    geometry = parse_geometry(OUTPUT)
+
+    assert (geometry.physical_width, geometry.physical_height) == (1080, 2400)
+    assert (geometry.override_width, geometry.override_height) == (720, 1600)
+    assert (geometry.density, geometry.override_density) == (420, 320)
+    assert geometry.rotation == 1
+    assert geometry.cutout_insets == {"left": 0, "top": 136, "right": 0, "bottom": 0}
+
+
+def test_effective_size_uses_the_override_and_rotation():
+    geometry = parse_geometry(OUTPUT)
+    assert (geometry.width, geometry.height) == (1600, 720)
+
+
+def test_physical_size_only():
+    geometry = parse_geometry("Physical size: 1080x2400\nPhysical density: 420\n")
+
+    assert (geometry.width, geometry.height) == (1080, 2400)
+    assert geometry.override_width is None
+    assert geometry.rotation == 0
+    assert geometry.cutout_insets == {}
+
+
+def test_window_manager_rotation_format():
+    geometry = parse_geometry(
+        "Physical size: 1080x2400\nmCurrentRotation=ROTATION_270\n"
+    )
+    assert geometry.rotation == 3
+    assert (geometry.width, geometry.height) == (2400, 1080)
+
+
+def test_unparseable_output():
+    assert parse_geometry("") is None
+    assert parse_geometry("error: device offline") is None
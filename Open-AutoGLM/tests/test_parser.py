@@ -0,0 +1,87 @@
+"""Tests for phone_agent.actions.parser."""
+
+import pytest
+
+from phone_agent.actions.parser import ActionParseError, ActionParser, parse_action_call
+
+
+def _parse_in_chunks(text: str, *cuts: int) -> dict:
+    parser = ActionParser()
+    start = 0
+    for cut in (*cuts, len(text)):
+        parser.feed(text[start:cut])
+        start = cut
+    return parser.close()
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (
+            'do(action="Tap", element=[500, 200])',
+            {"_metadata": "do", "action": "Tap", "element": [500, 200]},
+        ),
+        (
+            'finish(message="done")',
+            {"_metadata": "finish", "message": "done"},
+        ),
+        (
+            'do(action="Swipe", start=[1.5, -2], end=[3e2, .5], duration=None)',
+            {
+                "_metadata": "do",
+                "action": "Swipe",
+                "start": [1.5, -2],
+                "end": [300.0, 0.5],
+                "duration": None,
+            },
+        ),
+        (
+            "do(action='Type', text='a\\nb')",
+            {"_metadata": "do", "action": "Type", "text": "a\\nb"},
+        ),
+    ],
+)
+def test_well_formed_calls(text, expected):
+    action, warnings = parse_action_call(text)
+    assert action == expected
+    assert warnings == []
+
+
+def test_every_chunk_boundary_gives_the_same_result():
+    text = 'do(action="Swipe", start=[2.5e1, 1E-2], end=[3, -4e+2], message="a, b")'
+    expected, _ = parse_action_call(text)
+    for i in range(len(text) + 1):
+        for j in range(i, len(text) + 1):
+            assert _parse_in_chunks(text, i, j) == expected, (i, j)
+
+
+def test_free_text_keeps_unescaped_quotes():
+    action, warnings = parse_action_call('do(action="Type", text="say "hi" now")')
+    assert action["text"] == 'say "hi" now'
+    assert warnings
+
+
+def test_text_around_the_call_is_ignored():
+    action, warnings = parse_action_call('Sure. do(action="Back") Done.')
+    assert action == {"_metadata": "do", "action": "Back"}
+    assert warnings
+
+
+def test_truncated_call_is_recovered():
+    action, warnings = parse_action_call('finish(message="all done')
+    assert action == {"_metadata": "finish", "message": "all done"}
+    assert warnings
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "no call here",
+        'do(action="Tap", element=[2.5e])',
+        'do(action="Tap", element=[foo])',
+        'do(action="Tap" element=[1, 2])',
+    ],
+)
+def test_invalid_calls_raise(text):
+    with pytest.raises(ActionParseError):
+        parse_action_call(text)
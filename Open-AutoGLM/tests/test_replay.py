@@ -0,0 +1,160 @@
+"""Tests for phone_agent.replay."""
+
+import base64
+from io import BytesIO
+
+import pytest
+from PIL import Image, ImageDraw
+
+from phone_agent.replay import (
+    ReplayCache,
+    ReplayConfig,
+    ReplayRecorder,
+    hash_distance,
+    perceptual_hash,
+    task_prefix,
+)
+
+LAUNCH = 'do(action="Launch", app="微信")'
+TAP = 'do(action="Tap", element=[500, 100])'
+TYPE = 'do(action="Type", text="张三")'
+
+
+def _screen(
+    color: str = "white",
+    box: tuple[int, int, int, int] | None = None,
+    stripes: bool = False,
+) -> str:
+    image = Image.new("RGB", (108, 240), color)
+    draw = ImageDraw.Draw(image)
+    if box is not None:
+        draw.rectangle(box, fill="black")
+    if stripes:
+        for x in range(0, 108, 12):
+            draw.rectangle((x, 0, x + 5, 240), fill="black")
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ReplayCache(
+        ReplayConfig(path=str(tmp_path / "replay.sqlite"), max_distance=10)
+    )
+    yield cache
+    cache.close()
+
+
+def _record_run(cache, task, steps, success=True):
+    """Run steps of (app, screen, action, action name) through a recorder."""
+    recorder = ReplayRecorder(cache, task)
+    hits = []
+    for number, (app, screen, action, name) in enumerate(steps, start=1):
+        hit, phash = recorder.lookup(number, app, screen)
+        hits.append(hit)
+        recorder.record(number, app, phash, "thinking", action, name, hit)
+    recorder.finish(success)
+    return hits
+
+
+def test_perceptual_hash_tolerates_small_changes():
+    base = perceptual_hash(_screen(box=(10, 100, 90, 140)))
+    similar = perceptual_hash(_screen(box=(10, 101, 90, 141)))
+    different = perceptual_hash(_screen(stripes=True))
+    assert hash_distance(base, similar) < hash_distance(base, different)
+    assert len(base) == 64
+
+
+def test_task_prefix_is_the_opening_clause():
+    assert task_prefix("打开微信，给张三发消息") == "打开微信"
+    assert task_prefix("  Open WeChat then message Bob") == "open wechat"
+    assert task_prefix("打开微信。搜索 张三", clauses=2) == "打开微信，搜索 张三"
+
+
+def test_successful_run_is_replayed(cache):
+    screen = _screen(box=(10, 100, 90, 140))
+    steps = [("Home", screen, LAUNCH, "Launch"), ("WeChat", screen, TAP, "Tap")]
+    assert _record_run(cache, "打开微信，看朋友圈", steps) == [None, None]
+
+    hits = _record_run(cache, "打开微信，看朋友圈", steps)
+    assert [hit.action for hit in hits] == [LAUNCH, TAP]
+    assert cache.stats()["hits"] == 2
+
+
+def test_failed_run_is_not_stored_and_invalidates_replayed_entries(cache):
+    screen = _screen()
+    steps = [("Home", screen, LAUNCH, "Launch")]
+    _record_run(cache, "打开微信", steps, success=False)
+    assert cache.stats()["entries"] == 0
+
+    _record_run(cache, "打开微信", steps)
+    hits = _record_run(cache, "打开微信", steps, success=False)
+    assert hits[0] is not None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_different_screen_or_app_is_a_miss(cache):
+    _record_run(
+        cache, "打开微信", [("Home", _screen(box=(10, 100, 90, 140)), LAUNCH, "Launch")]
+    )
+    recorder = ReplayRecorder(cache, "打开微信")
+    assert recorder.lookup(1, "Home", _screen(stripes=True))[0] is None
+    assert recorder.lookup(1, "Settings", _screen(box=(10, 100, 90, 140)))[0] is None
+
+
+def test_tasks_with_the_same_opening_share_steps_but_not_typed_text(cache):
+    screen = _screen()
+    _record_run(
+        cache,
+        "打开微信，给张三发消息",
+        [("Home", screen, LAUNCH, "Launch"), ("WeChat", screen, TYPE, "Type")],
+    )
+
+    recorder = ReplayRecorder(cache, "打开微信，给李四发消息")
+    hit, phash = recorder.lookup(1, "Home", screen)
+    assert hit.action == LAUNCH and hit.shared
+    recorder.record(1, "Home", phash, hit.thinking, hit.action, "Launch", hit)
+    # The typed name came from the other task
+    assert recorder.lookup(2, "WeChat", screen)[0] is None
+    assert cache.stats()["shared_hits"] == 1
+
+
+def test_steps_after_an_uncacheable_action_are_not_looked_up(cache):
+    screen = _screen()
+    recorder = ReplayRecorder(cache, "打开微信")
+    _, phash = recorder.lookup(1, "Home", screen)
+    recorder.record(1, "Home", phash, "t", 'do(action="Take_over")', "Take_over")
+    assert recorder.lookup(2, "Home", screen) == (None, None)
+
+
+def test_only_the_first_steps_are_cached(tmp_path):
+    cache = ReplayCache(
+        ReplayConfig(path=str(tmp_path / "r.sqlite"), max_replay_steps=1)
+    )
+    recorder = ReplayRecorder(cache, "打开微信")
+    assert recorder.lookup(2, "Home", _screen()) == (None, None)
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ReplayCache(ReplayConfig(path=str(tmp_path / "r.sqlite"), max_entries=1))
+    _record_run(cache, "打开微信", [("Home", _screen(), LAUNCH, "Launch")])
+    _record_run(cache, "打开设置", [("Home", _screen(), LAUNCH, "Launch")])
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"]) == (1, 1)
+    cache.close()
+
+
+def test_stats_persist_across_instances(tmp_path):
+    path = str(tmp_path / "r.sqlite")
+    cache = ReplayCache(ReplayConfig(path=path))
+    _record_run(cache, "打开微信", [("Home", _screen(), LAUNCH, "Launch")])
+    _record_run(cache, "打开微信", [("Home", _screen(), LAUNCH, "Launch")])
+    cache.close()
+
+    reopened = ReplayCache(ReplayConfig(path=path))
+    stats = reopened.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    reopened.close()
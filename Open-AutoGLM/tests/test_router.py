@@ -0,0 +1,127 @@
+"""Tests for phone_agent.model.router."""
+
+import time
+
+import pytest
+
+from phone_agent.model.router import EndpointRouter, RouterConfig
+
+
+@pytest.fixture
+def router():
+    router = EndpointRouter(
+        ["http://a/v1", "http://b/v1/"],
+        RouterConfig(ewma_alpha=0.5, eject_after_failures=2, health_interval=3600),
+    )
+    yield router
+    router.close()
+
+
+def _endpoint(router, url):
+    return next(e for e in router.endpoints if e.url == url)
+
+
+def test_ewma_tracks_time_to_first_token(router):
+    a = _endpoint(router, "http://a/v1")
+    a.inflight += 1
+    router.release(a, ttft=1.0)
+    assert a.ewma_ttft == 1.0
+    a.inflight += 1
+    router.release(a, ttft=0.2)
+    assert a.ewma_ttft == pytest.approx(0.6)
+
+
+def test_requests_go_to_the_lowest_expected_wait(router):
+    a, b = router.endpoints
+    a.ewma_ttft, b.ewma_ttft = 0.5, 0.2
+    assert router.acquire().url == "http://b/v1"
+    # b now has one request in flight: 0.2 * 2 < 0.5, so still b
+    assert router.acquire().url == "http://b/v1"
+    # 0.2 * 3 > 0.5
+    assert router.acquire().url == "http://a/v1"
+
+
+def test_unmeasured_endpoint_is_sampled_first(router):
+    a, b = router.endpoints
+    a.ewma_ttft = 0.1
+    assert router.acquire().url == b.url
+
+
+def test_exclude_and_exhaustion(router):
+    assert router.acquire(exclude=["http://a/v1"]).url == "http://b/v1"
+    assert router.acquire(exclude=["http://a/v1", "http://b/v1"]) is None
+
+
+def test_consecutive_failures_eject_the_endpoint(router):
+    a, b = router.endpoints
+    for _ in range(2):
+        a.inflight += 1
+        router.release(a, error=RuntimeError("boom"))
+    assert a.ejected and a.ejections == 1
+    assert a.last_error == "boom"
+    a.ewma_ttft, b.ewma_ttft = 0.01, 10.0
+    assert router.acquire().url == b.url
+
+
+def test_success_resets_the_failure_streak(router):
+    a = router.endpoints[0]
+    a.inflight += 3
+    router.release(a, error=RuntimeError("boom"))
+    router.release(a, ttft=0.1)
+    router.release(a, error=RuntimeError("boom"))
+    assert not a.ejected
+
+
+def test_cancelled_request_is_not_a_failure(router):
+    a = router.endpoints[0]
+    a.inflight += 2
+    router.release(a, error=RuntimeError("aborted"), cancelled=True)
+    router.release(a, error=RuntimeError("aborted"), cancelled=True)
+    assert not a.ejected and a.failures == 0 and a.inflight == 0
+
+
+def test_success_reinstates_an_ejected_endpoint(router):
+    a, b = router.endpoints
+    for _ in range(2):
+        a.inflight += 1
+        router.release(a, ttft=0.3)
+    for _ in range(2):
+        a.inflight += 1
+        router.release(a, error=RuntimeError("boom"))
+    assert a.ejected
+
+    a.inflight += 1
+    router.release(a, ttft=0.1)
+    assert not a.ejected
+    # Latency measured before the ejection is forgotten, not averaged in
+    assert a.ewma_ttft == 0.1
+
+
+def test_all_ejected_falls_back_to_the_oldest_ejection(router):
+    a, b = router.endpoints
+    for endpoint in (a, b):
+        for _ in range(2):
+            endpoint.inflight += 1
+            router.release(endpoint, error=RuntimeError("boom"))
+    assert router.acquire().url == a.url
+
+
+def test_health_check_reinstates_an_ejected_endpoint(monkeypatch):
+    router = EndpointRouter(
+        ["http://a/v1", "http://b/v1"], RouterConfig(health_interval=0.01)
+    )
+    probed = []
+    monkeypatch.setattr(router, "_probe", lambda url: probed.append(url) or True)
+    a = router.endpoints[0]
+    try:
+        for _ in range(2):
+            a.inflight += 1
+            router.release(a, error=RuntimeError("boom"))
+        assert a.ejected
+        deadline = time.monotonic() + 2
+        while a.ejected and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert not a.ejected
+        assert probed and set(probed) == {"http://a/v1"}
+    finally:
+        router.close()
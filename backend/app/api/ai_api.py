@@ -1,9 +1,11 @@
+import json
+from typing import Optional
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from app.models.ai_models import NLCommand, NLCommandRequest, AIResponse
-from app.services.ai_service import AIService
+from app.services.ai_service import ai_service
 
 router = APIRouter()
-ai_service = AIService()
 
 @router.post("/command/{device_id}", response_model=AIResponse)
 async def execute_nl_command(device_id: str, nl_command: NLCommandRequest):
@@ -38,39 +40,43 @@ async def execute_nl_command(device_id: str, nl_command: NLCommandRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/batch-command")
-async def execute_batch_command(nl_commands: list[NLCommand]):
-    """批量执行自然语言指令"""
+async def execute_batch_command(
+    nl_commands: list[NLCommand],
+    stream: bool = False,
+    max_parallel: Optional[int] = None
+):
+    """
+    批量执行自然语言指令（不同设备并发，同一设备依次执行）
+    
+    stream=true 时以 NDJSON 流式返回，每条指令完成即输出一行，最后一行为汇总；
+    否则等全部完成后按提交顺序返回结果
+    """
+    commands = [cmd.model_dump() for cmd in nl_commands]
+    
+    if stream:
+        async def generate():
+            async for result in ai_service.execute_batch(commands, max_parallel):
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+        
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+    
     try:
-        results = []
-        has_error = False
+        results: list = [None] * len(commands)
         error_messages = []
-        
-        for cmd in nl_commands:
-            result = await ai_service.execute_natural_language_command(
-                device_id=cmd.device_id,
-                command=cmd.command,
-                verbose=cmd.verbose,
-                max_steps=cmd.max_steps,
-                base_url=cmd.base_url,
-                model_name=cmd.model_name,
-                api_key=cmd.api_key
-            )
-            
-            # 检查单个命令的执行结果
-            success = result.get("success", True)
-            if not success:
-                has_error = True
-                error_msg = result.get("error", "执行失败")
-                error_messages.append(f"设备 {cmd.device_id}: {error_msg}")
-            
-            results.append({
-                "device_id": cmd.device_id,
-                "success": success,
-                "result": result
-            })
+        async for item in ai_service.execute_batch(commands, max_parallel):
+            if item["type"] != "device_result":
+                continue
+            results[item["index"]] = {
+                "device_id": item["device_id"],
+                "success": item["success"],
+                "result": item["result"]
+            }
+            if not item["success"]:
+                error_msg = item["result"].get("error", "执行失败")
+                error_messages.append(f"设备 {item['device_id']}: {error_msg}")
         
         # 如果有任何命令失败，返回错误
-        if has_error:
+        if error_messages:
             raise HTTPException(
                 status_code=500, 
                 detail=f"部分命令执行失败: {'; '.join(error_messages)}"
@@ -83,6 +89,14 @@ async def execute_batch_command(nl_commands: list[NLCommand]):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/cancel/{device_id}")
+async def cancel_command(device_id: str, reason: str = "用户取消"):
+    """取消设备上正在运行的指令，中断进行中的模型请求并释放设备"""
+    cancelled = await ai_service.cancel(device_id, reason)
+    if not cancelled:
+        raise HTTPException(status_code=404, detail=f"设备 {device_id} 没有正在运行的指令")
+    return {"success": True, "device_id": device_id}
+
 @router.get("/status")
 async def get_ai_status():
     """获取AI服务状态"""
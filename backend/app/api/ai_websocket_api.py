@@ -2,94 +2,223 @@
 AI WebSocket API - 实时 AI 交互日志
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from app.services.ai_service import AIService
+from app.services.log_bus import log_bus
 from app.utils.logger_utils import logger
 import json
 import asyncio
 import time
-from typing import Dict
+from typing import Dict, Optional
 
 router = APIRouter()
-ai_service = AIService()
 
-# 存储活跃的 WebSocket 连接
-active_connections: Dict[str, WebSocket] = {}
+# 客户端无消息时发送心跳的间隔(秒)
+_HEARTBEAT_INTERVAL = 30.0
+# 思考过程片段最长缓冲时间(秒)
+_THINKING_FLUSH_INTERVAL = 0.1
+
 
 @router.websocket("/ai-logs/{device_id}")
-async def ai_logs_websocket(websocket: WebSocket, device_id: str):
-    """AI 日志 WebSocket 连接"""
+async def ai_logs_websocket(websocket: WebSocket, device_id: str, since: Optional[int] = None):
+    """
+    AI 日志 WebSocket 连接
+
+    同一设备可以有多个连接，每条日志带有 seq 序号；
+    重连时传入 ?since=<最后收到的 seq> 可补发断线期间缓冲区中的日志
+    """
     await websocket.accept()
+    subscription = log_bus.subscribe(device_id, since)
+    logger.info(f"AI 日志 WebSocket 已连接: {device_id} (since={since})")
     
-    # 存储连接
-    connection_key = f"ai_logs_{device_id}"
-    active_connections[connection_key] = websocket
-    
-    logger.info(f"AI 日志 WebSocket 已连接: {device_id}")
+    async def send_loop():
+        while True:
+            message = await subscription.get(timeout=_HEARTBEAT_INTERVAL)
+            if message is None:
+                if subscription.closed:
+                    return
+                message = {"type": "heartbeat"}
+            await websocket.send_json(message)
     
+    sender = None
     try:
         # 发送连接确认
         await websocket.send_json({
             "type": "connected",
             "message": f"AI 日志流已连接 - 设备 {device_id}",
-            "device_id": device_id
+            "device_id": device_id,
+            "last_seq": log_bus.last_seq(device_id)
         })
+        # 日志由独立任务发送，慢速客户端只会积压自己的队列
+        sender = asyncio.create_task(send_loop())
         
-        # 保持连接活跃
         while True:
-            try:
-                # 接收客户端消息（心跳等）
-                message = await asyncio.wait_for(websocket.receive(), timeout=30.0)
-                
-                if message.get("type") == "websocket.receive":
-                    data = message.get("text")
-                    if data:
-                        try:
-                            parsed = json.loads(data)
-                            if parsed.get("type") == "ping":
-                                await websocket.send_json({"type": "pong"})
-                        except json.JSONDecodeError:
-                            pass
-                            
-            except asyncio.TimeoutError:
-                # 发送心跳
-                await websocket.send_json({"type": "heartbeat"})
+            receiver = asyncio.ensure_future(websocket.receive())
+            done, _ = await asyncio.wait({receiver, sender}, return_when=asyncio.FIRST_COMPLETED)
+            if sender in done:
+                receiver.cancel()
+                sender.result()
+                break
+            message = receiver.result()
+            if message.get("type") == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            data = message.get("text")
+            if data:
+                try:
+                    parsed = json.loads(data)
+                    if parsed.get("type") == "ping":
+                        subscription.put({"type": "pong"})
+                except json.JSONDecodeError:
+                    pass
                 
     except WebSocketDisconnect:
         logger.info(f"AI 日志 WebSocket 已断开: {device_id}")
     except Exception as e:
         logger.error(f"AI 日志 WebSocket 错误: {str(e)}")
     finally:
-        # 清理连接
-        if connection_key in active_connections:
-            del active_connections[connection_key]
+        log_bus.unsubscribe(subscription)
+        if sender is not None:
+            sender.cancel()
 
 async def broadcast_ai_log(device_id: str, log_type: str, message: str, data: dict = None):
-    """广播 AI 日志到对应设备的 WebSocket 连接"""
-    connection_key = f"ai_logs_{device_id}"
-    
-    if connection_key in active_connections:
-        websocket = active_connections[connection_key]
-        
-        try:
-            log_data = {
-                "type": "ai_log",
-                "log_type": log_type,  # info, step, model_request, model_response, action, error
-                "message": message,
-                "device_id": device_id,
-                "timestamp": int(time.time() * 1000),  # 毫秒级时间戳
-                "data": data or {}
-            }
-            
-            await websocket.send_json(log_data)
-            logger.debug(f"✅ 已广播 AI 日志到设备 {device_id}: [{log_type}] {message}")
-            
-        except Exception as e:
-            logger.warning(f"发送 AI 日志失败: {str(e)}")
-            # 连接可能已断开，清理
-            if connection_key in active_connections:
-                del active_connections[connection_key]
+    """
+    发布 AI 日志到设备的日志总线
+
+    只写入环形缓冲区和各订阅者的队列，不等待 WebSocket 发送
+    """
+    _publish_ai_log(device_id, log_type, message, data)
+
+
+def _publish_ai_log(device_id: str, log_type: str, message: str, data: dict = None):
+    seq = log_bus.publish(device_id, {
+        "type": "ai_log",
+        "log_type": log_type,  # info, step, model_request, model_response, action, error
+        "message": message,
+        "device_id": device_id,
+        "timestamp": int(time.time() * 1000),  # 毫秒级时间戳
+        "data": data or {}
+    })
+    logger.debug(f"已发布 AI 日志 #{seq} 到设备 {device_id}: [{log_type}] {message}")
+
+# 代理事件类型 -> 前端日志类型
+_EVENT_LOG_TYPES = {
+    "step_start": "step",
+    "screenshot_captured": "info",
+    "model_first_token": "model_request",
+    "thinking_delta": "model_response",
+    "model_response": "model_response",
+    "action_parsed": "action",
+    "action_executed": "action",
+    "step_end": "step",
+    "finish": "info",
+    "cancelled": "warning",
+    "error": "error",
+}
+
+
+def _describe_event(event: dict) -> str:
+    """生成代理事件的简短说明"""
+    event_type = event["type"]
+    data = event.get("data", {})
+    if event_type == "step_start":
+        return f"步骤 {event['step']}/{data.get('max_steps')} 开始"
+    if event_type == "screenshot_captured":
+        return f"截图完成 {data.get('width')}x{data.get('height')}，当前应用: {data.get('current_app')}（{data.get('duration_ms')}ms）"
+    if event_type == "model_first_token":
+        return f"模型首 Token 延迟: {data.get('ttft_ms')}ms"
+    if event_type == "thinking_delta":
+        return data.get("text", "")
+    if event_type == "model_response":
+        return f"模型响应完成（{data.get('duration_ms')}ms）: {data.get('action')}"
+    if event_type == "action_parsed":
+        action = data.get("action") or {}
+        return f"解析操作: {action.get('action') or action.get('_metadata')}"
+    if event_type == "action_executed":
+        status = "成功" if data.get("success") else "失败"
+        return (
+            f"操作 {data.get('action') or ''} 执行{status}（{data.get('duration_ms')}ms，"
+            f"设备命令 {data.get('device_ms')}ms，等待 {data.get('wait_ms')}ms）"
+        )
+    if event_type == "step_end":
+        return f"步骤 {event['step']} 结束，耗时 {data.get('timings', {}).get('total_ms')}ms"
+    if event_type == "cancelled":
+        return f"任务已取消: {data.get('reason')}"
+    return data.get("message", "")
+
+
+class _ThinkingBuffer:
+    """设备尚未发布的思考过程片段"""
+
+    def __init__(self, event: dict):
+        # 合并后的日志沿用第一个片段的步骤号和时间
+        self.event = event
+        self.text = ""
+        self.started = time.monotonic()
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+_thinking_buffers: Dict[str, _ThinkingBuffer] = {}
+
+
+def _publish_event(device_id: str, event: dict, message: str):
+    _publish_ai_log(
+        device_id,
+        _EVENT_LOG_TYPES.get(event["type"], "info"),
+        message,
+        {
+            "event": event["type"],
+            "step": event["step"],
+            "elapsed_ms": event["elapsed_ms"],
+            "event_timestamp": event["timestamp"],
+            **event.get("data", {})
+        }
+    )
+
+
+def _flush_thinking(device_id: str, complete_lines_only: bool = False):
+    """发布设备缓冲的思考过程（complete_lines_only 时只发布到最后一个换行为止）"""
+    buffer = _thinking_buffers.get(device_id)
+    if buffer is None:
+        return
+    if complete_lines_only:
+        end = buffer.text.rfind("\n") + 1
+        if end == 0:
+            return
     else:
-        logger.debug(f"⚠️ 设备 {device_id} 没有活跃的 AI 日志 WebSocket 连接")
+        end = len(buffer.text)
+    text, buffer.text = buffer.text[:end], buffer.text[end:]
+    if buffer.timer is not None:
+        buffer.timer.cancel()
+    del _thinking_buffers[device_id]
+    if text:
+        _publish_event(device_id, {**buffer.event, "data": {"text": text}}, text)
+    if buffer.text:
+        # 剩余的半行作为新片段重新计时
+        _buffer_thinking(device_id, buffer.event, buffer.text)
+
+
+def _buffer_thinking(device_id: str, event: dict, text: str):
+    buffer = _thinking_buffers.get(device_id)
+    if buffer is None:
+        buffer = _thinking_buffers[device_id] = _ThinkingBuffer(event)
+        buffer.timer = asyncio.get_running_loop().call_later(
+            _THINKING_FLUSH_INTERVAL, _flush_thinking, device_id
+        )
+    buffer.text += text
+
+
+async def broadcast_ai_event(device_id: str, event: dict):
+    """
+    广播 PhoneAgent 结构化事件（AgentEvent.to_dict() 格式）
+    
+    以 ai_log 消息发送以兼容现有前端，并附带原始事件类型、步骤号和时间信息。
+    思考过程的逐 Token 片段按行或每 100ms 合并为一条日志，避免挤占日志环形缓冲区
+    """
+    if event["type"] == "thinking_delta":
+        _buffer_thinking(device_id, event, event.get("data", {}).get("text", ""))
+        _flush_thinking(device_id, complete_lines_only=True)
+        return
+    # 先发布缓冲的思考过程，保持日志顺序
+    _flush_thinking(device_id)
+    _publish_event(device_id, event, _describe_event(event))
 
 # 导出广播函数供其他模块使用
-__all__ = ["router", "broadcast_ai_log"]
\ No newline at end of file
+__all__ = ["router", "broadcast_ai_log", "broadcast_ai_event"]
\ No newline at end of file
@@ -0,0 +1,125 @@
+"""
+设备集群控制 API
+对一组设备并发执行相同的控制操作，以 NDJSON 或 WebSocket 流式返回每台设备的结果
+"""
+import json
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import Optional, List
+from app.api.phone_control_api import BatchStep
+from app.services.fleet_service import fleet_service
+from app.services.phone_control_service import PhoneControlService
+from app.utils.logger_utils import logger
+
+router = APIRouter()
+
+
+# ==================== 请求模型 ====================
+
+class DeviceSelector(BaseModel):
+    device_ids: Optional[List[str]] = Field(None, description="设备ID列表")
+    tag: Optional[str] = Field(None, description="设备标签")
+    all: bool = Field(default=False, description="选择全部在线设备")
+
+
+class FleetRunRequest(BaseModel):
+    selector: DeviceSelector
+    action: Optional[BatchStep] = Field(None, description="单个操作（与 steps 二选一）")
+    steps: Optional[List[BatchStep]] = Field(None, description="操作序列（与 action 二选一）")
+    stop_on_error: bool = True
+    max_parallel: Optional[int] = Field(None, description="最大并发设备数，默认使用 FLEET_MAX_PARALLEL")
+
+
+class TagsRequest(BaseModel):
+    tags: List[str]
+
+
+async def _prepare(request: FleetRunRequest):
+    """解析目标设备和操作序列，参数错误时抛出 ValueError"""
+    steps = request.steps or ([request.action] if request.action else [])
+    if not steps:
+        raise ValueError("必须提供 action 或 steps")
+    steps = [step.model_dump() for step in steps]
+    # 与批量执行相同的校验：动作和参数有误时直接返回 400，而不是在每台设备上分别失败
+    PhoneControlService.prepare_batch(steps)
+    selector = request.selector
+    device_ids = await fleet_service.resolve_devices(selector.device_ids, selector.tag, selector.all)
+    if not device_ids:
+        raise ValueError("选择器没有匹配到任何设备")
+    return device_ids, steps
+
+
+# ==================== 集群执行 ====================
+
+@router.post("/run")
+async def run_fleet(request: FleetRunRequest):
+    """并发执行集群操作，以 NDJSON 流式返回每台设备的结果（每行一个 JSON 对象，最后一行为汇总）"""
+    try:
+        device_ids, steps = await _prepare(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def stream():
+        async for result in fleet_service.broadcast(
+            device_ids, steps, request.stop_on_error, request.max_parallel
+        ):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.websocket("/run/ws")
+async def run_fleet_websocket(websocket: WebSocket):
+    """WebSocket 版集群执行：客户端发送一条与 POST /run 相同的 JSON 请求，服务端逐条推送设备结果"""
+    await websocket.accept()
+    try:
+        while True:
+            data = await websocket.receive_text()
+            try:
+                request = FleetRunRequest.model_validate_json(data)
+                device_ids, steps = await _prepare(request)
+            except (ValidationError, ValueError) as e:
+                await websocket.send_json({"type": "error", "message": str(e)})
+                continue
+            
+            await websocket.send_json({"type": "started", "devices": device_ids})
+            async for result in fleet_service.broadcast(
+                device_ids, steps, request.stop_on_error, request.max_parallel
+            ):
+                await websocket.send_json(result)
+    except WebSocketDisconnect:
+        logger.info("集群控制 WebSocket 已断开")
+    except Exception as e:
+        logger.error(f"集群控制 WebSocket 错误: {str(e)}")
+        try:
+            await websocket.send_json({"type": "error", "message": str(e)})
+        except Exception:
+            pass
+
+
+# ==================== 标签管理 ====================
+
+@router.get("/tags")
+async def get_tags():
+    """获取全部设备标签"""
+    return {"success": True, "tags": fleet_service.get_tags()}
+
+
+@router.put("/tags/{device_id}")
+async def set_tags(device_id: str, request: TagsRequest):
+    """设置设备标签（覆盖原有标签，传空列表即清除）"""
+    tags = fleet_service.set_tags(device_id, request.tags)
+    return {"success": True, "device_id": device_id, "tags": tags}
+
+
+@router.get("/devices")
+async def resolve_devices(tag: Optional[str] = None, all: bool = False):
+    """预览选择器匹配到的设备"""
+    try:
+        device_ids = await fleet_service.resolve_devices(tag=tag, all_devices=all)
+        return {"success": True, "devices": device_ids}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
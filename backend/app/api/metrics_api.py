@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from app.utils.metrics_utils import metrics
+
+router = APIRouter()
+
+
+@router.get("/")
+async def get_metrics():
+    """获取服务运行指标"""
+    return {"success": True, "metrics": metrics.snapshot()}
@@ -4,8 +4,8 @@
 """
 import asyncio
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any
 from app.services.phone_control_service import phone_control_service
 
 router = APIRouter()
@@ -34,6 +34,7 @@ class LongPressRequest(BaseModel):
 
 class TextInputRequest(BaseModel):
     text: str
+    keep_keyboard: bool = Field(default=False, description="输入后保持 ADB Keyboard，需调用 restore-keyboard 恢复")
 
 
 class KeyPressRequest(BaseModel):
@@ -49,6 +50,17 @@ class ScrollRequest(BaseModel):
     distance: int = 500
 
 
+class BatchStep(BaseModel):
+    action: str = Field(..., description="动作名称，如 tap、swipe、press_home、scroll_up、wait")
+    params: Dict[str, Any] = Field(default_factory=dict, description="动作参数，与单个接口的请求体一致")
+    delay_ms: int = Field(default=0, description="本步骤执行完成后的等待时间（毫秒）")
+
+
+class BatchRequest(BaseModel):
+    steps: List[BatchStep]
+    stop_on_error: bool = True
+
+
 # ==================== 基础控制 ====================
 
 @router.post("/{device_id}/tap")
@@ -106,18 +118,48 @@ async def long_press(device_id: str, request: LongPressRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ==================== 批量操作 ====================
+
+@router.post("/{device_id}/batch")
+async def batch(device_id: str, request: BatchRequest):
+    """在同一个 shell 通道上按顺序执行一组操作，返回每一步的耗时"""
+    if not request.steps:
+        raise HTTPException(status_code=400, detail="steps 不能为空")
+    try:
+        return await phone_control_service.run_batch(
+            device_id,
+            [step.model_dump() for step in request.steps],
+            request.stop_on_error
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ==================== 文本输入 ====================
 
 @router.post("/{device_id}/input-text")
 async def input_text(device_id: str, request: TextInputRequest):
     """输入文本"""
     try:
-        asyncio.create_task(phone_control_service.input_text(device_id, request.text))
+        asyncio.create_task(
+            phone_control_service.input_text(device_id, request.text, request.keep_keyboard)
+        )
         return {"success": True, "action": "input_text", "message": "文本输入命令已发送"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/{device_id}/restore-keyboard")
+async def restore_keyboard(device_id: str):
+    """恢复输入文本前的原输入法（keep_keyboard 输入后 ADB Keyboard 会保持为当前输入法）"""
+    result = await phone_control_service.restore_keyboard(device_id)
+    if not result.get("success"):
+        raise HTTPException(status_code=500, detail=result.get("error", "操作失败"))
+    return result
+
+
 @router.post("/{device_id}/clear-text")
 async def clear_text(device_id: str, count: int = 100):
     """清除文本"""
@@ -236,6 +278,15 @@ async def get_screen_size(device_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{device_id}/screen-geometry")
+async def get_screen_geometry(device_id: str, refresh: bool = False):
+    """获取屏幕几何信息（尺寸、分辨率覆盖、密度、旋转、刘海区域），refresh=true 时强制重新查询"""
+    result = await phone_control_service.get_screen_geometry(device_id, refresh)
+    if not result.get("success"):
+        raise HTTPException(status_code=500, detail=result.get("error", "操作失败"))
+    return result
+
+
 @router.post("/{device_id}/screenshot")
 async def screenshot(device_id: str, save_path: str = "/sdcard/screenshot.png"):
     """截图"""
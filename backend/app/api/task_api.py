@@ -0,0 +1,103 @@
+"""
+AI 任务 API
+提交后立即返回任务ID，任务在后台排队执行，客户端无需保持连接，之后按ID查询状态和结果
+"""
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from app.services.task_queue import task_queue, QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED
+
+router = APIRouter()
+
+TASK_STATUSES = (QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED)
+
+
+# ==================== 请求模型 ====================
+
+class TaskSubmitRequest(BaseModel):
+    model_config = {"protected_namespaces": ()}
+
+    device_id: str = Field(..., description="目标设备ID")
+    command: str = Field(..., description="自然语言指令")
+    tenant: str = Field(default="default", description="租户（调度时各租户轮流分派）")
+    priority: int = Field(default=0, description="优先级，越大越先执行（同一租户内）")
+    max_steps: Optional[int] = Field(None, description="最大执行步数")
+    verbose: bool = Field(default=False, description="是否输出详细日志")
+    base_url: Optional[str] = Field(None, description="AI模型服务地址")
+    model_name: Optional[str] = Field(None, description="AI模型名称")
+    api_key: Optional[str] = Field(None, description="API密钥")
+
+    def to_task(self):
+        return {
+            "device_id": self.device_id,
+            "command": self.command,
+            "tenant": self.tenant,
+            "priority": self.priority,
+            "params": self.model_dump(
+                include={"max_steps", "verbose", "base_url", "model_name", "api_key"},
+                exclude_none=True
+            )
+        }
+
+
+# ==================== 任务操作 ====================
+
+@router.post("")
+async def submit_task(request: TaskSubmitRequest):
+    """提交单个任务"""
+    try:
+        task = (await task_queue.submit([request.to_task()]))[0]
+        return {"success": True, "task": task}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/batch")
+async def submit_tasks(requests: List[TaskSubmitRequest]):
+    """批量提交任务（一次写入），返回全部任务ID"""
+    if not requests:
+        raise HTTPException(status_code=400, detail="任务列表为空")
+    try:
+        tasks = await task_queue.submit([request.to_task() for request in requests])
+        return {"success": True, "task_ids": [task["id"] for task in tasks]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("")
+async def list_tasks(
+    status: Optional[str] = None,
+    device_id: Optional[str] = None,
+    tenant: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0
+):
+    """按状态/设备/租户列出任务（不含执行结果）"""
+    if status and status not in TASK_STATUSES:
+        raise HTTPException(status_code=400, detail=f"未知的任务状态: {status}")
+    tasks = await task_queue.list_tasks(status, device_id, tenant, max(1, min(limit, 1000)), max(0, offset))
+    return {"success": True, "tasks": tasks}
+
+
+@router.get("/stats")
+async def get_stats():
+    """队列统计"""
+    return {"success": True, "stats": await task_queue.stats()}
+
+
+@router.get("/{task_id}")
+async def get_task(task_id: str):
+    """获取任务状态和执行结果"""
+    task = await task_queue.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail=f"任务不存在: {task_id}")
+    return {"success": True, "task": task}
+
+
+@router.post("/{task_id}/cancel")
+async def cancel_task(task_id: str):
+    """取消任务（排队中立即取消，运行中的任务中断代理后标记为已取消）"""
+    task = await task_queue.cancel(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail=f"任务不存在: {task_id}")
+    return {"success": True, "task": task}
@@ -0,0 +1,71 @@
+"""
+执行记录 API
+查询进程内执行的 AI 任务的逐步记录（动作、思考、耗时）和截图
+"""
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from app.core.config import settings
+from app.services.ai_service import ai_service
+
+router = APIRouter()
+
+TRACE_STATUSES = ("running", "succeeded", "failed", "cancelled")
+
+
+async def _get_store():
+    """获取执行记录存储（首次使用时加载 phone_agent）"""
+    if not settings.TRACE_STORE_ENABLED:
+        raise HTTPException(status_code=404, detail="执行记录未启用 (TRACE_STORE_ENABLED=False)")
+    if ai_service.runner.trace_store is None:
+        await ai_service.runner.warm_up()
+    store = ai_service.runner.trace_store
+    if store is None:
+        raise HTTPException(status_code=503, detail="执行记录存储未就绪")
+    return store
+
+
+@router.get("")
+async def list_traces(
+    device_id: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0
+):
+    """按设备/状态列出执行记录（最新的在前，不含步骤详情）"""
+    if status and status not in TRACE_STATUSES:
+        raise HTTPException(status_code=400, detail=f"未知的执行状态: {status}")
+    store = await _get_store()
+    runs = store.list_runs(device_id, status, max(1, min(limit, 500)), max(0, offset))
+    return {"success": True, "traces": runs}
+
+
+@router.get("/stats")
+async def get_trace_stats():
+    """执行记录存储统计"""
+    store = await _get_store()
+    return {"success": True, "stats": store.stats()}
+
+
+@router.get("/screenshots/{digest}")
+async def get_trace_screenshot(digest: str):
+    """获取步骤截图（JPEG，按内容哈希寻址）"""
+    store = await _get_store()
+    path = store.screenshot_path(digest)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"截图不存在: {digest}")
+    # 内容寻址，同一地址的内容不会变化
+    return FileResponse(path, media_type="image/jpeg", headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+
+@router.get("/{trace_id}")
+async def get_trace(trace_id: str):
+    """获取一次执行的全部步骤"""
+    store = await _get_store()
+    loop = asyncio.get_running_loop()
+    # 读取（可能已压缩的）分段文件，不占用事件循环
+    trace = await loop.run_in_executor(None, store.get_run, trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"执行记录不存在: {trace_id}")
+    return {"success": True, "trace": trace}
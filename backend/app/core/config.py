@@ -17,16 +17,47 @@ class Settings(BaseSettings):
     # ADB配置
     ADB_PATH: str = os.getenv("ADB_PATH", "adb")
     SCRCPY_PATH: str = os.getenv("SCRCPY_PATH", "scrcpy")
+    ADB_BACKGROUND_MAX_PER_DEVICE: int = int(os.getenv("ADB_BACKGROUND_MAX_PER_DEVICE", 8))  # 每台设备同时存在的后台 adb 进程上限
+    ADB_BACKGROUND_TIMEOUT: float = float(os.getenv("ADB_BACKGROUND_TIMEOUT", 15))  # 后台 adb 进程超时（秒），超时强制结束
     
     # Open-AutoGLM配置
-    AUTOGLM_BASE_URL: str = os.getenv("AUTOGLM_BASE_URL", "http://localhost:8000/v1")
+    AUTOGLM_BASE_URL: str = os.getenv("AUTOGLM_BASE_URL", "http://localhost:8000/v1")  # 多个副本用逗号分隔
     AUTOGLM_MODEL_NAME: str = os.getenv("AUTOGLM_MODEL_NAME", "autoglm-phone-9b")
     AUTOGLM_API_KEY: str = os.getenv("AUTOGLM_API_KEY", "EMPTY")
     AUTOGLM_MAX_STEPS: int = int(os.getenv("AUTOGLM_MAX_STEPS", 100))
+    AGENT_RUNNER_MODE: str = os.getenv("AGENT_RUNNER_MODE", "inprocess")  # inprocess: 进程内执行池; subprocess: 每条指令启动 main.py
+    AGENT_RUNNER_WORKERS: int = int(os.getenv("AGENT_RUNNER_WORKERS", 8))  # 进程内执行池线程数（同时运行的 AI 任务上限）
+    AGENT_MODEL_CHECK_TTL: float = float(os.getenv("AGENT_MODEL_CHECK_TTL", 600))  # 模型连通性检查结果复用时间(秒)
+    MODEL_GATEWAY_ENABLED: bool = os.getenv("MODEL_GATEWAY_ENABLED", "True") == "True"  # 多个代理的模型请求经批处理网关合并调度
+    MODEL_GATEWAY_WINDOW_MS: float = float(os.getenv("MODEL_GATEWAY_WINDOW_MS", 15))  # 批处理收集窗口(毫秒)
+    MODEL_GATEWAY_MAX_INFLIGHT: int = int(os.getenv("MODEL_GATEWAY_MAX_INFLIGHT", 16))  # 同时发往模型服务的最大请求数
+    MODEL_CONTINUOUS_USAGE_STATS: bool = os.getenv("MODEL_CONTINUOUS_USAGE_STATS", "False") == "True"  # 流式每个分块都返回 token 用量（仅 vLLM/SGLang 支持）
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "True") == "True"  # 相同请求（temperature=0）直接复用模型响应
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 256))  # 响应缓存条数上限(LRU)
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", 600))  # 响应缓存有效期(秒)
+    RESPONSE_CACHE_PATH: str = os.getenv("RESPONSE_CACHE_PATH", "")  # 响应缓存持久化文件，留空则只保存在内存
+    REPLAY_CACHE_ENABLED: bool = os.getenv("REPLAY_CACHE_ENABLED", "False") == "True"  # 复用开头分句相同的任务（如“打开微信，...”）前几步的历史决策，跳过模型调用
+    REPLAY_CACHE_PATH: str = os.getenv("REPLAY_CACHE_PATH", "data/replay_cache.sqlite")  # 回放缓存数据库路径
+    REPLAY_CACHE_MAX_DISTANCE: int = int(os.getenv("REPLAY_CACHE_MAX_DISTANCE", 10))  # 截图感知哈希允许的最大差异位数(共256位)
+    TRACE_STORE_ENABLED: bool = os.getenv("TRACE_STORE_ENABLED", "True") == "True"  # 记录每次执行的逐步动作、思考、耗时和截图
+    TRACE_STORE_DIR: str = os.getenv("TRACE_STORE_DIR", "data/traces")  # 执行记录目录
+    TRACE_STORE_MAX_SEGMENTS: int = int(os.getenv("TRACE_STORE_MAX_SEGMENTS", 50))  # 保留的记录分段数(每段约8MB)，超出时删除最旧的分段及其截图
+    AGENT_ASYNC_DEVICE_LAYER: bool = os.getenv("AGENT_ASYNC_DEVICE_LAYER", "False") == "True"  # 代理的设备操作经事件循环上的异步设备层执行（每台设备一个常驻 adb shell）
     
     # 设备配置
     MAX_DEVICES: int = int(os.getenv("MAX_DEVICES", 100))
     SCREENSHOT_INTERVAL: int = int(os.getenv("SCREENSHOT_INTERVAL", 1))  # 截图间隔(秒)
+    SCREEN_GEOMETRY_TTL: float = float(os.getenv("SCREEN_GEOMETRY_TTL", 300))  # 屏幕几何缓存有效期(秒)
+    FLEET_MAX_PARALLEL: int = int(os.getenv("FLEET_MAX_PARALLEL", 16))  # 集群控制最大并发设备数
+    AI_BATCH_MAX_PARALLEL: int = int(os.getenv("AI_BATCH_MAX_PARALLEL", 8))  # 批量 AI 指令同时执行的最大条数
+    AI_LOG_BUFFER_SIZE: int = int(os.getenv("AI_LOG_BUFFER_SIZE", 1000))  # 每台设备保留的 AI 日志条数（供重连补发）
+    AI_LOG_SUBSCRIBER_QUEUE: int = int(os.getenv("AI_LOG_SUBSCRIBER_QUEUE", 500))  # 每个 AI 日志连接的发送队列长度，满时丢弃最旧的日志
+    TASK_QUEUE_PATH: str = os.getenv("TASK_QUEUE_PATH", "data/tasks.sqlite")  # 任务队列数据库路径
+    TASK_WORKERS: int = int(os.getenv("TASK_WORKERS", 8))  # 任务队列同时执行的最大任务数
+    TASK_MAX_PER_TENANT: int = int(os.getenv("TASK_MAX_PER_TENANT", 0))  # 单个租户同时执行的最大任务数，0 表示不限
+    TASK_POLL_INTERVAL: float = float(os.getenv("TASK_POLL_INTERVAL", 2))  # 调度器空闲时的检查间隔(秒)
+    TASK_PREEMPT_PRIORITY_GAP: int = int(os.getenv("TASK_PREEMPT_PRIORITY_GAP", 10))  # 排队任务优先级高出同设备运行中任务该值时抢占，0 表示不抢占
+    TASK_RETENTION_DAYS: float = float(os.getenv("TASK_RETENTION_DAYS", 7))  # 已结束任务的保留天数
 
 settings = Settings()
 
@@ -1,10 +1,11 @@
 """数据模型模块"""
-from .device_models import DeviceInfo, DeviceCommand
+from .device_models import DeviceInfo, DeviceCommand, ScreenGeometry
 from .ai_models import NLCommand, NLCommandRequest, AIResponse
 
 __all__ = [
     "DeviceInfo",
     "DeviceCommand",
+    "ScreenGeometry",
     "NLCommand",
     "NLCommandRequest",
     "AIResponse",
@@ -1,6 +1,6 @@
 """设备相关数据模型"""
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, Dict
 
 
 class DeviceInfo(BaseModel):
@@ -45,3 +45,34 @@ class DeviceCommand(BaseModel):
     
     command: str = Field(..., description="ADB命令")
     timeout: Optional[int] = Field(30, description="命令超时时间（秒）")
+
+
+class ScreenGeometry(BaseModel):
+    """屏幕几何信息模型"""
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "width": 1080,
+                "height": 2400,
+                "physical_width": 1080,
+                "physical_height": 2400,
+                "override_width": None,
+                "override_height": None,
+                "density": 420,
+                "override_density": None,
+                "rotation": 0,
+                "cutout_insets": {"left": 0, "top": 136, "right": 0, "bottom": 0}
+            }
+        }
+    }
+    
+    width: int = Field(..., description="当前方向下的有效宽度（已考虑分辨率覆盖和旋转）")
+    height: int = Field(..., description="当前方向下的有效高度（已考虑分辨率覆盖和旋转）")
+    physical_width: int = Field(..., description="物理宽度")
+    physical_height: int = Field(..., description="物理高度")
+    override_width: Optional[int] = Field(None, description="wm size 覆盖宽度")
+    override_height: Optional[int] = Field(None, description="wm size 覆盖高度")
+    density: Optional[int] = Field(None, description="物理像素密度")
+    override_density: Optional[int] = Field(None, description="wm density 覆盖密度")
+    rotation: int = Field(default=0, description="屏幕旋转（0-3，每单位 90 度）")
+    cutout_insets: Dict[str, int] = Field(default_factory=dict, description="刘海/挖孔区域的边距")
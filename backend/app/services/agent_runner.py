@@ -0,0 +1,441 @@
+"""
+进程内 AI 代理执行池
+在常驻线程池中直接运行 PhoneAgent，复用已导入的模块和模型连通性检查结果，
+步骤结果通过回调以结构化事件的形式回传到事件循环
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from app.core.config import settings
+from app.utils.adb_utils import get_adb_path, get_shell_pool
+from app.utils.autoglm_utils import ensure_autoglm_importable
+from app.utils.logger_utils import logger
+from app.utils.metrics_utils import metrics
+
+# 单条指令的最长执行时间（秒），与子进程模式一致
+_TASK_TIMEOUT = 3600.0
+
+# 事件回调: 接收 AgentEvent.to_dict() 格式的事件
+EventCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class AgentRunnerPool:
+    """进程内 AI 代理执行池类"""
+
+    def __init__(self, autoglm_dir: Path):
+        self.autoglm_dir = autoglm_dir
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.AGENT_RUNNER_WORKERS,
+            thread_name_prefix="agent-runner"
+        )
+        # 正在执行任务的设备（同一设备同时只运行一个代理）
+        self.active_devices: Set[str] = set()
+        # 设备 -> 正在运行的 PhoneAgent（用于取消）
+        self._agents: Dict[str, Any] = {}
+        # 代理创建前收到的取消请求: 设备 -> 原因
+        self._pending_cancels: Dict[str, str] = {}
+        self._agents_lock = threading.Lock()
+        # (base_url, model, api_key) -> 检查通过时间
+        self._model_checks: Dict[Tuple[str, str, str], float] = {}
+        self._import_lock = threading.Lock()
+        self._imported = False
+        # 所有代理共用的模型请求批处理网关（MODEL_GATEWAY_ENABLED 时创建）
+        self.gateway = None
+        # 所有代理共用的模型响应缓存（RESPONSE_CACHE_ENABLED 时创建）
+        self.response_cache = None
+        # 多副本模型服务的路由器，按副本列表共享（延迟统计与健康状态）
+        self._routers: Dict[Tuple[str, ...], Any] = {}
+        # 任务开头几步的决策回放缓存（REPLAY_CACHE_ENABLED 时创建）
+        self.replay_cache = None
+        # 逐步执行记录（TRACE_STORE_ENABLED 时创建）
+        self.trace_store = None
+        # 所有代理共用的异步设备层（AGENT_ASYNC_DEVICE_LAYER 时创建，运行在服务事件循环上）
+        self.device_backend = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # 启动时的后台预加载任务（保持引用，避免任务被垃圾回收）
+        self.warm_up_task: Optional[asyncio.Task] = None
+        metrics.register_provider("agent_runner", self.snapshot)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """执行池状态"""
+        return {
+            "workers": settings.AGENT_RUNNER_WORKERS,
+            "active_devices": sorted(self.active_devices),
+            "modules_loaded": self._imported,
+            "cached_model_checks": len(self._model_checks),
+            "gateway": self.gateway.snapshot() if self.gateway else None,
+            "response_cache": self.response_cache.stats() if self.response_cache else None,
+            "replay_cache": self.replay_cache.stats() if self.replay_cache else None,
+            "trace_store": self.trace_store.stats() if self.trace_store else None,
+            "actions": self._action_stats(),
+            "device_channels": self.device_backend.channels.stats() if self.device_backend else None,
+            "model_endpoints": [
+                endpoint for router in self._routers.values() for endpoint in router.snapshot()
+            ]
+        }
+
+    def _action_stats(self) -> List[Dict[str, Any]]:
+        """各操作的设备命令耗时与等待耗时（按总耗时降序，最慢的操作在前）"""
+        if not self._imported:
+            return []
+        from phone_agent.actions import ACTION_STATS
+        return ACTION_STATS.snapshot()
+
+    # ==================== 模块加载 ====================
+
+    def _ensure_imported(self):
+        """将 Open-AutoGLM 加入模块搜索路径并导入 phone_agent（每个进程只执行一次）"""
+        if self._imported:
+            return
+        with self._import_lock:
+            if self._imported:
+                return
+            start = time.perf_counter()
+            ensure_autoglm_importable(self.autoglm_dir)
+            import phone_agent  # noqa: F401
+            import phone_agent.agent  # noqa: F401
+            if settings.MODEL_GATEWAY_ENABLED:
+                from phone_agent.model import BatchingGateway, GatewayConfig
+                self.gateway = BatchingGateway(GatewayConfig(
+                    window_ms=settings.MODEL_GATEWAY_WINDOW_MS,
+                    max_inflight=settings.MODEL_GATEWAY_MAX_INFLIGHT
+                ))
+            if settings.RESPONSE_CACHE_ENABLED:
+                from phone_agent.model import ResponseCache, ResponseCacheConfig
+                self.response_cache = ResponseCache(ResponseCacheConfig(
+                    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+                    ttl=settings.RESPONSE_CACHE_TTL,
+                    path=settings.RESPONSE_CACHE_PATH or None
+                ))
+            if settings.REPLAY_CACHE_ENABLED:
+                from phone_agent.replay import ReplayCache, ReplayConfig
+                self.replay_cache = ReplayCache(ReplayConfig(
+                    path=settings.REPLAY_CACHE_PATH,
+                    max_distance=settings.REPLAY_CACHE_MAX_DISTANCE
+                ))
+            if settings.TRACE_STORE_ENABLED:
+                from phone_agent.trace import TraceConfig, TraceStore
+                self.trace_store = TraceStore(TraceConfig(
+                    root=settings.TRACE_STORE_DIR,
+                    max_segments=settings.TRACE_STORE_MAX_SEGMENTS
+                ))
+            if settings.AGENT_ASYNC_DEVICE_LAYER:
+                from phone_agent.adb.async_device import AsyncADBBackend
+                # 与后台控制接口共用每台设备的持久 shell 通道
+                self.device_backend = AsyncADBBackend(
+                    adb_path=get_adb_path(), channels=get_shell_pool()
+                )
+            self._imported = True
+            logger.info(f"phone_agent 模块已加载，耗时 {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    def start_warm_up(self) -> asyncio.Task:
+        """在事件循环中启动后台预加载任务"""
+        if self.warm_up_task is None:
+            self.warm_up_task = asyncio.create_task(self.warm_up())
+        return self.warm_up_task
+
+    async def warm_up(self):
+        """在后台线程中预先加载 phone_agent，避免首条指令承担导入开销"""
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self.executor, self._ensure_imported)
+        except Exception as e:
+            logger.warning(f"预加载 phone_agent 失败: {str(e)}")
+
+    # ==================== 模型检查 ====================
+
+    def _check_model_api(self, base_url: str, model_name: str, api_key: str):
+        """检查模型服务连通性，多个副本（逗号分隔）中任一可用即通过"""
+        urls = [url.strip() for url in base_url.split(",") if url.strip()]
+        errors = []
+        for url in urls:
+            try:
+                self._check_endpoint(url, model_name, api_key)
+                return
+            except Exception as e:
+                errors.append(str(e))
+        raise Exception("; ".join(errors))
+
+    def _check_endpoint(self, base_url: str, model_name: str, api_key: str):
+        """检查单个模型服务，结果在 AGENT_MODEL_CHECK_TTL 内复用"""
+        key = (base_url, model_name, api_key)
+        checked_at = self._model_checks.get(key)
+        if checked_at is not None and time.monotonic() - checked_at < settings.AGENT_MODEL_CHECK_TTL:
+            metrics.inc("agent_runner.model_check.cached")
+            return
+
+        from openai import OpenAI
+
+        client = OpenAI(base_url=base_url, api_key=api_key, timeout=30.0)
+        try:
+            response = client.chat.completions.create(
+                model=model_name,
+                messages=[{"role": "user", "content": "Hi"}],
+                max_tokens=5,
+                temperature=0.0,
+                stream=False,
+            )
+        except Exception as e:
+            raise Exception(f"模型服务不可用 ({base_url}): {str(e)}")
+        if not response.choices:
+            raise Exception(f"模型服务返回空响应 ({base_url})")
+        self._model_checks[key] = time.monotonic()
+        metrics.inc("agent_runner.model_check.performed")
+
+    def _get_router(self, model_config):
+        """获取多副本模型服务共用的路由器（单一地址时返回 None）"""
+        if len(model_config.base_urls) < 2:
+            return None
+        key = tuple(model_config.base_urls)
+        with self._import_lock:
+            router = self._routers.get(key)
+            if router is None:
+                from phone_agent.model import EndpointRouter
+                router = EndpointRouter(model_config.base_urls, api_key=model_config.api_key)
+                self._routers[key] = router
+        return router
+
+    # ==================== 任务执行 ====================
+
+    def _run_agent(
+        self,
+        device_id: str,
+        command: str,
+        max_steps: int,
+        base_url: str,
+        model_name: str,
+        api_key: str,
+        verbose: bool,
+        emit: Callable[[Dict[str, Any]], None]
+    ) -> Dict[str, Any]:
+        """在工作线程中运行 PhoneAgent"""
+        self._ensure_imported()
+        from phone_agent.agent import AgentConfig, PhoneAgent, StepResult
+        from phone_agent.events import AgentEvent, EventType
+        from phone_agent.model import ModelClient, ModelConfig
+        from phone_agent.async_device_factory import BlockingDeviceBridge
+        from phone_agent.device_factory import DeviceFactory, DeviceType
+
+        self._check_model_api(base_url, model_name, api_key)
+
+        steps: List[Dict[str, Any]] = []
+        cancelled: List[str] = []
+        # FINISH 事件中的运行结果（正常完成/达到最大步数/模型错误）
+        finished: List[bool] = []
+
+        def on_step(result: StepResult):
+            steps.append({
+                "index": len(steps) + 1,
+                "success": result.success,
+                "finished": result.finished,
+                "action": result.action,
+                "thinking": result.thinking,
+                "message": result.message,
+                "timings": result.timings,
+                "tokens": result.tokens
+            })
+
+        def on_event(event: AgentEvent):
+            if event.type == EventType.CANCELLED:
+                cancelled.append(event.data.get("reason", ""))
+            elif event.type == EventType.FINISH:
+                finished.append(bool(event.data.get("success")))
+            emit(event.to_dict())
+
+        def on_confirmation(message: str) -> bool:
+            # 服务端无人值守，敏感操作一律拒绝
+            on_event(AgentEvent(EventType.ERROR, len(steps) + 1, {"message": f"敏感操作已拒绝: {message}"}))
+            return False
+
+        def on_takeover(message: str):
+            on_event(AgentEvent(EventType.ERROR, len(steps) + 1, {"message": f"需要人工接管: {message}"}))
+
+        model_config = ModelConfig(
+            base_url=base_url,
+            model_name=model_name,
+            api_key=api_key,
+            continuous_usage_stats=settings.MODEL_CONTINUOUS_USAGE_STATS
+        )
+        device_factory = None
+        if self.device_backend is not None:
+            # 设备命令在事件循环上执行，所有代理共用每台设备的常驻 shell
+            device_factory = DeviceFactory(
+                DeviceType.ADB,
+                module=BlockingDeviceBridge(self.device_backend, self._loop)
+            )
+        agent = PhoneAgent(
+            model_config=model_config,
+            agent_config=AgentConfig(
+                max_steps=max_steps,
+                device_id=device_id,
+                verbose=verbose,
+                replay_cache=self.replay_cache,
+                trace_store=self.trace_store,
+                device_factory=device_factory
+            ),
+            confirmation_callback=on_confirmation,
+            takeover_callback=on_takeover,
+            step_callback=on_step,
+            event_callback=on_event,
+            model_client=ModelClient(
+                model_config,
+                gateway=self.gateway,
+                cache=self.response_cache,
+                router=self._get_router(model_config)
+            )
+        )
+        with self._agents_lock:
+            self._agents[device_id] = agent
+            reason = self._pending_cancels.pop(device_id, None)
+        if reason is not None:
+            agent.cancel(reason)
+        try:
+            final_message = agent.run(command)
+        finally:
+            with self._agents_lock:
+                self._agents.pop(device_id, None)
+            agent.close()
+        return {
+            "result": final_message,
+            "steps": steps,
+            "success": not cancelled and bool(finished) and finished[-1],
+            "cancelled": bool(cancelled),
+            "cancel_reason": cancelled[0] if cancelled else None,
+            "trace_id": agent.trace_id
+        }
+
+    async def run(
+        self,
+        device_id: str,
+        command: str,
+        max_steps: int,
+        base_url: str,
+        model_name: str,
+        api_key: str,
+        verbose: bool = True,
+        on_event: Optional[EventCallback] = None
+    ) -> Dict[str, Any]:
+        """
+        在执行池中运行一条自然语言指令
+
+        Args:
+            on_event: 事件回调，按产生顺序在事件循环中调用
+
+        Returns:
+            执行结果（result/steps/success/duration_ms）
+        """
+        if device_id in self.active_devices:
+            raise Exception(f"设备 {device_id} 正在执行其他 AI 任务")
+
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        events: asyncio.Queue = asyncio.Queue()
+
+        def emit(event: Dict[str, Any]):
+            # 工作线程 -> 事件循环
+            loop.call_soon_threadsafe(events.put_nowait, event)
+
+        async def forward_events():
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                if on_event is not None:
+                    try:
+                        await on_event(event)
+                    except Exception as e:
+                        logger.warning(f"转发 AI 事件失败: {str(e)}")
+
+        self.active_devices.add(device_id)
+        forwarder = asyncio.create_task(forward_events())
+        start = time.perf_counter()
+        metrics.inc("agent_runner.tasks")
+        try:
+            future = loop.run_in_executor(
+                self.executor,
+                self._run_agent,
+                device_id, command, max_steps, base_url, model_name, api_key, verbose, emit
+            )
+            try:
+                result = await asyncio.wait_for(asyncio.shield(future), timeout=_TASK_TIMEOUT)
+            except asyncio.TimeoutError:
+                # 工作线程无法强制结束：取消代理，等待其在下一个阶段边界退出后再释放设备
+                logger.error(f"设备 {device_id}: AI 任务执行超时，正在取消")
+                self.cancel(device_id, "任务执行超时")
+                await self._wait_worker(future)
+                metrics.inc("agent_runner.tasks.timeout")
+                raise
+            except asyncio.CancelledError:
+                # 调用方被取消（如客户端断开）：同样取消代理，工作线程退出后再释放设备
+                logger.warning(f"设备 {device_id}: 调用方已取消，正在取消 AI 任务")
+                self.cancel(device_id, "调用方已取消")
+                await self._wait_worker(future)
+                metrics.inc("agent_runner.tasks.cancelled")
+                raise
+        except Exception:
+            metrics.inc("agent_runner.tasks.failed")
+            raise
+        finally:
+            self.active_devices.discard(device_id)
+            with self._agents_lock:
+                self._pending_cancels.pop(device_id, None)
+            # 工作线程已结束，排在其后的结束标记保证事件全部转发完毕
+            loop.call_soon_threadsafe(events.put_nowait, None)
+            await forwarder
+
+        result["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    @staticmethod
+    async def _wait_worker(future: asyncio.Future):
+        """等待工作线程结束，期间再次被取消也继续等待，避免设备提前释放"""
+        while not future.done():
+            try:
+                await asyncio.shield(future)
+            except asyncio.CancelledError:
+                continue
+            except Exception:
+                break
+
+    def cancel(self, device_id: str, reason: str = "用户取消") -> bool:
+        """
+        取消设备上正在运行的代理
+
+        代理在下一个阶段边界停止：正在进行的模型流式请求立即中断，
+        已开始的设备操作执行完毕后不再执行新操作，随后释放设备
+
+        Returns:
+            设备上是否有正在运行的任务
+        """
+        if device_id not in self.active_devices:
+            return False
+        with self._agents_lock:
+            agent = self._agents.get(device_id)
+            if agent is None:
+                # 任务已提交但代理尚未创建，创建后立即取消
+                self._pending_cancels[device_id] = reason
+        if agent is not None:
+            agent.cancel(reason)
+        metrics.inc("agent_runner.cancels")
+        logger.info(f"设备 {device_id}: 取消 AI 任务 - {reason}")
+        return True
+
+    def shutdown(self):
+        """关闭执行池（不等待正在运行的任务）"""
+        if self.warm_up_task is not None:
+            self.warm_up_task.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.gateway is not None:
+            self.gateway.close()
+        for router in self._routers.values():
+            router.close()
+        if self.trace_store is not None:
+            self.trace_store.close()
+
+    async def close_device_layer(self):
+        """关闭异步设备层的常驻 shell（须在服务事件循环中调用）"""
+        if self.device_backend is not None:
+            await self.device_backend.close()
@@ -3,10 +3,13 @@ import json
 import subprocess
 import os
 import sys
-from pathlib import Path
-from typing import Dict, Any, Optional
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Any, List, Optional
 from app.core.config import settings
+from app.services.agent_runner import AgentRunnerPool
 from app.services.device_service import DeviceManager
+from app.utils.autoglm_utils import get_autoglm_dir
 from app.utils.logger_utils import logger
 
 class AIService:
@@ -15,22 +18,34 @@ class AIService:
     def __init__(self):
         self.device_manager = DeviceManager()
         # 获取 main.py 的绝对路径
-        # 假设 backend 和 Open-AutoGLM 在同一父目录下
-        backend_dir = Path(__file__).parent.parent.parent
-        self.main_py_path = backend_dir.parent / "Open-AutoGLM" / "main.py"
-        
-        if not self.main_py_path.exists():
-            logger.warning(f"未找到 main.py 文件: {self.main_py_path}")
-            logger.info("将尝试使用环境变量中的路径或相对路径")
-            # 尝试使用环境变量或默认路径
-            main_py_env = os.getenv("AUTOGLM_MAIN_PY_PATH")
-            if main_py_env and Path(main_py_env).exists():
-                self.main_py_path = Path(main_py_env)
-            else:
-                # 默认路径
-                self.main_py_path = Path("/Users/rock/Documents/ai-auto-touch/Open-AutoGLM/main.py")
+        self.main_py_path = get_autoglm_dir() / "main.py"
         
         logger.info(f"使用 main.py 路径: {self.main_py_path}")
+        
+        # 进程内执行池（AGENT_RUNNER_MODE=inprocess 时使用）
+        self.runner = AgentRunnerPool(self.main_py_path.parent)
+        # 批量执行时每台设备一把锁，同一设备的多条指令按提交顺序依次执行
+        # 锁在没有指令使用（持有或等待）时移除，长期运行时不随设备数累积
+        self._device_locks: Dict[str, asyncio.Lock] = {}
+        self._device_lock_users: Dict[str, int] = {}
+        # 子进程模式下正在运行的 main.py 进程: 设备 -> 进程
+        self._processes: Dict[str, asyncio.subprocess.Process] = {}
+        # 子进程模式下被取消的设备 -> 取消原因
+        self._cancelled_processes: Dict[str, str] = {}
+    
+    @asynccontextmanager
+    async def _device_lock(self, device_id: str):
+        """持有设备的批量执行锁，最后一个使用者退出时移除该锁"""
+        lock = self._device_locks.setdefault(device_id, asyncio.Lock())
+        self._device_lock_users[device_id] = self._device_lock_users.get(device_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._device_lock_users[device_id] -= 1
+            if not self._device_lock_users[device_id]:
+                del self._device_lock_users[device_id]
+                del self._device_locks[device_id]
     
     async def get_service_status(self) -> Dict[str, Any]:
         """获取AI服务状态"""
@@ -41,7 +56,9 @@ class AIService:
             "api_key_configured": bool(settings.AUTOGLM_API_KEY and settings.AUTOGLM_API_KEY != "EMPTY"),
             "max_steps": settings.AUTOGLM_MAX_STEPS,
             "main_py_path": str(self.main_py_path),
-            "main_py_exists": self.main_py_path.exists()
+            "main_py_exists": self.main_py_path.exists(),
+            "runner_mode": settings.AGENT_RUNNER_MODE,
+            "runner": self.runner.snapshot()
         }
     
     async def execute_natural_language_command(
@@ -86,197 +103,21 @@ class AIService:
                 "max_steps": max_steps_value
             })
             
-            # 构建命令行参数
-            # 使用当前 Python 解释器（虚拟环境中的 Python）
-            cmd = [
-                sys.executable,  # 使用当前虚拟环境的 Python
-                "-u",  # 禁用Python输出缓冲，确保实时输出
-                str(self.main_py_path),
-                "--base-url", model_base_url,
-                "--model", model_model_name,
-                "--apikey", model_api_key,
-                "--device-id", device_id,
-                "--max-steps", str(max_steps_value),
-            ]
-            
-            # 如果不需要详细输出，添加 --quiet 参数
-            if not verbose:
-                cmd.append("--quiet")
-            
-            # 添加任务指令（用引号包裹，防止特殊字符问题）
-            cmd.append(command)
-            
-            logger.info(f"执行命令: {' '.join(cmd)}")
-            
-            # 设置工作目录为 main.py 所在目录
-            work_dir = self.main_py_path.parent
-            
-            # 设置环境变量
-            env = os.environ.copy()
-            env["PHONE_AGENT_DEVICE_ID"] = device_id
-            env["PHONE_AGENT_BASE_URL"] = model_base_url
-            env["PHONE_AGENT_MODEL"] = model_model_name
-            env["PHONE_AGENT_API_KEY"] = model_api_key
-            env["PHONE_AGENT_MAX_STEPS"] = str(max_steps_value)
-            # 禁用Python输出缓冲，确保实时输出
-            env["PYTHONUNBUFFERED"] = "1"
-            
-            # 广播启动进程
-            await broadcast_ai_log(device_id, "info", "启动 AI 代理进程...")
-            
-            # 在异步上下文中执行 subprocess，实时读取输出
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=str(work_dir),
-                env=env,
-                # 禁用缓冲以获得更实时的输出
-                bufsize=0
-            )
-            
-            # 实时读取并广播输出
-            stdout_lines = []
-            stderr_lines = []
-            
-            async def read_stdout():
-                """实时读取标准输出"""
-                buffer = b''
-                while True:
-                    try:
-                        # 读取小块数据而不是等待完整行
-                        chunk = await process.stdout.read(1024)
-                        if not chunk:
-                            # 处理缓冲区中剩余的数据
-                            if buffer:
-                                line_text = buffer.decode('utf-8', errors='ignore').strip()
-                                if line_text:
-                                    stdout_lines.append(line_text)
-                                    await self._parse_and_broadcast_log(device_id, line_text, broadcast_ai_log)
-                            break
-                        
-                        buffer += chunk
-                        
-                        # 处理完整的行
-                        while b'\n' in buffer:
-                            line, buffer = buffer.split(b'\n', 1)
-                            line_text = line.decode('utf-8', errors='ignore').strip()
-                            if line_text:
-                                stdout_lines.append(line_text)
-                                # 解析并广播不同类型的日志
-                                await self._parse_and_broadcast_log(device_id, line_text, broadcast_ai_log)
-                        
-                        # 如果缓冲区太大，也处理一下（防止内存问题）
-                        if len(buffer) > 8192:  # 8KB
-                            line_text = buffer.decode('utf-8', errors='ignore').strip()
-                            if line_text:
-                                stdout_lines.append(line_text)
-                                await self._parse_and_broadcast_log(device_id, line_text, broadcast_ai_log)
-                            buffer = b''
-                            
-                    except Exception as e:
-                        logger.error(f"读取stdout时出错: {e}")
-                        break
-            
-            async def read_stderr():
-                """实时读取错误输出"""
-                buffer = b''
-                while True:
-                    try:
-                        chunk = await process.stderr.read(1024)
-                        if not chunk:
-                            if buffer:
-                                line_text = buffer.decode('utf-8', errors='ignore').strip()
-                                if line_text:
-                                    stderr_lines.append(line_text)
-                                    await broadcast_ai_log(device_id, "error", f"错误: {line_text}")
-                            break
-                        
-                        buffer += chunk
-                        
-                        while b'\n' in buffer:
-                            line, buffer = buffer.split(b'\n', 1)
-                            line_text = line.decode('utf-8', errors='ignore').strip()
-                            if line_text:
-                                stderr_lines.append(line_text)
-                                await broadcast_ai_log(device_id, "error", f"错误: {line_text}")
-                        
-                        if len(buffer) > 8192:
-                            line_text = buffer.decode('utf-8', errors='ignore').strip()
-                            if line_text:
-                                stderr_lines.append(line_text)
-                                await broadcast_ai_log(device_id, "error", f"错误: {line_text}")
-                            buffer = b''
-                            
-                    except Exception as e:
-                        logger.error(f"读取stderr时出错: {e}")
-                        break
-            
-            # 并发读取输出
-            try:
-                await asyncio.wait_for(
-                    asyncio.gather(
-                        read_stdout(),
-                        read_stderr(),
-                        process.wait()
-                    ),
-                    timeout=3600.0
+            if settings.AGENT_RUNNER_MODE == "subprocess":
+                execution_result = await self._execute_via_main_py(
+                    device_id, command, verbose, model_base_url, model_model_name,
+                    model_api_key, max_steps_value, broadcast_ai_log
+                )
+            else:
+                execution_result = await self._execute_in_process(
+                    device_id, command, verbose, model_base_url, model_model_name,
+                    model_api_key, max_steps_value, broadcast_ai_log
                 )
-            except asyncio.TimeoutError:
-                process.kill()
-                await process.wait()
-                await broadcast_ai_log(device_id, "error", "任务执行超时（超过1小时）")
-                raise Exception("任务执行超时（超过1小时）")
-            
-            # 获取完整输出
-            stdout_text = '\n'.join(stdout_lines)
-            stderr_text = '\n'.join(stderr_lines)
-            
-            # 检查返回码
-            if process.returncode != 0:
-                error_msg = f"执行失败 (返回码: {process.returncode})"
-                if stderr_text:
-                    error_msg += f"\n错误信息: {stderr_text}"
-                logger.error(error_msg)
-                await broadcast_ai_log(device_id, "error", error_msg)
-                raise Exception(error_msg)
-            
-            # 从输出中提取结果
-            result_text = stdout_text.strip()
-            
-            # 尝试从输出中提取结果信息
-            result_lines = result_text.split('\n')
-            final_result = None
-            
-            # 查找 "Result:" 行
-            for line in reversed(result_lines):
-                if "Result:" in line or "任务完成" in line or "Task completed" in line:
-                    # 提取结果内容
-                    if "Result:" in line:
-                        final_result = line.split("Result:", 1)[1].strip()
-                    else:
-                        final_result = line.strip()
-                    break
-            
-            # 如果没有找到明确的结果行，使用最后几行作为结果
-            if not final_result:
-                final_result = '\n'.join(result_lines[-5:]) if result_lines else result_text
-            
-            # 广播执行完成
-            await broadcast_ai_log(device_id, "info", f"执行完成: {final_result}")
-            
-            # 记录执行结果
-            execution_result = {
-                "command": command,
-                "device_id": device_id,
-                "result": final_result or "任务执行完成",
-                "stdout": stdout_text,
-                "stderr": stderr_text,
-                "return_code": process.returncode,
-                "success": True
-            }
             
-            logger.info(f"指令执行完成: {execution_result['result']}")
+            if execution_result.get("cancelled"):
+                logger.info(f"指令已取消: {execution_result['error']}")
+            else:
+                logger.info(f"指令执行完成: {execution_result['result']}")
             return execution_result
             
         except asyncio.TimeoutError:
@@ -303,6 +144,398 @@ class AIService:
                 "success": False
             }
     
+    async def cancel(self, device_id: str, reason: str = "用户取消") -> bool:
+        """
+        取消设备上正在运行的指令
+
+        进程内模式下代理在下一个阶段边界停止并中断模型请求；
+        子进程模式下结束 main.py 进程
+
+        Returns:
+            设备上是否有正在运行的指令
+        """
+        process = self._processes.get(device_id)
+        if process is not None and process.returncode is None:
+            self._cancelled_processes[device_id] = reason
+            process.terminate()
+            logger.info(f"设备 {device_id}: 结束 AI 代理进程 - {reason}")
+            return True
+        return self.runner.cancel(device_id, reason)
+    
+    async def execute_batch(
+        self,
+        commands: List[Dict[str, Any]],
+        max_parallel: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        并发执行一批自然语言指令，按完成顺序逐个产出结果
+        
+        不同设备的指令并发执行（总数受 max_parallel 限制），
+        同一设备的多条指令按提交顺序依次执行
+        
+        Args:
+            commands: 指令列表（字段同 execute_natural_language_command 的参数）
+            max_parallel: 最大并发指令数，默认使用 AI_BATCH_MAX_PARALLEL
+        """
+        parallel = max(1, max_parallel or settings.AI_BATCH_MAX_PARALLEL)
+        semaphore = asyncio.Semaphore(parallel)
+        start = time.perf_counter()
+        # 正在设备上执行的指令: 序号 -> 设备
+        in_flight: Dict[int, str] = {}
+        
+        async def run_one(index: int, command: Dict[str, Any]) -> Dict[str, Any]:
+            device_id = command["device_id"]
+            # 先占设备再占并发名额，排队等待同一设备的指令不占用名额
+            async with self._device_lock(device_id):
+                async with semaphore:
+                    in_flight[index] = device_id
+                    try:
+                        result = await self.execute_natural_language_command(**command)
+                    finally:
+                        in_flight.pop(index, None)
+            return {
+                "type": "device_result",
+                "index": index,
+                "device_id": device_id,
+                "success": result.get("success", True),
+                "result": result,
+                "finished_ms": round((time.perf_counter() - start) * 1000, 1)
+            }
+        
+        logger.info(f"批量指令: {len(commands)} 条, 并发 {parallel}")
+        tasks = [
+            asyncio.create_task(run_one(index, command))
+            for index, command in enumerate(commands)
+        ]
+        succeeded = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if result["success"]:
+                    succeeded += 1
+                yield result
+        finally:
+            # 客户端提前断开时取消尚未完成的指令：先停止设备上正在运行的代理，
+            # 再取消排队中的指令，等全部结束后再返回
+            for device_id in list(in_flight.values()):
+                await self.cancel(device_id, "批量请求已断开")
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        
+        yield {
+            "type": "summary",
+            "total": len(commands),
+            "succeeded": succeeded,
+            "failed": len(commands) - succeeded,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+        }
+    
+    async def _execute_in_process(
+        self,
+        device_id: str,
+        command: str,
+        verbose: bool,
+        model_base_url: str,
+        model_model_name: str,
+        model_api_key: str,
+        max_steps_value: int,
+        broadcast_ai_log
+    ) -> Dict[str, Any]:
+        """在进程内执行池中运行 PhoneAgent，步骤事件直接转发到 AI 日志"""
+        await broadcast_ai_log(device_id, "info", "提交任务到 AI 代理执行池...")
+        
+        from app.api.ai_websocket_api import broadcast_ai_event
+        
+        async def on_event(event: Dict[str, Any]):
+            await broadcast_ai_event(device_id, event)
+        
+        outcome = await self.runner.run(
+            device_id=device_id,
+            command=command,
+            max_steps=max_steps_value,
+            base_url=model_base_url,
+            model_name=model_model_name,
+            api_key=model_api_key,
+            verbose=verbose,
+            on_event=on_event
+        )
+        
+        final_result = outcome["result"]
+        if outcome.get("cancelled"):
+            await broadcast_ai_log(device_id, "warning", f"任务已取消: {outcome['cancel_reason']}")
+            return {
+                "command": command,
+                "device_id": device_id,
+                "error": f"任务已取消: {outcome['cancel_reason']}",
+                "steps": outcome["steps"],
+                "duration_ms": outcome["duration_ms"],
+                "trace_id": outcome["trace_id"],
+                "cancelled": True,
+                "success": False
+            }
+        if not outcome["success"]:
+            # 达到最大步数、模型错误等，代理正常返回但任务未完成
+            await broadcast_ai_log(device_id, "error", f"执行失败: {final_result}", {
+                "duration_ms": outcome["duration_ms"]
+            })
+            return {
+                "command": command,
+                "device_id": device_id,
+                "result": final_result,
+                "error": final_result or "任务未完成",
+                "steps": outcome["steps"],
+                "duration_ms": outcome["duration_ms"],
+                "trace_id": outcome["trace_id"],
+                "success": False
+            }
+        await broadcast_ai_log(device_id, "info", f"执行完成: {final_result}", {
+            "duration_ms": outcome["duration_ms"]
+        })
+        
+        return {
+            "command": command,
+            "device_id": device_id,
+            "result": final_result or "任务执行完成",
+            "steps": outcome["steps"],
+            "duration_ms": outcome["duration_ms"],
+            "trace_id": outcome["trace_id"],
+            "success": True
+        }
+    
+    async def _execute_via_main_py(
+        self,
+        device_id: str,
+        command: str,
+        verbose: bool,
+        model_base_url: str,
+        model_model_name: str,
+        model_api_key: str,
+        max_steps_value: int,
+        broadcast_ai_log
+    ) -> Dict[str, Any]:
+        """启动独立的 main.py 进程执行指令，并解析其输出（AGENT_RUNNER_MODE=subprocess）"""
+        # 构建命令行参数
+        # 使用当前 Python 解释器（虚拟环境中的 Python）
+        cmd = [
+            sys.executable,  # 使用当前虚拟环境的 Python
+            "-u",  # 禁用Python输出缓冲，确保实时输出
+            str(self.main_py_path),
+            "--base-url", model_base_url,
+            "--model", model_model_name,
+            "--apikey", model_api_key,
+            "--device-id", device_id,
+            "--max-steps", str(max_steps_value),
+        ]
+        
+        # 如果不需要详细输出，添加 --quiet 参数
+        if not verbose:
+            cmd.append("--quiet")
+        
+        # 添加任务指令（用引号包裹，防止特殊字符问题）
+        cmd.append(command)
+        
+        logger.info(f"执行命令: {' '.join(cmd)}")
+        
+        # 设置工作目录为 main.py 所在目录
+        work_dir = self.main_py_path.parent
+        
+        # 设置环境变量
+        env = os.environ.copy()
+        env["PHONE_AGENT_DEVICE_ID"] = device_id
+        env["PHONE_AGENT_BASE_URL"] = model_base_url
+        env["PHONE_AGENT_MODEL"] = model_model_name
+        env["PHONE_AGENT_API_KEY"] = model_api_key
+        env["PHONE_AGENT_MAX_STEPS"] = str(max_steps_value)
+        # 禁用Python输出缓冲，确保实时输出
+        env["PYTHONUNBUFFERED"] = "1"
+        
+        # 广播启动进程
+        await broadcast_ai_log(device_id, "info", "启动 AI 代理进程...")
+        
+        # 在异步上下文中执行 subprocess，实时读取输出
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=str(work_dir),
+            env=env,
+            # 禁用缓冲以获得更实时的输出
+            bufsize=0
+        )
+        self._processes[device_id] = process
+        try:
+            return await self._collect_main_py(process, device_id, command, broadcast_ai_log)
+        except Exception:
+            reason = self._cancelled_processes.get(device_id)
+            if reason is None:
+                raise
+            await broadcast_ai_log(device_id, "warning", f"任务已取消: {reason}")
+            return {
+                "command": command,
+                "device_id": device_id,
+                "error": f"任务已取消: {reason}",
+                "cancelled": True,
+                "success": False
+            }
+        finally:
+            self._processes.pop(device_id, None)
+            self._cancelled_processes.pop(device_id, None)
+    
+    async def _collect_main_py(
+        self,
+        process: asyncio.subprocess.Process,
+        device_id: str,
+        command: str,
+        broadcast_ai_log
+    ) -> Dict[str, Any]:
+        """读取 main.py 进程输出并解析执行结果"""
+        
+        # 实时读取并广播输出
+        stdout_lines = []
+        stderr_lines = []
+        
+        async def read_stdout():
+            """实时读取标准输出"""
+            buffer = b''
+            while True:
+                try:
+                    # 读取小块数据而不是等待完整行
+                    chunk = await process.stdout.read(1024)
+                    if not chunk:
+                        # 处理缓冲区中剩余的数据
+                        if buffer:
+                            line_text = buffer.decode('utf-8', errors='ignore').strip()
+                            if line_text:
+                                stdout_lines.append(line_text)
+                                await self._parse_and_broadcast_log(device_id, line_text, broadcast_ai_log)
+                        break
+        
+                    buffer += chunk
+        
+                    # 处理完整的行
+                    while b'\n' in buffer:
+                        line, buffer = buffer.split(b'\n', 1)
+                        line_text = line.decode('utf-8', errors='ignore').strip()
+                        if line_text:
+                            stdout_lines.append(line_text)
+                            # 解析并广播不同类型的日志
+                            await self._parse_and_broadcast_log(device_id, line_text, broadcast_ai_log)
+        
+                    # 如果缓冲区太大，也处理一下（防止内存问题）
+                    if len(buffer) > 8192:  # 8KB
+                        line_text = buffer.decode('utf-8', errors='ignore').strip()
+                        if line_text:
+                            stdout_lines.append(line_text)
+                            await self._parse_and_broadcast_log(device_id, line_text, broadcast_ai_log)
+                        buffer = b''
+        
+                except Exception as e:
+                    logger.error(f"读取stdout时出错: {e}")
+                    break
+        
+        async def read_stderr():
+            """实时读取错误输出"""
+            buffer = b''
+            while True:
+                try:
+                    chunk = await process.stderr.read(1024)
+                    if not chunk:
+                        if buffer:
+                            line_text = buffer.decode('utf-8', errors='ignore').strip()
+                            if line_text:
+                                stderr_lines.append(line_text)
+                                await broadcast_ai_log(device_id, "error", f"错误: {line_text}")
+                        break
+        
+                    buffer += chunk
+        
+                    while b'\n' in buffer:
+                        line, buffer = buffer.split(b'\n', 1)
+                        line_text = line.decode('utf-8', errors='ignore').strip()
+                        if line_text:
+                            stderr_lines.append(line_text)
+                            await broadcast_ai_log(device_id, "error", f"错误: {line_text}")
+        
+                    if len(buffer) > 8192:
+                        line_text = buffer.decode('utf-8', errors='ignore').strip()
+                        if line_text:
+                            stderr_lines.append(line_text)
+                            await broadcast_ai_log(device_id, "error", f"错误: {line_text}")
+                        buffer = b''
+        
+                except Exception as e:
+                    logger.error(f"读取stderr时出错: {e}")
+                    break
+        
+        # 并发读取输出
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    read_stdout(),
+                    read_stderr(),
+                    process.wait()
+                ),
+                timeout=3600.0
+            )
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            await broadcast_ai_log(device_id, "error", "任务执行超时（超过1小时）")
+            raise Exception("任务执行超时（超过1小时）")
+        
+        # 获取完整输出
+        stdout_text = '\n'.join(stdout_lines)
+        stderr_text = '\n'.join(stderr_lines)
+        
+        # 检查返回码
+        if process.returncode != 0:
+            error_msg = f"执行失败 (返回码: {process.returncode})"
+            if stderr_text:
+                error_msg += f"\n错误信息: {stderr_text}"
+            logger.error(error_msg)
+            await broadcast_ai_log(device_id, "error", error_msg)
+            raise Exception(error_msg)
+        
+        # 从输出中提取结果
+        result_text = stdout_text.strip()
+        
+        # 尝试从输出中提取结果信息
+        result_lines = result_text.split('\n')
+        final_result = None
+        
+        # 查找 "Result:" 行
+        for line in reversed(result_lines):
+            if "Result:" in line or "任务完成" in line or "Task completed" in line:
+                # 提取结果内容
+                if "Result:" in line:
+                    final_result = line.split("Result:", 1)[1].strip()
+                else:
+                    final_result = line.strip()
+                break
+        
+        # 如果没有找到明确的结果行，使用最后几行作为结果
+        if not final_result:
+            final_result = '\n'.join(result_lines[-5:]) if result_lines else result_text
+        
+        # 广播执行完成
+        await broadcast_ai_log(device_id, "info", f"执行完成: {final_result}")
+        
+        # 记录执行结果
+        execution_result = {
+            "command": command,
+            "device_id": device_id,
+            "result": final_result or "任务执行完成",
+            "stdout": stdout_text,
+            "stderr": stderr_text,
+            "return_code": process.returncode,
+            "success": True
+        }
+        
+        return execution_result
+    
     async def _parse_and_broadcast_log(self, device_id: str, line: str, broadcast_func):
         """解析日志行并广播相应类型的消息"""
         line_lower = line.lower()
@@ -327,3 +560,5 @@ class AIService:
             # 一般信息
             await broadcast_func(device_id, "info", line)
 
+# 全局实例
+ai_service = AIService()
@@ -0,0 +1,135 @@
+"""
+设备集群控制服务
+将同一组控制操作并发下发到多台设备，并按完成顺序返回每台设备的结果
+"""
+import asyncio
+import time
+from typing import Dict, Any, List, Optional, Set, AsyncIterator
+from app.core.config import settings
+from app.services.phone_control_service import phone_control_service
+from app.utils.adb_utils import run_adb_command
+from app.utils.logger_utils import logger
+
+
+class FleetService:
+    """设备集群控制服务类"""
+    
+    def __init__(self):
+        # 设备标签: device_id -> {tag, ...}
+        self.device_tags: Dict[str, Set[str]] = {}
+    
+    # ==================== 标签管理 ====================
+    
+    def set_tags(self, device_id: str, tags: List[str]) -> List[str]:
+        """设置设备标签（覆盖原有标签）"""
+        cleaned = {tag.strip() for tag in tags if tag and tag.strip()}
+        if cleaned:
+            self.device_tags[device_id] = cleaned
+        else:
+            self.device_tags.pop(device_id, None)
+        logger.info(f"设备 {device_id}: 标签更新为 {sorted(cleaned)}")
+        return sorted(cleaned)
+    
+    def get_tags(self) -> Dict[str, List[str]]:
+        """获取全部设备标签"""
+        return {device_id: sorted(tags) for device_id, tags in self.device_tags.items()}
+    
+    # ==================== 设备选择 ====================
+    
+    async def list_online_devices(self) -> List[str]:
+        """通过 `adb devices` 获取在线设备ID（不查询设备详情，避免大规模集群下的额外开销）"""
+        result = await run_adb_command("devices", timeout=10)
+        devices = []
+        for line in result.stdout.split("\n")[1:]:
+            parts = line.strip().split()
+            if len(parts) >= 2 and parts[1] == "device":
+                devices.append(parts[0])
+        return devices
+    
+    async def resolve_devices(
+        self,
+        device_ids: Optional[List[str]] = None,
+        tag: Optional[str] = None,
+        all_devices: bool = False
+    ) -> List[str]:
+        """
+        根据选择器解析目标设备
+        
+        Args:
+            device_ids: 显式指定的设备ID列表
+            tag: 设备标签
+            all_devices: 是否选择全部在线设备
+        """
+        selected: List[str] = []
+        if all_devices:
+            selected = await self.list_online_devices()
+        else:
+            if device_ids:
+                selected.extend(device_ids)
+            if tag:
+                selected.extend(
+                    device_id for device_id, tags in self.device_tags.items() if tag in tags
+                )
+        # 去重并保持顺序
+        return list(dict.fromkeys(selected))
+    
+    # ==================== 并发执行 ====================
+    
+    async def broadcast(
+        self,
+        device_ids: List[str],
+        steps: List[Dict[str, Any]],
+        stop_on_error: bool = True,
+        max_parallel: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        在多台设备上并发执行同一组操作，按完成顺序逐个产出结果
+        
+        Args:
+            device_ids: 目标设备列表
+            steps: 操作列表（格式同 PhoneControlService.run_batch）
+            stop_on_error: 单台设备某步失败后是否停止该设备后续步骤
+            max_parallel: 最大并发设备数，默认使用 FLEET_MAX_PARALLEL
+        """
+        parallel = max(1, max_parallel or settings.FLEET_MAX_PARALLEL)
+        semaphore = asyncio.Semaphore(parallel)
+        start = time.perf_counter()
+        
+        async def run_one(device_id: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    result = await phone_control_service.run_batch(device_id, steps, stop_on_error)
+                except Exception as e:
+                    logger.error(f"设备 {device_id}: 集群操作失败 - {str(e)}")
+                    result = {"success": False, "device_id": device_id, "error": str(e)}
+            result["type"] = "device_result"
+            result["device_id"] = device_id
+            result["finished_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            return result
+        
+        logger.info(f"集群操作: {len(device_ids)} 台设备, {len(steps)} 步, 并发 {parallel}")
+        tasks = [asyncio.create_task(run_one(device_id)) for device_id in device_ids]
+        succeeded = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if result.get("success"):
+                    succeeded += 1
+                yield result
+        finally:
+            # 客户端提前断开时取消尚未完成的设备任务
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        
+        yield {
+            "type": "summary",
+            "total": len(device_ids),
+            "succeeded": succeeded,
+            "failed": len(device_ids) - succeeded,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+        }
+
+
+# 全局实例
+fleet_service = FleetService()
@@ -0,0 +1,164 @@
+"""
+AI 日志总线
+按设备发布 AI 日志，每台设备保留一个有界环形缓冲区，支持多个订阅者同时查看；
+每个订阅者有独立的发送队列，队列满时丢弃最旧的消息，发布方从不等待慢速客户端；
+重连的客户端可以从指定序号开始补发缓冲区中的日志
+"""
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+from app.core.config import settings
+from app.utils.metrics_utils import metrics
+
+
+class LogSubscription:
+    """单个订阅者的发送队列"""
+
+    def __init__(self, device_id: str, max_queue: int):
+        self.device_id = device_id
+        self._queue: Deque[Dict[str, Any]] = deque(maxlen=max_queue)
+        self._ready = asyncio.Event()
+        # 队列满时被丢弃、尚未通知客户端的消息数
+        self.dropped = 0
+        self.total_dropped = 0
+        self.closed = False
+
+    def put(self, message: Dict[str, Any]):
+        """放入一条消息，队列已满时丢弃最旧的一条"""
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+            self.total_dropped += 1
+            metrics.inc("ai_logs.dropped")
+        self._queue.append(message)
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        取出下一条消息
+
+        有消息被丢弃时先返回一条 dropped 通知；超时或订阅已关闭时返回 None
+        """
+        while not self._queue and not self.closed:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if self.closed:
+            return None
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            return {
+                "type": "dropped",
+                "device_id": self.device_id,
+                "count": dropped,
+                "next_seq": self._queue[0].get("seq")
+            }
+        return self._queue.popleft()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+
+class _DeviceChannel:
+    """单台设备的环形缓冲区和订阅者"""
+
+    def __init__(self, buffer_size: int):
+        self.buffer: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self.subscribers: Set[LogSubscription] = set()
+        self.next_seq = 1
+
+
+class LogBus:
+    """AI 日志发布/订阅总线（仅在事件循环线程中使用）"""
+
+    def __init__(self, buffer_size: int, subscriber_queue: int):
+        self.buffer_size = buffer_size
+        self.subscriber_queue = subscriber_queue
+        self._channels: Dict[str, _DeviceChannel] = {}
+        self.published = 0
+
+    def _channel(self, device_id: str) -> _DeviceChannel:
+        channel = self._channels.get(device_id)
+        if channel is None:
+            channel = self._channels[device_id] = _DeviceChannel(self.buffer_size)
+        return channel
+
+    def publish(self, device_id: str, message: Dict[str, Any]) -> int:
+        """
+        发布一条日志（不等待任何订阅者）
+
+        Returns:
+            分配给该消息的序号（每台设备从 1 开始递增）
+        """
+        channel = self._channel(device_id)
+        seq = channel.next_seq
+        channel.next_seq += 1
+        message = {**message, "seq": seq}
+        channel.buffer.append(message)
+        for subscription in channel.subscribers:
+            subscription.put(message)
+        self.published += 1
+        return seq
+
+    def subscribe(self, device_id: str, since: Optional[int] = None) -> LogSubscription:
+        """
+        订阅设备日志
+
+        Args:
+            device_id: 设备ID
+            since: 已收到的最后一条日志序号，缓冲区中更新的日志会先补发；
+                   为 None 时只接收之后的新日志
+        """
+        channel = self._channel(device_id)
+        subscription = LogSubscription(device_id, self.subscriber_queue)
+        if since is not None:
+            missed = [message for message in channel.buffer if message["seq"] > since]
+            # 请求的序号已被环形缓冲区覆盖，告知客户端中间有缺失
+            if missed and missed[0]["seq"] > since + 1:
+                subscription.dropped = missed[0]["seq"] - since - 1
+            for message in missed:
+                subscription.put(message)
+        channel.subscribers.add(subscription)
+        metrics.inc("ai_logs.subscriptions")
+        return subscription
+
+    def unsubscribe(self, subscription: LogSubscription):
+        """取消订阅"""
+        subscription.close()
+        channel = self._channels.get(subscription.device_id)
+        if channel is not None:
+            channel.subscribers.discard(subscription)
+
+    def last_seq(self, device_id: str) -> int:
+        """设备最后一条日志的序号（没有日志时为 0）"""
+        channel = self._channels.get(device_id)
+        return channel.next_seq - 1 if channel else 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """总线状态"""
+        devices: List[Dict[str, Any]] = []
+        for device_id, channel in list(self._channels.items()):
+            devices.append({
+                "device_id": device_id,
+                "last_seq": channel.next_seq - 1,
+                "buffered": len(channel.buffer),
+                "subscribers": len(channel.subscribers),
+                "pending": sum(len(s) for s in channel.subscribers),
+                "dropped": sum(s.total_dropped for s in channel.subscribers)
+            })
+        return {
+            "buffer_size": self.buffer_size,
+            "subscriber_queue": self.subscriber_queue,
+            "published": self.published,
+            "devices": devices
+        }
+
+
+# 全局实例
+log_bus = LogBus(settings.AI_LOG_BUFFER_SIZE, settings.AI_LOG_SUBSCRIBER_QUEUE)
+metrics.register_provider("ai_logs", log_bus.snapshot)
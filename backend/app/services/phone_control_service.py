@@ -3,17 +3,148 @@
 提供各种手机控制功能，包括点击、滑动、输入文本、按键等
 """
 import asyncio
+import base64
 import re
+import shlex
+import time
 from typing import Dict, Any, Optional, Tuple, List
-from app.utils.adb_utils import run_adb_command, get_adb_path
+from app.services.screen_geometry_service import screen_geometry_service
+from app.utils.adb_utils import run_adb_command, get_adb_path, run_shell
 from app.utils.logger_utils import logger
 
 
+# 批量操作中按键类动作与 keycode 的对应关系
+BATCH_KEY_ACTIONS = {
+    "press_home": "KEYCODE_HOME",
+    "press_back": "KEYCODE_BACK",
+    "press_menu": "KEYCODE_MENU",
+    "press_power": "KEYCODE_POWER",
+    "press_volume_up": "KEYCODE_VOLUME_UP",
+    "press_volume_down": "KEYCODE_VOLUME_DOWN",
+    "press_enter": "KEYCODE_ENTER",
+    "press_app_switch": "KEYCODE_APP_SWITCH",
+}
+
+# 批量操作支持的全部动作
+BATCH_ACTIONS = {
+    "tap", "swipe", "long_press", "input_text", "clear_text", "press_key",
+    "scroll_up", "scroll_down", "scroll_left", "scroll_right",
+    "unlock_screen", "swipe_down", "open_notification", "open_quick_settings",
+    "close_notification", "start_app", "stop_app", "wait",
+} | set(BATCH_KEY_ACTIONS)
+
+# 需要屏幕尺寸才能计算坐标的动作
+_SCREEN_SIZE_ACTIONS = {"scroll_up", "scroll_down", "scroll_left", "scroll_right", "unlock_screen", "swipe_down"}
+
+ADB_KEYBOARD_IME = "com.android.adbkeyboard/.AdbIME"
+# 切换输入法后等待 ADB Keyboard 生效的最长时间（秒）
+KEYBOARD_SWITCH_TIMEOUT = 1.0
+# 单次 ADB Keyboard 广播的最大字符数，长文本分块发送
+TEXT_CHUNK_CHARS = 256
+
+_KEYCODE_PATTERN = re.compile(r"^[A-Za-z0-9_]+$")
+_PACKAGE_PATTERN = re.compile(r"^[A-Za-z0-9_.]+$")
+_ACTIVITY_PATTERN = re.compile(r"^[A-Za-z0-9_.$/]+$")
+
+# 通知栏相关动作对应的设备端命令
+STATUSBAR_COMMANDS = {
+    "open_notification": "cmd statusbar expand-notifications",
+    "open_quick_settings": "cmd statusbar expand-settings",
+    "close_notification": "cmd statusbar collapse",
+}
+
+# 批量操作预校验时代替真实屏幕尺寸（实际尺寸在执行时查询）
+_PLACEHOLDER_SCREEN = (1080, 1920)
+
+
+# ==================== 设备端命令（单个操作与批量操作共用） ====================
+
+def swipe_command(x1: int, y1: int, x2: int, y2: int, duration: int = 300) -> str:
+    """滑动命令"""
+    return f"input swipe {int(x1)} {int(y1)} {int(x2)} {int(y2)} {int(duration)}"
+
+
+def long_press_command(x: int, y: int, duration: int = 1000) -> str:
+    """长按命令（起点和终点相同的滑动）"""
+    return swipe_command(x, y, x, y, duration)
+
+
+def keyevent_command(keycode: str) -> str:
+    """按键命令，按键代码不合法时抛出 ValueError"""
+    keycode = str(keycode)
+    if not _KEYCODE_PATTERN.match(keycode):
+        raise ValueError(f"非法的按键代码: {keycode}")
+    return f"input keyevent {keycode}"
+
+
+def start_app_command(package_name: str, activity: Optional[str] = None) -> str:
+    """启动应用命令，包名或 Activity 不合法时抛出 ValueError"""
+    package_name = _check_package(package_name)
+    if activity:
+        if not _ACTIVITY_PATTERN.match(str(activity)):
+            raise ValueError(f"非法的 Activity: {activity}")
+        return f"am start -n {package_name}/{activity}"
+    return f"monkey -p {package_name} -c android.intent.category.LAUNCHER 1"
+
+
+def stop_app_command(package_name: str) -> str:
+    """停止应用命令，包名不合法时抛出 ValueError"""
+    return f"am force-stop {_check_package(package_name)}"
+
+
+def _check_package(package_name: str) -> str:
+    package_name = str(package_name)
+    if not _PACKAGE_PATTERN.match(package_name):
+        raise ValueError(f"非法的包名: {package_name}")
+    return package_name
+
+
+def scroll_points(direction: str, width: int, height: int, distance: int = 500) -> Tuple[int, int, int, int]:
+    """滚动手势的起止坐标 (x1, y1, x2, y2)，direction 为 up/down/left/right"""
+    distance = int(distance)
+    if direction == "up":
+        x, y1 = width // 2, height * 2 // 3
+        return x, y1, x, y1 - distance
+    if direction == "down":
+        x, y1 = width // 2, height // 3
+        return x, y1, x, y1 + distance
+    if direction == "left":
+        y, x1 = height // 2, width * 2 // 3
+        return x1, y, x1 - distance, y
+    if direction == "right":
+        y, x1 = height // 2, width // 3
+        return x1, y, x1 + distance, y
+    raise ValueError(f"不支持的滚动方向: {direction}")
+
+
+def swipe_up_points(width: int, height: int) -> Tuple[int, int, int, int]:
+    """从屏幕下部滑到上部（解锁）"""
+    x = width // 2
+    return x, height * 4 // 5, x, height // 5
+
+
+def swipe_down_points(width: int, height: int) -> Tuple[int, int, int, int]:
+    """从屏幕上部滑到下部"""
+    x = width // 2
+    return x, height // 5, x, height * 4 // 5
+
+
+def wait_seconds(params: Dict[str, Any]) -> float:
+    """批量操作 wait 步骤的等待时间（秒），参数不合法时抛出 ValueError"""
+    return max(int(params.get("duration_ms", 0)), 0) / 1000
+
+
 class PhoneControlService:
     """手机控制服务类"""
     
     def __init__(self):
         self.adb_path = get_adb_path()
+        # 设备是否安装了 ADB Keyboard: device_id -> bool
+        self._adb_keyboard_installed: Dict[str, bool] = {}
+        # 已切换到 ADB Keyboard 的设备及其原输入法: device_id -> ime
+        self._original_ime: Dict[str, str] = {}
+        # 每台设备一把输入法锁，串行化切换/输入/恢复，避免并发请求记错原输入法
+        self._keyboard_locks: Dict[str, asyncio.Lock] = {}
     
     # ==================== 基础控制 ====================
     
@@ -68,7 +199,7 @@ class PhoneControlService:
         try:
             # 不等待命令完成，避免阻塞视频流
             await run_adb_command(
-                f"-s {device_id} shell input swipe {x1} {y1} {x2} {y2} {duration}",
+                f"-s {device_id} shell {swipe_command(x1, y1, x2, y2, duration)}",
                 wait=False
             )
             logger.info(f"设备 {device_id}: 滑动 ({x1},{y1}) -> ({x2},{y2}), 持续 {duration}ms")
@@ -104,10 +235,9 @@ class PhoneControlService:
             duration: 长按持续时间（毫秒）
         """
         try:
-            # 长按实际上是一个起点和终点相同的滑动
             # 不等待命令完成，避免阻塞视频流
             await run_adb_command(
-                f"-s {device_id} shell input swipe {x} {y} {x} {y} {duration}",
+                f"-s {device_id} shell {long_press_command(x, y, duration)}",
                 wait=False
             )
             logger.info(f"设备 {device_id}: 长按坐标 ({x}, {y}), 持续 {duration}ms")
@@ -128,34 +258,121 @@ class PhoneControlService:
     
     # ==================== 文本输入 ====================
     
-    async def input_text(self, device_id: str, text: str) -> Dict[str, Any]:
+    async def input_text(self, device_id: str, text: str, keep_keyboard: bool = False) -> Dict[str, Any]:
         """
         输入文本
         
+        设备安装了 ADB Keyboard 时通过 base64 广播输入（支持中文等 Unicode 文本，长文本分块），
+        输入完成后恢复原输入法；否则退回 `input text`（仅支持 ASCII）。
+        
         Args:
             device_id: 设备ID
             text: 要输入的文本
+            keep_keyboard: 输入后保持 ADB Keyboard 为当前输入法，连续输入时省去每次切换，
+                需要调用 restore_keyboard 恢复
         """
+        async with self._keyboard_lock(device_id):
+            # 之前的请求已保持 ADB Keyboard 时不在本次请求中恢复
+            held = device_id in self._original_ime
+            switched = False
+            try:
+                chunks = [text[i:i + TEXT_CHUNK_CHARS] for i in range(0, len(text), TEXT_CHUNK_CHARS)]
+                if await self._ensure_adb_keyboard(device_id):
+                    switched = not held
+                    command = " ; ".join(
+                        "am broadcast -a ADB_INPUT_B64 --es msg "
+                        + base64.b64encode(chunk.encode("utf-8")).decode("ascii")
+                        for chunk in chunks
+                    )
+                    method = "adb_keyboard"
+                else:
+                    # 先分块再转义（空格用 %s 表示），避免转义序列被切开
+                    command = " ; ".join(
+                        f"input text {shlex.quote(chunk.replace(' ', '%s'))}" for chunk in chunks
+                    )
+                    method = "input_text"
+                if command:
+                    await run_shell(device_id, command)
+                logger.info(f"设备 {device_id}: 输入文本 '{text}' ({method}, {len(chunks)} 块)")
+                return {
+                    "success": True,
+                    "action": "input_text",
+                    "text": text,
+                    "method": method,
+                    "message": f"已输入文本: {text}"
+                }
+            except Exception as e:
+                logger.error(f"设备 {device_id}: 输入文本失败 - {str(e)}")
+                return {
+                    "success": False,
+                    "action": "input_text",
+                    "error": str(e)
+                }
+            finally:
+                if switched and not keep_keyboard:
+                    await self._restore_ime(device_id)
+    
+    def _keyboard_lock(self, device_id: str) -> asyncio.Lock:
+        """获取设备的输入法锁"""
+        return self._keyboard_locks.setdefault(device_id, asyncio.Lock())
+    
+    async def _ensure_adb_keyboard(self, device_id: str) -> bool:
+        """确保 ADB Keyboard 为当前输入法，设备未安装时返回 False（须持有输入法锁）"""
+        if device_id in self._original_ime:
+            return True
+        installed = self._adb_keyboard_installed.get(device_id)
+        if installed is None:
+            result = await run_shell(device_id, "ime list -s", timeout=10)
+            installed = ADB_KEYBOARD_IME in result.stdout
+            self._adb_keyboard_installed[device_id] = installed
+        if not installed:
+            return False
+        
+        result = await run_shell(device_id, "settings get secure default_input_method", timeout=10)
+        current_ime = result.stdout.strip()
+        if current_ime != ADB_KEYBOARD_IME:
+            await run_shell(device_id, f"ime set {ADB_KEYBOARD_IME}", timeout=10)
+            # 输入法绑定是异步的，生效前发出的广播会丢失
+            if not await self._wait_for_adb_keyboard(device_id):
+                logger.warning(f"设备 {device_id}: 等待 ADB Keyboard 生效超时")
+            logger.info(f"设备 {device_id}: 已切换到 ADB Keyboard（原输入法 {current_ime}）")
+        self._original_ime[device_id] = current_ime
+        return True
+    
+    async def _wait_for_adb_keyboard(self, device_id: str) -> bool:
+        """轮询 dumpsys input_method，直到 ADB Keyboard 成为当前绑定的输入法"""
+        deadline = time.monotonic() + KEYBOARD_SWITCH_TIMEOUT
+        while True:
+            result = await run_shell(device_id, "dumpsys input_method | grep mCurMethodId", timeout=10)
+            if f"mCurMethodId={ADB_KEYBOARD_IME}" in result.stdout:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.1)
+    
+    async def restore_keyboard(self, device_id: str) -> Dict[str, Any]:
+        """恢复输入文本前的原输入法"""
+        async with self._keyboard_lock(device_id):
+            return await self._restore_ime(device_id)
+    
+    async def _restore_ime(self, device_id: str) -> Dict[str, Any]:
+        """恢复原输入法（须持有输入法锁）"""
         try:
-            # 转义特殊字符
-            escaped_text = text.replace(' ', '%s').replace('&', '\\&')
-            # 不等待命令完成，避免阻塞视频流
-            await run_adb_command(
-                f"-s {device_id} shell input text \"{escaped_text}\"",
-                wait=False
-            )
-            logger.info(f"设备 {device_id}: 输入文本 '{text}'")
+            original_ime = self._original_ime.pop(device_id, None)
+            if original_ime and original_ime != ADB_KEYBOARD_IME and _ACTIVITY_PATTERN.match(original_ime):
+                await run_shell(device_id, f"ime set {original_ime}", timeout=10)
+            logger.info(f"设备 {device_id}: 已恢复输入法 {original_ime}")
             return {
                 "success": True,
-                "action": "input_text",
-                "text": text,
-                "message": f"已输入文本: {text}"
+                "action": "restore_keyboard",
+                "ime": original_ime,
+                "message": "已恢复原输入法"
             }
         except Exception as e:
-            logger.error(f"设备 {device_id}: 输入文本失败 - {str(e)}")
+            logger.error(f"设备 {device_id}: 恢复输入法失败 - {str(e)}")
             return {
                 "success": False,
-                "action": "input_text",
+                "action": "restore_keyboard",
                 "error": str(e)
             }
     
@@ -199,7 +416,7 @@ class PhoneControlService:
         try:
             # 不等待命令完成，避免阻塞视频流
             await run_adb_command(
-                f"-s {device_id} shell input keyevent {keycode}",
+                f"-s {device_id} shell {keyevent_command(keycode)}",
                 wait=False
             )
             logger.info(f"设备 {device_id}: 按下按键 {keycode}")
@@ -253,23 +470,18 @@ class PhoneControlService:
     
     async def get_screen_size(self, device_id: str) -> Dict[str, Any]:
         """
-        获取屏幕尺寸
+        获取屏幕尺寸（来自屏幕几何缓存）
         """
         try:
-            result = await run_adb_command(f"-s {device_id} shell wm size")
-            # 解析输出: Physical size: 1080x2400
-            match = re.search(r'(\d+)x(\d+)', result.stdout)
-            if match:
-                width, height = int(match.group(1)), int(match.group(2))
-                logger.info(f"设备 {device_id}: 屏幕尺寸 {width}x{height}")
-                return {
-                    "success": True,
-                    "width": width,
-                    "height": height,
-                    "message": f"屏幕尺寸: {width}x{height}"
-                }
-            else:
-                raise ValueError("无法解析屏幕尺寸")
+            geometry = await screen_geometry_service.get(device_id)
+            width, height = geometry.width, geometry.height
+            logger.debug(f"设备 {device_id}: 屏幕尺寸 {width}x{height}")
+            return {
+                "success": True,
+                "width": width,
+                "height": height,
+                "message": f"屏幕尺寸: {width}x{height}"
+            }
         except Exception as e:
             logger.error(f"设备 {device_id}: 获取屏幕尺寸失败 - {str(e)}")
             return {
@@ -277,6 +489,27 @@ class PhoneControlService:
                 "error": str(e)
             }
     
+    async def get_screen_geometry(self, device_id: str, refresh: bool = False) -> Dict[str, Any]:
+        """
+        获取屏幕几何信息（尺寸、分辨率覆盖、密度、旋转、刘海区域）
+        
+        Args:
+            device_id: 设备ID
+            refresh: 是否强制重新查询设备
+        """
+        try:
+            geometry = await screen_geometry_service.get(device_id, refresh=refresh)
+            return {
+                "success": True,
+                "geometry": geometry.model_dump()
+            }
+        except Exception as e:
+            logger.error(f"设备 {device_id}: 获取屏幕几何信息失败 - {str(e)}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
     async def screenshot(self, device_id: str, save_path: str = "/sdcard/screenshot.png") -> Dict[str, Any]:
         """
         截图
@@ -360,12 +593,7 @@ class PhoneControlService:
             activity: Activity名称（可选）
         """
         try:
-            if activity:
-                cmd = f"-s {device_id} shell am start -n {package_name}/{activity}"
-            else:
-                cmd = f"-s {device_id} shell monkey -p {package_name} -c android.intent.category.LAUNCHER 1"
-            
-            result = await run_adb_command(cmd)
+            result = await run_adb_command(f"-s {device_id} shell {start_app_command(package_name, activity)}")
             logger.info(f"设备 {device_id}: 启动应用 {package_name}")
             return {
                 "success": True,
@@ -392,7 +620,7 @@ class PhoneControlService:
         """
         try:
             result = await run_adb_command(
-                f"-s {device_id} shell am force-stop {package_name}"
+                f"-s {device_id} shell {stop_app_command(package_name)}"
             )
             logger.info(f"设备 {device_id}: 停止应用 {package_name}")
             return {
@@ -476,13 +704,8 @@ class PhoneControlService:
         if not screen_size.get("success"):
             return screen_size
         
-        width = screen_size["width"]
-        height = screen_size["height"]
-        x = width // 2
-        y1 = height * 2 // 3
-        y2 = y1 - distance
-        
-        return await self.swipe(device_id, x, y1, x, y2, 300)
+        x1, y1, x2, y2 = scroll_points("up", screen_size["width"], screen_size["height"], distance)
+        return await self.swipe(device_id, x1, y1, x2, y2, 300)
     
     async def scroll_down(self, device_id: str, distance: int = 500) -> Dict[str, Any]:
         """向下滚动"""
@@ -490,13 +713,8 @@ class PhoneControlService:
         if not screen_size.get("success"):
             return screen_size
         
-        width = screen_size["width"]
-        height = screen_size["height"]
-        x = width // 2
-        y1 = height // 3
-        y2 = y1 + distance
-        
-        return await self.swipe(device_id, x, y1, x, y2, 300)
+        x1, y1, x2, y2 = scroll_points("down", screen_size["width"], screen_size["height"], distance)
+        return await self.swipe(device_id, x1, y1, x2, y2, 300)
     
     async def scroll_left(self, device_id: str, distance: int = 500) -> Dict[str, Any]:
         """向左滚动"""
@@ -504,13 +722,8 @@ class PhoneControlService:
         if not screen_size.get("success"):
             return screen_size
         
-        width = screen_size["width"]
-        height = screen_size["height"]
-        y = height // 2
-        x1 = width * 2 // 3
-        x2 = x1 - distance
-        
-        return await self.swipe(device_id, x1, y, x2, y, 300)
+        x1, y1, x2, y2 = scroll_points("left", screen_size["width"], screen_size["height"], distance)
+        return await self.swipe(device_id, x1, y1, x2, y2, 300)
     
     async def scroll_right(self, device_id: str, distance: int = 500) -> Dict[str, Any]:
         """向右滚动"""
@@ -518,13 +731,8 @@ class PhoneControlService:
         if not screen_size.get("success"):
             return screen_size
         
-        width = screen_size["width"]
-        height = screen_size["height"]
-        y = height // 2
-        x1 = width // 3
-        x2 = x1 + distance
-        
-        return await self.swipe(device_id, x1, y, x2, y, 300)
+        x1, y1, x2, y2 = scroll_points("right", screen_size["width"], screen_size["height"], distance)
+        return await self.swipe(device_id, x1, y1, x2, y2, 300)
     
     # ==================== 系统操作 ====================
     
@@ -538,12 +746,8 @@ class PhoneControlService:
             # 向上滑动解锁
             screen_size = await self.get_screen_size(device_id)
             if screen_size.get("success"):
-                width = screen_size["width"]
-                height = screen_size["height"]
-                x = width // 2
-                y1 = height * 4 // 5
-                y2 = height // 5
-                await self.swipe(device_id, x, y1, x, y2, 500)
+                x1, y1, x2, y2 = swipe_up_points(screen_size["width"], screen_size["height"])
+                await self.swipe(device_id, x1, y1, x2, y2, 500)
             
             logger.info(f"设备 {device_id}: 向上滑动屏幕")
             return {
@@ -565,12 +769,8 @@ class PhoneControlService:
             # 获取屏幕尺寸
             screen_size = await self.get_screen_size(device_id)
             if screen_size.get("success"):
-                width = screen_size["width"]
-                height = screen_size["height"]
-                x = width // 2
-                y1 = height // 5
-                y2 = height * 4 // 5
-                await self.swipe(device_id, x, y1, x, y2, 500)
+                x1, y1, x2, y2 = swipe_down_points(screen_size["width"], screen_size["height"])
+                await self.swipe(device_id, x1, y1, x2, y2, 500)
             
             logger.info(f"设备 {device_id}: 向下滑动屏幕")
             return {
@@ -591,7 +791,7 @@ class PhoneControlService:
         try:
             # 不等待命令完成，避免阻塞视频流
             await run_adb_command(
-                f"-s {device_id} shell cmd statusbar expand-notifications",
+                f"-s {device_id} shell {STATUSBAR_COMMANDS['open_notification']}",
                 wait=False
             )
             logger.info(f"设备 {device_id}: 打开通知栏")
@@ -613,7 +813,7 @@ class PhoneControlService:
         try:
             # 不等待命令完成，避免阻塞视频流
             await run_adb_command(
-                f"-s {device_id} shell cmd statusbar expand-settings",
+                f"-s {device_id} shell {STATUSBAR_COMMANDS['open_quick_settings']}",
                 wait=False
             )
             logger.info(f"设备 {device_id}: 打开快捷设置")
@@ -635,7 +835,7 @@ class PhoneControlService:
         try:
             # 不等待命令完成，避免阻塞视频流
             await run_adb_command(
-                f"-s {device_id} shell cmd statusbar collapse",
+                f"-s {device_id} shell {STATUSBAR_COMMANDS['close_notification']}",
                 wait=False
             )
             logger.info(f"设备 {device_id}: 关闭通知栏")
@@ -651,6 +851,175 @@ class PhoneControlService:
                 "action": "close_notification",
                 "error": str(e)
             }
+    
+    # ==================== 批量操作 ====================
+    
+    async def run_batch(
+        self,
+        device_id: str,
+        steps: List[Dict[str, Any]],
+        stop_on_error: bool = True
+    ) -> Dict[str, Any]:
+        """
+        在同一个持久 shell 通道上按顺序执行一组操作
+        
+        Args:
+            device_id: 设备ID
+            steps: 操作列表，每项包含 action、params（可选）和 delay_ms（执行后等待，可选）
+            stop_on_error: 某一步失败后是否停止执行后续步骤
+        
+        Raises:
+            ValueError: 存在不支持的动作或参数不合法
+        """
+        # 先整体校验，避免执行到一半才发现参数错误
+        commands = self.prepare_batch(steps)
+        
+        screen: Optional[Tuple[int, int]] = None
+        results = []
+        success = True
+        # 批量中的多次输入共用一次输入法切换，结束后恢复
+        keyboard_held = device_id in self._original_ime
+        batch_start = time.perf_counter()
+        
+        for index, step in enumerate(steps):
+            action = step["action"]
+            params = step.get("params") or {}
+            delay_ms = max(int(step.get("delay_ms") or 0), 0)
+            step_start = time.perf_counter()
+            step_result: Dict[str, Any] = {
+                "index": index,
+                "action": action,
+                "started_ms": round((step_start - batch_start) * 1000, 1),
+            }
+            try:
+                if action == "wait":
+                    await asyncio.sleep(wait_seconds(params))
+                    step_result.update(success=True, returncode=0)
+                elif action == "input_text":
+                    # 与单独的输入接口保持一致（优先使用 ADB Keyboard）
+                    result = await self.input_text(device_id, str(params["text"]), keep_keyboard=True)
+                    step_result.update(success=result["success"], error=result.get("error"))
+                else:
+                    command = commands[index]
+                    if command is None:
+                        if screen is None:
+                            screen = await screen_geometry_service.get_size(device_id)
+                        command = self._build_batch_command(action, params, screen)
+                    result = await run_shell(device_id, command)
+                    step_result.update(
+                        success=result.returncode == 0,
+                        returncode=result.returncode,
+                        output=result.stdout[:500]
+                    )
+            except Exception as e:
+                logger.error(f"设备 {device_id}: 批量操作第 {index} 步 ({action}) 失败 - {str(e)}")
+                step_result.update(success=False, error=str(e) or type(e).__name__)
+            step_result["duration_ms"] = round((time.perf_counter() - step_start) * 1000, 1)
+            
+            results.append(step_result)
+            if not step_result["success"]:
+                success = False
+                if stop_on_error:
+                    break
+            
+            if delay_ms:
+                step_result["delay_ms"] = delay_ms
+                await asyncio.sleep(delay_ms / 1000)
+        
+        if not keyboard_held and device_id in self._original_ime:
+            await self.restore_keyboard(device_id)
+        
+        total_ms = round((time.perf_counter() - batch_start) * 1000, 1)
+        logger.info(f"设备 {device_id}: 批量操作完成 {len(results)}/{len(steps)} 步, 耗时 {total_ms}ms")
+        return {
+            "success": success,
+            "action": "batch",
+            "device_id": device_id,
+            "completed": len(results),
+            "total": len(steps),
+            "total_ms": total_ms,
+            "steps": results
+        }
+    
+    @classmethod
+    def prepare_batch(cls, steps: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        校验一组批量操作并预先生成不依赖屏幕尺寸的命令
+        
+        Returns:
+            每一步的 shell 命令；wait 和依赖屏幕尺寸的动作为 None（执行时生成）
+        
+        Raises:
+            ValueError: 存在不支持的动作或参数不合法
+        """
+        commands: List[Optional[str]] = []
+        for index, step in enumerate(steps):
+            action = step.get("action")
+            if action not in BATCH_ACTIONS:
+                raise ValueError(f"第 {index} 步: 不支持的动作 '{action}'")
+            params = step.get("params") or {}
+            try:
+                if action == "wait":
+                    wait_seconds(params)
+                    commands.append(None)
+                elif action in _SCREEN_SIZE_ACTIONS:
+                    cls._build_batch_command(action, params, _PLACEHOLDER_SCREEN)
+                    commands.append(None)
+                else:
+                    commands.append(cls._build_batch_command(action, params))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"第 {index} 步 ({action}): 参数错误 - {e}")
+        return commands
+    
+    @staticmethod
+    def _build_batch_command(
+        action: str,
+        params: Dict[str, Any],
+        screen: Optional[Tuple[int, int]] = None
+    ) -> str:
+        """将批量操作中的单个动作转换为设备端 shell 命令"""
+        if action in BATCH_KEY_ACTIONS:
+            return keyevent_command(BATCH_KEY_ACTIONS[action])
+        if action in STATUSBAR_COMMANDS:
+            return STATUSBAR_COMMANDS[action]
+        
+        if action == "tap":
+            return f"input tap {int(params['x'])} {int(params['y'])}"
+        if action == "swipe":
+            return swipe_command(
+                params["x1"], params["y1"], params["x2"], params["y2"], params.get("duration", 300)
+            )
+        if action == "long_press":
+            return long_press_command(params["x"], params["y"], params.get("duration", 1000))
+        if action == "input_text":
+            text = str(params["text"]).replace(' ', '%s')
+            return f"input text {shlex.quote(text)}"
+        if action == "clear_text":
+            count = max(min(int(params.get("count", 100)), 500), 1)
+            # 一次 input 调用发送多个删除键
+            return "input keyevent " + " ".join(["KEYCODE_DEL"] * count)
+        if action == "press_key":
+            return keyevent_command(params["keycode"])
+        if action == "start_app":
+            return start_app_command(params["package_name"], params.get("activity"))
+        if action == "stop_app":
+            return stop_app_command(params["package_name"])
+        
+        # 以下动作依赖屏幕尺寸
+        width, height = screen
+        if action.startswith("scroll_"):
+            direction = action[len("scroll_"):]
+            return swipe_command(*scroll_points(direction, width, height, params.get("distance", 500)), 300)
+        if action == "swipe_down":
+            return swipe_command(*swipe_down_points(width, height), 500)
+        if action == "unlock_screen":
+            # 屏幕关闭时先按电源键唤醒，再向上滑动
+            return (
+                "if dumpsys power | grep mHoldingDisplay | grep -q false; then "
+                "input keyevent KEYCODE_POWER; sleep 0.5; fi; "
+                + swipe_command(*swipe_up_points(width, height), 500)
+            )
+        raise ValueError(f"不支持的动作: {action}")
 
 
 # 全局实例
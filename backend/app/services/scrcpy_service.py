@@ -8,6 +8,7 @@ from typing import Dict, Any, Optional
 from fastapi import WebSocket
 from app.core.config import settings
 from app.services.device_service import DeviceManager
+from app.services.screen_geometry_service import screen_geometry_service
 from app.utils.logger_utils import logger
 from app.utils.adb_utils import run_adb_command, get_adb_path
 
@@ -928,6 +929,10 @@ class ScrcpyManager:
                                         if nalu_type == 7:  # SPS
                                             if device_id not in self.h264_frame_cache:
                                                 self.h264_frame_cache[device_id] = {}
+                                            previous_sps = self.h264_frame_cache[device_id].get('sps')
+                                            if previous_sps is not None and previous_sps != nalu_data:
+                                                # SPS 变化意味着视频分辨率变化（旋转或显示参数变化）
+                                                screen_geometry_service.invalidate(device_id)
                                             self.h264_frame_cache[device_id]['sps'] = nalu_data
                                             logger.info(f"设备 {device_id}: 🔖 已缓存 SPS 帧（{len(nalu_data)} 字节）")
                                         elif nalu_type == 8:  # PPS
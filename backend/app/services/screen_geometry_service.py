@@ -0,0 +1,110 @@
+"""
+屏幕几何信息缓存
+按设备缓存屏幕尺寸、分辨率覆盖、像素密度、旋转方向和刘海区域，供所有坐标计算共用
+"""
+import asyncio
+import sys
+import time
+from typing import Dict, Tuple
+from app.core.config import settings
+from app.models.device_models import ScreenGeometry
+from app.utils.adb_utils import run_shell
+from app.utils.autoglm_utils import ensure_autoglm_importable
+from app.utils.logger_utils import logger
+from app.utils.metrics_utils import metrics
+
+
+def _geometry_module():
+    """phone_agent.adb.geometry（查询脚本和解析与代理共用；首次使用时导入，不拖慢服务启动）"""
+    ensure_autoglm_importable()
+    from phone_agent.adb import geometry
+    return geometry
+
+
+class ScreenGeometryService:
+    """屏幕几何信息缓存服务类"""
+    
+    def __init__(self):
+        # device_id -> (几何信息, 缓存时间)
+        self._cache: Dict[str, Tuple[ScreenGeometry, float]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    async def get(self, device_id: str, refresh: bool = False) -> ScreenGeometry:
+        """
+        获取设备屏幕几何信息，缓存未命中或过期时查询设备
+        
+        Args:
+            device_id: 设备ID
+            refresh: 是否强制重新查询
+        
+        Raises:
+            ValueError: 无法解析设备返回的屏幕信息
+        """
+        cached = self._cache.get(device_id)
+        if cached and not refresh and time.monotonic() - cached[1] < settings.SCREEN_GEOMETRY_TTL:
+            self.hits += 1
+            return cached[0]
+        
+        lock = self._locks.setdefault(device_id, asyncio.Lock())
+        async with lock:
+            # 等锁期间可能已被其他请求刷新
+            cached = self._cache.get(device_id)
+            if cached and not refresh and time.monotonic() - cached[1] < settings.SCREEN_GEOMETRY_TTL:
+                self.hits += 1
+                return cached[0]
+            
+            self.misses += 1
+            geometry_module = _geometry_module()
+            result = await run_shell(device_id, geometry_module.GEOMETRY_SCRIPT, timeout=10)
+            parsed = geometry_module.parse_geometry(result.stdout)
+            if parsed is None:
+                raise ValueError("无法解析屏幕尺寸")
+            # 进程内运行的代理共用同一份几何信息
+            geometry_module.set_screen_geometry(device_id, parsed)
+            geometry = self.to_model(parsed)
+            self._cache[device_id] = (geometry, time.monotonic())
+            logger.info(
+                f"设备 {device_id}: 屏幕几何信息 {geometry.width}x{geometry.height}, "
+                f"旋转 {geometry.rotation}, 密度 {geometry.override_density or geometry.density}"
+            )
+            return geometry
+    
+    async def get_size(self, device_id: str) -> Tuple[int, int]:
+        """获取当前方向下的有效屏幕尺寸 (width, height)"""
+        geometry = await self.get(device_id)
+        return geometry.width, geometry.height
+    
+    def invalidate(self, device_id: str):
+        """使设备缓存失效（旋转、分辨率变化等显示变化时调用）"""
+        geometry_module = sys.modules.get("phone_agent.adb.geometry")
+        if geometry_module is not None:
+            geometry_module.invalidate_screen_geometry(device_id)
+        if self._cache.pop(device_id, None) is not None:
+            logger.info(f"设备 {device_id}: 显示参数变化，屏幕几何缓存已失效")
+    
+    def snapshot(self) -> Dict[str, int]:
+        """缓存统计（用于指标输出）"""
+        return {"devices": len(self._cache), "hits": self.hits, "misses": self.misses}
+    
+    @staticmethod
+    def to_model(parsed) -> ScreenGeometry:
+        """将 phone_agent 的 ScreenGeometry 转换为接口模型"""
+        return ScreenGeometry(
+            width=parsed.width,
+            height=parsed.height,
+            physical_width=parsed.physical_width,
+            physical_height=parsed.physical_height,
+            override_width=parsed.override_width,
+            override_height=parsed.override_height,
+            density=parsed.density,
+            override_density=parsed.override_density,
+            rotation=parsed.rotation,
+            cutout_insets=parsed.cutout_insets
+        )
+
+
+# 全局实例
+screen_geometry_service = ScreenGeometryService()
+metrics.register_provider("screen_geometry_cache", screen_geometry_service.snapshot)
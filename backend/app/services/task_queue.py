@@ -0,0 +1,560 @@
+"""
+AI 任务队列
+任务持久化在本地 SQLite 中，由后台调度器按优先级和租户公平性分派执行，
+同一设备同时只运行一个任务（高优先级任务可抢占），客户端提交后即可断开，之后查询状态和结果
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set
+from app.core.config import settings
+from app.services.ai_service import ai_service
+from app.utils.logger_utils import logger
+from app.utils.metrics_utils import metrics
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    device_id TEXT NOT NULL,
+    command TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    preemptions INTEGER NOT NULL DEFAULT 0,
+    has_api_key INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, priority, created_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_device ON tasks (device_id, status);
+CREATE INDEX IF NOT EXISTS idx_tasks_tenant ON tasks (tenant, status);
+"""
+
+API_KEY_LOST_ERROR = "服务重启，提交任务时的 API 密钥已丢失，请重新提交任务"
+
+
+def _placeholders(values) -> str:
+    return ", ".join("?" for _ in values)
+
+
+class TaskQueue:
+    """持久化 AI 任务队列与调度器类"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(tasks)")}
+        if "preemptions" not in columns:
+            self._db.execute("ALTER TABLE tasks ADD COLUMN preemptions INTEGER NOT NULL DEFAULT 0")
+        if "has_api_key" not in columns:
+            self._db.execute("ALTER TABLE tasks ADD COLUMN has_api_key INTEGER NOT NULL DEFAULT 0")
+        # 早期版本把 API 密钥写进了 params，启动时清除（保留“提交过密钥”的标记）
+        self._db.execute(
+            "UPDATE tasks SET has_api_key = 1, params = json_remove(params, '$.api_key') "
+            "WHERE json_extract(params, '$.api_key') IS NOT NULL"
+        )
+        self._db.commit()
+
+        # 任务ID -> API 密钥，只保存在内存中，不落盘；
+        # 服务重启后密钥丢失，提交时带了密钥的排队任务标记为失败，不改用服务端配置的密钥
+        self._api_keys: Dict[str, str] = {}
+        # 各状态的任务数，由调度循环刷新，供指标输出使用（避免在事件循环中查询数据库）
+        self._counts: Dict[str, int] = {}
+
+        # 调度状态（只在事件循环中修改）
+        self._running: Dict[str, asyncio.Task] = {}
+        self._running_devices: Set[str] = set()
+        # 设备 -> 正在该设备上运行的任务行（用于抢占判断）
+        self._device_tasks: Dict[str, sqlite3.Row] = {}
+        # 正在被抢占的任务ID，结束后重新排队
+        self._preempting: Set[str] = set()
+        # 设备 -> 抢占该设备的任务ID，设备空出后只分派给该任务
+        self._reserved: Dict[str, str] = {}
+        self._tenant_running: Dict[str, int] = {}
+        # 租户 -> 上次分派时间，用于同等条件下轮转
+        self._tenant_served: Dict[str, float] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._scheduler: Optional[asyncio.Task] = None
+        self._last_cleanup = 0.0
+        metrics.register_provider("task_queue", lambda: self._stats(self._counts))
+
+    # ==================== 生命周期 ====================
+
+    async def start(self):
+        """恢复中断的任务并启动调度器"""
+        if self._scheduler is not None:
+            return
+        interrupted, key_lost = await asyncio.to_thread(self._recover, set(self._api_keys))
+        if interrupted:
+            logger.warning(f"任务队列: {interrupted} 个运行中的任务因服务重启被标记为失败")
+        if key_lost:
+            logger.warning(f"任务队列: {key_lost} 个排队任务的 API 密钥已丢失，已标记为失败，需重新提交")
+        self._wake = asyncio.Event()
+        self._scheduler = asyncio.create_task(self._schedule_loop())
+        logger.info(f"任务队列已启动: {self.path}, 并发 {settings.TASK_WORKERS}")
+
+    async def stop(self):
+        """停止调度器（运行中的任务在下次启动时标记为中断）"""
+        if self._scheduler is None:
+            return
+        self._scheduler.cancel()
+        try:
+            await self._scheduler
+        except asyncio.CancelledError:
+            pass
+        self._scheduler = None
+
+    def _recover(self, known_keys: Set[str]):
+        now = time.time()
+        with self._lock:
+            # 服务重启前仍在运行的任务无法得知设备状态，标记为失败
+            interrupted = self._db.execute(
+                "UPDATE tasks SET status = ?, finished_at = ?, error = ? WHERE status = ?",
+                (FAILED, now, "服务重启，任务被中断", RUNNING)
+            ).rowcount
+            # 提交时带了密钥的排队任务无法按原密钥执行，标记为失败而不是改用服务端密钥
+            lost = [
+                row[0] for row in self._db.execute(
+                    "SELECT id FROM tasks WHERE status = ? AND has_api_key = 1", (QUEUED,)
+                )
+                if row[0] not in known_keys
+            ]
+            if lost:
+                self._db.execute(
+                    f"UPDATE tasks SET status = ?, finished_at = ?, error = ? "
+                    f"WHERE status = ? AND id IN ({_placeholders(lost)})",
+                    (FAILED, now, API_KEY_LOST_ERROR, QUEUED, *lost)
+                )
+            self._db.commit()
+        return interrupted, len(lost)
+
+    # ==================== 任务操作 ====================
+
+    async def submit(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        提交任务（一次事务写入）
+
+        Args:
+            tasks: 任务列表，字段: device_id, command, tenant, priority, params
+
+        Returns:
+            创建的任务
+        """
+        now = time.time()
+        rows = []
+        api_keys = {}
+        for task in tasks:
+            task_id = uuid.uuid4().hex
+            params = dict(task.get("params") or {})
+            api_key = params.pop("api_key", None)
+            if api_key is not None:
+                api_keys[task_id] = api_key
+            rows.append((
+                task_id,
+                task.get("tenant") or "default",
+                task["device_id"],
+                task["command"],
+                int(task.get("priority") or 0),
+                json.dumps(params, ensure_ascii=False),
+                QUEUED,
+                now,
+                int(api_key is not None)
+            ))
+        self._api_keys.update(api_keys)
+        created = await asyncio.to_thread(self._insert, rows)
+        metrics.inc("task_queue.submitted", len(rows))
+        self._notify()
+        return [self._to_dict(row, with_result=True) for row in created]
+
+    def _insert(self, rows: List[tuple]) -> List[sqlite3.Row]:
+        ids = [row[0] for row in rows]
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO tasks (id, tenant, device_id, command, priority, params, status, created_at, has_api_key) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._db.commit()
+            created = {
+                row["id"]: row for row in self._db.execute(
+                    f"SELECT * FROM tasks WHERE id IN ({_placeholders(ids)})", ids
+                )
+            }
+        return [created[task_id] for task_id in ids]
+
+    async def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务详情"""
+        row = await asyncio.to_thread(self._fetch, task_id)
+        return self._to_dict(row, with_result=True) if row else None
+
+    def _fetch(self, task_id: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+
+    async def list_tasks(
+        self,
+        status: Optional[str] = None,
+        device_id: Optional[str] = None,
+        tenant: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """按条件列出任务（不含执行结果），新任务在前"""
+        conditions, args = [], []
+        for column, value in (("status", status), ("device_id", device_id), ("tenant", tenant)):
+            if value:
+                conditions.append(f"{column} = ?")
+                args.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = await asyncio.to_thread(
+            self._query,
+            f"SELECT * FROM tasks {where} ORDER BY created_at DESC, rowid DESC LIMIT ? OFFSET ?",
+            (*args, limit, offset)
+        )
+        return [self._to_dict(row) for row in rows]
+
+    def _query(self, sql: str, args) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    async def cancel(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        取消任务
+
+        排队中的任务立即取消；运行中的任务中断代理，停止后状态为 cancelled
+        """
+        row = await asyncio.to_thread(self._request_cancel, task_id)
+        if row is None:
+            return None
+        if row["status"] == QUEUED:
+            self._api_keys.pop(task_id, None)
+        elif row["status"] == RUNNING:
+            await ai_service.cancel(row["device_id"], f"任务 {task_id} 被取消")
+        metrics.inc("task_queue.cancel_requests")
+        return await self.get(task_id)
+
+    def _request_cancel(self, task_id: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, device_id FROM tasks WHERE id = ?", (task_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row["status"] == QUEUED:
+                self._db.execute(
+                    "UPDATE tasks SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                    (CANCELLED, time.time(), task_id, QUEUED)
+                )
+            elif row["status"] == RUNNING:
+                self._db.execute("UPDATE tasks SET cancel_requested = 1 WHERE id = ?", (task_id,))
+            self._db.commit()
+        return row
+
+    async def stats(self) -> Dict[str, Any]:
+        """队列统计"""
+        self._counts = await asyncio.to_thread(self._count)
+        return self._stats(self._counts)
+
+    def _count(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._db.execute(
+                "SELECT status, COUNT(*) FROM tasks GROUP BY status"
+            ).fetchall())
+
+    def _stats(self, counts: Dict[str, int]) -> Dict[str, Any]:
+        return {
+            "workers": settings.TASK_WORKERS,
+            "running": len(self._running),
+            "busy_devices": sorted(self._running_devices),
+            "preempting": len(self._preempting),
+            "tenants_running": dict(self._tenant_running),
+            "counts": counts
+        }
+
+    # ==================== 调度 ====================
+
+    def _notify(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _schedule_loop(self):
+        while True:
+            self._wake.clear()
+            try:
+                await self._dispatch()
+                await self._preempt()
+                await self._cleanup()
+                self._counts = await asyncio.to_thread(self._count)
+            except Exception as e:
+                logger.error(f"任务调度失败: {str(e)}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.TASK_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch(self):
+        """在空闲名额内按公平顺序启动可运行的任务"""
+        while len(self._running) < settings.TASK_WORKERS:
+            row = await self._pick()
+            if row is None:
+                return
+            now = time.time()
+            claimed = await asyncio.to_thread(self._claim, row["id"], now)
+            if not claimed:
+                continue
+            tenant = row["tenant"]
+            self._running_devices.add(row["device_id"])
+            self._device_tasks[row["device_id"]] = row
+            self._reserved.pop(row["device_id"], None)
+            self._tenant_running[tenant] = self._tenant_running.get(tenant, 0) + 1
+            self._tenant_served[tenant] = now
+            self._running[row["id"]] = asyncio.create_task(self._execute(row))
+            metrics.inc("task_queue.started")
+
+    def _claim(self, task_id: str, now: float) -> bool:
+        with self._lock:
+            claimed = self._db.execute(
+                "UPDATE tasks SET status = ?, started_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, now, task_id, QUEUED)
+            ).rowcount
+            self._db.commit()
+        return bool(claimed)
+
+    async def _preempt(self):
+        """
+        抢占：排队任务的优先级比同一设备上运行中的任务高出
+        TASK_PREEMPT_PRIORITY_GAP 时，中断运行中的任务并让其重新排队
+        """
+        gap = settings.TASK_PREEMPT_PRIORITY_GAP
+        if gap <= 0 or not self._device_tasks:
+            return
+        devices = list(self._device_tasks)
+        # 每个运行中设备只取优先级最高的排队任务
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT * FROM ("
+            "  SELECT *, ROW_NUMBER() OVER ("
+            "    PARTITION BY device_id ORDER BY priority DESC, created_at, rowid"
+            "  ) AS pick_rank FROM tasks"
+            f"  WHERE status = ? AND device_id IN ({_placeholders(devices)})"
+            ") WHERE pick_rank = 1",
+            (QUEUED, *devices)
+        )
+        for row in rows:
+            device_id = row["device_id"]
+            running = self._device_tasks.get(device_id)
+            if (
+                running is None
+                or device_id in self._reserved
+                or running["id"] in self._preempting
+                or row["priority"] - running["priority"] < gap
+            ):
+                continue
+            self._preempting.add(running["id"])
+            self._reserved[device_id] = row["id"]
+            metrics.inc("task_queue.preemptions")
+            logger.info(f"任务 {row['id']} (优先级 {row['priority']}) 抢占设备 {device_id} 上的任务 {running['id']}")
+            asyncio.create_task(
+                ai_service.cancel(device_id, f"被高优先级任务 {row['id']} 抢占")
+            )
+
+    async def _pick(self) -> Optional[sqlite3.Row]:
+        """
+        选出下一个任务
+
+        设备正忙、设备已预留给其他任务、租户已达并发上限的任务在 SQL 中过滤，
+        每个租户只取优先级最高（同优先级先进先出）的一个可运行任务；
+        各租户先比较运行中的任务数（少者优先），再比较优先级，最后轮转到最久未被分派的租户
+        """
+        # 抢占方已取消或已不在队列中时解除设备预留
+        if self._reserved:
+            reserved_ids = list(self._reserved.values())
+            queued_ids = {row[0] for row in await asyncio.to_thread(
+                self._query,
+                f"SELECT id FROM tasks WHERE status = ? AND id IN ({_placeholders(reserved_ids)})",
+                (QUEUED, *reserved_ids)
+            )}
+            for device_id, task_id in list(self._reserved.items()):
+                if task_id not in queued_ids and device_id not in self._running_devices:
+                    del self._reserved[device_id]
+
+        conditions, args = ["status = ?"], [QUEUED]
+        busy = list(self._running_devices | set(ai_service.runner.active_devices))
+        if busy:
+            conditions.append(f"device_id NOT IN ({_placeholders(busy)})")
+            args.extend(busy)
+        for device_id, task_id in self._reserved.items():
+            conditions.append("NOT (device_id = ? AND id != ?)")
+            args.extend((device_id, task_id))
+        if settings.TASK_MAX_PER_TENANT:
+            full = [
+                tenant for tenant, running in self._tenant_running.items()
+                if running >= settings.TASK_MAX_PER_TENANT
+            ]
+            if full:
+                conditions.append(f"tenant NOT IN ({_placeholders(full)})")
+                args.extend(full)
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT * FROM ("
+            "  SELECT rowid AS seq, *, ROW_NUMBER() OVER ("
+            "    PARTITION BY tenant ORDER BY priority DESC, created_at, rowid"
+            "  ) AS pick_rank FROM tasks"
+            f"  WHERE {' AND '.join(conditions)}"
+            ") WHERE pick_rank = 1",
+            args
+        )
+        best = None
+        best_key = None
+        for row in rows:
+            tenant = row["tenant"]
+            running = self._tenant_running.get(tenant, 0)
+            key = (running, -row["priority"], self._tenant_served.get(tenant, 0.0), row["seq"])
+            if best_key is None or key < best_key:
+                best, best_key = row, key
+        return best
+
+    async def _execute(self, row: sqlite3.Row):
+        """执行一个任务并写回结果"""
+        task_id = row["id"]
+        params = json.loads(row["params"])
+        status, result, error = FAILED, None, None
+        api_key = self._api_keys.get(task_id)
+        try:
+            if row["has_api_key"] and api_key is None:
+                # 不能用服务端配置的密钥代替提交任务时的密钥
+                raise RuntimeError(API_KEY_LOST_ERROR)
+            result = await ai_service.execute_natural_language_command(
+                device_id=row["device_id"],
+                command=row["command"],
+                verbose=params.get("verbose", False),
+                max_steps=params.get("max_steps"),
+                base_url=params.get("base_url"),
+                model_name=params.get("model_name"),
+                api_key=api_key
+            )
+            if result.get("success", True):
+                status = SUCCEEDED
+            else:
+                error = result.get("error", "执行失败")
+        except Exception as e:
+            logger.error(f"任务 {task_id} 执行失败: {str(e)}")
+            error = str(e)
+        finally:
+            status = await asyncio.to_thread(
+                self._finish, task_id, status, result, error, task_id in self._preempting
+            )
+            if status != QUEUED:
+                self._api_keys.pop(task_id, None)
+            self._preempting.discard(task_id)
+            self._running.pop(task_id, None)
+            self._running_devices.discard(row["device_id"])
+            self._device_tasks.pop(row["device_id"], None)
+            tenant = row["tenant"]
+            self._tenant_running[tenant] -= 1
+            if not self._tenant_running[tenant]:
+                del self._tenant_running[tenant]
+            metrics.inc(f"task_queue.{status}")
+            self._notify()
+
+    def _finish(self, task_id: str, status: str, result, error: Optional[str], preempted: bool) -> str:
+        """写回执行结果，返回任务的最终状态"""
+        with self._lock:
+            cancel_requested = self._db.execute(
+                "SELECT cancel_requested FROM tasks WHERE id = ?", (task_id,)
+            ).fetchone()[0]
+            if cancel_requested:
+                status = CANCELLED
+            elif preempted:
+                # 被抢占的任务重新排队，之后从头执行
+                status = QUEUED
+            if status == QUEUED:
+                self._db.execute(
+                    "UPDATE tasks SET status = ?, started_at = NULL, error = ?, "
+                    "preemptions = preemptions + 1 WHERE id = ?",
+                    (QUEUED, "被高优先级任务抢占，等待重新执行", task_id)
+                )
+            else:
+                self._db.execute(
+                    "UPDATE tasks SET status = ?, finished_at = ?, result = ?, error = ? WHERE id = ?",
+                    (
+                        status,
+                        time.time(),
+                        json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+                        error,
+                        task_id
+                    )
+                )
+            self._db.commit()
+        return status
+
+    async def _cleanup(self):
+        """定期删除超过保留期的已结束任务"""
+        now = time.time()
+        if now - self._last_cleanup < 3600:
+            return
+        self._last_cleanup = now
+        cutoff = now - settings.TASK_RETENTION_DAYS * 86400
+        deleted = await asyncio.to_thread(self._delete_finished, cutoff)
+        if deleted:
+            logger.info(f"任务队列: 清理 {deleted} 个过期任务")
+
+    def _delete_finished(self, cutoff: float) -> int:
+        with self._lock:
+            deleted = self._db.execute(
+                f"DELETE FROM tasks WHERE status IN ({_placeholders(FINISHED_STATUSES)}) AND finished_at < ?",
+                (*FINISHED_STATUSES, cutoff)
+            ).rowcount
+            self._db.commit()
+        return deleted
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row, with_result: bool = False) -> Dict[str, Any]:
+        params = json.loads(row["params"])
+        data = {
+            "id": row["id"],
+            "tenant": row["tenant"],
+            "device_id": row["device_id"],
+            "command": row["command"],
+            "priority": row["priority"],
+            "params": params,
+            "status": row["status"],
+            "cancel_requested": bool(row["cancel_requested"]),
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "error": row["error"],
+            "preemptions": row["preemptions"],
+            "has_api_key": bool(row["has_api_key"])
+        }
+        if with_result:
+            data["result"] = json.loads(row["result"]) if row["result"] else None
+        return data
+
+
+# 全局实例
+task_queue = TaskQueue(settings.TASK_QUEUE_PATH)
@@ -1,9 +1,13 @@
 import asyncio
 import os
 import shutil
-from typing import Dict, Any
+import threading
+import time
+from typing import Dict, Any, List, Optional, Set
 from app.core.config import settings
+from app.utils.autoglm_utils import ensure_autoglm_importable
 from app.utils.logger_utils import logger
+from app.utils.metrics_utils import metrics
 
 def get_adb_path() -> str:
     """获取ADB的完整路径"""
@@ -32,6 +36,123 @@ def get_adb_path() -> str:
     
     return adb_path
 
+class BackgroundProcessRegistry:
+    """后台 adb 进程登记表
+
+    `run_adb_command(..., wait=False)` 启动的进程在这里登记，由后台任务异步回收：
+    每台设备同时存在的后台进程数有上限（超出时等待空位），超时未退出的进程会被强制结束，
+    保证长时间运行时进程数和文件描述符数保持稳定。
+    """
+
+    def __init__(self, max_per_device: int, timeout: float):
+        self.max_per_device = max_per_device
+        self.timeout = timeout
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._outstanding: Dict[str, Set[asyncio.subprocess.Process]] = {}
+        self._reapers: Set[asyncio.Task] = set()
+        self.spawned = 0
+        self.reaped = 0
+        self.killed = 0
+        self.failed = 0
+
+    def _slot(self, device_key: str) -> asyncio.Semaphore:
+        slot = self._slots.get(device_key)
+        if slot is None:
+            slot = asyncio.Semaphore(self.max_per_device)
+            self._slots[device_key] = slot
+        return slot
+
+    async def spawn(self, cmd_parts: List[str], device_key: str) -> asyncio.subprocess.Process:
+        """启动后台进程并登记回收（设备后台进程数已满时等待）"""
+        slot = self._slot(device_key)
+        await slot.acquire()
+        try:
+            # 后台进程的输出无人读取，直接丢弃，避免管道占用文件描述符
+            process = await asyncio.create_subprocess_exec(
+                *cmd_parts,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+                env=os.environ.copy()
+            )
+        except Exception:
+            slot.release()
+            raise
+
+        self.spawned += 1
+        self._outstanding.setdefault(device_key, set()).add(process)
+        reaper = asyncio.create_task(self._reap(device_key, process, slot))
+        self._reapers.add(reaper)
+        reaper.add_done_callback(self._reapers.discard)
+        return process
+
+    async def _reap(self, device_key: str, process: asyncio.subprocess.Process, slot: asyncio.Semaphore):
+        """等待进程退出，超时则强制结束"""
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(process.wait(), timeout=self.timeout)
+            self.reaped += 1
+            if process.returncode != 0:
+                self.failed += 1
+                logger.debug(f"后台 ADB 进程退出码 {process.returncode} (pid={process.pid})")
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"后台 ADB 进程超时 {time.monotonic() - started:.1f}s，强制结束 (pid={process.pid}, 设备={device_key})"
+            )
+            await self._kill(process)
+        except asyncio.CancelledError:
+            await self._kill(process)
+            raise
+        finally:
+            self._outstanding.get(device_key, set()).discard(process)
+            slot.release()
+
+    async def _kill(self, process: asyncio.subprocess.Process):
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+        self.killed += 1
+
+    def outstanding(self, device_key: Optional[str] = None) -> int:
+        """当前未退出的后台进程数"""
+        if device_key is not None:
+            return len(self._outstanding.get(device_key, ()))
+        return sum(len(processes) for processes in self._outstanding.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        """后台进程统计（用于指标输出）"""
+        return {
+            "outstanding": self.outstanding(),
+            "outstanding_by_device": {
+                device_key: len(processes)
+                for device_key, processes in self._outstanding.items() if processes
+            },
+            "spawned": self.spawned,
+            "reaped": self.reaped,
+            "killed": self.killed,
+            "failed": self.failed,
+            "max_per_device": self.max_per_device,
+            "timeout": self.timeout,
+        }
+
+    async def shutdown(self):
+        """结束全部后台进程（服务关闭时调用）"""
+        for reaper in list(self._reapers):
+            reaper.cancel()
+        if self._reapers:
+            await asyncio.gather(*self._reapers, return_exceptions=True)
+
+
+background_processes = BackgroundProcessRegistry(
+    max_per_device=settings.ADB_BACKGROUND_MAX_PER_DEVICE,
+    timeout=settings.ADB_BACKGROUND_TIMEOUT
+)
+metrics.register_provider("adb_background_processes", background_processes.snapshot)
+
+
 class CommandResult:
     """命令执行结果"""
     def __init__(self, stdout: str, stderr: str, returncode: int):
@@ -57,6 +178,15 @@ async def run_adb_command(command: str, timeout: int = 30, wait: bool = True) ->
         
         # 执行命令（使用列表形式，更安全）
         cmd_parts = [adb_path] + command.split()
+        
+        # 如果不等待，交给后台进程登记表回收后立即返回
+        if not wait:
+            args = cmd_parts[1:]
+            device_key = args[1] if len(args) > 1 and args[0] == "-s" else "default"
+            await background_processes.spawn(cmd_parts, device_key)
+            logger.debug(f"ADB命令已启动（不等待完成）: {cmd}")
+            return CommandResult(stdout="", stderr="", returncode=0)
+        
         process = await asyncio.create_subprocess_exec(
             *cmd_parts,
             stdout=asyncio.subprocess.PIPE,
@@ -64,13 +194,14 @@ async def run_adb_command(command: str, timeout: int = 30, wait: bool = True) ->
             env=os.environ.copy()  # 确保环境变量正确传递
         )
         
-        # 如果不等待，立即返回
-        if not wait:
-            logger.debug(f"ADB命令已启动（不等待完成）: {cmd}")
-            return CommandResult(stdout="", stderr="", returncode=0)
-        
-        # 等待命令完成
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        # 等待命令完成，超时则结束进程，避免遗留子进程
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
         
         # 解码输出
         stdout_str = stdout.decode('utf-8', errors='ignore') if stdout else ""
@@ -92,3 +223,54 @@ async def run_adb_command(command: str, timeout: int = 30, wait: bool = True) ->
         logger.error(f"执行ADB命令失败: {str(e)}", exc_info=True)
         raise
 
+
+
+# 全部设备共用的持久 shell 通道池（phone_agent.async_shell.ShellChannelPool），
+# 后台控制接口和进程内运行的代理共用，每台设备只保持一个 adb shell 进程
+_shell_pool = None
+_shell_pool_lock = threading.Lock()
+
+
+def get_shell_pool():
+    """获取（首次调用时创建）共用的 shell 通道池"""
+    global _shell_pool
+    with _shell_pool_lock:
+        if _shell_pool is None:
+            ensure_autoglm_importable()
+            from phone_agent.async_shell import ShellChannelPool
+            _shell_pool = ShellChannelPool([get_adb_path()], "-s")
+        return _shell_pool
+
+
+async def run_shell(device_id: str, command: str, timeout: float = 30) -> CommandResult:
+    """在设备的持久 shell 通道中执行一条命令（stderr 合并到 stdout）
+
+    Args:
+        device_id: 设备ID
+        command: 设备端 shell 命令（不包含 `adb shell` 前缀）
+        timeout: 超时时间（秒），超时或取消后通道会被丢弃并在下次使用时重建
+    """
+    output = await get_shell_pool().shell(device_id, command, timeout)
+    return CommandResult(stdout=output.text.rstrip("\n"), stderr="", returncode=output.returncode)
+
+
+def _shell_channel_stats() -> Dict[str, Any]:
+    if _shell_pool is None:
+        return {"open": 0, "devices": []}
+    stats = _shell_pool.stats()
+    return {
+        "open": sum(1 for channel in stats.values() if channel["alive"]),
+        "devices": [device_id for device_id, channel in stats.items() if channel["alive"]],
+        "commands": sum(channel["commands"] for channel in stats.values()),
+        "restarts": sum(channel["restarts"] for channel in stats.values()),
+    }
+
+
+metrics.register_provider("adb_shell_channels", _shell_channel_stats)
+
+
+async def shutdown_adb_processes():
+    """关闭全部 shell 通道并结束后台 adb 进程（服务关闭时调用）"""
+    if _shell_pool is not None:
+        await _shell_pool.close()
+    await background_processes.shutdown()
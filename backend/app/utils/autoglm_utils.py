@@ -0,0 +1,29 @@
+import os
+import sys
+from pathlib import Path
+from app.utils.logger_utils import logger
+
+# 假设 backend 和 Open-AutoGLM 在同一父目录下
+_DEFAULT_AUTOGLM_DIR = Path(__file__).resolve().parent.parent.parent.parent / "Open-AutoGLM"
+
+
+def get_autoglm_dir() -> Path:
+    """获取 Open-AutoGLM 目录（main.py 和 phone_agent 包所在目录）"""
+    if (_DEFAULT_AUTOGLM_DIR / "main.py").exists():
+        return _DEFAULT_AUTOGLM_DIR
+
+    logger.warning(f"未找到 main.py 文件: {_DEFAULT_AUTOGLM_DIR / 'main.py'}")
+    logger.info("将尝试使用环境变量中的路径或相对路径")
+    # 尝试使用环境变量或默认路径
+    main_py_env = os.getenv("AUTOGLM_MAIN_PY_PATH")
+    if main_py_env and Path(main_py_env).exists():
+        return Path(main_py_env).parent
+    # 默认路径
+    return Path("/Users/rock/Documents/ai-auto-touch/Open-AutoGLM")
+
+
+def ensure_autoglm_importable(autoglm_dir: Path = None) -> None:
+    """将 Open-AutoGLM 加入模块搜索路径，使 phone_agent 可以导入"""
+    path = str(autoglm_dir or get_autoglm_dir())
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,69 @@
+"""
+运行指标
+各模块通过计数器或指标提供函数登记运行数据，由 /api/v1/metrics 统一输出
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict
+from app.utils.logger_utils import logger
+
+
+class MetricsRegistry:
+    """进程内指标登记表"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._started_at = time.time()
+    
+    def inc(self, name: str, value: float = 1):
+        """累加计数器"""
+        with self._lock:
+            self._counters[name] += value
+    
+    def register_provider(self, name: str, provider: Callable[[], Dict[str, Any]]):
+        """登记指标提供函数，输出指标时调用，返回值放在同名字段下"""
+        self._providers[name] = provider
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """获取当前全部指标"""
+        with self._lock:
+            counters = dict(self._counters)
+        data: Dict[str, Any] = {
+            "uptime_seconds": round(time.time() - self._started_at, 1),
+            "counters": counters,
+            "process": _process_stats(),
+        }
+        for name, provider in list(self._providers.items()):
+            try:
+                data[name] = provider()
+            except Exception as e:
+                logger.warning(f"获取指标 {name} 失败: {str(e)}")
+                data[name] = {"error": str(e)}
+        return data
+
+
+def _process_stats() -> Dict[str, Any]:
+    """当前进程的子进程数和文件描述符数"""
+    stats: Dict[str, Any] = {"pid": os.getpid()}
+    try:
+        import psutil
+        process = psutil.Process()
+        stats["children"] = len(process.children())
+        stats["threads"] = process.num_threads()
+        if hasattr(process, "num_fds"):
+            stats["open_fds"] = process.num_fds()
+    except Exception:
+        # psutil 不可用时退回到 /proc（仅 Linux）
+        if os.path.isdir("/proc/self/fd"):
+            stats["open_fds"] = len(os.listdir("/proc/self/fd"))
+    return stats
+
+
+# 全局实例
+metrics = MetricsRegistry()
+
+__all__ = ["metrics", "MetricsRegistry"]
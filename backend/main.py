@@ -2,9 +2,12 @@ import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import socketio
-from app.api import device_api, ai_api, websocket_api, ai_websocket_api, phone_control_api
+from app.api import device_api, ai_api, websocket_api, ai_websocket_api, phone_control_api, fleet_api, metrics_api, task_api, trace_api
 from app.api.video_stream_api import sio
 from app.core.config import settings
+from app.services.ai_service import ai_service
+from app.services.task_queue import task_queue
+from app.utils.adb_utils import shutdown_adb_processes
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -30,8 +33,27 @@ socket_app = socketio.ASGIApp(sio, app)
 app.include_router(device_api.router, prefix=settings.API_V1_STR + "/devices", tags=["设备管理"])
 app.include_router(ai_api.router, prefix=settings.API_V1_STR + "/ai", tags=["AI控制"])
 app.include_router(phone_control_api.router, prefix=settings.API_V1_STR + "/control", tags=["手机控制"])
+app.include_router(fleet_api.router, prefix=settings.API_V1_STR + "/fleet", tags=["集群控制"])
+app.include_router(task_api.router, prefix=settings.API_V1_STR + "/tasks", tags=["任务队列"])
+app.include_router(trace_api.router, prefix=settings.API_V1_STR + "/traces", tags=["执行记录"])
 app.include_router(websocket_api.router, prefix=settings.API_V1_STR + "/ws", tags=["实时通信"])
 app.include_router(ai_websocket_api.router, prefix=settings.API_V1_STR + "/ws", tags=["AI实时日志"])
+app.include_router(metrics_api.router, prefix=settings.API_V1_STR + "/metrics", tags=["运行指标"])
+
+# 服务启动时预加载 AI 代理模块
+@app.on_event("startup")
+async def on_startup():
+    if settings.AGENT_RUNNER_MODE != "subprocess":
+        ai_service.runner.start_warm_up()
+    await task_queue.start()
+
+# 服务关闭时回收所有 adb 子进程
+@app.on_event("shutdown")
+async def on_shutdown():
+    await task_queue.stop()
+    ai_service.runner.shutdown()
+    await ai_service.runner.close_device_layer()
+    await shutdown_adb_processes()
 
 # 根路由
 @app.get("/")
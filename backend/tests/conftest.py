@@ -0,0 +1,9 @@
+"""使 app 包可以导入，并把日志和数据目录放到临时目录中"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# logs/ 和 data/ 按当前工作目录创建，测试时不写入仓库
+os.chdir(tempfile.mkdtemp(prefix="backend-tests-"))
@@ -0,0 +1,73 @@
+"""批量操作命令生成与预校验的测试"""
+import pytest
+from app.services.phone_control_service import (
+    PhoneControlService,
+    scroll_points,
+    swipe_command,
+)
+
+
+def build(action, params=None, screen=None):
+    return PhoneControlService._build_batch_command(action, params or {}, screen)
+
+
+def test_key_and_statusbar_actions():
+    assert build("press_home") == "input keyevent KEYCODE_HOME"
+    assert build("press_key", {"keycode": "KEYCODE_CAMERA"}) == "input keyevent KEYCODE_CAMERA"
+    assert build("open_notification") == "cmd statusbar expand-notifications"
+
+
+def test_gesture_actions():
+    assert build("tap", {"x": 10, "y": "20"}) == "input tap 10 20"
+    assert build("swipe", {"x1": 1, "y1": 2, "x2": 3, "y2": 4}) == "input swipe 1 2 3 4 300"
+    assert build("long_press", {"x": 5, "y": 6, "duration": 800}) == "input swipe 5 6 5 6 800"
+
+
+def test_text_actions_are_quoted():
+    assert build("input_text", {"text": "a b;rm"}) == "input text 'a%sb;rm'"
+    assert build("clear_text", {"count": 2}) == "input keyevent KEYCODE_DEL KEYCODE_DEL"
+
+
+def test_app_actions():
+    assert build("stop_app", {"package_name": "com.a.b"}) == "am force-stop com.a.b"
+    assert build("start_app", {"package_name": "com.a.b", "activity": ".Main"}) == "am start -n com.a.b/.Main"
+    assert build("start_app", {"package_name": "com.a.b"}).startswith("monkey -p com.a.b ")
+
+
+def test_screen_actions_use_the_shared_geometry():
+    screen = (1080, 1920)
+    expected = swipe_command(*scroll_points("up", 1080, 1920, 400), 300)
+    assert build("scroll_up", {"distance": 400}, screen) == expected
+    assert build("swipe_down", {}, screen) == "input swipe 540 384 540 1536 500"
+    assert build("unlock_screen", {}, screen).endswith("input swipe 540 1536 540 384 500")
+
+
+@pytest.mark.parametrize("action, params", [
+    ("press_key", {"keycode": "HOME; reboot"}),
+    ("start_app", {"package_name": "com.a;reboot"}),
+    ("start_app", {"package_name": "com.a", "activity": ".Main && reboot"}),
+    ("tap", {"x": "left", "y": 1}),
+])
+def test_unsafe_or_malformed_params_are_rejected(action, params):
+    with pytest.raises((ValueError, TypeError, KeyError)):
+        build(action, params)
+
+
+def test_prepare_batch_defers_screen_and_wait_steps():
+    commands = PhoneControlService.prepare_batch([
+        {"action": "press_back"},
+        {"action": "wait", "params": {"duration_ms": 100}},
+        {"action": "scroll_down"},
+    ])
+    assert commands == ["input keyevent KEYCODE_BACK", None, None]
+
+
+@pytest.mark.parametrize("step", [
+    {"action": "reboot"},
+    {"action": "tap", "params": {"x": 1}},
+    {"action": "wait", "params": {"duration_ms": "soon"}},
+    {"action": "scroll_up", "params": {"distance": "far"}},
+])
+def test_prepare_batch_rejects_bad_steps_up_front(step):
+    with pytest.raises(ValueError, match="第 1 步"):
+        PhoneControlService.prepare_batch([{"action": "press_home"}, step])
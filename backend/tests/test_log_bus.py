@@ -0,0 +1,89 @@
+"""AI 日志总线序号、补发与丢弃的测试"""
+import asyncio
+from app.services.log_bus import LogBus
+
+
+def drain(subscription):
+    async def collect():
+        messages = []
+        while len(subscription) or subscription.dropped:
+            messages.append(await subscription.get(timeout=0))
+        return messages
+    return asyncio.run(collect())
+
+
+def test_seq_is_assigned_per_device():
+    bus = LogBus(buffer_size=10, subscriber_queue=10)
+    assert bus.publish("d1", {"message": "a"}) == 1
+    assert bus.publish("d1", {"message": "b"}) == 2
+    assert bus.publish("d2", {"message": "c"}) == 1
+    assert bus.last_seq("d1") == 2
+    assert bus.last_seq("unknown") == 0
+
+
+def test_subscriber_receives_new_messages_only_by_default():
+    bus = LogBus(buffer_size=10, subscriber_queue=10)
+    bus.publish("d1", {"message": "old"})
+    subscription = bus.subscribe("d1")
+    bus.publish("d1", {"message": "new"})
+    assert [m["message"] for m in drain(subscription)] == ["new"]
+
+
+def test_resubscribe_replays_buffer_after_since():
+    bus = LogBus(buffer_size=10, subscriber_queue=10)
+    for i in range(5):
+        bus.publish("d1", {"message": i})
+    subscription = bus.subscribe("d1", since=3)
+    assert [m["seq"] for m in drain(subscription)] == [4, 5]
+
+
+def test_replay_reports_gap_overwritten_by_ring_buffer():
+    bus = LogBus(buffer_size=3, subscriber_queue=10)
+    for i in range(6):
+        bus.publish("d1", {"message": i})
+    # 缓冲区只剩 4..6，客户端最后收到的是 1
+    messages = drain(bus.subscribe("d1", since=1))
+    assert messages[0] == {"type": "dropped", "device_id": "d1", "count": 2, "next_seq": 4}
+    assert [m["seq"] for m in messages[1:]] == [4, 5, 6]
+
+
+def test_full_queue_drops_oldest_and_notifies_once():
+    bus = LogBus(buffer_size=100, subscriber_queue=2)
+    subscription = bus.subscribe("d1")
+    for i in range(5):
+        bus.publish("d1", {"message": i})
+    messages = drain(subscription)
+    assert messages[0] == {"type": "dropped", "device_id": "d1", "count": 3, "next_seq": 4}
+    assert [m["seq"] for m in messages[1:]] == [4, 5]
+    assert subscription.total_dropped == 3
+    assert subscription.dropped == 0
+    assert bus.snapshot()["devices"][0]["dropped"] == 3
+
+
+def test_slow_subscriber_does_not_affect_others():
+    bus = LogBus(buffer_size=100, subscriber_queue=2)
+    slow = bus.subscribe("d1")
+    fast = bus.subscribe("d1")
+    received = []
+    for i in range(4):
+        bus.publish("d1", {"message": i})
+        received.extend(m["seq"] for m in drain(fast))
+    assert received == [1, 2, 3, 4]
+    assert slow.total_dropped == 2
+
+
+def test_get_returns_none_on_timeout_and_after_unsubscribe():
+    bus = LogBus(buffer_size=10, subscriber_queue=10)
+    subscription = bus.subscribe("d1")
+
+    async def scenario():
+        assert await subscription.get(timeout=0.01) is None
+        waiter = asyncio.create_task(subscription.get())
+        await asyncio.sleep(0)
+        bus.unsubscribe(subscription)
+        assert await waiter is None
+
+    asyncio.run(scenario())
+    bus.publish("d1", {"message": "after"})
+    assert len(subscription) == 0
+    assert bus.snapshot()["devices"][0]["subscribers"] == 0
@@ -0,0 +1,163 @@
+"""任务队列抢占调度的测试"""
+import asyncio
+import pytest
+from app.core.config import settings
+from app.services import task_queue as task_queue_module
+from app.services.task_queue import TaskQueue, QUEUED, RUNNING, SUCCEEDED
+
+
+class FakeAIService:
+    """按设备阻塞执行的 AI 服务，cancel 时让对应设备上的执行立即返回"""
+
+    def __init__(self):
+        self.started = []
+        self.cancelled = []
+        self._release = {}
+
+    async def execute_natural_language_command(self, device_id, command, **kwargs):
+        self.started.append(command)
+        release = self._release[device_id] = asyncio.Event()
+        await release.wait()
+        return {"success": True, "command": command}
+
+    async def cancel(self, device_id, reason=None):
+        self.cancelled.append(device_id)
+        self.finish(device_id)
+        return True
+
+    def finish(self, device_id):
+        release = self._release.pop(device_id, None)
+        if release is not None:
+            release.set()
+
+
+@pytest.fixture
+def fake_ai(monkeypatch):
+    fake = FakeAIService()
+    # _pick 会查询 runner 上正在运行的设备
+    fake.runner = task_queue_module.ai_service.runner
+    monkeypatch.setattr(task_queue_module, "ai_service", fake)
+    monkeypatch.setattr(settings, "TASK_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(settings, "TASK_PREEMPT_PRIORITY_GAP", 10)
+    return fake
+
+
+async def wait_until(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await predicate():
+        assert asyncio.get_running_loop().time() < deadline, "等待超时"
+        await asyncio.sleep(0.01)
+
+
+async def status_of(queue, task_id):
+    return (await queue.get(task_id))["status"]
+
+
+def run(coro):
+    asyncio.run(coro)
+
+
+def test_higher_priority_task_preempts_and_victim_is_requeued(fake_ai, tmp_path):
+    async def scenario():
+        queue = TaskQueue(str(tmp_path / "tasks.db"))
+        await queue.start()
+        try:
+            low, = await queue.submit([{"device_id": "d1", "command": "low", "priority": 0}])
+            await wait_until(lambda: _is(queue, low["id"], RUNNING))
+
+            high, middle = await queue.submit([
+                {"device_id": "d1", "command": "high", "priority": 10},
+                # 优先级差距不足，不会抢占，也不能插到抢占方前面
+                {"device_id": "d1", "command": "middle", "priority": 5},
+            ])
+            await wait_until(lambda: _is(queue, high["id"], RUNNING))
+            assert fake_ai.cancelled == ["d1"]
+
+            victim = await queue.get(low["id"])
+            assert victim["status"] == QUEUED
+            assert victim["preemptions"] == 1
+            assert await status_of(queue, middle["id"]) == QUEUED
+
+            # 抢占方结束后按优先级继续执行：middle 先于重新排队的 low
+            fake_ai.finish("d1")
+            await wait_until(lambda: _is(queue, middle["id"], RUNNING))
+            fake_ai.finish("d1")
+            await wait_until(lambda: _is(queue, low["id"], RUNNING))
+            fake_ai.finish("d1")
+            await wait_until(lambda: _is(queue, low["id"], SUCCEEDED))
+
+            assert fake_ai.started == ["low", "high", "middle", "low"]
+            assert fake_ai.cancelled == ["d1"]
+            assert (await queue.get(high["id"]))["status"] == SUCCEEDED
+        finally:
+            await queue.stop()
+
+    run(scenario())
+
+
+def test_priority_gap_below_threshold_does_not_preempt(fake_ai, tmp_path):
+    async def scenario():
+        queue = TaskQueue(str(tmp_path / "tasks.db"))
+        await queue.start()
+        try:
+            running, = await queue.submit([{"device_id": "d1", "command": "a", "priority": 0}])
+            await wait_until(lambda: _is(queue, running["id"], RUNNING))
+            waiting, = await queue.submit([{"device_id": "d1", "command": "b", "priority": 9}])
+            await asyncio.sleep(0.1)
+
+            assert fake_ai.cancelled == []
+            assert await status_of(queue, running["id"]) == RUNNING
+            assert await status_of(queue, waiting["id"]) == QUEUED
+            fake_ai.finish("d1")
+            await wait_until(lambda: _is(queue, waiting["id"], RUNNING))
+            fake_ai.finish("d1")
+        finally:
+            await queue.stop()
+
+    run(scenario())
+
+
+def test_reservation_is_released_when_preempting_task_is_cancelled(fake_ai, tmp_path):
+    async def scenario():
+        queue = TaskQueue(str(tmp_path / "tasks.db"))
+        # 先让抢占方排队，再启动调度器，保证两个任务在同一轮中被看到
+        low, = await queue.submit([{"device_id": "d1", "command": "low", "priority": 0}])
+        await queue.start()
+        try:
+            await wait_until(lambda: _is(queue, low["id"], RUNNING))
+            # 抢占中的任务结束前，抢占方被取消
+            fake_ai.cancel = _record_only(fake_ai)
+            high, = await queue.submit([{"device_id": "d1", "command": "high", "priority": 20}])
+            await wait_until(lambda: _has(fake_ai.cancelled))
+            await queue.cancel(high["id"])
+            fake_ai.finish("d1")
+
+            # 预留解除后，被抢占的任务重新分派
+            await wait_until(lambda: _started(fake_ai, 2))
+            assert fake_ai.started == ["low", "low"]
+            assert await status_of(queue, low["id"]) == RUNNING
+            fake_ai.finish("d1")
+            await wait_until(lambda: _is(queue, low["id"], SUCCEEDED))
+        finally:
+            await queue.stop()
+
+    run(scenario())
+
+
+def _record_only(fake):
+    async def cancel(device_id, reason=None):
+        fake.cancelled.append(device_id)
+        return True
+    return cancel
+
+
+async def _is(queue, task_id, status):
+    return await status_of(queue, task_id) == status
+
+
+async def _has(items):
+    return bool(items)
+
+
+async def _started(fake, count):
+    return len(fake.started) >= count
@@ -74,7 +74,13 @@ const AIConsole: React.FC<AIConsoleProps> = ({ logs, connected, onClear, deviceI
         return { 
           color: '#ff4d4f', 
           prefix: '[ERR]', 
-          className: 'log-error' 
+          className: 'log-error'
+        }
+      case 'warning':
+        return {
+          color: '#faad14',
+          prefix: '[WARN]',
+          className: 'log-warning'
         }
       default:
         return { 
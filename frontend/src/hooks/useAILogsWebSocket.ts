@@ -1,12 +1,15 @@
 import { useEffect, useRef, useState, useCallback } from 'react'
 
 interface AILogMessage {
-  type: 'ai_log' | 'connected' | 'heartbeat'
-  log_type?: 'info' | 'step' | 'model_request' | 'model_response' | 'action' | 'error'
+  type: 'ai_log' | 'connected' | 'heartbeat' | 'pong' | 'dropped'
+  log_type?: 'info' | 'step' | 'model_request' | 'model_response' | 'action' | 'error' | 'warning'
   message?: string
   device_id?: string
   timestamp?: number
   data?: any
+  seq?: number
+  last_seq?: number
+  count?: number
 }
 
 interface AILogEntry {
@@ -32,10 +35,17 @@ export function useAILogsWebSocket(deviceId: string | null): UseAILogsWebSocketR
   const reconnectTimerRef = useRef<number | null>(null)
   const reconnectAttempts = useRef(0)
   const maxReconnectAttempts = 5
+  // 最后收到的日志序号，重连时从这里补发
+  const lastSeqRef = useRef<number | null>(null)
 
   const wsUrl = import.meta.env.VITE_API_URL || 'http://localhost:8001'
   const url = deviceId ? `${wsUrl.replace('http', 'ws')}/api/v1/ws/ai-logs/${deviceId}` : null
 
+  // 切换设备时重新计数
+  useEffect(() => {
+    lastSeqRef.current = null
+  }, [deviceId])
+
   const addLog = useCallback((logEntry: AILogEntry) => {
     setLogs(prev => [...prev, logEntry])
   }, [])
@@ -67,8 +77,10 @@ export function useAILogsWebSocket(deviceId: string | null): UseAILogsWebSocketR
     disconnect() // 清理现有连接
 
     try {
-      console.log('连接 AI 日志 WebSocket:', url)
-      const ws = new WebSocket(url)
+      const since = lastSeqRef.current
+      const connectUrl = since !== null ? `${url}?since=${since}` : url
+      console.log('连接 AI 日志 WebSocket:', connectUrl)
+      const ws = new WebSocket(connectUrl)
       wsRef.current = ws
 
       ws.onopen = () => {
@@ -93,6 +105,13 @@ export function useAILogsWebSocket(deviceId: string | null): UseAILogsWebSocketR
           console.log('📨 收到 AI 日志消息:', message)
           
           if (message.type === 'ai_log' && message.log_type && message.message) {
+            if (message.seq !== undefined) {
+              // 补发与已收到的日志重叠时跳过
+              if (lastSeqRef.current !== null && message.seq <= lastSeqRef.current) {
+                return
+              }
+              lastSeqRef.current = message.seq
+            }
             const logEntry: AILogEntry = {
               id: `${Date.now()}_${Math.random().toString(36).substr(2, 9)}`,
               timestamp: message.timestamp || Date.now(),
@@ -105,6 +124,17 @@ export function useAILogsWebSocket(deviceId: string | null): UseAILogsWebSocketR
             addLog(logEntry)
           } else if (message.type === 'connected') {
             console.log('AI 日志连接确认:', message.message)
+            // 服务重启后序号从头开始
+            if (lastSeqRef.current !== null && (message.last_seq ?? 0) < lastSeqRef.current) {
+              lastSeqRef.current = null
+            }
+          } else if (message.type === 'dropped') {
+            addLog({
+              id: `${Date.now()}_${Math.random().toString(36).substr(2, 9)}`,
+              timestamp: Date.now(),
+              log_type: 'warning',
+              message: `日志过多，已跳过 ${message.count} 条`
+            })
           } else if (message.type === 'heartbeat' || message.type === 'pong') {
             // 心跳消息，不需要处理
           } else {